@@ -0,0 +1,277 @@
+import json
+import os
+import shutil
+import time
+from typing import (
+    Dict,
+    Optional,
+)
+
+from slips_files.core.helpers.alert_writer import AlertWriter
+
+
+# the checkpoints store where slips is in each zeek file, so they're only
+# supported for zeek files that are done being written
+CHECKPOINTED_INPUT_TYPES = ("zeek_folder", "zeek_log_file")
+CHECKPOINT_DIR = "checkpoint"
+INFO_FILE = "checkpoint.json"
+RDB_FILE = "redis.rdb"
+SQLITE_FILE = "flows.sqlite"
+# the copy of the redis snapshot the redis server loads when resuming
+RESUMED_RDB = "resumed_db.rdb"
+
+
+class CheckpointManager:
+    """
+    Periodically stores a checkpoint of the analysis of zeek files in
+    <output_dir>/checkpoint/, to be able to continue it using
+    --resume <output_dir> if slips stops or crashes.
+    Each checkpoint has
+        redis.rdb: a snapshot of the redis db written in the background
+            by redis (BGSAVE). it has the number of processed flows and
+            the offset of the last processed flow in each zeek file,
+            stored by the profiler with each flow
+        flows.sqlite: a copy of the sqlite db taken using the sqlite online
+            backup api once the redis snapshot is done
+        checkpoint.json: the input of the analysis and the size of the
+            alerts files when the checkpoint was taken
+    The alerts files are written by the evidence handler, so it's the one
+    flushing them and starting the snapshot of each checkpoint when main
+    asks it to
+    """
+
+    def __init__(self, main):
+        self.main = main
+        # seconds between checkpoints, 0 if they're disabled
+        self.interval: float = 0
+        self.last_checkpoint_time = 0.0
+        # the time the evidence handler was asked to start the snapshot
+        # of the next checkpoint, until it does
+        self.requested_at: Optional[str] = None
+        # set while redis is writing the snapshot of the next checkpoint
+        self.is_saving = False
+        # {filename: {"size": .., "rotated_files": ..}} of each alerts
+        # file when the snapshot was started
+        self.alerts_files: Dict[str, Dict[str, int]] = {}
+        # set by resume()
+        self.rdb_to_load: Optional[str] = None
+
+    @staticmethod
+    def get_checkpoint_dir(output_dir: str) -> str:
+        return os.path.join(output_dir, CHECKPOINT_DIR)
+
+    def enable(self):
+        """
+        enables the checkpoints if they're enabled in the config and
+        supported by the given input. should be called after starting the db
+        """
+        interval = self.main.conf.checkpoint_interval()
+        if not interval:
+            return
+
+        if (
+            self.main.input_type not in CHECKPOINTED_INPUT_TYPES
+            or self.main.db.is_growing_zeek_dir()
+        ):
+            self.main.print(
+                "Warning: Checkpoints are only supported when reading zeek "
+                "files. Disabled checkpoints."
+            )
+            return
+
+        if self.main.conf.message_transport() != "streams":
+            # the offsets of the flows the modules didn't get to yet are
+            # in the snapshot, so their msgs have to be in it too.
+            # pub/sub msgs aren't, streams msgs are until they're acked
+            self.main.print(
+                "Warning: Checkpoints require message_transport: streams "
+                "in config/slips.yaml. Disabled checkpoints."
+            )
+            return
+
+        self.interval = interval
+        self.last_checkpoint_time = time.time()
+        self.main.print(
+            f"Storing a checkpoint every {interval} seconds in "
+            f"{self.get_checkpoint_dir(self.main.args.output)}"
+        )
+
+    def update(self):
+        """
+        is called by main every few seconds. starts a new checkpoint when
+        it's time to, or stores the current one once its snapshot is done
+        """
+        if not self.interval:
+            return
+
+        if self.is_saving:
+            self.finish_checkpoint()
+            return
+
+        if self.requested_at:
+            self.check_snapshot_request()
+            return
+
+        if time.time() - self.last_checkpoint_time < self.interval:
+            return
+
+        self.requested_at = str(time.time())
+        self.main.db.publish("take_checkpoint", self.requested_at)
+
+    def check_snapshot_request(self):
+        """
+        checks whether the evidence handler started the snapshot of the
+        requested checkpoint
+        """
+        snapshot: Optional[dict] = self.main.db.get_checkpoint_snapshot()
+        if not snapshot or snapshot["requested_at"] != self.requested_at:
+            # the evidence handler didn't get to the request yet
+            return
+
+        self.requested_at = None
+        self.alerts_files = snapshot["alerts_files"]
+        # redis forks and writes the snapshot without blocking slips,
+        # it's stored in the checkpoint dir once it's done.
+        # if redis was busy, it's requested again in the next update()
+        self.is_saving = snapshot["started"]
+
+    def finish_checkpoint(self):
+        status: Optional[bool] = self.main.db.get_background_save_status()
+        if status is None:
+            # redis is still writing the snapshot
+            return
+
+        self.is_saving = False
+        self.last_checkpoint_time = time.time()
+        if not status:
+            self.main.print(
+                "Error storing a checkpoint: redis failed to write a "
+                "snapshot of the db.",
+                0,
+                1,
+            )
+            return
+
+        try:
+            self.store_checkpoint()
+        except OSError as e:
+            self.main.print(f"Error storing a checkpoint: {e}", 0, 1)
+
+    def store_checkpoint(self):
+        """
+        copies the redis snapshot, the sqlite db and the info of the
+        checkpoint to the checkpoint dir
+        """
+        checkpoint_dir = self.get_checkpoint_dir(self.main.args.output)
+        # the new checkpoint replaces the old one only once it's complete,
+        # so slips stopping while storing it doesn't break the old one
+        tmp_dir = f"{checkpoint_dir}.tmp"
+        old_dir = f"{checkpoint_dir}.old"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        shutil.copy(
+            self.main.db.get_rdb_path(), os.path.join(tmp_dir, RDB_FILE)
+        )
+        # taken after the redis snapshot so it has all the flows in it.
+        # the flows added after it are added again when resuming
+        self.main.db.backup_sqlite_db(os.path.join(tmp_dir, SQLITE_FILE))
+
+        info = {
+            "input_information": self.main.input_information,
+            "input_type": self.main.input_type,
+            "time": time.time(),
+            "alerts_files": self.alerts_files,
+        }
+        with open(os.path.join(tmp_dir, INFO_FILE), "w") as f:
+            json.dump(info, f)
+
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(checkpoint_dir):
+            os.replace(checkpoint_dir, old_dir)
+        os.replace(tmp_dir, checkpoint_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        self.main.print(
+            f"Stored a checkpoint after "
+            f"{self.main.db.get_processed_flows_so_far()} flows.",
+            2,
+            0,
+        )
+
+    def read_checkpoint_info(self, output_dir: str) -> Optional[dict]:
+        path = os.path.join(self.get_checkpoint_dir(output_dir), INFO_FILE)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, json.decoder.JSONDecodeError):
+            return None
+
+    @staticmethod
+    def restore_alerts_file(path: str, size: int, rotated_files: int):
+        """
+        truncates the alerts file that was being written when the
+        checkpoint was taken to its size back then.
+        if it was rotated since, it's moved back to the given path and the
+        files rotated after it are removed
+        :param rotated_files: the number of files rotated before the
+            checkpoint, the next rotated file is the one to truncate
+        """
+        paths = AlertWriter.get_rotated_paths(path)
+        if os.path.exists(path):
+            paths.append(path)
+        if len(paths) <= rotated_files:
+            # the files rotated before the checkpoint were removed
+            return
+
+        checkpoint_path = paths[rotated_files]
+        for newer_path in paths[rotated_files + 1 :]:
+            os.remove(newer_path)
+        if os.path.getsize(checkpoint_path) > size:
+            os.truncate(checkpoint_path, size)
+        if checkpoint_path != path:
+            os.replace(checkpoint_path, path)
+
+    def resume(self) -> Optional[str]:
+        """
+        restores the dbs and the alerts files of the output dir given to
+        --resume to its last checkpoint.
+        returns the input of the analysis to continue
+        """
+        # do not use self.main.print here, the output process isn't
+        # started yet
+        output_dir = self.main.args.resume
+        info = self.read_checkpoint_info(output_dir)
+        if not info or info.get("input_type") not in CHECKPOINTED_INPUT_TYPES:
+            print(
+                f"[Main] No valid checkpoint found in {output_dir}. "
+                f"Stopping Slips."
+            )
+            self.main.terminate_slips()
+            return None
+
+        checkpoint_dir = self.get_checkpoint_dir(output_dir)
+        self.main.args.output = output_dir
+        # the sqlite db of the output dir is used as is when it exists
+        shutil.copy(
+            os.path.join(checkpoint_dir, SQLITE_FILE),
+            os.path.join(output_dir, SQLITE_FILE),
+        )
+        # the redis server loads this file when it's started, it's a copy
+        # because redis writes its next snapshots to it
+        self.rdb_to_load = os.path.abspath(
+            os.path.join(output_dir, RESUMED_RDB)
+        )
+        shutil.copy(os.path.join(checkpoint_dir, RDB_FILE), self.rdb_to_load)
+
+        # remove the alerts added after the checkpoint, they're added
+        # again once their flows are read
+        for filename, file_info in info.get("alerts_files", {}).items():
+            self.restore_alerts_file(
+                os.path.join(output_dir, filename), **file_info
+            )
+
+        print(
+            f"[Main] Resuming the analysis of {info['input_information']} "
+            f"from its checkpoint in {checkpoint_dir}"
+        )
+        return info["input_information"]
@@ -371,7 +371,8 @@ class RedisManager:
             if redis_port != 6379:
                 # close slips if port is in use
                 self.close_slips_if_port_in_use(redis_port)
-        elif self.main.args.multiinstance:
+        elif self.main.args.multiinstance or self.main.args.resume:
+            # when resuming, the checkpoint is loaded by a new redis server
             redis_port = self.get_random_redis_port()
             if not redis_port:
                 # all ports are unavailable
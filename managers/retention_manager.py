@@ -0,0 +1,105 @@
+from typing import List
+
+from slips_files.common.slips_utils import utils
+
+# the max number of tws to archive each time main calls update(), so
+# archiving doesn't block the main loop for long
+MAX_TWS_PER_UPDATE = 500
+# the number of tws to archive when redis uses more memory than allowed
+MEMORY_BATCH = 50
+
+
+class RetentionManager:
+    """
+    Bounds the memory used by redis when slips runs for long by moving the
+    data of the oldest closed timewindows to the sqlite db.
+    The archived timewindows are read back to redis by the DBManager when
+    they're needed again, or when kalipso asks for them in the
+    restore_archived_tw channel.
+    """
+
+    def __init__(self, main):
+        self.main = main
+        # number of closed tws to keep in redis, 0 keeps all of them
+        self.keep_closed_tws: int = 0
+        # bytes, 0 if redis has no memory budget
+        self.max_redis_memory: int = 0
+        # kalipso publishes the archived tws it wants to view here
+        self.restore_channel = None
+
+    def enable(self):
+        """should be called after starting the db"""
+        self.keep_closed_tws = self.main.conf.keep_closed_tws()
+        self.max_redis_memory = self.main.conf.max_redis_memory()
+        if self.keep_closed_tws:
+            self.main.print(
+                f"Keeping the latest {self.keep_closed_tws} closed "
+                f"timewindows in redis, older ones are moved to sqlite."
+            )
+        if self.max_redis_memory:
+            self.main.print(
+                f"Moving the oldest closed timewindows to sqlite when "
+                f"redis uses more than "
+                f"{self.max_redis_memory // (1024 * 1024)} MBs."
+            )
+        if self.is_enabled():
+            self.restore_channel = self.main.db.subscribe(
+                "restore_archived_tw"
+            )
+
+    def is_enabled(self) -> bool:
+        return bool(self.keep_closed_tws or self.max_redis_memory)
+
+    def get_number_of_tws_to_archive(self) -> int:
+        to_archive = 0
+        if self.keep_closed_tws:
+            to_archive = (
+                self.main.db.get_closed_tws_to_archive_len()
+                - self.keep_closed_tws
+            )
+
+        if (
+            self.max_redis_memory
+            and self.main.db.get_used_memory() > self.max_redis_memory
+        ):
+            to_archive = max(to_archive, MEMORY_BATCH)
+        return min(to_archive, MAX_TWS_PER_UPDATE)
+
+    def restore_requested_tws(self):
+        """
+        reads back to redis the archived tws that kalipso asked for.
+        kalipso reads redis directly, so it can't use the DBManager to
+        restore them
+        """
+        while msg := self.restore_channel.get_message(timeout=0.01):
+            if not utils.is_msg_intended_for(msg, "restore_archived_tw"):
+                continue
+            # e.g. profile_1.1.1.1_timewindow1
+            profileid, twid = msg["data"].rsplit("_", 1)
+            self.main.db.restore_archived_tw(profileid, twid)
+
+    def update(self):
+        """
+        is called by main every few seconds. archives the oldest closed tws
+        if there are more than keep_closed_tws, or if redis uses more
+        memory than max_redis_memory
+        """
+        if not self.is_enabled():
+            return
+
+        self.restore_requested_tws()
+
+        to_archive: List[str] = self.main.db.get_closed_tws_to_archive(
+            self.get_number_of_tws_to_archive()
+        )
+        archived = 0
+        for profileid_tw in to_archive:
+            # e.g. profile_1.1.1.1_timewindow1
+            profileid, twid = profileid_tw.rsplit("_", 1)
+            if self.main.db.archive_tw(profileid, twid):
+                archived += 1
+
+        if archived:
+            self.main.print(
+                f"Moved {archived} closed timewindows to sqlite.", 2, 0
+            )
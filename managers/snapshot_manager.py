@@ -0,0 +1,125 @@
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import (
+    List,
+    Optional,
+)
+
+from slips_files.common.slips_utils import utils
+
+SNAPSHOTS_DIR = "snapshots"
+
+
+class SnapshotManager:
+    """
+    Periodically stores snapshots of the redis db in
+    <output_dir>/snapshots/ while slips is running, and keeps only the
+    latest ones.
+    Redis writes each snapshot from a forked process (BGSAVE) and it's
+    copied to the snapshots dir by a thread, so neither redis nor the main
+    process are blocked while saving big dbs.
+    The snapshots can be loaded using -d like the dbs saved using -s.
+    """
+
+    def __init__(self, main):
+        self.main = main
+        # seconds between snapshots, 0 if they're disabled
+        self.interval: float = 0
+        self.to_keep: int = 3
+        self.last_snapshot_time = 0.0
+        # set while redis is writing the next snapshot
+        self.is_saving = False
+        self.copy_thread: Optional[threading.Thread] = None
+
+    def get_snapshots_dir(self) -> str:
+        return os.path.join(self.main.args.output, SNAPSHOTS_DIR)
+
+    def enable(self):
+        """should be called after starting the db"""
+        self.interval = self.main.conf.snapshot_interval()
+        if not self.interval:
+            return
+        self.to_keep = self.main.conf.snapshots_to_keep()
+        self.last_snapshot_time = time.time()
+        self.main.print(
+            f"Storing a snapshot of the db every {self.interval} seconds "
+            f"in {self.get_snapshots_dir()}"
+        )
+
+    def update(self):
+        """
+        is called by main every few seconds. starts a new snapshot when
+        it's time to, or copies the current one once redis wrote it
+        """
+        if not self.interval:
+            return
+
+        if self.copy_thread and self.copy_thread.is_alive():
+            return
+
+        if self.is_saving:
+            self.finish_snapshot()
+            return
+
+        if time.time() - self.last_snapshot_time < self.interval:
+            return
+        self.is_saving = self.main.db.start_background_save()
+
+    def finish_snapshot(self):
+        status: Optional[bool] = self.main.db.get_background_save_status()
+        if status is None:
+            # redis is still writing the snapshot
+            return
+
+        self.is_saving = False
+        self.last_snapshot_time = time.time()
+        if not status:
+            self.main.print(
+                "Error storing a snapshot: redis failed to write a "
+                "snapshot of the db.",
+                0,
+                1,
+            )
+            return
+
+        self.copy_thread = threading.Thread(
+            target=self.store_snapshot,
+            args=(self.main.db.get_rdb_path(),),
+            daemon=True,
+        )
+        self.copy_thread.start()
+
+    def store_snapshot(self, rdb_path: str):
+        """
+        copies the given .rdb to the snapshots dir and removes the old
+        snapshots
+        """
+        snapshots_dir = self.get_snapshots_dir()
+        now = utils.convert_format(datetime.now(), "%Y-%m-%d_%H:%M:%S")
+        snapshot = os.path.join(snapshots_dir, f"{now}.rdb")
+        try:
+            os.makedirs(snapshots_dir, exist_ok=True)
+            # the snapshot is renamed once it's complete so there are no
+            # half copied snapshots in the dir
+            shutil.copy(rdb_path, f"{snapshot}.tmp")
+            os.replace(f"{snapshot}.tmp", snapshot)
+        except OSError as e:
+            self.main.print(f"Error storing a snapshot: {e}", 0, 1)
+            return
+
+        for old_snapshot in self.get_snapshots()[: -self.to_keep]:
+            os.remove(old_snapshot)
+        self.main.print(f"Stored a snapshot of the db in {snapshot}", 2, 0)
+
+    def get_snapshots(self) -> List[str]:
+        """returns the stored snapshots from the oldest to the newest"""
+        snapshots_dir = self.get_snapshots_dir()
+        # the names are the dates of the snapshots
+        return [
+            os.path.join(snapshots_dir, snapshot)
+            for snapshot in sorted(os.listdir(snapshots_dir))
+            if snapshot.endswith(".rdb")
+        ]
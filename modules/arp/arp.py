@@ -30,12 +30,8 @@ class ARP(IModule):
     authors = ["Alya Gomaa"]
 
     def init(self):
-        self.c1 = self.db.subscribe("new_arp")
-        self.c2 = self.db.subscribe("tw_closed")
-        self.channels = {
-            "new_arp": self.c1,
-            "tw_closed": self.c2,
-        }
+        self.register_handler("new_arp", self.handle_new_arp)
+        self.register_handler("tw_closed", self.handle_tw_closed)
         self.read_configuration()
         self.classifier = FlowClassifier()
         # this dict will categorize arp requests by profileid_twid
@@ -515,45 +511,46 @@ class ARP(IModule):
         utils.drop_root_privs()
         self.timer_thread_arp_scan.start()
 
+    def handle_new_arp(self, msg: dict):
+        msg = json.loads(msg["data"])
+        profileid = msg["profileid"]
+        twid = msg["twid"]
+        # this is the actual arp flow
+        flow = self.classifier.convert_to_flow_obj(msg["flow"])
+        # PS: arp flows don't have uids by zeek. the uids received
+        # are randomly generated by slips
+
+        if self.check_if_gratutitous_arp(flow):
+            # for MITM arp attack, the arp has to be gratuitous
+            # and it has to be a reply operation, not a request.
+            # A gratuitous ARP is always a reply. A MITM attack
+            # happens when there is a reply without a request
+            self.detect_mitm_arp_attack(twid, flow)
+        else:
+            # not gratuitous and request, may be an arp scan
+            self.check_arp_scan(profileid, twid, flow)
+
+        if "request" in flow.operation:
+            self.check_dstip_outside_localnet(twid, flow)
+        elif "reply" in flow.operation:
+            # Unsolicited ARPs should be of type reply only, not request
+            self.detect_unsolicited_arp(twid, flow)
+
+    def handle_tw_closed(self, msg: dict):
+        # if the tw is closed, remove all its entries from the cache dict
+        profileid_tw = msg["data"]
+        # when a tw is closed, this means that it's too
+        # old so we don't check for arp scan in this time
+        # range anymore
+        # this copy is made to avoid dictionary
+        # changed size during iteration err
+        cache_copy = self.cache_arp_requests.copy()
+        for key in cache_copy:
+            if profileid_tw in key:
+                self.cache_arp_requests.pop(key)
+                # don't break, keep looking for more
+                # keys that belong to the same tw
+
     def main(self):
+        # runs after each batch of msgs is dispatched to the handlers
         self.clear_arp_logfile()
-
-        if msg := self.get_msg("new_arp"):
-            msg = json.loads(msg["data"])
-            profileid = msg["profileid"]
-            twid = msg["twid"]
-            # this is the actual arp flow
-            flow = self.classifier.convert_to_flow_obj(msg["flow"])
-            # PS: arp flows don't have uids by zeek. the uids received
-            # are randomly generated by slips
-
-            if self.check_if_gratutitous_arp(flow):
-                # for MITM arp attack, the arp has to be gratuitous
-                # and it has to be a reply operation, not a request.
-                # A gratuitous ARP is always a reply. A MITM attack
-                # happens when there is a reply without a request
-                self.detect_mitm_arp_attack(twid, flow)
-            else:
-                # not gratuitous and request, may be an arp scan
-                self.check_arp_scan(profileid, twid, flow)
-
-            if "request" in flow.operation:
-                self.check_dstip_outside_localnet(twid, flow)
-            elif "reply" in flow.operation:
-                # Unsolicited ARPs should be of type reply only, not request
-                self.detect_unsolicited_arp(twid, flow)
-
-        # if the tw is closed, remove all its entries from the cache dict
-        if msg := self.get_msg("tw_closed"):
-            profileid_tw = msg["data"]
-            # when a tw is closed, this means that it's too
-            # old so we don't check for arp scan in this time
-            # range anymore
-            # this copy is made to avoid dictionary
-            # changed size during iteration err
-            cache_copy = self.cache_arp_requests.copy()
-            for key in cache_copy:
-                if profileid_tw in key:
-                    self.cache_arp_requests.pop(key)
-                    # don't break, keep looking for more
-                    # keys that belong to the same tw
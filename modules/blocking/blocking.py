@@ -1,4 +1,14 @@
+from typing import (
+    List,
+    Optional,
+)
+
+from modules.blocking.firewall_backends import (
+    DryRunBackend,
+    IpsetBackend,
+)
 from slips_files.common.abstracts.module import IModule
+from slips_files.common.parsers.config_parser import ConfigParser
 import platform
 import sys
 import os
@@ -18,22 +28,57 @@ class Blocking(IModule):
     authors = ["Sebastian Garcia, Alya Gomaa"]
 
     def init(self):
-        self.c1 = self.db.subscribe("new_blocking")
-        self.channels = {
-            "new_blocking": self.c1,
-        }
+        self.register_batch_handler(
+            "new_blocking", self.handle_blocking_requests
+        )
+        self.read_configuration()
+        self.set_sudo_according_to_env()
+        # this will keep track of ips that are blocked only for a specific time
+        # format {ip: (block_for(seconds), time_of_blocking(epoch))}
+        self.unblock_ips = {}
+        if self.backend_name == "dry_run":
+            # nothing is blocked, so no firewall is needed
+            self.firewall = None
+            self.backend: Optional[IpsetBackend] = DryRunBackend(self.sudo)
+            self.backend.init()
+            return
+
         self.os = platform.system()
         if self.os == "Darwin":
             self.print("Mac OS blocking is not supported yet.")
             sys.exit()
         self.firewall = self.determine_linux_firewall()
-        self.set_sudo_according_to_env()
         self.initialize_chains_in_firewall()
-        # this will keep track of ips that are blocked only for a specific time
-        # format {ip: (block_for(seconds), time_of_blocking(epoch))}
-        self.unblock_ips = {}
+        self.backend = self.init_ipset_backend()
+
+    def read_configuration(self):
+        conf = ConfigParser()
+        self.backend_name = conf.blocking_backend()
 
-        # self.test()
+    def init_ipset_backend(self) -> Optional[IpsetBackend]:
+        """
+        returns the backend that blocks ips using ipsets, or None if
+        ipsets can't be used, so each ip is blocked by its own iptables
+        rules
+        """
+        if self.backend_name != "ipset" or self.firewall != "iptables":
+            return None
+
+        if not shutil.which("ipset"):
+            self.print(
+                "ipset is not installed. Blocking each ip using its own "
+                "iptables rules."
+            )
+            return None
+
+        backend = IpsetBackend(self.sudo)
+        if not backend.init():
+            self.print(
+                "Unable to create the slips ipsets. Blocking each ip using "
+                "its own iptables rules."
+            )
+            return None
+        return backend
 
     def test(self):
         """For debugging purposes, once we're done with the module we'll delete it"""
@@ -85,6 +130,12 @@ class Blocking(IModule):
 
     def delete_slipsBlocking_chain(self):
         """Flushes and deletes everything in slipsBlocking chain"""
+        if isinstance(self.backend, IpsetBackend):
+            # deletes the chains that use the ipsets, then the ipsets
+            self.backend.delete()
+            print("Successfully deleted slipsBlocking chain.")
+            return True
+
         # check if slipsBlocking chain exists before flushing it and suppress stderr and stdout while checking
         # 0 means it exists
         chain_exists = (
@@ -194,6 +245,11 @@ class Blocking(IModule):
 
     def is_ip_blocked(self, ip) -> bool:
         """Checks if ip is already blocked or not"""
+        if self.backend and self.backend.is_blocked(ip):
+            return True
+
+        if self.firewall != "iptables":
+            return False
 
         command = f"{self.sudo}iptables -L slipsBlocking -v -n"
         # Execute command
@@ -220,6 +276,12 @@ class Blocking(IModule):
         if not isinstance(ip_to_block, str):
             return False
 
+        if self.should_use_backend(from_, to, dport, sport, protocol):
+            blocked = self.backend.block(ip_to_block, block_for)
+            if blocked:
+                self.print(f"Blocked all traffic from and to: {ip_to_block}")
+            return blocked
+
         # Make sure ip isn't already blocked before blocking
         if self.is_ip_blocked(ip_to_block):
             return False
@@ -293,6 +355,15 @@ class Blocking(IModule):
         protocol=None,
     ):
         """Unblocks an ip based on the flags passed in the message"""
+        if self.should_use_backend(from_, to, dport, sport, protocol):
+            unblocked = self.backend.unblock(ip_to_unblock)
+            if unblocked:
+                self.print(f"Unblocked: {ip_to_unblock}")
+            return unblocked
+
+        if self.firewall != "iptables":
+            return False
+
         # This dictionary will be used to construct the rule
         options = {
             "protocol": f" -p {protocol}" if protocol else "",
@@ -359,9 +430,12 @@ class Blocking(IModule):
         for ip in unblocked_ips:
             self.unblock_ips.pop(ip)
 
-    def main(self):
-        # There's an IP that needs to be blocked
-        if msg := self.get_msg("new_blocking"):
+    def handle_blocking_requests(self, msgs: List[dict]):
+        """
+        handles all the blocking requests received since the last call,
+        and applies the changes to the ipsets in one batch
+        """
+        for msg in msgs:
             # message['data'] in the new_blocking channel is a dictionary that contains
             # the ip and the blocking options
             # Example of the data dictionary to block or unblock an ip:
@@ -395,4 +469,46 @@ class Blocking(IModule):
                 self.block_ip(ip, from_, to, dport, sport, protocol, block_for)
             else:
                 self.unblock_ip(ip, from_, to, dport, sport, protocol)
+        self.flush_backend()
+
+    def should_use_backend(self, from_, to, dport, sport, protocol) -> bool:
+        """
+        the ipsets block all the traffic from and to the ips in them, the
+        requests that block only some ports, protocols or directions
+        use their own iptables rules
+        """
+        if not self.backend:
+            return False
+        if dport is not None or sport is not None or protocol is not None:
+            return False
+        # both None means block both directions
+        return bool(from_) == bool(to)
+
+    def flush_backend(self):
+        """applies the queued blocks and unblocks of the backend"""
+        if not self.backend:
+            return
+
+        if not self.backend.flush():
+            self.print(
+                "Unable to update the slips ipsets. The last blocks and "
+                "unblocks weren't applied.",
+                0,
+                1,
+            )
+
+        if isinstance(self.backend, DryRunBackend):
+            for cmd, input_ in self.backend.commands:
+                self.print(f"[dry run] {' '.join(cmd)} {input_ or ''}", 2, 0)
+            self.backend.commands.clear()
+
+    def shutdown_gracefully(self):
+        self.flush_backend()
+
+    def main(self):
+        # runs after each batch of blocking requests is handled
         self.check_for_ips_to_unblock()
+        if self.backend:
+            for ip in self.backend.unblock_expired(time.time()):
+                self.print(f"Unblocked: {ip}")
+            self.flush_backend()
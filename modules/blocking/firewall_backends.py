@@ -0,0 +1,201 @@
+import ipaddress
+import subprocess
+import time
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from slips_files.common.data_structures.timer_wheel import TimerWheel
+
+CHAIN = "slipsBlocking"
+# the chains that jump to slipsBlocking
+CHAINS_TO_REDIRECT = ("INPUT", "OUTPUT", "FORWARD")
+# (iptables command, ipset family, ipset name) of each ip version
+FAMILIES = {
+    4: ("iptables", "inet", "slips_blocked_v4"),
+    6: ("ip6tables", "inet6", "slips_blocked_v6"),
+}
+
+
+class IpsetBackend:
+    """
+    Keeps the blocked ips in 2 kernel ipsets (one per ip version) that
+    are matched by 2 rules in the slipsBlocking chain, so the number of
+    rules doesn't grow with the number of blocked ips.
+    - blocks and unblocks are queued and applied in one batch by flush()
+      using ipset restore
+    - is_blocked() is answered by an in-memory mirror of the sets
+    - ips blocked for a limited time are unblocked by a timer wheel
+    """
+
+    def __init__(self, sudo: str = ""):
+        self.sudo: List[str] = sudo.split()
+        # {ip: time when it should be unblocked or None}
+        self.blocked: Dict[str, Optional[float]] = {}
+        # the ips added to or removed from the mirror since the last flush,
+        # with their unblock time, to be able to undo them if the flush
+        # fails
+        self.to_add: Dict[str, Optional[float]] = {}
+        self.to_delete: Dict[str, Optional[float]] = {}
+        # (ip, unblock time) records
+        self.unblock_timers = TimerWheel(tick=1, slots=3600)
+
+    def run(self, cmd: List[str], input_: str = None) -> bool:
+        """
+        runs the given command with the given stdin
+        returns True if it succeeded
+        """
+        try:
+            result = subprocess.run(
+                self.sudo + cmd,
+                input=input_,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+        except FileNotFoundError:
+            return False
+        return result.returncode == 0
+
+    @staticmethod
+    def get_ipset(ip: str) -> Optional[str]:
+        """returns the name of the ipset the given ip should be stored in"""
+        try:
+            return FAMILIES[ipaddress.ip_address(ip).version][2]
+        except ValueError:
+            return None
+
+    def init(self) -> bool:
+        """
+        creates the ipsets, the slipsBlocking chain and the rules that
+        drop the traffic from and to the ips in the sets
+        """
+        ipsets = "".join(
+            f"create {ipset} hash:ip family {family}\n"
+            for _, family, ipset in FAMILIES.values()
+        )
+        if not self.run(["ipset", "restore", "-exist"], ipsets):
+            return False
+
+        for iptables, _, ipset in FAMILIES.values():
+            rules = (
+                "*filter\n"
+                f":{CHAIN} - [0:0]\n"
+                f"-A {CHAIN} -m set --match-set {ipset} src -j DROP\n"
+                f"-A {CHAIN} -m set --match-set {ipset} dst -j DROP\n"
+                "COMMIT\n"
+            )
+            if not self.run([f"{iptables}-restore", "--noflush"], rules):
+                return False
+            for chain in CHAINS_TO_REDIRECT:
+                # insert the jump once, at the top of the chain
+                if not self.run([iptables, "-C", chain, "-j", CHAIN]):
+                    self.run([iptables, "-I", chain, "-j", CHAIN])
+        return True
+
+    def delete(self):
+        """deletes the slipsBlocking chains and the ipsets"""
+        for iptables, _, _ in FAMILIES.values():
+            for chain in CHAINS_TO_REDIRECT:
+                self.run([iptables, "-D", chain, "-j", CHAIN])
+            self.run([iptables, "-F", CHAIN])
+            self.run([iptables, "-X", CHAIN])
+        # the sets can only be destroyed once no rules use them
+        ipsets = "".join(
+            f"destroy {ipset}\n" for _, _, ipset in FAMILIES.values()
+        )
+        self.run(["ipset", "restore", "-exist"], ipsets)
+
+    def is_blocked(self, ip: str) -> bool:
+        return ip in self.blocked
+
+    def block(self, ip: str, block_for: Optional[float] = None) -> bool:
+        """
+        queues the blocking of the given ip until the next flush()
+        :param block_for: seconds to unblock the ip after
+        returns False if the ip is already blocked or isn't an ip
+        """
+        if self.is_blocked(ip) or not self.get_ipset(ip):
+            return False
+
+        unblock_at = time.time() + block_for if block_for else None
+        self.blocked[ip] = unblock_at
+        if ip in self.to_delete:
+            # was unblocked and blocked again before the flush
+            del self.to_delete[ip]
+        else:
+            self.to_add[ip] = unblock_at
+        if unblock_at:
+            self.unblock_timers.schedule(unblock_at, (ip, unblock_at))
+        return True
+
+    def unblock(self, ip: str) -> bool:
+        """
+        queues the unblocking of the given ip until the next flush()
+        returns False if the ip isn't blocked
+        """
+        if not self.is_blocked(ip):
+            return False
+
+        unblock_at = self.blocked.pop(ip)
+        if ip in self.to_add:
+            # was blocked and unblocked before the flush
+            del self.to_add[ip]
+        else:
+            self.to_delete[ip] = unblock_at
+        return True
+
+    def unblock_expired(self, now: float) -> List[str]:
+        """
+        queues the unblocking of the ips whose blocking time passed
+        returns the unblocked ips
+        """
+        unblocked = []
+        for ip, unblock_at in self.unblock_timers.advance(now):
+            # the ip may have been unblocked and blocked again since this
+            # timer was scheduled
+            if self.blocked.get(ip) == unblock_at and self.unblock(ip):
+                unblocked.append(ip)
+        return unblocked
+
+    def get_batch(self) -> str:
+        """returns the ipset restore commands of the queued changes"""
+        batch = [f"add {self.get_ipset(ip)} {ip}\n" for ip in self.to_add]
+        batch += [f"del {self.get_ipset(ip)} {ip}\n" for ip in self.to_delete]
+        return "".join(batch)
+
+    def flush(self) -> bool:
+        """
+        applies the queued blocks and unblocks using one ipset restore
+        returns False if they couldn't be applied, the mirror is reverted
+        in that case
+        """
+        if not self.to_add and not self.to_delete:
+            return True
+
+        applied = self.run(["ipset", "restore", "-exist"], self.get_batch())
+        if not applied:
+            for ip in self.to_add:
+                self.blocked.pop(ip, None)
+            self.blocked.update(self.to_delete)
+        self.to_add, self.to_delete = {}, {}
+        return applied
+
+
+class DryRunBackend(IpsetBackend):
+    """
+    Generates the same commands as the ipset backend, but records them
+    instead of running them, e.g. to test the blocking without root
+    """
+
+    def __init__(self, sudo: str = ""):
+        super().__init__(sudo)
+        # (command, stdin) of each command that would have been run
+        self.commands: List[Tuple[List[str], Optional[str]]] = []
+
+    def run(self, cmd: List[str], input_: str = None) -> bool:
+        self.commands.append((self.sudo + cmd, input_))
+        return True
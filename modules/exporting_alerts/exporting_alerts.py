@@ -20,8 +20,7 @@ class ExportingAlerts(IModule):
     def init(self):
         self.slack = SlackExporter(self.logger, self.db)
         self.stix = StixExporter(self.logger, self.db)
-        self.c1 = self.db.subscribe("export_evidence")
-        self.channels = {"export_evidence": self.c1}
+        self.register_handler("export_evidence", self.handle_export_evidence)
 
     def shutdown_gracefully(self):
         self.slack.shutdown_gracefully()
@@ -57,24 +56,29 @@ class ExportingAlerts(IModule):
         description = evidence["description"]
         return description[: description.index("Leaked location")]
 
-    def main(self):
+    def handle_export_evidence(self, msg: dict):
         # a msg is sent here for each evidence that was part of an alert
-        if msg := self.get_msg("export_evidence"):
-            evidence = json.loads(msg["data"])
-            description = self.remove_sensitive_info(evidence)
-            if self.slack.should_export():
-                srcip = evidence["profile"]["ip"]
-                msg_to_send = f"Src IP {srcip} Detected {description}"
-                self.slack.export(msg_to_send)
-
-            if self.stix.should_export():
-                msg_to_send = (
-                    evidence["evidence_type"],
-                    evidence["attacker"]["value"],
-                )
-                added_to_stix: bool = self.stix.add_to_stix_file(msg_to_send)
-                if added_to_stix:
-                    # now export to taxii
+        evidence = json.loads(msg["data"])
+        description = self.remove_sensitive_info(evidence)
+        if self.slack.should_export():
+            srcip = evidence["profile"]["ip"]
+            msg_to_send = f"Src IP {srcip} Detected {description}"
+            self.slack.export(msg_to_send)
+
+        if self.stix.should_export():
+            msg_to_send = (
+                evidence["evidence_type"],
+                evidence["attacker"]["value"],
+            )
+            added_to_stix: bool = self.stix.add_to_stix_file(msg_to_send)
+            if added_to_stix:
+                # export to taxii once there are enough new
+                # indicators, the rest are exported every push_delay
+                if self.stix.should_push():
                     self.stix.export()
-                else:
-                    self.print("Problem in add_to_stix_file()", 0, 3)
+            else:
+                self.print("Problem in add_to_stix_file()", 0, 3)
+
+    def main(self):
+        # the evidence is exported by handle_export_evidence()
+        pass
@@ -1,8 +1,12 @@
-from stix2 import Indicator, Bundle
+from typing import Optional
+from uuid import uuid4
+
+from stix2 import Indicator
 from cabby import create_client
 import time
 import threading
 import os
+import shutil
 
 from slips_files.common.abstracts.exporter import IExporter
 from slips_files.common.parsers.config_parser import ConfigParser
@@ -14,15 +18,31 @@ class StixExporter(IExporter):
         self.port = None
         self.is_running_non_stop: bool = self.db.is_running_non_stop()
         self.stix_filename = "STIX_data.json"
+        # the indicators that weren't pushed yet, one json per line. they're
+        # put in a bundle in STIX_data.json only when pushing, so adding an
+        # indicator doesn't rewrite the indicators added before it
+        self.journal_filename = "STIX_indicators.jsonl"
         self.configs_read: bool = self.read_configuration()
         if self.should_export():
             self.print(
                 f"Exporting to Stix & TAXII very "
                 f"{self.push_delay} seconds."
             )
-            # This bundle should be created once and we should
-            # append all indicators to it
-            self.is_bundle_created = False
+            # the indicators of previous runs aren't pushed
+            for filename in (
+                self.journal_filename,
+                self.get_pushed_journal_filename(),
+            ):
+                if os.path.exists(filename):
+                    os.remove(filename)
+            # number of indicators in the journal
+            self.indicators_to_push = 0
+            # the journal is written by the module and pushed by both the
+            # module and the push thread. it's only held to swap the
+            # journal, not while pushing
+            self.journal_lock = threading.Lock()
+            # one push at a time
+            self.push_lock = threading.Lock()
             # To avoid duplicates in STIX_data.json
             self.added_ips = set()
             self.export_to_taxii_thread = threading.Thread(
@@ -78,21 +98,97 @@ class StixExporter(IExporter):
         )
         return False
 
-    def read_stix_file(self) -> str:
-        with open(self.stix_filename) as stix_file:
-            stix_data = stix_file.read()
-        return stix_data
+    def get_pushed_journal_filename(self) -> str:
+        """
+        the journal is moved here while its indicators are being pushed,
+        so new indicators go to a new journal meanwhile
+        """
+        return f"{self.journal_filename}.pushing"
+
+    def create_bundle(self, journal_filename: str = None) -> Optional[str]:
+        """
+        puts the indicators of the given journal (the current one by
+        default) in a STIX bundle, and writes it to STIX_data.json
+        returns the bundle, or None if the journal is empty
+        """
+        journal_filename = journal_filename or self.journal_filename
+        if not os.path.exists(journal_filename):
+            return None
+
+        with open(journal_filename) as journal:
+            # each line is a serialized indicator
+            indicators = [line.strip() for line in journal if line.strip()]
+        if not indicators:
+            return None
+
+        bundle = (
+            f'{{"type": "bundle", "id": "bundle--{uuid4()}", '
+            f'"objects": [{", ".join(indicators)}]}}'
+        )
+        with open(self.stix_filename, "w") as stix_file:
+            stix_file.write(bundle)
+        return bundle
+
+    def should_push(self) -> bool:
+        """
+        returns True if enough indicators were added since the last push
+        to push them without waiting for the push delay
+        """
+        return self.indicators_to_push >= self.push_batch_size
 
     def export(self) -> bool:
         """
-        Exports evidence/alerts to the TAXII server
-        Uses Inbox Service (TAXII Service to Support Producer-initiated
-         pushes of cyber threat information) to publish
-        our STIX_data.json file
+        Exports the indicators added since the last push to the TAXII
+        server
+        the journal is swapped for an empty one before pushing, so
+        indicators can be added while pushing. if the push fails, the
+        pushed indicators are put back in the journal to be pushed with
+        the next batch
         """
-        if not self.should_export:
+        if not self.should_export():
             return False
 
+        with self.push_lock:
+            pushed_journal: str = self.get_pushed_journal_filename()
+            with self.journal_lock:
+                if not os.path.exists(self.journal_filename):
+                    return False
+                os.replace(self.journal_filename, pushed_journal)
+                pushed_indicators = self.indicators_to_push
+                self.indicators_to_push = 0
+
+            pushed = False
+            try:
+                bundle: Optional[str] = self.create_bundle(pushed_journal)
+                # Make sure we don't push empty bundles
+                pushed = bool(bundle) and self.push(bundle)
+            finally:
+                if pushed:
+                    os.remove(pushed_journal)
+                else:
+                    self.restore_journal(pushed_journal, pushed_indicators)
+            return pushed
+
+    def restore_journal(self, pushed_journal: str, pushed_indicators: int):
+        """
+        puts the indicators of a failed push back in the journal, before
+        the ones added while pushing
+        """
+        with self.journal_lock:
+            if os.path.exists(self.journal_filename):
+                with open(self.journal_filename) as journal, open(
+                    pushed_journal, "a"
+                ) as pushed:
+                    shutil.copyfileobj(journal, pushed)
+            os.replace(pushed_journal, self.journal_filename)
+            self.indicators_to_push += pushed_indicators
+
+    def push(self, stix_data: str) -> bool:
+        """
+        Uses Inbox Service (TAXII Service to Support Producer-initiated
+         pushes of cyber threat information) to publish
+        the given STIX bundle
+        """
         client = self.create_client()
 
         # Check the available services to make sure inbox service is there
@@ -100,12 +196,6 @@ class StixExporter(IExporter):
         if not self.inbox_service_exists_in_taxii_server(services):
             return False
 
-        stix_data: str = self.read_stix_file()
-
-        # Make sure we don't push empty files
-        if len(stix_data) == 0:
-            return False
-
         binding = "urn:stix.mitre.org:json:2.1"
         # URI is the path to the inbox service we want to
         # use in the taxii server
@@ -148,6 +238,7 @@ class StixExporter(IExporter):
         self.inbox_path = conf.inbox_path()
         # push_delay is only used when slips is running using -i
         self.push_delay = conf.push_delay()
+        self.push_batch_size = conf.push_batch_size()
         self.collection_name = conf.collection_name()
         self.taxii_username = conf.taxii_username()
         self.taxii_password = conf.taxii_password()
@@ -176,9 +267,8 @@ class StixExporter(IExporter):
     def add_to_stix_file(self, to_add: tuple) -> bool:
         """
         Function to export evidence to a STIX_data.json file in the cwd.
-        It keeps appending the given indicator to STIX_data.json until they're
-         sent to the
-        taxii server
+        It keeps appending the given indicator to the journal until they're
+        put in STIX_data.json and sent to the taxii server
         msg_to_send is a tuple: (evidence_type,attacker)
             evidence_type: e.g PortScan, ThreatIntelligence etc
             attacker: ip of the attcker
@@ -187,6 +277,9 @@ class StixExporter(IExporter):
             to_add[0],
             to_add[1],
         )
+        if self.ip_exists_in_stix_file(attacker):
+            return True
+
         # Get the right description to use in stix
         name = evidence_type
         ioc_type = utils.detect_ioc_type(attacker)
@@ -200,32 +293,13 @@ class StixExporter(IExporter):
         indicator = Indicator(
             name=name, pattern=pattern, pattern_type="stix"
         )  # the pattern language that the indicator pattern is expressed in.
-        # Create and Populate Bundle.
-        # All our indicators will be inside bundle['objects'].
-        bundle = Bundle()
-        if not self.is_bundle_created:
-            bundle = Bundle(indicator)
-            # Clear everything in the existing STIX_data.json
-            # if it's not empty
-            open(self.stix_filename, "w").close()
-            # Write the bundle.
-            with open(self.stix_filename, "w") as stix_file:
-                stix_file.write(str(bundle))
-            self.is_bundle_created = True
-        elif not self.ip_exists_in_stix_file(attacker):
-            # Bundle is already created just append to it
-            # r+ to delete last 4 chars
-            with open(self.stix_filename, "r+") as stix_file:
-                # delete the last 4 characters in the file ']\n}\n' so we
-                # can append to the objects array and add them back later
-                stix_file.seek(0, os.SEEK_END)
-                stix_file.seek(stix_file.tell() - 4, 0)
-                stix_file.truncate()
-
-            # Append mode to add the new indicator to the objects array
-            with open(self.stix_filename, "a") as stix_file:
-                # Append the indicator in the objects array
-                stix_file.write(f",{str(indicator)}" + "]\n}\n")
+
+        # Append the indicator to the journal, it's added to the bundle
+        # when pushing
+        with self.journal_lock:
+            with open(self.journal_filename, "a") as journal:
+                journal.write(f"{indicator.serialize()}\n")
+            self.indicators_to_push += 1
 
         # Set of unique ips added to stix_data.json to avoid duplicates
         self.added_ips.add(attacker)
@@ -244,11 +318,8 @@ class StixExporter(IExporter):
             # Sometimes the time's up and we need to send to
             # server again but there's no
             # new alerts in stix_data.json yet
-            if os.path.exists(self.stix_filename):
+            if self.indicators_to_push:
                 self.export()
-                # Delete stix_data.json file so we don't send duplicates
-                os.remove(self.stix_filename)
-                self.is_bundle_created = False
             else:
                 self.print(
                     f"{self.push_delay} seconds passed, "
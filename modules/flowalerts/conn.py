@@ -1,4 +1,3 @@
-import asyncio
 import contextlib
 import ipaddress
 import json
@@ -489,7 +488,7 @@ class Conn(IFlowalertsAnalyzer):
         # 30 minutes have passed?
         return diff >= self.conn_without_dns_interface_wait_time
 
-    async def check_connection_without_dns_resolution(
+    def check_connection_without_dns_resolution(
         self, profileid, twid, flow
     ) -> bool:
         """
@@ -511,16 +510,32 @@ class Conn(IFlowalertsAnalyzer):
             return False
 
         # search 24hs back for a dns resolution
-        if self.db.is_ip_resolved(flow.daddr, 24):
+        if self.db.is_ip_resolved(profileid, twid, flow.daddr, 24):
             return False
 
         # There is no DNS resolution, but it can be that Slips is
         # still reading it from the files.
         # To give time to Slips to read all the files and get all the flows
-        # don't alert a Connection Without DNS until 15 seconds has passed
-        # in real time from the time of this checking.
-        await asyncio.sleep(15)
-        if self.db.is_ip_resolved(flow.daddr, 24):
+        # don't alert a Connection Without DNS until 15 seconds have passed
+        # after this flow.
+        self.flowalerts.deferred_checks.schedule(
+            15,
+            flow,
+            self.recheck_connection_without_dns_resolution,
+            profileid,
+            twid,
+            flow,
+        )
+        return False
+
+    def recheck_connection_without_dns_resolution(
+        self, profileid, twid, flow
+    ) -> bool:
+        """
+        runs 15 seconds after check_connection_without_dns_resolution()
+        found no dns resolution for the given flow
+        """
+        if self.db.is_ip_resolved(profileid, twid, flow.daddr, 24):
             return False
 
         # Reaching here means we already waited 15 seconds for the dns
@@ -671,7 +686,7 @@ class Conn(IFlowalertsAnalyzer):
         """get the SNI, ASN, and  rDNS of the IP to check if it belongs
         to a well-known org"""
 
-        ip_data = self.db.get_ip_info(ip)
+        ip_data = self.db.get_ip_info(ip, ["SNI", "reverse_dns"])
         try:
             sni = ip_data["SNI"]
             if isinstance(sni, list):
@@ -776,12 +791,15 @@ class Conn(IFlowalertsAnalyzer):
 
         self.set_evidence.conn_to_private_ip(twid, flow)
 
-    async def analyze(self, msg):
+    def analyze(self, msg):
         if utils.is_msg_intended_for(msg, "new_flow"):
             msg = json.loads(msg["data"])
             profileid = msg["profileid"]
             twid = msg["twid"]
             flow = self.classifier.convert_to_flow_obj(msg["flow"])
+            # conn.log flows are the clock of the deferred checks when
+            # reading files
+            self.flowalerts.deferred_checks.update_time(flow)
             flow.interpreted_state = self.db.get_final_state_from_flags(
                 flow.state, flow.pkts
             )
@@ -798,13 +816,7 @@ class Conn(IFlowalertsAnalyzer):
             self.check_different_localnet_usage(
                 twid, flow, what_to_check="srcip"
             )
-            task = asyncio.create_task(
-                self.check_connection_without_dns_resolution(
-                    profileid, twid, flow
-                )
-            )
-            # to wait for these functions before flowalerts shuts down
-            self.flowalerts.tasks.append(task)
+            self.check_connection_without_dns_resolution(profileid, twid, flow)
             self.detect_connection_to_multiple_ports(profileid, twid, flow)
             self.check_data_upload(profileid, twid, flow)
             self.check_non_http_port_80_conns(twid, flow)
@@ -1,4 +1,3 @@
-import asyncio
 import collections
 import ipaddress
 import json
@@ -241,9 +240,7 @@ class DNS(IFlowalertsAnalyzer):
         # 30 minutes have passed?
         return diff >= self.dns_without_conn_interface_wait_time
 
-    async def check_dns_without_connection(
-        self, profileid, twid, flow
-    ) -> bool:
+    def check_dns_without_connection(self, profileid, twid, flow) -> bool:
         """
         Makes sure all cached DNS answers are there in contacted_ips
         """
@@ -256,9 +253,23 @@ class DNS(IFlowalertsAnalyzer):
         if self.is_any_flow_answer_contacted(profileid, twid, flow):
             return False
 
-        # Found a DNS query and none of its answers were contacted
-        await asyncio.sleep(40)
+        # Found a DNS query and none of its answers were contacted, give
+        # slips 40 seconds to read their connections
+        self.flowalerts.deferred_checks.schedule(
+            40,
+            flow,
+            self.recheck_dns_without_connection,
+            profileid,
+            twid,
+            flow,
+        )
+        return False
 
+    def recheck_dns_without_connection(self, profileid, twid, flow) -> bool:
+        """
+        runs 40 seconds after check_dns_without_connection() found no
+        connections to the answers of the given dns flow
+        """
         if self.is_any_flow_answer_contacted(profileid, twid, flow):
             return False
 
@@ -428,20 +439,14 @@ class DNS(IFlowalertsAnalyzer):
         self.dns_arpa_queries.pop(profileid)
         return True
 
-    async def analyze(self, msg):
+    def analyze(self, msg):
         if not utils.is_msg_intended_for(msg, "new_dns"):
             return False
         msg = json.loads(msg["data"])
         profileid = msg["profileid"]
         twid = msg["twid"]
         flow = self.classifier.convert_to_flow_obj(msg["flow"])
-        task = asyncio.create_task(
-            self.check_dns_without_connection(profileid, twid, flow)
-        )
-        # Allow the event loop to run the scheduled task
-        await asyncio.sleep(0)
-        # to wait for these functions before flowalerts shuts down
-        self.flowalerts.tasks.append(task)
+        self.check_dns_without_connection(profileid, twid, flow)
         self.check_high_entropy_dns_answers(twid, flow)
         self.check_invalid_dns_answers(twid, flow)
         self.detect_dga(profileid, twid, flow)
@@ -1,8 +1,4 @@
-import asyncio
-import inspect
-from asyncio import Task
-from typing import List
-
+from slips_files.common.deferred_checks import DeferredChecks
 from slips_files.common.slips_utils import utils
 from slips_files.common.abstracts.async_module import AsyncModule
 from .conn import Conn
@@ -26,8 +22,11 @@ class FlowAlerts(AsyncModule):
     authors = ["Kamila Babayeva", "Sebastian Garcia", "Alya Gomaa"]
 
     def init(self):
-        self.subscribe_to_channels()
         self.whitelist = Whitelist(self.logger, self.db)
+        # checks that wait for other flows to arrive before running, e.g.
+        # conns without dns resolutions. must be created before the
+        # analyzers
+        self.deferred_checks = DeferredChecks(self.db)
         self.dns = DNS(self.db, flowalerts=self)
         self.software = Software(self.db, flowalerts=self)
         self.notice = Notice(self.db, flowalerts=self)
@@ -37,31 +36,6 @@ class FlowAlerts(AsyncModule):
         self.downloaded_file = DownloadedFile(self.db, flowalerts=self)
         self.tunnel = Tunnel(self.db, flowalerts=self)
         self.conn = Conn(self.db, flowalerts=self)
-        # list of async functions to await before flowalerts shuts down
-        self.tasks: List[Task] = []
-
-    def subscribe_to_channels(self):
-        channels = (
-            "new_flow",
-            "new_ssh",
-            "new_notice",
-            "new_ssl",
-            "tw_closed",
-            "new_dns",
-            "new_downloaded_file",
-            "new_smtp",
-            "new_software",
-            "new_tunnel",
-        )
-        for channel in channels:
-            channel_obj = self.db.subscribe(channel)
-            self.channels.update({channel: channel_obj})
-
-    async def shutdown_gracefully(self):
-        await asyncio.gather(*self.tasks)
-
-    def pre_main(self):
-        utils.drop_root_privs()
         self.analyzers_map = {
             "new_downloaded_file": [self.downloaded_file.analyze],
             "new_notice": [self.notice.analyze],
@@ -74,24 +48,21 @@ class FlowAlerts(AsyncModule):
             "new_tunnel": [self.tunnel.analyze],
             "new_ssl": [self.ssl.analyze],
         }
+        for channel in self.analyzers_map:
+            self.register_handler(channel, self.analyze_msg)
 
-    async def main(self):
-        for channel, analyzers in self.analyzers_map.items():
-            msg: dict = self.get_msg(channel)
-            if not msg:
-                continue
+    async def shutdown_gracefully(self):
+        # no more flows are coming, the pending checks don't need to wait
+        self.deferred_checks.run_all()
 
-            for analyzer in analyzers:
-                # some analyzers are async functions
-                if inspect.iscoroutinefunction(analyzer):
-                    # analyzer will run normally, until it finishes.
-                    # tasks inside this analyzer will run asynchrously,
-                    # and finish whenever they finish, we'll not wait for them
-                    loop = asyncio.get_event_loop()
-                    task = loop.create_task(analyzer(msg))
-                    # to wait for these functions before flowalerts shuts down
-                    self.tasks.append(task)
-                    # Allow the event loop to run the scheduled task
-                    await asyncio.sleep(0)
-                else:
-                    analyzer(msg)
+    def pre_main(self):
+        utils.drop_root_privs()
+
+    def analyze_msg(self, msg: dict):
+        """runs all the analyzers of the channel of the given msg"""
+        for analyzer in self.analyzers_map[msg["channel"]]:
+            analyzer(msg)
+
+    async def main(self):
+        # runs after each batch of msgs is dispatched to the analyzers
+        self.deferred_checks.run_due()
@@ -1,5 +1,5 @@
 import json
-from typing import List
+from typing import List, Dict
 from uuid import uuid4
 from datetime import datetime
 from slips_files.common.slips_utils import utils
@@ -1199,9 +1199,11 @@ class SetEvidnceHelper:
 
         self.db.set_evidence(evidence)
 
-    def malicious_ja3s(self, twid, flow, malicious_ja3_dict: dict) -> None:
-        ja3_info: dict = json.loads(malicious_ja3_dict[flow.ja3s])
-
+    def malicious_ja3s(self, twid, flow, ja3_info: Dict[str, str]) -> None:
+        """
+        :param ja3_info: the description of the malicious ja3s as stored
+        in our db
+        """
         threat_level: str = ja3_info["threat_level"].upper()
         threat_level: ThreatLevel = ThreatLevel[threat_level]
 
@@ -1263,9 +1265,11 @@ class SetEvidnceHelper:
 
         self.db.set_evidence(evidence)
 
-    def malicious_ja3(self, twid, flow, malicious_ja3_dict: dict) -> None:
-        ja3_info: dict = json.loads(malicious_ja3_dict[flow.ja3])
-
+    def malicious_ja3(self, twid, flow, ja3_info: Dict[str, str]) -> None:
+        """
+        :param ja3_info: the description of the malicious ja3 as stored
+        in our db
+        """
         threat_level: str = ja3_info["threat_level"].upper()
         threat_level: ThreatLevel = ThreatLevel[threat_level]
 
@@ -1,4 +1,3 @@
-import asyncio
 import json
 
 from slips_files.common.abstracts.flowalerts_analyzer import (
@@ -73,7 +72,7 @@ class SSH(IFlowalertsAnalyzer):
         )
         return True
 
-    async def check_successful_ssh(self, twid, flow):
+    def check_successful_ssh(self, twid, flow):
         """
         Function to check if an SSH connection logged in successfully
         """
@@ -81,11 +80,24 @@ class SSH(IFlowalertsAnalyzer):
         conn_log_flow = utils.get_original_conn_flow(flow, self.db)
 
         if not conn_log_flow:
-            await asyncio.sleep(15)
-            conn_log_flow = utils.get_original_conn_flow(flow, self.db)
-            if not conn_log_flow:
-                return
+            # give slips 15 seconds to read it
+            self.flowalerts.deferred_checks.schedule(
+                15, flow, self.recheck_successful_ssh, twid, flow
+            )
+            return
+
+        self.check_ssh_auth(twid, conn_log_flow, flow)
+
+    def recheck_successful_ssh(self, twid, flow):
+        """
+        runs 15 seconds after check_successful_ssh() didn't find the
+        conn.log flow of the given ssh flow
+        """
+        conn_log_flow = utils.get_original_conn_flow(flow, self.db)
+        if conn_log_flow:
+            self.check_ssh_auth(twid, conn_log_flow, flow)
 
+    def check_ssh_auth(self, twid, conn_log_flow: dict, flow):
         # it's true in zeek json files, T in zeke tab files
         if flow.auth_success in ["true", "T"]:
             self.set_evidence_ssh_successful_by_zeek(twid, conn_log_flow, flow)
@@ -117,7 +129,7 @@ class SSH(IFlowalertsAnalyzer):
             # reset the counter
             del self.password_guessing_cache[cache_key]
 
-    async def analyze(self, msg):
+    def analyze(self, msg):
         if not utils.is_msg_intended_for(msg, "new_ssh"):
             return
 
@@ -125,7 +137,5 @@ class SSH(IFlowalertsAnalyzer):
         profileid = msg["profileid"]
         twid = msg["twid"]
         flow = self.classifier.convert_to_flow_obj(msg["flow"])
-        task = asyncio.create_task(self.check_successful_ssh(twid, flow))
-        # to wait for these functions before flowalerts shuts down
-        self.flowalerts.tasks.append(task)
+        self.check_successful_ssh(twid, flow)
         self.check_ssh_password_guessing(profileid, twid, flow)
@@ -1,4 +1,3 @@
-import asyncio
 import json
 from typing import Union, Optional, List
 import re
@@ -26,7 +25,7 @@ class SSL(IFlowalertsAnalyzer):
             conf.get_pastebin_download_threshold()
         )
 
-    async def check_pastebin_download(
+    def check_pastebin_download(
         self,
         twid: str,
         ssl_flow: Union[SSL, SuricataTLS],
@@ -41,11 +40,37 @@ class SSL(IFlowalertsAnalyzer):
 
         conn_log_flow = utils.get_original_conn_flow(ssl_flow, self.db)
         if not conn_log_flow:
-            await asyncio.sleep(40)
-            conn_log_flow = utils.get_original_conn_flow(ssl_flow, self.db)
-            if not conn_log_flow:
-                return False
+            self.flowalerts.deferred_checks.schedule(
+                40, ssl_flow, self.recheck_pastebin_download, twid, ssl_flow
+            )
+            return False
 
+        return self.check_pastebin_downloaded_bytes(
+            twid, ssl_flow, conn_log_flow
+        )
+
+    def recheck_pastebin_download(
+        self,
+        twid: str,
+        ssl_flow: Union[SSL, SuricataTLS],
+    ):
+        """
+        runs 40 seconds after check_pastebin_download() didn't find the
+        conn.log flow of the given ssl flow
+        """
+        conn_log_flow = utils.get_original_conn_flow(ssl_flow, self.db)
+        if not conn_log_flow:
+            return False
+        return self.check_pastebin_downloaded_bytes(
+            twid, ssl_flow, conn_log_flow
+        )
+
+    def check_pastebin_downloaded_bytes(
+        self,
+        twid: str,
+        ssl_flow: Union[SSL, SuricataTLS],
+        conn_log_flow: dict,
+    ):
         # orig_bytes is number of payload bytes downloaded
         downloaded_bytes = conn_log_flow["resp_bytes"]
         if downloaded_bytes >= self.pastebin_downloads_threshold:
@@ -74,14 +99,11 @@ class SSL(IFlowalertsAnalyzer):
             # we don't have info about this flow's ja3 or ja3s fingerprint
             return
 
-        # get the dict of malicious ja3 stored in our db
-        malicious_ja3_dict = self.db.get_all_blacklisted_ja3()
-
-        if flow.ja3 in malicious_ja3_dict:
-            self.set_evidence.malicious_ja3(twid, flow, malicious_ja3_dict)
+        if flow.ja3 and (ja3_info := self.db.is_blacklisted_ja3(flow.ja3)):
+            self.set_evidence.malicious_ja3(twid, flow, ja3_info)
 
-        if flow.ja3s in malicious_ja3_dict:
-            self.set_evidence.malicious_ja3s(twid, flow, malicious_ja3_dict)
+        if flow.ja3s and (ja3s_info := self.db.is_blacklisted_ja3(flow.ja3s)):
+            self.set_evidence.malicious_ja3s(twid, flow, ja3s_info)
 
     def detect_incompatible_cn(self, twid, flow):
         """
@@ -233,18 +255,13 @@ class SSL(IFlowalertsAnalyzer):
             return
         self.set_evidence.cn_url_mismatch(twid, cn, flow)
 
-    async def analyze(self, msg: dict):
+    def analyze(self, msg: dict):
         if utils.is_msg_intended_for(msg, "new_ssl"):
             msg = json.loads(msg["data"])
             twid = msg["twid"]
             flow = self.classifier.convert_to_flow_obj(msg["flow"])
 
-            task = asyncio.create_task(
-                self.check_pastebin_download(twid, flow)
-            )
-            # to wait for these functions before flowalerts shuts down
-            self.flowalerts.tasks.append(task)
-
+            self.check_pastebin_download(twid, flow)
             self.check_self_signed_certs(twid, flow)
             self.detect_malicious_ja3(twid, flow)
             self.detect_incompatible_cn(twid, flow)
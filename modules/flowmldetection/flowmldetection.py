@@ -46,8 +46,7 @@ class FlowMLDetection(IModule):
 
     def init(self):
         # Subscribe to the channel
-        self.c1 = self.db.subscribe("new_flow")
-        self.channels = {"new_flow": self.c1}
+        self.register_handler("new_flow", self.handle_new_flow)
         self.fieldseparator = self.db.get_field_separator()
         # Set the output queue of our database instance
         # Read the configuration
@@ -416,83 +415,86 @@ class FlowMLDetection(IModule):
         # Load the model
         self.read_model()
 
-    def main(self):
-        if msg := self.get_msg("new_flow"):
-            msg = json.loads(msg["data"])
-            twid = msg["twid"]
-            self.flow = msg["flow"]
-            # these fields are expected in testing. update the original
-            # flow dict to have them
-            self.flow.update(
-                {
-                    "allbytes": (self.flow["sbytes"] + self.flow["dbytes"]),
-                    # the flow["state"] is the origstate, we dont need that here
-                    # we need the interpreted state
-                    "state": msg["interpreted_state"],
-                    "pkts": self.flow["spkts"] + self.flow["dpkts"],
-                    "label": msg["label"],
-                    "module_labels": msg["module_labels"],
-                }
-            )
+    def handle_new_flow(self, msg: dict):
+        msg = json.loads(msg["data"])
+        twid = msg["twid"]
+        self.flow = msg["flow"]
+        # these fields are expected in testing. update the original
+        # flow dict to have them
+        self.flow.update(
+            {
+                "allbytes": (self.flow["sbytes"] + self.flow["dbytes"]),
+                # the flow["state"] is the origstate, we dont need that here
+                # we need the interpreted state
+                "state": msg["interpreted_state"],
+                "pkts": self.flow["spkts"] + self.flow["dpkts"],
+                "label": msg["label"],
+                "module_labels": msg["module_labels"],
+            }
+        )
 
-            if self.mode == "train":
-                # We are training
-
-                # Is the amount in the DB of labels enough to retrain?
-                # Use labeled flows
-                labels = self.db.get_labels()
-                sum_labeled_flows = sum(i[1] for i in labels)
-                if (
-                    sum_labeled_flows >= self.minimum_lables_to_retrain
-                    and sum_labeled_flows % self.minimum_lables_to_retrain == 1
-                ):
-                    # We get here every 'self.minimum_lables_to_retrain'
-                    # amount of labels
-                    # So for example we retrain every 100 labels and only when
-                    # we have at least 100 labels
+        if self.mode == "train":
+            # We are training
+
+            # Is the amount in the DB of labels enough to retrain?
+            # Use labeled flows
+            labels = self.db.get_labels()
+            sum_labeled_flows = sum(i[1] for i in labels)
+            if (
+                sum_labeled_flows >= self.minimum_lables_to_retrain
+                and sum_labeled_flows % self.minimum_lables_to_retrain == 1
+            ):
+                # We get here every 'self.minimum_lables_to_retrain'
+                # amount of labels
+                # So for example we retrain every 100 labels and only when
+                # we have at least 100 labels
+                self.print(
+                    f"Training the model with the last group of "
+                    f"flows and labels. Total flows: {sum_labeled_flows}."
+                )
+                # Process all flows in the DB and make them ready
+                # for pandas
+                self.process_flows()
+                # Train an algorithm
+                self.train()
+        elif self.mode == "test":
+            # We are testing, which means using the model to detect
+            processed_flow = self.process_flow(self.flow)
+
+            # After processing the flow, it may happen that we
+            # delete icmp/arp/etc so the dataframe can be empty
+            if processed_flow is not None and not processed_flow.empty:
+                # Predict
+                pred: numpy.ndarray = self.detect(processed_flow)
+                label = self.flow["label"]
+                if label and label != "unknown" and label != pred[0]:
+                    # If the user specified a label in test mode,
+                    # and the label is diff from the prediction,
+                    # print in debug mode
+                    self.print(
+                        f"Report Prediction {pred[0]} for label"
+                        f' {label} flow {self.flow["saddr"]}:'
+                        f'{self.flow["sport"]} ->'
+                        f' {self.flow["daddr"]}:'
+                        f'{self.flow["dport"]}/'
+                        f'{self.flow["proto"]}',
+                        0,
+                        3,
+                    )
+                if pred[0] == "Malware":
+                    # Generate an alert
+                    self.set_evidence_malicious_flow(self.flow, twid)
                     self.print(
-                        f"Training the model with the last group of "
-                        f"flows and labels. Total flows: {sum_labeled_flows}."
+                        f"Prediction {pred[0]} for label {label}"
+                        f' flow {self.flow["saddr"]}:'
+                        f'{self.flow["sport"]} -> '
+                        f'{self.flow["daddr"]}:'
+                        f'{self.flow["dport"]}/'
+                        f'{self.flow["proto"]}',
+                        0,
+                        2,
                     )
-                    # Process all flows in the DB and make them ready
-                    # for pandas
-                    self.process_flows()
-                    # Train an algorithm
-                    self.train()
-            elif self.mode == "test":
-                # We are testing, which means using the model to detect
-                processed_flow = self.process_flow(self.flow)
-
-                # After processing the flow, it may happen that we
-                # delete icmp/arp/etc so the dataframe can be empty
-                if processed_flow is not None and not processed_flow.empty:
-                    # Predict
-                    pred: numpy.ndarray = self.detect(processed_flow)
-                    label = self.flow["label"]
-                    if label and label != "unknown" and label != pred[0]:
-                        # If the user specified a label in test mode,
-                        # and the label is diff from the prediction,
-                        # print in debug mode
-                        self.print(
-                            f"Report Prediction {pred[0]} for label"
-                            f' {label} flow {self.flow["saddr"]}:'
-                            f'{self.flow["sport"]} ->'
-                            f' {self.flow["daddr"]}:'
-                            f'{self.flow["dport"]}/'
-                            f'{self.flow["proto"]}',
-                            0,
-                            3,
-                        )
-                    if pred[0] == "Malware":
-                        # Generate an alert
-                        self.set_evidence_malicious_flow(self.flow, twid)
-                        self.print(
-                            f"Prediction {pred[0]} for label {label}"
-                            f' flow {self.flow["saddr"]}:'
-                            f'{self.flow["sport"]} -> '
-                            f'{self.flow["daddr"]}:'
-                            f'{self.flow["dport"]}/'
-                            f'{self.flow["proto"]}',
-                            0,
-                            2,
-                        )
+
+    def main(self):
+        # the flows are handled by handle_new_flow()
+        pass
@@ -1,5 +1,5 @@
-import asyncio
 import json
+import time
 import urllib
 from uuid import uuid4
 
@@ -10,6 +10,9 @@ from typing import (
     Optional,
 )
 
+from modules.http_analyzer.user_agent_cache import UserAgentCache
+from modules.http_analyzer.user_agent_parser import parse_user_agent
+from slips_files.common.deferred_checks import DeferredChecks
 from slips_files.common.flow_classifier import FlowClassifier
 from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.slips_utils import utils
@@ -27,6 +30,13 @@ from slips_files.core.structures.evidence import (
     Direction,
 )
 
+# the online db used to classify the UAs unknown to the offline parser
+USER_AGENT_DB_URL = "http://useragentstring.com/"
+# seconds to keep the info of each UA in the cache db
+USER_AGENT_CACHE_TTL = 7 * 24 * 3600
+# max number of UAs to keep in memory
+LOCAL_USER_AGENT_CACHE_SIZE = 10000
+
 
 class HTTPAnalyzer(IModule):
     # Name: short name of the module. Do not use spaces
@@ -35,9 +45,8 @@ class HTTPAnalyzer(IModule):
     authors = ["Alya Gomaa"]
 
     def init(self):
-        self.c1 = self.db.subscribe("new_http")
-        self.c2 = self.db.subscribe("new_weird")
-        self.channels = {"new_http": self.c1, "new_weird": self.c2}
+        self.register_handler("new_http", self.handle_new_http)
+        self.register_handler("new_weird", self.handle_new_weird)
         self.connections_counter = {}
         self.empty_connections_threshold = 4
         # this is a list of hosts known to be resolved by malware
@@ -65,6 +74,16 @@ class HTTPAnalyzer(IModule):
             "application/x-dosexec",
         ]
         self.classifier = FlowClassifier()
+        # weird.log flows that wait for their conn.log flow to be read
+        self.deferred_checks = DeferredChecks(self.db)
+        self.ua_cache = UserAgentCache(
+            self.db, LOCAL_USER_AGENT_CACHE_SIZE, USER_AGENT_CACHE_TTL
+        )
+        # number of UAs classified by each source, and the seconds spent
+        # classifying UAs
+        self.offline_classifications = 0
+        self.online_classifications = 0
+        self.ua_classification_time = 0.0
 
     def read_configuration(self):
         conf = ConfigParser()
@@ -353,11 +372,12 @@ class HTTPAnalyzer(IModule):
         Get OS and browser info about a use agent from an online database
          http://useragentstring.com
         """
-        url = "http://useragentstring.com/"
         params = {"uas": user_agent, "getJSON": "all"}
         params = urllib.parse.urlencode(params, quote_via=urllib.parse.quote)
         try:
-            response = requests.get(url, params=params, timeout=5)
+            response = requests.get(
+                USER_AGENT_DB_URL, params=params, timeout=5
+            )
             if response.status_code != 200 or not response.text:
                 raise requests.exceptions.ConnectionError
         except (
@@ -381,9 +401,56 @@ class HTTPAnalyzer(IModule):
             return False
         return json_response
 
+    def classify_user_agent_online(
+        self, user_agent: str
+    ) -> Optional[Dict[str, str]]:
+        """
+        returns the os_type, os_name and browser of the given UA from the
+        online db, or None if the db couldn't be reached
+        """
+        ua_info = self.get_ua_info_online(user_agent)
+        if not ua_info:
+            return None
+
+        # the above website returns unknown if it has
+        # no info about this UA, remove the 'unknown' from the string
+        # before storing in the db
+        os_type = (
+            ua_info.get("os_type", "").replace("unknown", "").replace("  ", "")
+        )
+        os_name = (
+            ua_info.get("os_name", "").replace("unknown", "").replace("  ", "")
+        )
+        browser = (
+            ua_info.get("agent_name", "")
+            .replace("unknown", "")
+            .replace("  ", "")
+        )
+        return {"os_type": os_type, "os_name": os_name, "browser": browser}
+
+    def classify_user_agent(self, user_agent: str) -> Optional[Dict[str, str]]:
+        """
+        returns the os_type, os_name and browser of the given UA.
+        the cached UAs and the common UA families are classified without
+        waiting for the online db, it's only asked about the rest
+        """
+        start = time.perf_counter()
+        ua_info = self.ua_cache.get(user_agent)
+        if not ua_info:
+            if ua_info := parse_user_agent(user_agent):
+                self.offline_classifications += 1
+            elif ua_info := self.classify_user_agent_online(user_agent):
+                self.online_classifications += 1
+
+            if ua_info:
+                self.ua_cache.set(user_agent, ua_info)
+
+        self.ua_classification_time += time.perf_counter() - start
+        return ua_info
+
     def get_user_agent_info(self, user_agent: str, profileid: str):
         """
-        Get OS and browser info about a user agent online
+        Get OS and browser info about a user agent
         """
         # some zeek http flows don't have a user agent field
         if not user_agent:
@@ -392,45 +459,36 @@ class HTTPAnalyzer(IModule):
         # keep a history of the past user agents
         self.db.add_all_user_agent_to_profile(profileid, user_agent)
 
-        # don't make a request again if we already have a
+        # don't classify the UA again if we already have a
         # user agent associated with this profile
         if self.db.get_user_agent_from_profile(profileid) is not None:
             # this profile already has a user agent
             return False
 
         UA_info = {"user_agent": user_agent, "os_type": "", "os_name": ""}
-
-        if ua_info := self.get_ua_info_online(user_agent):
-            # the above website returns unknown if it has
-            # no info about this UA, remove the 'unknown' from the string
-            # before storing in the db
-            os_type = (
-                ua_info.get("os_type", "")
-                .replace("unknown", "")
-                .replace("  ", "")
-            )
-            os_name = (
-                ua_info.get("os_name", "")
-                .replace("unknown", "")
-                .replace("  ", "")
-            )
-            browser = (
-                ua_info.get("agent_name", "")
-                .replace("unknown", "")
-                .replace("  ", "")
-            )
-
-            UA_info.update(
-                {
-                    "os_name": os_name,
-                    "os_type": os_type,
-                    "browser": browser,
-                }
-            )
+        if ua_info := self.classify_user_agent(user_agent):
+            UA_info.update(ua_info)
 
         self.db.add_user_agent_to_profile(profileid, json.dumps(UA_info))
         return UA_info
 
+    def get_ua_classification_stats(self) -> str:
+        classified = self.ua_cache.lookups
+        throughput = (
+            classified / self.ua_classification_time
+            if self.ua_classification_time
+            else 0
+        )
+        return (
+            f"Classified {classified} user agents "
+            f"({throughput:.0f} user agents/sec). "
+            f"Cache hit rate: {self.ua_cache.get_hit_rate():.2f}% "
+            f"(in memory: {self.ua_cache.local_hits}, "
+            f"cache db: {self.ua_cache.db_hits}). "
+            f"Classified offline: {self.offline_classifications}, "
+            f"online: {self.online_classifications}"
+        )
+
     def extract_info_from_ua(self, user_agent, profileid):
         """
         Zeek sometimes collects info about a specific UA,
@@ -627,7 +685,7 @@ class HTTPAnalyzer(IModule):
 
         self.db.set_evidence(evidence)
 
-    async def check_weird_http_method(self, msg: Dict[str, str]):
+    def check_weird_http_method(self, msg: Dict[str, str]):
         """
         detect weird http methods in zeek's weird.log
         """
@@ -640,49 +698,70 @@ class HTTPAnalyzer(IModule):
         conn_log_flow: Optional[dict]
         conn_log_flow = utils.get_original_conn_flow(flow, self.db)
         if not conn_log_flow:
-            await asyncio.sleep(15)
-            conn_log_flow = utils.get_original_conn_flow(flow, self.db)
-            if not conn_log_flow:
-                return
+            # give slips 15 seconds to read it
+            self.deferred_checks.schedule(
+                15, flow, self.recheck_weird_http_method, twid, flow
+            )
+            return
 
         self.set_evidence_weird_http_method(twid, flow, conn_log_flow)
 
+    def recheck_weird_http_method(self, twid: str, flow: Weird):
+        """
+        runs 15 seconds after check_weird_http_method() didn't find the
+        conn.log flow of the given weird flow
+        """
+        conn_log_flow = utils.get_original_conn_flow(flow, self.db)
+        if conn_log_flow:
+            self.set_evidence_weird_http_method(twid, flow, conn_log_flow)
+
+    def shutdown_gracefully(self):
+        # no more flows are coming, the pending checks don't need to wait
+        self.deferred_checks.run_all()
+        self.print(
+            self.get_ua_classification_stats(), log_to_logfiles_only=True
+        )
+
     def pre_main(self):
         utils.drop_root_privs()
 
+    def handle_new_http(self, msg: dict):
+        msg = json.loads(msg["data"])
+        profileid = msg["profileid"]
+        twid = msg["twid"]
+        flow = self.classifier.convert_to_flow_obj(msg["flow"])
+        self.deferred_checks.update_time(flow)
+        self.check_suspicious_user_agents(profileid, twid, flow)
+        self.check_multiple_empty_connections(twid, flow)
+        # find the UA of this profileid if we don't have it
+        # get the last used ua of this profile
+        cached_ua = self.db.get_user_agent_from_profile(profileid)
+        if cached_ua:
+            self.check_multiple_user_agents_in_a_row(
+                flow,
+                twid,
+                cached_ua,
+            )
+
+        if not cached_ua or (
+            isinstance(cached_ua, dict)
+            and cached_ua.get("user_agent", "") != flow.user_agent
+            and "server-bag" not in flow.user_agent
+        ):
+            # only UAs of type dict are browser UAs,
+            # skips str UAs as they are SSH clients
+            self.get_user_agent_info(flow.user_agent, profileid)
+
+        self.extract_info_from_ua(flow.user_agent, profileid)
+        self.detect_executable_mime_types(twid, flow)
+        self.check_incompatible_user_agent(profileid, twid, flow)
+        self.check_pastebin_downloads(twid, flow)
+        self.set_evidence_http_traffic(twid, flow)
+
+    def handle_new_weird(self, msg: dict):
+        msg = json.loads(msg["data"])
+        self.check_weird_http_method(msg)
+
     def main(self):
-        if msg := self.get_msg("new_http"):
-            msg = json.loads(msg["data"])
-            profileid = msg["profileid"]
-            twid = msg["twid"]
-            flow = self.classifier.convert_to_flow_obj(msg["flow"])
-            self.check_suspicious_user_agents(profileid, twid, flow)
-            self.check_multiple_empty_connections(twid, flow)
-            # find the UA of this profileid if we don't have it
-            # get the last used ua of this profile
-            cached_ua = self.db.get_user_agent_from_profile(profileid)
-            if cached_ua:
-                self.check_multiple_user_agents_in_a_row(
-                    flow,
-                    twid,
-                    cached_ua,
-                )
-
-            if not cached_ua or (
-                isinstance(cached_ua, dict)
-                and cached_ua.get("user_agent", "") != flow.user_agent
-                and "server-bag" not in flow.user_agent
-            ):
-                # only UAs of type dict are browser UAs,
-                # skips str UAs as they are SSH clients
-                self.get_user_agent_info(flow.user_agent, profileid)
-
-            self.extract_info_from_ua(flow.user_agent, profileid)
-            self.detect_executable_mime_types(twid, flow)
-            self.check_incompatible_user_agent(profileid, twid, flow)
-            self.check_pastebin_downloads(twid, flow)
-            self.set_evidence_http_traffic(twid, flow)
-
-        if msg := self.get_msg("new_weird"):
-            msg = json.loads(msg["data"])
-            self.check_weird_http_method(msg)
+        # runs after each batch of msgs is dispatched to the handlers
+        self.deferred_checks.run_due()
@@ -0,0 +1,57 @@
+from collections import OrderedDict
+from typing import (
+    Dict,
+    Optional,
+)
+
+
+class UserAgentCache:
+    """
+    Caches the os_type, os_name and browser of each classified UA, so
+    fleets of clients using the same UA are classified once.
+    - the UAs are first looked up in a bounded in-process LRU
+    - then in the cache db, which is shared by all slips instances and
+      keeps each UA for ttl seconds
+    """
+
+    def __init__(self, db, max_size: int = 10000, ttl: int = 604800):
+        self.db = db
+        self.max_size = max_size
+        self.ttl = ttl
+        # {user_agent: {"os_type": .., "os_name": .., "browser": ..}}
+        self.local: OrderedDict = OrderedDict()
+        self.lookups = 0
+        self.local_hits = 0
+        self.db_hits = 0
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+    def cache_locally(self, user_agent: str, info: Dict[str, str]):
+        self.local[user_agent] = info
+        self.local.move_to_end(user_agent)
+        if len(self.local) > self.max_size:
+            self.local.popitem(last=False)
+
+    def get(self, user_agent: str) -> Optional[Dict[str, str]]:
+        """returns the cached info of the given UA, if any"""
+        self.lookups += 1
+        if info := self.local.get(user_agent):
+            self.local.move_to_end(user_agent)
+            self.local_hits += 1
+            return info
+
+        if info := self.db.get_cached_user_agent_info(user_agent):
+            self.cache_locally(user_agent, info)
+            self.db_hits += 1
+            return info
+
+    def set(self, user_agent: str, info: Dict[str, str]):
+        self.cache_locally(user_agent, info)
+        self.db.set_cached_user_agent_info(user_agent, info, self.ttl)
+
+    def get_hit_rate(self) -> float:
+        """returns the % of the lookups found in the LRU or the cache db"""
+        if not self.lookups:
+            return 0.0
+        return (self.local_hits + self.db_hits) / self.lookups * 100
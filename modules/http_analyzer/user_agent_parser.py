@@ -0,0 +1,90 @@
+import re
+from typing import (
+    Dict,
+    Optional,
+    Tuple,
+)
+
+# the names used by the online db (useragentstring.com) of each windows
+# NT version
+WINDOWS_VERSIONS = {
+    "10.0": "Windows 10",
+    "6.3": "Windows 8.1",
+    "6.2": "Windows 8",
+    "6.1": "Windows 7",
+    "6.0": "Windows Vista",
+    "5.2": "Windows XP",
+    "5.1": "Windows XP",
+}
+WINDOWS_NT = re.compile(r"Windows NT (\d+\.\d+)")
+
+# (keyword, os_type, os_name) of each os family, the first match wins.
+# the os_type or the os_name is always found in the UA, so
+# check_multiple_user_agents_in_a_row() doesn't alert on the same UA
+OPERATING_SYSTEMS: Tuple[Tuple[str, str, str], ...] = (
+    ("Windows Phone", "Windows", "Windows Phone"),
+    ("iPhone", "Macintosh", "iPhone OS"),
+    ("iPad", "Macintosh", "iPad"),
+    ("Mac OS X", "Macintosh", "OS X"),
+    ("Android", "Android", "Android"),
+    ("CrOS", "Chrome OS", "CrOS"),
+    ("Linux", "Linux", "Linux"),
+)
+
+# (keyword, browser) of each browser family, the first match wins, so
+# browsers whose UAs contain the keywords of other browsers come first,
+# e.g. chrome UAs contain Safari/
+BROWSERS: Tuple[Tuple[str, str], ...] = (
+    ("Edg/", "Edge"),
+    ("Edge/", "Edge"),
+    ("EdgA/", "Edge"),
+    ("EdgiOS/", "Edge"),
+    ("OPR/", "Opera"),
+    ("Opera", "Opera"),
+    ("SamsungBrowser/", "Samsung Internet"),
+    ("YaBrowser/", "Yandex Browser"),
+    ("Firefox/", "Firefox"),
+    ("FxiOS/", "Firefox"),
+    ("CriOS/", "Chrome"),
+    ("Chromium/", "Chromium"),
+    ("Chrome/", "Chrome"),
+    ("Safari/", "Safari"),
+    ("MSIE ", "Internet Explorer"),
+    ("Trident/", "Internet Explorer"),
+    ("curl/", "cURL"),
+    ("Wget/", "Wget"),
+    ("python-requests/", "Python-requests"),
+)
+
+
+def get_os(user_agent: str) -> Tuple[str, str]:
+    """returns the os_type and os_name of the given UA or empty strs"""
+    if "Windows Phone" not in user_agent:
+        if windows := WINDOWS_NT.search(user_agent):
+            return "Windows", WINDOWS_VERSIONS.get(windows[1], "Windows")
+
+    for keyword, os_type, os_name in OPERATING_SYSTEMS:
+        if keyword in user_agent:
+            return os_type, os_name
+    return "", ""
+
+
+def get_browser(user_agent: str) -> str:
+    for keyword, browser in BROWSERS:
+        if keyword in user_agent:
+            return browser
+    return ""
+
+
+def parse_user_agent(user_agent: str) -> Optional[Dict[str, str]]:
+    """
+    classifies the common UA families offline, using the same names as the
+    online db
+    returns a dict with the os_type, os_name and browser of the given UA,
+    or None if neither its os nor its browser are known
+    """
+    os_type, os_name = get_os(user_agent)
+    browser = get_browser(user_agent)
+    if not os_type and not browser:
+        return None
+    return {"os_type": os_type, "os_name": os_name, "browser": browser}
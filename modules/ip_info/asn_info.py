@@ -1,10 +1,15 @@
+import threading
 import time
-import ipaddress
 import ipwhois
 import json
+from typing import (
+    Dict,
+    Optional,
+)
 import requests
 import maxminddb
 
+from slips_files.common.data_structures.ip_range_index import IPRangeIndex
 from slips_files.common.slips_utils import utils
 
 
@@ -13,6 +18,11 @@ class ASN:
         self.db = db
         # update asn every 1 month
         self.update_period = 2592000
+        # ranges cached in the db, loaded on the first lookup
+        self.asn_ranges: Optional[IPRangeIndex] = None
+        # get_asn() runs in multiple threads of the lookup pool, the
+        # ranges are loaded, searched and added to under this lock
+        self.asn_ranges_lock = threading.Lock()
 
         # Open the maxminddb ASN offline db
         try:
@@ -23,36 +33,44 @@ class ASN:
             # errors are printed in IP_info
             pass
 
+    def _get_asn_ranges(self) -> IPRangeIndex:
+        """
+        Loads the asn ranges cached in the db into memory once, the ones
+        cached later by this module are added to it by cache_ip_range()
+        """
+        if self.asn_ranges is None:
+            self.asn_ranges = IPRangeIndex()
+            for asn_range, range_info in self.db.get_asn_cache().items():
+                self._add_asn_range(asn_range, range_info)
+        return self.asn_ranges
+
+    def _add_asn_range(self, asn_range: str, range_info: Dict[str, str]):
+        try:
+            self.asn_ranges.insert(asn_range, range_info)
+        except ValueError:
+            # invalid range
+            pass
+
     def get_cached_asn(self, ip):
         """
         If this ip belongs to a cached ip range, return the cached asn info of it
         :param ip: str
         if teh range of this ip was found, this function returns a dict with {'number' , 'org'}
         """
-        first_octet: str = utils.get_first_octet(ip)
-        if not first_octet:
-            # invalid ip or no cached asns
-            return
-
-        cached_asn: str = self.db.get_asn_cache(first_octet=first_octet)
-        if not cached_asn:
+        with self.asn_ranges_lock:
+            asn_ranges: IPRangeIndex = self._get_asn_ranges()
+            range_info: Optional[Dict[str, str]] = asn_ranges.search(ip)
+        if not range_info:
             return
 
-        cached_asn: dict = json.loads(cached_asn)
-
-        for range, range_info in cached_asn.items():
-            # convert to objects
-            ip_range = ipaddress.ip_network(range)
-            ip = ipaddress.ip_address(ip)
-            if ip in ip_range:
-                asn_info = {
-                    "asn": {
-                        "org": range_info["org"],
-                    }
-                }
-                if "number" in range_info:
-                    asn_info["asn"].update({"number": range_info["number"]})
-                return asn_info
+        asn_info = {
+            "asn": {
+                "org": range_info["org"],
+            }
+        }
+        if "number" in range_info:
+            asn_info["asn"].update({"number": range_info["number"]})
+        return asn_info
 
     def should_update_asn(self, cached_data) -> bool:
         """
@@ -111,6 +129,13 @@ class ASN:
 
             if asnorg and asn_cidr not in ("", "NA"):
                 self.db.set_asn_cache(asnorg, asn_cidr, asn_number)
+                with self.asn_ranges_lock:
+                    if self.asn_ranges is not None:
+                        # if it's not loaded yet, it'll be read from the db
+                        range_info = {"org": asnorg}
+                        if asn_number:
+                            range_info["number"] = f"AS{asn_number}"
+                        self._add_asn_range(asn_cidr, range_info)
                 asn_info = {
                     "asn": {"number": f"AS{asn_number}", "org": asnorg}
                 }
@@ -178,17 +203,19 @@ class ASN:
         """
         asn.update({"timestamp": time.time()})
         cached_ip_info.update(asn)
-        # store the ASN we found in 'IPsInfo'
-        self.db.set_ip_info(ip, cached_ip_info)
+        # store the ASN we found in 'IPsInfo', the rest of the cached
+        # info is already there
+        self.db.set_ip_info(ip, asn)
 
     def get_asn(self, ip, cached_ip_info):
         """
         Gets ASN info about IP, either cached, from our offline mmdb or from ip-api.com
+        returns the asn found or None
         """
         # do we have asn cached for this range?
         if cached_asn := self.get_cached_asn(ip):
             self.update_ip_info(ip, cached_ip_info, cached_asn)
-            return
+            return cached_asn
 
         else:
             # now we have 2 options, either search for the ASN in our offline db, or online
@@ -198,15 +225,15 @@ class ASN:
                 # range is cached and we managed to get the number and org of the given ip using whois
                 # no need to search online or offline
                 self.update_ip_info(ip, cached_ip_info, asn)
-                return
+                return asn
 
             # we don't have it cached in our db, get it from geolite
             if asn := self.get_asn_info_from_geolite(ip):
                 self.update_ip_info(ip, cached_ip_info, asn)
-                return
+                return asn
 
             # can't find asn in mmdb or using whois library, try using ip-info
             if asn := self.get_asn_online(ip):
                 # found it online
                 self.update_ip_info(ip, cached_ip_info, asn)
-                return
+                return asn
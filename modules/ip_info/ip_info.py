@@ -1,5 +1,7 @@
 import platform
 from typing import (
+    Dict,
+    Set,
     Union,
     Optional,
 )
@@ -16,11 +18,13 @@ import subprocess
 import re
 import time
 import asyncio
+import traceback
 import multiprocessing
 from functools import lru_cache
 
 
 from modules.ip_info.jarm import JARM
+from modules.ip_info.lookup_pool import LookupPool
 from slips_files.common.flow_classifier import FlowClassifier
 from slips_files.core.helpers.whitelist.whitelist import Whitelist
 from .asn_info import ASN
@@ -38,6 +42,12 @@ from slips_files.core.structures.evidence import (
     Direction,
 )
 
+# max number of new ips and domains being looked up at the same time,
+# no more msgs are read until some of them are done
+MAX_PENDING_LOOKUPS = 500
+# seconds to keep the jarm of each ip and port in the cache db
+JARM_CACHE_TTL = 24 * 3600
+
 
 class IPInfo(AsyncModule):
     # Name: short name of the module. Do not use spaces
@@ -51,19 +61,26 @@ class IPInfo(AsyncModule):
         self.asn = ASN(self.db)
         self.JARM = JARM()
         self.classifier = FlowClassifier()
-        self.c1 = self.db.subscribe("new_ip")
-        self.c2 = self.db.subscribe("new_MAC")
-        self.c3 = self.db.subscribe("new_dns")
-        self.c4 = self.db.subscribe("check_jarm_hash")
-        self.channels = {
-            "new_ip": self.c1,
-            "new_MAC": self.c2,
-            "new_dns": self.c3,
-            "check_jarm_hash": self.c4,
-        }
+        self.register_handler("new_ip", self.on_new_ip)
+        self.register_handler("new_MAC", self.on_new_mac)
+        self.register_handler("new_dns", self.on_new_dns)
+        self.register_handler("check_jarm_hash", self.on_check_jarm_hash)
         self.whitelist = Whitelist(self.logger, self.db)
         self.is_running_non_stop: bool = self.db.is_running_non_stop()
         self.valid_tlds = whois.validTlds()
+        # the online lookups block, so each kind runs in its own pool of
+        # threads instead of in the event loop of this module
+        self.lookup_pools: Dict[str, LookupPool] = {
+            "asn": LookupPool("asn", workers=4, timeout=10, negative_ttl=3600),
+            "rdns": LookupPool(
+                "rdns", workers=8, timeout=3, negative_ttl=3600
+            ),
+            "whois": LookupPool(
+                "whois", workers=4, timeout=5, negative_ttl=3600
+            ),
+        }
+        # the tasks handling the new ips and domains
+        self.pending_lookups: Set[asyncio.Task] = set()
 
     async def open_dbs(self):
         """Function to open the different offline databases used in this
@@ -284,13 +301,18 @@ class IPInfo(AsyncModule):
         except Exception:
             return None
 
-    def get_domain_info(self, domain):
+    def get_domain_info(self, domain) -> bool:
         """
         Gets the age and org of a domain using whois
+        returns True if any info about the domain is known, so the
+        lookup pool doesn't negatively cache the found domains
         """
-        if not self.is_valid_domain(domain) or self.has_cached_info(domain):
-            return
+        if not self.is_valid_domain(domain):
+            return False
+        if self.has_cached_info(domain):
+            return True
 
+        found = False
         res = self.query_whois(domain)
         if res:
             if res.creation_date:
@@ -300,10 +322,11 @@ class IPInfo(AsyncModule):
                     return_type="days",
                 )
                 self.db.set_info_for_domains(domain, {"Age": age})
+                found = True
 
             if res.registrant:
                 self.db.set_info_for_domains(domain, {"Org": res.registrant})
-                return
+                return True
 
         # usually support.microsoft.com doesnt have a registrant,
         # but microsoft.com does
@@ -311,8 +334,16 @@ class IPInfo(AsyncModule):
         sld_res = self.query_whois(sld)
         if sld_res and sld_res.registrant:
             self.db.set_info_for_domains(domain, {"Org": sld_res.registrant})
+            found = True
+        return found
 
     async def shutdown_gracefully(self):
+        # wait for the ongoing lookups, they're bounded by their timeouts
+        if self.pending_lookups:
+            # the errors are printed by on_lookup_done()
+            await asyncio.gather(*self.pending_lookups, return_exceptions=True)
+        for pool in self.lookup_pools.values():
+            pool.shutdown()
         if hasattr(self, "asn_db"):
             self.asn_db.close()
         if hasattr(self, "country_db"):
@@ -516,7 +547,7 @@ class IPInfo(AsyncModule):
             # now that it's found, get and store the mac addr of it
             self.get_gateway_mac(ip)
 
-    def handle_new_ip(self, ip: str):
+    async def handle_new_ip(self, ip: str):
         try:
             # make sure its a valid ip
             ip_addr = ipaddress.ip_address(ip)
@@ -529,59 +560,116 @@ class IPInfo(AsyncModule):
 
         # Do we have cached info about this ip in redis?
         # If yes, load it
-        cached_ip_info = self.db.get_ip_info(ip)
+        cached_ip_info = self.db.get_ip_info(ip, ["geocountry", "asn"])
         if not cached_ip_info:
             cached_ip_info = {}
 
-        # Get the geocountry
+        # Get the geocountry. it's a lookup in the local geolite db,
+        # fast enough to be done here
         if cached_ip_info == {} or "geocountry" not in cached_ip_info:
             self.get_geocountry(ip)
 
+        lookups = [
+            self.lookup_pools["rdns"].lookup(ip, self.get_rdns, ip),
+        ]
         # only update the ASN for this IP if more than 1 month
         # passed since last ASN update on this IP
         if self.asn.should_update_asn(cached_ip_info):
-            self.asn.get_asn(ip, cached_ip_info)
+            lookups.append(
+                self.lookup_pools["asn"].lookup(
+                    ip, self.asn.get_asn, ip, cached_ip_info
+                )
+            )
+        await asyncio.gather(*lookups)
 
-        self.get_rdns(ip)
+    async def handle_new_domain(self, domain: str):
+        await self.lookup_pools["whois"].lookup(
+            domain, self.get_domain_info, domain
+        )
 
-    async def main(self):
-        if msg := self.get_msg("new_MAC"):
-            data = json.loads(msg["data"])
-            mac_addr: str = data["MAC"]
-            profileid: str = data["profileid"]
-
-            self.get_vendor(mac_addr, profileid)
-            self.check_if_we_have_pending_offline_mac_queries()
-
-        if msg := self.get_msg("new_dns"):
-            msg = json.loads(msg["data"])
-            flow = self.classifier.convert_to_flow_obj(msg["flow"])
-            if domain := flow.query:
-                self.get_domain_info(domain)
-
-        if msg := self.get_msg("new_ip"):
-            ip = msg["data"]
-            self.handle_new_ip(ip)
-
-        if msg := self.get_msg("check_jarm_hash"):
-            # example of a msg
-            # {'attacker_type': 'ip',
-            # 'profileid': 'profile_192.168.1.9', 'twid': 'timewindow1',
-            # 'flow': {'starttime': 1700828217.923668,
-            # 'uid': 'CuTCcR1Bbp9Je7LVqa', 'saddr': '192.168.1.9',
-            # 'daddr': '45.33.32.156', 'dur': 0.20363497734069824,
-            # 'proto': 'tcp', 'appproto': '', 'sport': 50824, 'dport': 443,
-            # 'spkts': 1, 'dpkts': 1, 'sbytes': 0, 'dbytes': 0,
-            # 'smac': 'c4:23:60:3d:fd:d3', 'dmac': '50:78:b3:b0:08:ec',
-            # 'state': 'REJ', 'history': 'Sr', 'type_': 'conn', 'dir_': '->'},
-            # 'uid': 'CuTCcR1Bbp9Je7LVqa'}
-
-            msg: dict = json.loads(msg["data"])
-            flow: dict = msg["flow"]
-            if msg["attacker_type"] == "ip":
-                jarm_hash: str = self.JARM.JARM_hash(
-                    flow["daddr"], flow["dport"]
-                )
+    async def get_jarm_hash(self, ip: str, port: int) -> str:
+        if jarm_hash := self.db.get_jarm_hash(ip, port):
+            return jarm_hash
+        jarm_hash: str = await self.JARM.async_JARM_hash(ip, port)
+        self.db.set_jarm_hash(ip, port, jarm_hash, JARM_CACHE_TTL)
+        return jarm_hash
 
-                if self.db.is_blacklisted_jarm(jarm_hash):
-                    self.set_evidence_malicious_jarm_hash(flow, msg["twid"])
+    async def check_jarm_hash(self, flow: dict, twid: str):
+        jarm_hash: str = await self.get_jarm_hash(flow["daddr"], flow["dport"])
+        if self.db.is_blacklisted_jarm(jarm_hash):
+            self.set_evidence_malicious_jarm_hash(flow, twid)
+
+    async def run_in_background(self, coroutine):
+        """
+        runs the given coroutine without waiting for it, so a slow lookup
+        doesn't delay the next msgs. waits for some of the pending ones
+        first if there are too many
+        """
+        if len(self.pending_lookups) >= MAX_PENDING_LOOKUPS:
+            await asyncio.wait(
+                self.pending_lookups, return_when=asyncio.FIRST_COMPLETED
+            )
+        task = asyncio.create_task(coroutine)
+        self.pending_lookups.add(task)
+        task.add_done_callback(self.on_lookup_done)
+
+    def on_lookup_done(self, task: asyncio.Task):
+        """
+        prints the errors of the finished background tasks, nothing
+        awaits them so their exceptions would be lost otherwise
+        """
+        self.pending_lookups.discard(task)
+        if task.cancelled():
+            return
+        if exception := task.exception():
+            self.print(f"Problem in a background lookup: {exception!r}", 0, 1)
+            self.print(
+                "".join(
+                    traceback.format_exception(
+                        type(exception), exception, exception.__traceback__
+                    )
+                ),
+                0,
+                1,
+            )
+
+    def on_new_mac(self, msg: dict):
+        data = json.loads(msg["data"])
+        mac_addr: str = data["MAC"]
+        profileid: str = data["profileid"]
+
+        self.get_vendor(mac_addr, profileid)
+        self.check_if_we_have_pending_offline_mac_queries()
+
+    async def on_new_dns(self, msg: dict):
+        msg = json.loads(msg["data"])
+        flow = self.classifier.convert_to_flow_obj(msg["flow"])
+        if domain := flow.query:
+            await self.run_in_background(self.handle_new_domain(domain))
+
+    async def on_new_ip(self, msg: dict):
+        await self.run_in_background(self.handle_new_ip(msg["data"]))
+
+    async def on_check_jarm_hash(self, msg: dict):
+        # example of a msg
+        # {'attacker_type': 'ip',
+        # 'profileid': 'profile_192.168.1.9', 'twid': 'timewindow1',
+        # 'flow': {'starttime': 1700828217.923668,
+        # 'uid': 'CuTCcR1Bbp9Je7LVqa', 'saddr': '192.168.1.9',
+        # 'daddr': '45.33.32.156', 'dur': 0.20363497734069824,
+        # 'proto': 'tcp', 'appproto': '', 'sport': 50824, 'dport': 443,
+        # 'spkts': 1, 'dpkts': 1, 'sbytes': 0, 'dbytes': 0,
+        # 'smac': 'c4:23:60:3d:fd:d3', 'dmac': '50:78:b3:b0:08:ec',
+        # 'state': 'REJ', 'history': 'Sr', 'type_': 'conn', 'dir_': '->'},
+        # 'uid': 'CuTCcR1Bbp9Je7LVqa'}
+
+        msg: dict = json.loads(msg["data"])
+        flow: dict = msg["flow"]
+        if msg["attacker_type"] == "ip":
+            await self.run_in_background(
+                self.check_jarm_hash(flow, msg["twid"])
+            )
+
+    async def main(self):
+        # the msgs are handled by the handlers registered in init()
+        pass
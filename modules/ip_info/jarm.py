@@ -1,5 +1,6 @@
 from __future__ import print_function
 
+import asyncio
 import codecs
 import socket
 import struct
@@ -7,9 +8,27 @@ import os
 import random
 import hashlib
 import ipaddress
+from typing import (
+    Dict,
+    List,
+    Tuple,
+    Union,
+)
+
+# seconds to wait for connecting and for each server hello
+PROBE_TIMEOUT = 20
+# max number of probes sent at the same time to all hosts
+MAX_CONCURRENT_PROBES = 50
+# the jarm of hosts that didn't reply to any probe
+EMPTY_JARM = "|||,|||,|||,|||,|||,|||,|||,|||,|||,|||"
 
 
 class JARM:
+    def __init__(self):
+        self.probes_semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROBES)
+        # {(host, port): the task fingerprinting it}
+        self.pending: Dict[Tuple[str, int], asyncio.Task] = {}
+
     # Randomly choose a grease value
     def choose_grease(self):
         grease_list = [
@@ -857,9 +876,7 @@ class JARM:
             selected_ciphers += cipher
         return selected_ciphers
 
-    def JARM_hash(self, destination_host, destination_port=443) -> str:
-        self.destination_host = destination_host
-        self.destination_port = destination_port
+    def get_probes(self, destination_host, destination_port) -> List[list]:
         # Select the packets and formats to send
         # Array format = [destination_host,destination_port,version,cipher_list,cipher_order,GREASE,RARE_APLN,1.3_SUPPORT,extension_orders]
         tls1_2_forward = [
@@ -978,7 +995,7 @@ class JARM:
         # APLN: either APLN or RARE_APLN
         # Supported Verisons extension: 1.2_SUPPPORT, NO_SUPPORT, or 1.3_SUPPORT
         # Possible Extension order: FORWARD, REVERSE
-        queue = [
+        return [
             tls1_2_forward,
             tls1_2_reverse,
             tls1_2_top_half,
@@ -990,6 +1007,11 @@ class JARM:
             tls1_3_invalid,
             tls1_3_middle_out,
         ]
+
+    def JARM_hash(self, destination_host, destination_port=443) -> str:
+        self.destination_host = destination_host
+        self.destination_port = destination_port
+        queue = self.get_probes(destination_host, destination_port)
         jarm = ""
         # Assemble, send, and decipher each packet
         iterate = 0
@@ -998,7 +1020,7 @@ class JARM:
             server_hello, ip = self.send_packet(payload)
             # Deal with timeout error
             if server_hello == "TIMEOUT":
-                jarm = "|||,|||,|||,|||,|||,|||,|||,|||,|||,|||"
+                jarm = EMPTY_JARM
                 break
             ans = self.read_packet(server_hello, queue[iterate])
             jarm += ans
@@ -1009,3 +1031,64 @@ class JARM:
                 jarm += ","
         # Fuzzy hash
         return self.get_hash(jarm)
+
+    async def send_probe(
+        self, host: str, port: int, packet: bytes
+    ) -> Union[bytearray, str, None]:
+        """
+        async version of send_packet()
+        returns the server hello, "TIMEOUT", or None if the connection
+        failed
+        """
+        async with self.probes_semaphore:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(host, port), PROBE_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                return "TIMEOUT"
+            except OSError:
+                return None
+
+            try:
+                writer.write(packet)
+                await writer.drain()
+                data = await asyncio.wait_for(reader.read(1484), PROBE_TIMEOUT)
+                return bytearray(data)
+            except asyncio.TimeoutError:
+                return "TIMEOUT"
+            except OSError:
+                return None
+            finally:
+                writer.close()
+
+    async def _async_JARM_hash(self, host: str, port: int) -> str:
+        probes = self.get_probes(host, port)
+        server_hellos = await asyncio.gather(
+            *[
+                self.send_probe(host, port, self.packet_building(probe))
+                for probe in probes
+            ]
+        )
+        if "TIMEOUT" in server_hellos:
+            return self.get_hash(EMPTY_JARM)
+
+        jarm = ",".join(
+            self.read_packet(server_hello, probe)
+            for server_hello, probe in zip(server_hellos, probes)
+        )
+        return self.get_hash(jarm)
+
+    async def async_JARM_hash(self, host: str, port: int = 443) -> str:
+        """
+        same as JARM_hash() but sends the 10 probes at the same time
+        without blocking. concurrent calls for the same host and port
+        share the same probes
+        """
+        key = (host, port)
+        task = self.pending.get(key)
+        if not task:
+            task = asyncio.ensure_future(self._async_JARM_hash(host, port))
+            self.pending[key] = task
+            task.add_done_callback(lambda _: self.pending.pop(key, None))
+        return await asyncio.shield(task)
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+)
+
+
+class LookupPool:
+    """
+    Runs the blocking lookups of one kind, e.g. reverse dns, in a bounded
+    pool of threads so they don't block the event loop of the module.
+    - each lookup is given up on after the pool's timeout
+    - lookups that found nothing or timed out aren't retried for
+      negative_ttl seconds
+    - concurrent lookups of the same key share one lookup
+    """
+
+    def __init__(
+        self,
+        name: str,
+        workers: int,
+        timeout: float,
+        negative_ttl: float,
+        max_negative_cache_size: int = 10000,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.negative_ttl = negative_ttl
+        self.max_negative_cache_size = max_negative_cache_size
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"{name}_lookup"
+        )
+        # {key: time when the key can be looked up again}, oldest first
+        self.negative_cache: Dict[str, float] = {}
+        # {key: the task looking it up}
+        self.in_flight: Dict[str, asyncio.Task] = {}
+
+    def is_negatively_cached(self, key: str) -> bool:
+        expiry = self.negative_cache.get(key)
+        if expiry is None:
+            return False
+        if time.time() < expiry:
+            return True
+        del self.negative_cache[key]
+        return False
+
+    def cache_negative_result(self, key: str):
+        # re-insert to keep the dict ordered by expiry
+        self.negative_cache.pop(key, None)
+        self.negative_cache[key] = time.time() + self.negative_ttl
+        if len(self.negative_cache) > self.max_negative_cache_size:
+            del self.negative_cache[next(iter(self.negative_cache))]
+
+    async def lookup(self, key: str, func: Callable, *args) -> Any:
+        """
+        runs func(*args) in the pool unless the given key is being looked
+        up already, or had no result recently.
+        returns the result of func, or None if it timed out
+        """
+        if self.is_negatively_cached(key):
+            return None
+
+        task = self.in_flight.get(key)
+        if not task:
+            task = asyncio.ensure_future(self._lookup(key, func, *args))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        # shielded so one caller giving up doesn't cancel the lookup of
+        # the others
+        return await asyncio.shield(task)
+
+    async def _lookup(self, key: str, func: Callable, *args) -> Any:
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(self.executor, func, *args),
+                self.timeout,
+            )
+        except asyncio.TimeoutError:
+            # the thread keeps running until func returns, but its result
+            # isn't waited for
+            result = None
+
+        if not result:
+            self.cache_negative_result(key)
+        return result
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
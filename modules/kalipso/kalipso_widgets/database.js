@@ -93,9 +93,14 @@ class Redis{
 
     /*Get information about the specific IP*/
     getIpInfo(ip){
-      return new Promise((resolve, reject)=>{this.cache.hget("IPsInfo",ip,(err,reply)=>{
+      return new Promise((resolve, reject)=>{this.cache.hgetall("IPsInfo_"+ip,(err,reply)=>{
         if(err){console.log("Error in getIpInfo in kalipso_redis.js. Error: ",err); reject(err);}
-        else{resolve(reply);}
+        else if(reply==null || Object.keys(reply).length==0){resolve(null);}
+        else{
+          // each info type of the ip is a json field of its hash
+          var ip_info = {}
+          for(var info_type in reply){ip_info[info_type] = JSON.parse(reply[info_type])}
+          resolve(JSON.stringify(ip_info));}
       });})
     }
 
@@ -175,6 +180,25 @@ class Redis{
       });})
     }
 
+    /*Check if the data of the timewindow was moved to sqlite by slips.*/
+    isTWArchived(ip, timewindow){
+      return new Promise ((resolve, reject)=>{this.db.sismember("archived_tws","profile_"+ip+"_"+timewindow,(err,reply)=>{
+        if(err){console.log("Error in isTWArchived in kalipso_redis.js. Error: ",err); reject(err);}
+        else{resolve(reply == 1);}
+      });})
+    }
+
+    /*Ask slips to read an archived timewindow back to redis and wait until it's there.
+    Slips checks for these requests every few seconds, so give up after timeout ms.*/
+    async restoreArchivedTW(ip, timewindow, timeout=15000){
+      if(!await this.isTWArchived(ip, timewindow)){return;}
+      this.db.publish("restore_archived_tw", "profile_"+ip+"_"+timewindow)
+      for(let waited = 0; waited < timeout; waited += 500){
+        await new Promise(resolve => setTimeout(resolve, 500));
+        if(!await this.isTWArchived(ip, timewindow)){return;}
+      }
+    }
+
     /*Create all the client to the Redis database.*/
     createClient(){
         let redis_config = {
@@ -148,10 +148,14 @@ class ProfileTWs extends tree.TreeClass{
 		    	let timewindow = stripAnsi(node.name);
 		    	this.current_ip = ip
 		    	this.current_tw = timewindow
-				// prepare what to show when pressing z
-		    	this.evidence.setEvidence(ip, timewindow)
-				// prepare timeline for this ip,tw
-		    	this.timeline.setTimeline(ip, timewindow)
+				// slips may have moved this tw to sqlite, ask for it back before reading it
+		    	this.redis_database.restoreArchivedTW(ip, timewindow).then(()=>{
+					// prepare what to show when pressing z
+			    	this.evidence.setEvidence(ip, timewindow)
+					// prepare timeline for this ip,tw
+			    	this.timeline.setTimeline(ip, timewindow)
+			    	this.screen.render()
+		    	})
 		    	}
 		    this.screen.render()
 			});
@@ -3,15 +3,19 @@ import base64
 import time
 import binascii
 import os
+import struct
 import subprocess
-import json
 import shutil
 from typing import (
-    Dict,
     List,
+    Optional,
 )
 from uuid import uuid4
 
+from modules.leak_detector.pcap_index import (
+    PacketInfo,
+    PcapIndex,
+)
 from slips_files.common.slips_utils import utils
 from slips_files.common.abstracts.module import IModule
 from slips_files.core.structures.evidence import (
@@ -26,6 +30,8 @@ from slips_files.core.structures.evidence import (
     Direction,
 )
 
+COMPILED_RULESET = "ruleset_compiled"
+
 
 class LeakDetector(IModule):
     # Name: short name of the module. Do not use spaces
@@ -45,6 +51,7 @@ class LeakDetector(IModule):
         self.compiled_yara_rules_path = (
             "modules/leak_detector/yara_rules/compiled/"
         )
+        self.pcap_index: Optional[PcapIndex] = None
         self.bin_found = False
         if self.is_yara_installed():
             self.bin_found = True
@@ -64,112 +71,20 @@ class LeakDetector(IModule):
         )
         return False
 
-    def fix_json_packet(self, json_packet):
-        """
-        in very large pcaps, tshark gets killed before it's done processing,
-        but the first packet info is printed in a corrupted json format
-        this function fixes the printed packet
-        """
-        json_packet = json_packet.replace("Killed", "")
-        json_packet += "}]"
-        try:
-            return json.loads(json_packet)
-        except json.decoder.JSONDecodeError:
-            return False
-
-    def get_packet_info(self, offset: int):
+    def get_packet_info(self, offset: int) -> Optional[PacketInfo]:
         """
-        Parse pcap and determine the packet at this offset
-        returns  a tuple with packet info (srcip, dstip, proto, sport, dport, ts) or False if not found
+        Determine the packet at this offset of the pcap
+        returns a tuple with packet info (srcip, dstip, proto, sport,
+        dport, ts) or None if not found
         """
-        offset = int(offset)
-        with open(self.pcap, "rb") as f:
-            # every pcap header is 24 bytes
-            f.read(24)
-            packet_number = 0
-
-            packet_data_length = True
-            while packet_data_length:
-                # the number of the packet we're currently working with,
-                # since packets start from 1 in tshark,
-                # the first packet should be 1
-                packet_number += 1
-                # this offset is exactly when the packet starts
-                start_offset = f.tell() + 1
-                # get the Packet header, every packet header is exactly 16 bytes long
-                packet_header = f.read(16)
-                # get the length of the Packet Data field
-                # (the second last 4 bytes of the header),
-                # [::-1] for little endian
-                packet_data_length = packet_header[8:12][::-1]
-                # convert the hex into decimal
-                packet_length_in_decimal = int.from_bytes(
-                    packet_data_length, "big"
-                )
-
-                # read until the end of this packet
-                f.read(packet_length_in_decimal)
-                # this offset is exactly when the packet ends
-                end_offset = f.tell()
-                if offset <= end_offset and offset >= start_offset:
-                    # print(f"Found a match. Packet number in wireshark: {packet_number+1}")
-                    # use tshark to get packet info
-                    cmd = f'tshark -r "{self.pcap}" -T json -Y frame.number=={packet_number}'
-                    tshark_proc = subprocess.Popen(
-                        cmd,
-                        stdout=subprocess.PIPE,
-                        stderr=subprocess.DEVNULL,
-                        stdin=subprocess.PIPE,
-                        shell=True,
-                    )
-
-                    result, error = tshark_proc.communicate()
-                    if error:
-                        self.print(
-                            f"tshark error {tshark_proc.returncode}: {error.strip()}"
-                        )
-                        return
-
-                    json_packet: str = result.decode()
-
-                    try:
-                        json_packet: List[Dict[str, str]] = json.loads(
-                            json_packet
-                        )
-                    except json.decoder.JSONDecodeError:
-                        json_packet = self.fix_json_packet(json_packet)
-
-                    if json_packet:
-                        # sometime tshark can't find the desired packet?
-                        json_packet = json_packet[0]["_source"]["layers"]
-
-                        # get ip family and used protocol
-                        used_protocols = json_packet["frame"][
-                            "frame.protocols"
-                        ]
-                        ip_family = (
-                            "ipv6" if "ipv6" in used_protocols else "ip"
-                        )
-                        if "tcp" in used_protocols:
-                            proto = "tcp"
-                        elif "udp" in used_protocols:
-                            proto = "udp"
-                        else:
-                            # probably ipv6.hopopt
-                            return
-
-                        try:
-                            ts = json_packet["frame"]["frame.time_epoch"]
-                            srcip = json_packet[ip_family][f"{ip_family}.src"]
-                            dstip = json_packet[ip_family][f"{ip_family}.dst"]
-                            sport = json_packet[proto][f"{proto}.srcport"]
-                            dport = json_packet[proto][f"{proto}.dstport"]
-                        except KeyError:
-                            return
-
-                        return srcip, dstip, proto, sport, dport, ts
-
-        return False
+        if not self.pcap_index:
+            # one pass over the pcap for all the matches
+            try:
+                self.pcap_index = PcapIndex(self.pcap)
+            except (OSError, ValueError, struct.error) as e:
+                self.print(f"Unable to read {self.pcap}: {e}")
+                return None
+        return self.pcap_index.get_packet_info(int(offset))
 
     def set_evidence_yara_match(self, info: dict):
         """
@@ -188,14 +103,7 @@ class LeakDetector(IModule):
         if not packet_info:
             return
 
-        srcip, dstip, proto, _, dport, ts = (
-            packet_info[0],
-            packet_info[1],
-            packet_info[2],
-            packet_info[3],
-            packet_info[4],
-            packet_info[5],
-        )
+        srcip, dstip, proto, _, dport, ts = packet_info
 
         portproto = f"{dport}/{proto}"
         port_info = self.db.get_port_info(portproto)
@@ -203,9 +111,6 @@ class LeakDetector(IModule):
         # generate a random uid
         uid = base64.b64encode(binascii.b2a_hex(os.urandom(9))).decode("utf-8")
         profileid = f"profile_{srcip}"
-        # sometimes this module tries to find the profile before it's created. so
-        # wait a while before alerting.
-        time.sleep(4)
 
         description = (
             f"{rule} to destination address: {dstip} "
@@ -265,9 +170,31 @@ class LeakDetector(IModule):
 
         self.db.set_evidence(evidence)
 
+    def get_compiled_ruleset(self) -> str:
+        """
+        all the rules are compiled to this file so the pcap is scanned once
+        """
+        return os.path.join(self.compiled_yara_rules_path, COMPILED_RULESET)
+
+    def get_rule_paths(self) -> List[str]:
+        return [
+            os.path.join(self.yara_rules_path, yara_rule)
+            for yara_rule in sorted(os.listdir(self.yara_rules_path))
+        ]
+
+    def is_compiled_ruleset_outdated(self, rule_paths: List[str]) -> bool:
+        if not os.path.exists(self.get_compiled_ruleset()):
+            return True
+        compiled_time = os.path.getmtime(self.get_compiled_ruleset())
+        return any(
+            os.path.getmtime(rule_path) > compiled_time
+            for rule_path in rule_paths
+        )
+
     def compile_and_save_rules(self):
         """
-        Compile and save all yara rules in the compiled_yara_rules_path
+        Compile all yara rules to one ruleset and save it in the
+        compiled_yara_rules_path
         """
 
         try:
@@ -275,23 +202,24 @@ class LeakDetector(IModule):
         except FileExistsError:
             pass
 
-        for yara_rule in os.listdir(self.yara_rules_path):
-            compiled_rule_path = os.path.join(
-                self.compiled_yara_rules_path, f"{yara_rule}_compiled"
-            )
-            # if we already have the rule compiled, don't compile again
-            if os.path.exists(compiled_rule_path):
-                # we already have the rule compiled
-                continue
+        rule_paths: List[str] = self.get_rule_paths()
+        # if we already have the rules compiled, don't compile again
+        if not self.is_compiled_ruleset_outdated(rule_paths):
+            return True
 
-            # get the complete path of the .yara rule
-            rule_path = os.path.join(self.yara_rules_path, yara_rule)
-            # compile
-            cmd = f"yarac {rule_path} {compiled_rule_path} >/dev/null 2>&1"
-            return_code = os.system(cmd)
-            if return_code != 0:
-                self.print(f"Error compiling {yara_rule}.")
-                return False
+        # each file gets its own namespace so rules with the same name in
+        # different files don't conflict
+        sources = " ".join(
+            f'"{os.path.basename(rule_path)}:{rule_path}"'
+            for rule_path in rule_paths
+        )
+        cmd = (
+            f'yarac {sources} "{self.get_compiled_ruleset()}" >/dev/null 2>&1'
+        )
+        return_code = os.system(cmd)
+        if return_code != 0:
+            self.print("Error compiling the yara rules.")
+            return False
         return True
 
     def delete_compiled_rules(self):
@@ -301,65 +229,76 @@ class LeakDetector(IModule):
         shutil.rmtree(self.compiled_yara_rules_path)
         os.mkdir(self.compiled_yara_rules_path)
 
-    def find_matches(self):
-        """Run yara rules on the given pcap and find matches"""
-        for compiled_rule in os.listdir(self.compiled_yara_rules_path):
-            compiled_rule_path = os.path.join(
-                self.compiled_yara_rules_path, compiled_rule
-            )
-            # -p 7 means use 7 threads for faster analysis
-            # -f to stop searching for strings when they were already found
-            # -s prints the found string
-            cmd = f'yara -C {compiled_rule_path} "{self.pcap}" -p 7 -f -s '
-            yara_proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-                shell=True,
+    def parse_yara_output(self, lines: str) -> List[dict]:
+        """
+        returns the matches in the given output of yara -s. each matching
+        rule is printed followed by the strings it matched
+        """
+        matches = []
+        matching_rule = None
+        for line in lines.splitlines():
+            if not line.startswith("0x"):
+                matching_rule = line.split()[0]
+                continue
+            # example of a line: 0x4e15c:$rgx_gps_loc: ll=00.000000,-00.000000
+            line = line.split(":")
+            matches.append(
+                {
+                    "rule": matching_rule,
+                    # var is either $rgx_gps_loc, $rgx_gps_lon or
+                    # $rgx_gps_lat
+                    "vars_matched": line[1].replace("$", ""),
+                    # strings_matched is exactly the string that was found
+                    # that triggered this detection starts from the var
+                    # until the end of the line
+                    "strings_matched": " ".join(list(line[2:])),
+                    # offset: pcap index where the rule was matched
+                    "offset": int(line[0], 16),
+                }
             )
+        return matches
 
-            lines, error = yara_proc.communicate()
-            lines = lines.decode()
-            if error:
-                if (
-                    b"rules were compiled with a different version of YARA"
-                    in error.strip()
-                ):
-                    self.delete_compiled_rules()
-                    # will re-compile and save rules again and try to find matches
-                    self.run()
-                else:
-                    self.print(
-                        f"YARA error {yara_proc.returncode}: {error.strip()}"
-                    )
-                    return
-
-            if not lines:
-                # no match
-                return
-
-            lines = lines.splitlines()
-            matching_rule = lines[0].split()[0]
-            # each match (line) should be a separate detection(yara match)
-            for line in lines[1:]:
-                # example of a line: 0x4e15c:$rgx_gps_loc: ll=00.000000,-00.000000
-                line = line.split(":")
-                # offset: pcap index where the rule was matched
-                offset = int(line[0], 16)
-                # var is either $rgx_gps_loc, $rgx_gps_lon or $rgx_gps_lat
-                var = line[1].replace("$", "")
-                # strings_matched is exactly the string that was found that triggered this detection
-                # starts from the var until the end of the line
-                strings_matched = " ".join(list(line[2:]))
-                self.set_evidence_yara_match(
-                    {
-                        "rule": matching_rule,
-                        "vars_matched": var,
-                        "strings_matched": strings_matched,
-                        "offset": offset,
-                    }
+    def find_matches(self, recompile_on_version_error=True):
+        """Run yara rules on the given pcap and find matches"""
+        # -p 7 means use 7 threads for faster analysis
+        # -f to stop searching for strings when they were already found
+        # -s prints the found string
+        cmd = f'yara -C "{self.get_compiled_ruleset()}" "{self.pcap}" -p 7 -f -s '
+        yara_proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            stdin=subprocess.PIPE,
+            shell=True,
+        )
+
+        lines, error = yara_proc.communicate()
+        lines = lines.decode()
+        if error:
+            if (
+                b"rules were compiled with a different version of YARA"
+                in error.strip()
+                and recompile_on_version_error
+            ):
+                self.delete_compiled_rules()
+                # re-compile and save rules again and try to find matches
+                if self.compile_and_save_rules():
+                    self.find_matches(recompile_on_version_error=False)
+            else:
+                self.print(
+                    f"YARA error {yara_proc.returncode}: {error.strip()}"
                 )
+            return
+
+        if not (matches := self.parse_yara_output(lines)):
+            return
+
+        # sometimes this module tries to find the profile before it's
+        # created. so wait a while before alerting.
+        time.sleep(4)
+        # each match (line) should be a separate detection(yara match)
+        for match in matches:
+            self.set_evidence_yara_match(match)
 
     def pre_main(self):
         utils.drop_root_privs()
@@ -0,0 +1,274 @@
+import ipaddress
+import struct
+from array import array
+from bisect import bisect_right
+from typing import (
+    BinaryIO,
+    List,
+    Optional,
+    Tuple,
+)
+
+PCAP_MAGICS = {
+    # magic: (byte order, ts resolution)
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6),
+    b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9),
+    b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+PCAPNG_SECTION_HEADER = 0x0A0D0D0A
+PCAPNG_INTERFACE_DESCRIPTION = 1
+PCAPNG_SIMPLE_PACKET = 3
+PCAPNG_ENHANCED_PACKET = 6
+PCAPNG_IF_TSRESOL = 9
+
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = (12, 14, 101)
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_VLAN = (0x8100, 0x88A8)
+# the values of AF_INET6 on the different OSs in null/loopback headers
+AF_INET6 = (10, 24, 28, 30)
+TRANSPORT_PROTOS = {6: "tcp", 17: "udp"}
+
+# (srcip, dstip, proto, sport, dport, ts)
+PacketInfo = Tuple[str, str, str, int, int, float]
+
+
+class PcapIndex:
+    """
+    Maps the offsets of a pcap or pcapng file to the packets containing
+    them. The file is read once to build the index, and each offset is
+    then resolved to its packet using a binary search and one read of
+    that packet.
+    """
+
+    def __init__(self, pcap: str):
+        self.pcap = pcap
+        # the offsets where the data of each packet starts, sorted.
+        # typed arrays take a fraction of the memory lists of python ints
+        # and floats take for pcaps with millions of packets
+        self.starts = array("Q")
+        # the captured length, timestamp and link type of each packet
+        self.lengths = array("I")
+        self.timestamps = array("d")
+        self.linktypes = array("I")
+        with open(self.pcap, "rb") as f:
+            if f.read(4) == struct.pack("<I", PCAPNG_SECTION_HEADER):
+                self.index_pcapng(f)
+            else:
+                self.index_pcap(f)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def add_packet(self, start: int, length: int, ts: float, linktype: int):
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.timestamps.append(ts)
+        self.linktypes.append(linktype)
+
+    def index_pcap(self, f: BinaryIO):
+        f.seek(0)
+        header = f.read(24)
+        if header[:4] not in PCAP_MAGICS:
+            raise ValueError(f"{self.pcap} is not a pcap or pcapng file")
+        byte_order, resolution = PCAP_MAGICS[header[:4]]
+        linktype = struct.unpack(f"{byte_order}I", header[20:24])[0]
+
+        record_header = struct.Struct(f"{byte_order}IIII")
+        while len(packet_header := f.read(16)) == 16:
+            ts_sec, ts_frac, caplen, _ = record_header.unpack(packet_header)
+            self.add_packet(
+                f.tell(), caplen, ts_sec + ts_frac * resolution, linktype
+            )
+            f.seek(caplen, 1)
+
+    def index_pcapng(self, f: BinaryIO):
+        f.seek(0)
+        byte_order = "<"
+        # (linktype, ts resolution, snaplen) of each interface in the
+        # current section
+        interfaces: List[Tuple[int, float, int]] = []
+        while True:
+            block_start = f.tell()
+            block_header = f.read(12)
+            if len(block_header) < 12:
+                return
+
+            if block_header[:4] == struct.pack("<I", PCAPNG_SECTION_HEADER):
+                # the byte order of each section is set by its header
+                byte_order = (
+                    "<" if block_header[8:12] == b"\x4d\x3c\x2b\x1a" else ">"
+                )
+                interfaces = []
+
+            block_type, block_len = struct.unpack(
+                f"{byte_order}II", block_header[:8]
+            )
+            if block_len < 12:
+                return
+
+            if block_type == PCAPNG_INTERFACE_DESCRIPTION:
+                f.seek(block_start + 8)
+                body = f.read(block_len - 12)
+                interfaces.append(self.parse_interface(body, byte_order))
+            elif block_type == PCAPNG_ENHANCED_PACKET:
+                f.seek(block_start + 8)
+                interface_id, ts_high, ts_low, caplen, _ = struct.unpack(
+                    f"{byte_order}IIIII", f.read(20)
+                )
+                if interface_id >= len(interfaces):
+                    # corrupted block, or its interface is missing
+                    f.seek(block_start + block_len)
+                    continue
+                linktype, resolution, _ = interfaces[interface_id]
+                self.add_packet(
+                    block_start + 28,
+                    caplen,
+                    ((ts_high << 32) | ts_low) * resolution,
+                    linktype,
+                )
+            elif block_type == PCAPNG_SIMPLE_PACKET and interfaces:
+                f.seek(block_start + 8)
+                (origlen,) = struct.unpack(f"{byte_order}I", f.read(4))
+                linktype, _, snaplen = interfaces[0]
+                caplen = min(origlen, snaplen) if snaplen else origlen
+                # simple packet blocks have no timestamps
+                self.add_packet(block_start + 12, caplen, 0.0, linktype)
+
+            f.seek(block_start + block_len)
+
+    @staticmethod
+    def parse_interface(
+        body: bytes, byte_order: str
+    ) -> Tuple[int, float, int]:
+        """
+        returns the (linktype, ts resolution, snaplen) of the given
+        interface description block
+        """
+        linktype, _, snaplen = struct.unpack(f"{byte_order}HHI", body[:8])
+        resolution = 1e-6
+        options = body[8:]
+        while len(options) >= 4:
+            code, length = struct.unpack(f"{byte_order}HH", options[:4])
+            if code == 0:
+                break
+            if code == PCAPNG_IF_TSRESOL and length >= 1:
+                tsresol = options[4]
+                # the most significant bit says if it's a power of 2 or 10
+                if tsresol & 0x80:
+                    resolution = 2 ** -(tsresol & 0x7F)
+                else:
+                    resolution = 10**-tsresol
+            # options are padded to 32 bits
+            options = options[4 + length + (-length % 4) :]
+        return linktype, resolution, snaplen
+
+    def find_packet(self, offset: int) -> Optional[int]:
+        """
+        returns the index of the packet whose data contains the given
+        offset of the file
+        """
+        packet = bisect_right(self.starts, offset) - 1
+        if packet < 0:
+            return None
+        if offset >= self.starts[packet] + self.lengths[packet]:
+            # the offset is in the headers between 2 packets
+            return None
+        return packet
+
+    def get_packet_info(self, offset: int) -> Optional[PacketInfo]:
+        """
+        returns the (srcip, dstip, proto, sport, dport, ts) of the tcp or
+        udp packet containing the given offset of the file
+        """
+        packet = self.find_packet(offset)
+        if packet is None:
+            return None
+
+        with open(self.pcap, "rb") as f:
+            f.seek(self.starts[packet])
+            data = f.read(self.lengths[packet])
+
+        if not (ip_packet := self.get_ip_packet(data, self.linktypes[packet])):
+            return None
+        if not (info := self.parse_ip_packet(*ip_packet)):
+            return None
+        return *info, self.timestamps[packet]
+
+    @staticmethod
+    def get_ip_packet(data: bytes, linktype: int) -> Optional[Tuple]:
+        """
+        strips the link layer header of the given packet
+        returns the (ip version, ip packet)
+        """
+        ethertype = None
+        if linktype == LINKTYPE_ETHERNET:
+            ethertype, offset = int.from_bytes(data[12:14], "big"), 14
+            while ethertype in ETHERTYPE_VLAN:
+                ethertype = int.from_bytes(
+                    data[offset + 2 : offset + 4], "big"
+                )
+                offset += 4
+            data = data[offset:]
+        elif linktype == LINKTYPE_LINUX_SLL:
+            ethertype, data = int.from_bytes(data[14:16], "big"), data[16:]
+        elif linktype == LINKTYPE_LINUX_SLL2:
+            ethertype, data = int.from_bytes(data[0:2], "big"), data[20:]
+        elif linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+            family = int.from_bytes(data[:4], "little")
+            if family > 0xFFFF:
+                family = int.from_bytes(data[:4], "big")
+            ethertype = ETHERTYPE_IPV6 if family in AF_INET6 else None
+            data = data[4:]
+        elif linktype not in (*LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+            return None
+
+        if not data:
+            return None
+        version = data[0] >> 4
+        if ethertype == ETHERTYPE_IPV4 or (ethertype is None and version == 4):
+            return 4, data
+        if ethertype == ETHERTYPE_IPV6 or (ethertype is None and version == 6):
+            return 6, data
+        return None
+
+    @staticmethod
+    def parse_ip_packet(
+        version: int, data: bytes
+    ) -> Optional[Tuple[str, str, str, int, int]]:
+        """returns the (srcip, dstip, proto, sport, dport) of the packet"""
+        if version == 4:
+            if len(data) < 20:
+                return None
+            header_len = (data[0] & 0x0F) * 4
+            proto_number = data[9]
+            srcip, dstip = data[12:16], data[16:20]
+        else:
+            if len(data) < 40:
+                return None
+            # packets with ipv6 extension headers are skipped
+            header_len, proto_number = 40, data[6]
+            srcip, dstip = data[8:24], data[24:40]
+
+        if proto_number not in TRANSPORT_PROTOS:
+            return None
+        ports = data[header_len : header_len + 4]
+        if len(ports) < 4:
+            return None
+        sport, dport = struct.unpack(">HH", ports)
+        return (
+            str(ipaddress.ip_address(srcip)),
+            str(ipaddress.ip_address(dstip)),
+            TRANSPORT_PROTOS[proto_number],
+            sport,
+            dport,
+        )
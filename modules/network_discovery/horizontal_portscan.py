@@ -1,5 +1,8 @@
 import ipaddress
-from typing import List
+from typing import (
+    Dict,
+    List,
+)
 
 import validators
 
@@ -32,41 +35,15 @@ class HorizontalPortscan:
         # The minimum amount of scanned dstips to trigger an evidence
         # is increased exponentially every evidence, and is reset each timewindow
         self.minimum_dstips_to_set_evidence = 5
-
-    def get_not_estab_dst_ports(
-        self, protocol: str, state: str, profileid: str, twid: str
-    ) -> dict:
-        """
-        Get the list of dstports that we tried to connect
-         to (not established flows)
-         here, the profileid given is the client.
-         :return: the following dict
-         #TODO this is wrong, fix it
-         {
-             dst_ip: {
-                 totalflows: total flows seen by the profileid
-                 totalpkt: total packets seen by the profileid
-                 totalbytes: total bytes sent by the profileid
-                 stime: timestamp of the first flow seen from this
-                    profileid -> this dstip
-                 uid: list of uids where the given profileid was
-                        contacting the dst_ip on this dstport
-                 dstports: dst ports seen in all flows where the given
-                    profileid was srcip
-                     {
-                         <str port>: < int spkts sent to this port>
-                     }
-             }
-        """
-        # Get the list of dports that we connected as client
-        # using TCP not established
-        direction = "Dst"
-        role = "Client"
-        type_data = "Ports"
-        dports: dict = self.db.get_data_from_profile_tw(
-            profileid, twid, direction, state, protocol, role, type_data
-        )
-        return dports
+        # the not established dst ports each profile connected to as a
+        # client, updated flow by flow instead of reading them from the db
+        # {profileid_twid: {protocol: {dport: {"dstips": {dstip: {
+        #   "pkts": src+dst packets sent to this dstip,
+        #   "spkts": src packets sent to this dstip,
+        #   "stime": timestamp of the first flow to this dstip,
+        #   "uid": [uids of flows to this dstip]
+        # }}}}}}
+        self.not_estab_dports: Dict[str, Dict[str, Dict[str, dict]]] = {}
 
     def get_twid_identifier(self, profileid: str, twid: str, dport) -> str:
         if not dport:
@@ -208,48 +185,129 @@ class HorizontalPortscan:
     def is_valid_twid(twid: str) -> bool:
         return not (twid in ("", None) or "timewindow" not in twid)
 
-    def check(self, profileid: str, twid: str):
-        if not self.is_valid_saddr(profileid) or not self.is_valid_twid(twid):
+    @staticmethod
+    def was_flow_flipped(flow) -> bool:
+        """
+        The majority of the FP with horizontal port scan detection
+        happen because a benign computer changes wifi, and many not
+        established conns are redone, which look like a port scan to
+        10 webpages. To avoid this, we IGNORE all the flows that have
+        in the history of flags (field history in zeek), the ^,
+        that means that the flow was swapped/flipped.
+        """
+        state_hist = flow.state_hist if hasattr(flow, "state_hist") else ""
+        return "^" in state_hist
+
+    @staticmethod
+    def is_multicast_or_broadcast(daddr: str) -> bool:
+        if daddr == BROADCAST_ADDR:
+            return True
+        return ipaddress.ip_address(daddr).is_multicast
+
+    def should_ignore_dstip(self, protocol: str, daddr: str) -> bool:
+        """
+        we only count unresolved non multicast non broadcast TCP dst ips
+        """
+        if protocol != "TCP":
+            return False
+        return bool(
+            self.db.get_dns_resolution(daddr)
+            or self.is_multicast_or_broadcast(daddr)
+        )
+
+    def update_dstips(self, dstips: dict, flow) -> bool:
+        """
+        adds the given flow to the dst ips contacted on its dport
+        returns True if the flow's daddr wasn't contacted on this
+        dport before
+        """
+        pkts = int(flow.pkts or 0)
+        spkts = int(flow.spkts or 0)
+        if flow.daddr in dstips:
+            dstip = dstips[flow.daddr]
+            dstip["pkts"] += pkts
+            dstip["spkts"] += spkts
+            dstip["uid"].append(flow.uid)
             return False
 
+        dstips[flow.daddr] = {
+            "pkts": pkts,
+            "spkts": spkts,
+            "stime": str(flow.starttime),
+            "uid": [flow.uid],
+        }
+        return True
+
+    def check(self, profileid: str, twid: str, flow, state: str):
+        """
+        Updates the dst IPs the given profile contacted on the dport of
+        the given flow, and sets an evidence if this flow made them cross
+        the threshold.
+        :param flow: a flow where the given profile is the client
+        :param state: the interpreted state of the flow,
+            Established or Not Established
+        """
         # if you're portscaning a port that is open it's gonna be established
         # the amount of open ports we find is gonna be so small
         # theoretically this is incorrect bc we'll be ignoring
         # established evidence,
         # but usually open ports are very few compared to the whole range
         # so, practically this is correct to avoid FP
-        state = "Not Established"
-        for protocol in ("TCP", "UDP"):
-            dports: dict = self.get_not_estab_dst_ports(
-                protocol, state, profileid, twid
-            )
-
-            # For each port, see if the amount is over the threshold
-            for dport in dports.keys():
-                # PortScan Type 2. Direction OUT
-                dstips: dict = dports[dport]["dstips"]
-
-                twid_identifier: str = self.get_twid_identifier(
-                    profileid, twid, dport
+        if state != "Not Established":
+            return False
+
+        protocol = flow.proto.upper()
+        if protocol not in ("TCP", "UDP"):
+            return False
+
+        if not self.is_valid_saddr(profileid) or not self.is_valid_twid(twid):
+            return False
+
+        # PortScan Type 2. Direction OUT
+        dport = str(flow.dport)
+        twid_identifier: str = self.get_twid_identifier(profileid, twid, dport)
+        if not twid_identifier:
+            return False
+
+        if self.was_flow_flipped(flow) or self.should_ignore_dstip(
+            protocol, flow.daddr
+        ):
+            return False
+
+        dports: Dict[str, dict] = self.not_estab_dports.setdefault(
+            f"{profileid}_{twid}", {}
+        ).setdefault(protocol, {})
+        dstips: dict = dports.setdefault(dport, {"dstips": {}})["dstips"]
+
+        if not self.update_dstips(dstips, flow):
+            # the amount of scanned dst ips didn't change
+            return False
+
+        amount_of_dips = len(dstips)
+        if not self.check_if_enough_dstips_to_trigger_an_evidence(
+            twid_identifier, amount_of_dips
+        ):
+            return False
+
+        evidence = {
+            "protocol": protocol,
+            "profileid": profileid,
+            "twid": twid,
+            "uids": self.get_uids(dstips),
+            "dport": dport,
+            "pkts_sent": self.get_packets_sent(dstips),
+            "timestamp": next(iter(dstips.values()))["stime"],
+            "state": state,
+            "amount_of_dips": amount_of_dips,
+        }
+        self.set_evidence_horizontal_portscan(evidence)
+        return True
+
+    def clear_tw(self, profileid: str, twid: str):
+        """forgets about the scanned dst ips of a closed timewindow"""
+        dports_per_proto = self.not_estab_dports.pop(f"{profileid}_{twid}", {})
+        for dports in dports_per_proto.values():
+            for dport in dports:
+                self.cached_thresholds_per_tw.pop(
+                    self.get_twid_identifier(profileid, twid, dport), None
                 )
-                if not twid_identifier:
-                    continue
-
-                amount_of_dips = len(dstips)
-
-                if self.check_if_enough_dstips_to_trigger_an_evidence(
-                    twid_identifier, amount_of_dips
-                ):
-                    evidence = {
-                        "protocol": protocol,
-                        "profileid": profileid,
-                        "twid": twid,
-                        "uids": self.get_uids(dstips),
-                        "dport": dport,
-                        "pkts_sent": self.get_packets_sent(dstips),
-                        "timestamp": next(iter(dstips.values()))["stime"],
-                        "state": state,
-                        "amount_of_dips": amount_of_dips,
-                    }
-
-                    self.set_evidence_horizontal_portscan(evidence)
@@ -1,5 +1,8 @@
 import json
-from typing import List
+from typing import (
+    Dict,
+    List,
+)
 
 from slips_files.common.flow_classifier import FlowClassifier
 from slips_files.common.slips_utils import utils
@@ -33,14 +36,10 @@ class NetworkDiscovery(IModule):
     def init(self):
         self.horizontal_ps = HorizontalPortscan(self.db)
         self.vertical_ps = VerticalPortscan(self.db)
-        self.c1 = self.db.subscribe("tw_modified")
-        self.c2 = self.db.subscribe("new_notice")
-        self.c3 = self.db.subscribe("new_dhcp")
-        self.channels = {
-            "tw_modified": self.c1,
-            "new_notice": self.c2,
-            "new_dhcp": self.c3,
-        }
+        self.register_handler("new_flow", self.handle_new_flow)
+        self.register_handler("new_notice", self.handle_new_notice)
+        self.register_handler("new_dhcp", self.handle_new_dhcp)
+        self.register_handler("tw_closed", self.handle_tw_closed)
         # We need to know that after a detection, if we receive another flow
         # that does not modify the count for the detection, we are not
         # re-detecting again only because the threshold was overcomed last time.
@@ -56,6 +55,14 @@ class NetworkDiscovery(IModule):
         # slips sets dhcp scan evidence
         self.minimum_requested_addrs = 4
         self.classifier = FlowClassifier()
+        # the established icmp flows each profile sent as a client,
+        # updated flow by flow instead of reading them from the db
+        # {profileid_twid: {sport: {dstip: {
+        #   "spkts": src packets sent to this dstip,
+        #   "stime": timestamp of the first flow to this dstip,
+        #   "uid": [uids of flows to this dstip]
+        # }}}}
+        self.icmp_sports: Dict[str, Dict[str, Dict[str, dict]]] = {}
 
     def check_icmp_sweep(self, twid, flow):
         """
@@ -131,7 +138,31 @@ class NetworkDiscovery(IModule):
             Amount: {}'.format(dport, profileid.split('_')[1], totalpkts),6,0)
         """
 
-    def check_icmp_scan(self, profileid, twid):
+    @staticmethod
+    def update_scanned_ips(scanned_ips: dict, flow):
+        """adds the given icmp flow to the ips scanned on its sport"""
+        spkts = int(flow.spkts or 0)
+        if flow.daddr in scanned_ips:
+            scan_info = scanned_ips[flow.daddr]
+            scan_info["spkts"] += spkts
+            scan_info["uid"].append(flow.uid)
+            return
+
+        scanned_ips[flow.daddr] = {
+            "spkts": spkts,
+            "stime": str(flow.starttime),
+            "uid": [flow.uid],
+        }
+
+    def check_icmp_scan(self, profileid, twid, flow, state: str):
+        """
+        Updates the ips the given profile sent icmp flows to on the sport
+        of the given flow, and sets an evidence if they're enough for
+        an icmp scan
+        :param flow: a flow where the given profile is the client
+        :param state: the interpreted state of the flow,
+            Established or Not Established
+        """
         # Map the ICMP port scanned to it's attack
         port_map = {
             "0x0008": EvidenceType.ICMP_ADDRESS_SCAN,
@@ -140,96 +171,105 @@ class NetworkDiscovery(IModule):
             "0x0017": EvidenceType.ICMP_ADDRESS_MASK_SCAN,
             "0x0018": EvidenceType.ICMP_ADDRESS_MASK_SCAN,
         }
-
-        direction = "Src"
-        role = "Client"
-        type_data = "Ports"
         protocol = "ICMP"
-        state = "Established"
-        sports = self.db.get_data_from_profile_tw(
-            profileid, twid, direction, state, protocol, role, type_data
-        )
-        for sport, sport_info in sports.items():
-            # get the name of this attack
-            attack: EvidenceType = port_map.get(sport)
-            if not attack:
-                return
+        if flow.proto.upper() != protocol or state != "Established":
+            return
+
+        if HorizontalPortscan.was_flow_flipped(flow):
+            return
 
-            # get the IPs attacked
-            scanned_ips = sport_info["dstips"]
-            # are we pinging a single IP or ping scanning several IPs?
-            amount_of_scanned_ips = len(scanned_ips)
-
-            if amount_of_scanned_ips == 1:
-                # how many icmp flows were found?
-                for scanned_ip, scan_info in scanned_ips.items():
-                    icmp_flows_uids = scan_info["uid"]
-                    number_of_flows = len(icmp_flows_uids)
-                    # how many flows are responsible for this attack
-                    # (from this srcip to this dstip on the same port)
-                    cache_key = (
-                        f"{profileid}:{twid}:dstip:"
-                        f"{scanned_ip}:{sport}:{attack}"
-                    )
-                    prev_flows = self.cache_det_thresholds.get(cache_key, 0)
-
-                    # We detect a scan every Threshold. So we detect when there
-                    # is 5,10,15 etc. scan to the same dstip on the same port
-                    # The idea is that after X dips we detect a connection.
-                    # And then we 'reset' the counter
-                    # until we see again X more.
-                    if (
-                        number_of_flows % self.pingscan_minimum_flows == 0
-                        and prev_flows < number_of_flows
-                    ):
-                        self.cache_det_thresholds[cache_key] = number_of_flows
-                        pkts_sent = scan_info["spkts"]
-                        timestamp = scan_info["stime"]
-                        self.set_evidence_icmp_scan(
-                            amount_of_scanned_ips,
-                            timestamp,
-                            pkts_sent,
-                            protocol,
-                            profileid,
-                            twid,
-                            icmp_flows_uids,
-                            attack,
-                            scanned_ip=scanned_ip,
-                        )
-
-            elif amount_of_scanned_ips > 1:
-                # this srcip is scanning several IPs (a network maybe)
-                # how many dstips scanned by this srcip on this port?
-                cache_key = f"{profileid}:{twid}:{attack}"
-                prev_scanned_ips = self.cache_det_thresholds.get(cache_key, 0)
-                # detect every 5, 10, 15 scanned IPs
-                if (
-                    amount_of_scanned_ips % self.pingscan_minimum_scanned_ips
-                    == 0
-                    and prev_scanned_ips < amount_of_scanned_ips
-                ):
-                    pkts_sent = 0
-                    uids = []
-                    for scanned_ip, scan_info in scanned_ips.items():
-                        # get the total amount of pkts sent to all scanned IP
-                        pkts_sent += scan_info["spkts"]
-                        # get all flows that were part of this scan
-                        uids.extend(scan_info["uid"])
-                        timestamp = scan_info["stime"]
-
-                    self.set_evidence_icmp_scan(
-                        amount_of_scanned_ips,
-                        timestamp,
-                        pkts_sent,
-                        protocol,
-                        profileid,
-                        twid,
-                        uids,
-                        attack,
-                    )
-                    self.cache_det_thresholds[cache_key] = (
-                        amount_of_scanned_ips
-                    )
+        sport = str(flow.sport)
+        # get the name of this attack
+        attack: EvidenceType = port_map.get(sport)
+        if not attack:
+            return
+
+        # get the IPs attacked
+        scanned_ips: dict = self.icmp_sports.setdefault(
+            f"{profileid}_{twid}", {}
+        ).setdefault(sport, {})
+        self.update_scanned_ips(scanned_ips, flow)
+        # are we pinging a single IP or ping scanning several IPs?
+        amount_of_scanned_ips = len(scanned_ips)
+
+        if amount_of_scanned_ips == 1:
+            # how many icmp flows were found?
+            scanned_ip = flow.daddr
+            scan_info = scanned_ips[scanned_ip]
+            icmp_flows_uids = scan_info["uid"]
+            number_of_flows = len(icmp_flows_uids)
+            # how many flows are responsible for this attack
+            # (from this srcip to this dstip on the same port)
+            cache_key = (
+                f"{profileid}:{twid}:dstip:{scanned_ip}:{sport}:{attack}"
+            )
+            prev_flows = self.cache_det_thresholds.get(cache_key, 0)
+
+            # We detect a scan every Threshold. So we detect when there
+            # is 5,10,15 etc. scan to the same dstip on the same port
+            # The idea is that after X dips we detect a connection.
+            # And then we 'reset' the counter
+            # until we see again X more.
+            if (
+                number_of_flows % self.pingscan_minimum_flows == 0
+                and prev_flows < number_of_flows
+            ):
+                self.cache_det_thresholds[cache_key] = number_of_flows
+                self.set_evidence_icmp_scan(
+                    amount_of_scanned_ips,
+                    scan_info["stime"],
+                    scan_info["spkts"],
+                    protocol,
+                    profileid,
+                    twid,
+                    icmp_flows_uids,
+                    attack,
+                    scanned_ip=scanned_ip,
+                )
+            return
+
+        # this srcip is scanning several IPs (a network maybe)
+        # how many dstips scanned by this srcip on this port?
+        cache_key = f"{profileid}:{twid}:{attack}"
+        prev_scanned_ips = self.cache_det_thresholds.get(cache_key, 0)
+        # detect every 5, 10, 15 scanned IPs
+        if (
+            amount_of_scanned_ips % self.pingscan_minimum_scanned_ips == 0
+            and prev_scanned_ips < amount_of_scanned_ips
+        ):
+            pkts_sent = 0
+            uids = []
+            for scan_info in scanned_ips.values():
+                # get the total amount of pkts sent to all scanned IP
+                pkts_sent += scan_info["spkts"]
+                # get all flows that were part of this scan
+                uids.extend(scan_info["uid"])
+                timestamp = scan_info["stime"]
+
+            self.set_evidence_icmp_scan(
+                amount_of_scanned_ips,
+                timestamp,
+                pkts_sent,
+                protocol,
+                profileid,
+                twid,
+                uids,
+                attack,
+            )
+            self.cache_det_thresholds[cache_key] = amount_of_scanned_ips
+
+    def clear_tw(self, profileid: str, twid: str):
+        """
+        forgets about the flows of a closed timewindow, the scans
+        are detected per timewindow
+        """
+        self.horizontal_ps.clear_tw(profileid, twid)
+        self.vertical_ps.clear_tw(profileid, twid)
+        self.icmp_sports.pop(f"{profileid}_{twid}", None)
+        prefix = f"{profileid}:{twid}:"
+        for cache_key in list(self.cache_det_thresholds):
+            if cache_key.startswith(prefix):
+                del self.cache_det_thresholds[cache_key]
 
     def set_evidence_icmp_scan(
         self,
@@ -372,51 +412,56 @@ class NetworkDiscovery(IModule):
     def pre_main(self):
         utils.drop_root_privs()
 
-    def main(self):
-        if msg := self.get_msg("tw_modified"):
-            # Get the profileid and twid
-            profileid = msg["data"].split(":")[0]
-            twid = msg["data"].split(":")[1]
-            # Start of the port scan detection
-            self.print(
-                f"Running the detection of portscans in profile "
-                f"{profileid} TW {twid}",
-                3,
-                0,
-            )
-
-            # For port scan detection, we will measure different things:
+    def handle_new_flow(self, msg: dict):
+        msg = json.loads(msg["data"])
+        profileid = msg["profileid"]
+        twid = msg["twid"]
+        flow = self.classifier.convert_to_flow_obj(msg["flow"])
+        # new_flow is published for the flows going in to a profile
+        # too, scans are only detected from the client's side
+        if profileid == f"profile_{flow.saddr}":
+            # For port scan detection, we will measure different
+            # things:
 
             # 1. Vertical port scan:
             # (single IP being scanned for multiple ports)
-            # - 1 srcip sends not established flows to > 3 dst ports in the
-            # same dst ip. Any number of packets
+            # - 1 srcip sends not established flows to > 3 dst ports
+            # in the same dst ip. Any number of packets
             # 2. Horizontal port scan:
             #  (scan against a group of IPs for a single port)
-            # - 1 srcip sends not established flows to the same dst ports in
-            # > 3 dst ip.
+            # - 1 srcip sends not established flows to the same dst
+            # ports in > 3 dst ip.
             # 3. Too many connections???:
-            # - 1 srcip sends not established flows to the same dst ports,
-            # > 3 pkts, to the same dst ip
+            # - 1 srcip sends not established flows to the same dst
+            # ports, > 3 pkts, to the same dst ip
             # 4. Slow port scan. Same as the others but distributed in
             # multiple time windows
 
             # Remember that in slips all these port scans can happen
             # for traffic going IN to an IP or going OUT from the IP.
+            state = msg["interpreted_state"]
+            self.horizontal_ps.check(profileid, twid, flow, state)
+            self.vertical_ps.check(profileid, twid, flow, state)
+            self.check_icmp_scan(profileid, twid, flow, state)
+
+    def handle_tw_closed(self, msg: dict):
+        # the closed tw is in the format profile_<ip>_timewindow<n>
+        profileid, twid = msg["data"].rsplit("_", 1)
+        self.clear_tw(profileid, twid)
+
+    def handle_new_notice(self, msg: dict):
+        data = json.loads(msg["data"])
+        twid = data["twid"]
+        flow = self.classifier.convert_to_flow_obj(data["flow"])
+        self.check_icmp_sweep(twid, flow)
+
+    def handle_new_dhcp(self, msg: dict):
+        msg = json.loads(msg["data"])
+        profileid = msg["profileid"]
+        twid = msg["twid"]
+        flow = self.classifier.convert_to_flow_obj(msg["flow"])
+        self.check_dhcp_scan(profileid, twid, flow)
 
-            self.horizontal_ps.check(profileid, twid)
-            self.vertical_ps.check(profileid, twid)
-            self.check_icmp_scan(profileid, twid)
-
-        if msg := self.get_msg("new_notice"):
-            data = json.loads(msg["data"])
-            twid = data["twid"]
-            flow = self.classifier.convert_to_flow_obj(data["flow"])
-            self.check_icmp_sweep(twid, flow)
-
-        if msg := self.get_msg("new_dhcp"):
-            msg = json.loads(msg["data"])
-            profileid = msg["profileid"]
-            twid = msg["twid"]
-            flow = self.classifier.convert_to_flow_obj(msg["flow"])
-            self.check_dhcp_scan(profileid, twid, flow)
+    def main(self):
+        # the msgs are handled by the handlers registered in init()
+        pass
@@ -1,3 +1,5 @@
+from typing import Dict
+
 from slips_files.common.slips_utils import utils
 from slips_files.core.structures.evidence import (
     Evidence,
@@ -16,10 +18,10 @@ from slips_files.core.structures.evidence import (
 class VerticalPortscan:
     """
     Here's how the detection of vertical portscans is done
-    1. Slips retrieves all destination IPs of the not
-    established flows on TCP and UDP protocols
-    2. For each dst IP, slips checks the amount of
-    destination ports we connected to
+    1. Slips keeps track of the destination IPs of the not
+    established flows on TCP and UDP protocols, flow by flow
+    2. Every time a dst IP is contacted on a new port, slips checks
+    the amount of destination ports we connected to
     3. The first evidence will be triggered if the amount of
     destination ports for 1 IP is 5+
     4. then we set evidence on 20+,35+. etc
@@ -49,6 +51,14 @@ class VerticalPortscan:
         # The minimum amount of scanned ports to trigger an evidence
         # is increased exponentially every evidence, and is reset each timewindow
         self.minimum_dports_to_set_evidence = 5
+        # the not established dst ips each profile connected to as a
+        # client, updated flow by flow instead of reading them from the db
+        # {profileid_twid: {protocol: {dstip: {
+        #   "stime": timestamp of the first flow to this dstip,
+        #   "uid": [uids of flows to this dstip],
+        #   "dstports": {dport: src packets sent to this dport}
+        # }}}}
+        self.not_estab_dstips: Dict[str, Dict[str, Dict[str, dict]]] = {}
 
     def set_evidence_vertical_portscan(self, evidence: dict):
         """Sets the vertical portscan evidence in the db"""
@@ -148,42 +158,6 @@ class VerticalPortscan:
             return True
         return False
 
-    def get_not_established_dst_ips(
-        self, protocol: str, state: str, profileid: str, twid: str
-    ) -> dict:
-        """
-        Get the list of dstips that we tried to connect to
-            (not established flows)
-          these unknowns are the info this function retrieves
-          profileid -> unknown_dstip:unknown_dstports
-
-         here, the profileid given is the client.
-         :return: the following dict
-         {
-             dst_ip: {
-                 totalflows: total flows seen by the profileid
-                 totalpkt: total packets seen by the profileid
-                 totalbytes: total bytes sent by the profileid
-                 stime: timestamp of the first flow seen from
-                        this profileid -> this dstip
-                 uid: list of uids where the given profileid was
-                        contacting the dst_ip on this dstport
-                 dstports: dst ports seen in all flows where the given
-                        profileid was srcip
-                     {
-                         <str port>: < int spkts sent to this port>
-                     }
-             }
-        """
-        direction = "Dst"
-        role = "Client"
-        type_data = "IPs"
-
-        dstips: dict = self.db.get_data_from_profile_tw(
-            profileid, twid, direction, state, protocol, role, type_data
-        )
-        return dstips
-
     def get_twid_identifier(
         self, profileid: str, twid: str, dstip: str
     ) -> str:
@@ -193,9 +167,40 @@ class VerticalPortscan:
         """
         return f"{profileid}:{twid}:dstip:{dstip}"
 
-    def check(self, profileid, twid):
+    @staticmethod
+    def update_dstip(dstips: dict, flow) -> bool:
+        """
+        adds the given flow to the ports contacted on its daddr
+        returns True if the flow's dport wasn't contacted on this daddr
+        before
+        """
+        dport = str(flow.dport)
+        spkts = int(flow.spkts or 0)
+        if flow.daddr not in dstips:
+            dstips[flow.daddr] = {
+                "stime": str(flow.starttime),
+                "uid": [flow.uid],
+                "dstports": {dport: spkts},
+            }
+            return True
+
+        dstip = dstips[flow.daddr]
+        dstip["uid"].append(flow.uid)
+        if dport in dstip["dstports"]:
+            dstip["dstports"][dport] += spkts
+            return False
+
+        dstip["dstports"][dport] = spkts
+        return True
+
+    def check(self, profileid: str, twid: str, flow, state: str):
         """
-        sets an evidence if a vertical portscan is detected
+        Updates the dst ports the given profile contacted on the daddr of
+        the given flow, and sets an evidence if a vertical portscan
+        is detected
+        :param flow: a flow where the given profile is the client
+        :param state: the interpreted state of the flow,
+            Established or Not Established
         """
         # if you're portscaning a port that is open it's gonna be established
         # the amount of open ports we find is gonna be so small
@@ -203,38 +208,49 @@ class VerticalPortscan:
         # established connections, but usually open ports are very few
         # compared to the whole range. so, practically this is correct to
         # avoid FP
-        state = "Not Established"
-
-        for protocol in ("TCP", "UDP"):
-            dstips: dict = self.get_not_established_dst_ips(
-                protocol, state, profileid, twid
-            )
-
-            # For each dstip, see if the amount of ports
-            # connections is over the threshold
-            for dstip in dstips.keys():
-                dst_ports: dict = dstips[dstip]["dstports"]
-                # Get the total amount of pkts sent to all
-                # ports on the same host
-                pkts_sent = sum(dst_ports[dport] for dport in dst_ports)
-                amount_of_dports = len(dst_ports)
-
-                twid_identifier: str = self.get_twid_identifier(
-                    profileid, twid, dstip
+        if state != "Not Established":
+            return False
+
+        protocol = flow.proto.upper()
+        if protocol not in ("TCP", "UDP"):
+            return False
+
+        dstips: dict = self.not_estab_dstips.setdefault(
+            f"{profileid}_{twid}", {}
+        ).setdefault(protocol, {})
+        if not self.update_dstip(dstips, flow):
+            # the amount of scanned dst ports didn't change
+            return False
+
+        dstip = flow.daddr
+        dst_ports: dict = dstips[dstip]["dstports"]
+        amount_of_dports = len(dst_ports)
+        twid_identifier: str = self.get_twid_identifier(profileid, twid, dstip)
+        if not self.check_if_enough_dports_to_trigger_an_evidence(
+            twid_identifier, amount_of_dports
+        ):
+            return False
+
+        evidence_details = {
+            "timestamp": dstips[dstip]["stime"],
+            # the total amount of pkts sent to all ports on the same host
+            "pkts_sent": sum(dst_ports.values()),
+            "protocol": protocol,
+            "profileid": profileid,
+            "twid": twid,
+            "uid": dstips[dstip]["uid"],
+            "amount_of_dports": amount_of_dports,
+            "dstip": dstip,
+            "state": state,
+        }
+        self.set_evidence_vertical_portscan(evidence_details)
+        return True
+
+    def clear_tw(self, profileid: str, twid: str):
+        """forgets about the scanned dst ports of a closed timewindow"""
+        dstips_per_proto = self.not_estab_dstips.pop(f"{profileid}_{twid}", {})
+        for dstips in dstips_per_proto.values():
+            for dstip in dstips:
+                self.cached_thresholds_per_tw.pop(
+                    self.get_twid_identifier(profileid, twid, dstip), None
                 )
-                if self.check_if_enough_dports_to_trigger_an_evidence(
-                    twid_identifier, amount_of_dports
-                ):
-                    evidence_details = {
-                        "timestamp": dstips[dstip]["stime"],
-                        "pkts_sent": pkts_sent,
-                        "protocol": protocol,
-                        "profileid": profileid,
-                        "twid": twid,
-                        "uid": dstips[dstip]["uid"],
-                        "amount_of_dports": amount_of_dports,
-                        "dstip": dstip,
-                        "state": state,
-                    }
-
-                    self.set_evidence_vertical_portscan(evidence_details)
@@ -15,10 +15,7 @@ class RiskIQ(IModule):
     authors = ["Alya Gomaa"]
 
     def init(self):
-        self.c1 = self.db.subscribe("new_ip")
-        self.channels = {
-            "new_ip": self.c1,
-        }
+        self.register_handler("new_ip", self.handle_new_ip)
         self.read_configuration()
 
     def read_configuration(self):
@@ -87,17 +84,20 @@ class RiskIQ(IModule):
         if not self.riskiq_email or not self.riskiq_key:
             return 1
 
-    def main(self):
-        if msg := self.get_msg("new_ip"):
-            ip = msg["data"]
-            if utils.is_ignored_ip(ip):
-                # return here means keep looping
-                return
+    def handle_new_ip(self, msg: dict):
+        ip = msg["data"]
+        if utils.is_ignored_ip(ip):
+            # nothing to look up
+            return
 
-            # Only get passive total dns data if we don't have it in the db
-            if self.db.get_passive_dns(ip):
-                return
-            # we don't have it in the db , get it from passive total
-            if passive_dns := self.get_passive_dns(ip):
-                # we found data from passive total, store it in the db
-                self.db.set_passive_dns(ip, passive_dns)
+        # Only get passive total dns data if we don't have it in the db
+        if self.db.get_passive_dns(ip):
+            return
+        # we don't have it in the db , get it from passive total
+        if passive_dns := self.get_passive_dns(ip):
+            # we found data from passive total, store it in the db
+            self.db.set_passive_dns(ip, passive_dns)
+
+    def main(self):
+        # the ips are handled by handle_new_ip()
+        pass
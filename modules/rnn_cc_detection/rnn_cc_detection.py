@@ -36,17 +36,10 @@ class CCDetection(IModule):
     authors = ["Sebastian Garcia", "Kamila Babayeva", "Ondrej Lukas"]
 
     def init(self):
-        self.subscribe_to_channels()
+        self.register_handler("new_letters", self.handle_new_letters)
+        self.register_handler("tw_closed", self.handle_tw_closed)
         self.exporter = StratoLettersExporter(self.db)
 
-    def subscribe_to_channels(self):
-        self.c1 = self.db.subscribe("new_letters")
-        self.c2 = self.db.subscribe("tw_closed")
-        self.channels = {
-            "new_letters": self.c1,
-            "tw_closed": self.c2,
-        }
-
     def set_evidence_cc_channel(
         self,
         score: float,
@@ -176,7 +169,7 @@ class CCDetection(IModule):
         return len(pre_behavioral_model) / threshold_confidence
 
     def handle_new_letters(self, msg: Dict):
-        """handles msgs from the tw_closed channel"""
+        """handles msgs from the new_letters channel"""
 
         msg = msg["data"]
         msg = json.loads(msg)
@@ -260,8 +253,5 @@ class CCDetection(IModule):
         self.exporter.init()
 
     def main(self):
-        if msg := self.get_msg("new_letters"):
-            self.handle_new_letters(msg)
-
-        if msg := self.get_msg("tw_closed"):
-            self.handle_tw_closed(msg)
+        # the msgs are handled by the handlers registered in init()
+        pass
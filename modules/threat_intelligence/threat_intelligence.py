@@ -56,12 +56,12 @@ class ThreatIntel(IModule, URLhaus, Spamhaus):
             querying URLhaus data.
         """
         self.separator = self.db.get_field_separator()
-        self.c1 = self.db.subscribe("give_threat_intelligence")
-        self.c2 = self.db.subscribe("new_downloaded_file")
-        self.channels = {
-            "give_threat_intelligence": self.c1,
-            "new_downloaded_file": self.c2,
-        }
+        self.register_handler(
+            "give_threat_intelligence", self.handle_give_threat_intelligence
+        )
+        self.register_handler(
+            "new_downloaded_file", self.handle_new_downloaded_file
+        )
         self.__read_configuration()
         self.get_all_blacklisted_ip_ranges()
         self.urlhaus = URLhaus(self.db)
@@ -1232,7 +1232,7 @@ class ThreatIntel(IModule, URLhaus, Spamhaus):
         This function queries the local database to determine if
         the IP's ASN is known to be malicious.
         """
-        ip_info = self.db.get_ip_info(ip)
+        ip_info = self.db.get_ip_info(ip, ["asn"])
         if not ip_info:
             # we dont know the asn of this ip
             return
@@ -1797,77 +1797,80 @@ class ThreatIntel(IModule, URLhaus, Spamhaus):
 
         self.pending_circllu_calls_thread.start()
 
-    def main(self):
+    def handle_give_threat_intelligence(self, msg: dict):
         # The channel can receive an IP address or a domain name
-        if msg := self.get_msg("give_threat_intelligence"):
-            data = json.loads(msg["data"])
-            profileid = data.get("profileid")
-            twid = data.get("twid")
-            timestamp = data.get("stime")
-            uid = data.get("uid")
-            protocol = data.get("proto")
-            daddr = data.get("daddr")
-            # these 2 are only available when looking up dns answers
-            # the query is needed when a malicious answer is found,
-            # for more detailed description of the evidence
-            is_dns_response = data.get("is_dns_response")
-            dns_query = data.get("dns_query")
-            # this is the IP/domain that we want the TI for.
-            to_lookup = data.get("to_lookup", "")
-            # detect the type given because sometimes,
-            # http.log host field has ips OR domains
-            type_ = utils.detect_ioc_type(to_lookup)
-
-            # ip_state can be "srcip" or "dstip"
-            ip_state = data.get("ip_state")
-            if type_ == "ip":
-                ip = to_lookup
-                if self.should_lookup(ip, protocol, ip_state):
-                    self.is_malicious_ip(
-                        ip,
-                        uid,
-                        daddr,
-                        timestamp,
-                        profileid,
-                        twid,
-                        ip_state,
-                        dns_query=dns_query,
-                        is_dns_response=is_dns_response,
-                    )
-                    self.ip_belongs_to_blacklisted_range(
-                        ip, uid, daddr, timestamp, profileid, twid, ip_state
-                    )
-                    self.ip_has_blacklisted_asn(
-                        ip,
-                        uid,
-                        timestamp,
-                        profileid,
-                        twid,
-                        is_dns_response=is_dns_response,
-                    )
-            elif type_ == "domain":
-                if is_dns_response:
-                    self.is_malicious_cname(
-                        dns_query, to_lookup, uid, timestamp, profileid, twid
-                    )
-                else:
-                    self.is_malicious_domain(
-                        to_lookup, uid, timestamp, profileid, twid
-                    )
-            elif type_ == "url":
-                self.is_malicious_url(
-                    to_lookup, uid, timestamp, daddr, profileid, twid
+        data = json.loads(msg["data"])
+        profileid = data.get("profileid")
+        twid = data.get("twid")
+        timestamp = data.get("stime")
+        uid = data.get("uid")
+        protocol = data.get("proto")
+        daddr = data.get("daddr")
+        # these 2 are only available when looking up dns answers
+        # the query is needed when a malicious answer is found,
+        # for more detailed description of the evidence
+        is_dns_response = data.get("is_dns_response")
+        dns_query = data.get("dns_query")
+        # this is the IP/domain that we want the TI for.
+        to_lookup = data.get("to_lookup", "")
+        # detect the type given because sometimes,
+        # http.log host field has ips OR domains
+        type_ = utils.detect_ioc_type(to_lookup)
+
+        # ip_state can be "srcip" or "dstip"
+        ip_state = data.get("ip_state")
+        if type_ == "ip":
+            ip = to_lookup
+            if self.should_lookup(ip, protocol, ip_state):
+                self.is_malicious_ip(
+                    ip,
+                    uid,
+                    daddr,
+                    timestamp,
+                    profileid,
+                    twid,
+                    ip_state,
+                    dns_query=dns_query,
+                    is_dns_response=is_dns_response,
+                )
+                self.ip_belongs_to_blacklisted_range(
+                    ip, uid, daddr, timestamp, profileid, twid, ip_state
+                )
+                self.ip_has_blacklisted_asn(
+                    ip,
+                    uid,
+                    timestamp,
+                    profileid,
+                    twid,
+                    is_dns_response=is_dns_response,
                 )
+        elif type_ == "domain":
+            if is_dns_response:
+                self.is_malicious_cname(
+                    dns_query, to_lookup, uid, timestamp, profileid, twid
+                )
+            else:
+                self.is_malicious_domain(
+                    to_lookup, uid, timestamp, profileid, twid
+                )
+        elif type_ == "url":
+            self.is_malicious_url(
+                to_lookup, uid, timestamp, daddr, profileid, twid
+            )
 
-        if msg := self.get_msg("new_downloaded_file"):
-            file_info: dict = json.loads(msg["data"])
-            # the format of file_info is as follows
-            #  {
-            #     'flow': asdict(self.flow),
-            #     'type': 'suricata' or 'zeek',
-            #     'profileid': str,
-            #     'twid': str,
-            # }
-
-            if file_info["type"] == "zeek":
-                self.is_malicious_hash(file_info)
+    def handle_new_downloaded_file(self, msg: dict):
+        file_info: dict = json.loads(msg["data"])
+        # the format of file_info is as follows
+        #  {
+        #     'flow': asdict(self.flow),
+        #     'type': 'suricata' or 'zeek',
+        #     'profileid': str,
+        #     'twid': str,
+        # }
+
+        if file_info["type"] == "zeek":
+            self.is_malicious_hash(file_info)
+
+    def main(self):
+        # the msgs are handled by the handlers registered in init()
+        pass
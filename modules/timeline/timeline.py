@@ -2,9 +2,14 @@ import traceback
 import sys
 import time
 import json
+from collections import deque
 from typing import (
     Any,
+    Deque,
+    Dict,
     List,
+    Optional,
+    Tuple,
 )
 
 from slips_files.common.flow_classifier import FlowClassifier
@@ -12,6 +17,16 @@ from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.slips_utils import utils
 from slips_files.common.abstracts.module import IModule
 
+# the types of the flows that add info to the timeline line of the conn
+# flow with the same uid
+ALTFLOW_TYPES = ("dns", "http", "ssl", "ssh")
+# seconds to wait for the altflows of each conn flow before adding it to
+# the timeline, they're read by slips at about the same time but are
+# received in different channels
+ALTFLOW_WAIT = 1
+# max number of altflows to keep in memory waiting for their conn flows
+MAX_CACHED_ALTFLOWS = 10000
+
 
 class Timeline(IModule):
     # Name: short name of the module. Do not use spaces
@@ -24,10 +39,14 @@ class Timeline(IModule):
 
     def init(self):
         self.read_configuration()
-        self.c1 = self.db.subscribe("new_flow")
-        self.channels = {
-            "new_flow": self.c1,
-        }
+        self.register_batch_handler("new_flow", self.handle_new_flows)
+        for flow_type in ALTFLOW_TYPES:
+            self.register_handler(f"new_{flow_type}", self.cache_altflow)
+        # {uid: altflow} of the recently received altflows, oldest first
+        self.altflows: Dict[str, dict] = {}
+        # (time received, profileid, twid, flow) of the flows waiting for
+        # their altflows, oldest first
+        self.pending_flows: Deque[Tuple[float, str, str, Any]] = deque()
         self.classifier = FlowClassifier()
         self.host_ip: str = self.db.get_host_ip()
 
@@ -132,10 +151,28 @@ class Timeline(IModule):
         }
         return {"info": ssh_activity}
 
+    def cache_altflow(self, msg: dict):
+        """
+        keeps the given dns, http, ssl or ssh flow in memory until the
+        conn flow with the same uid is added to the timeline
+        """
+        altflow: dict = json.loads(msg["data"])["flow"]
+        self.altflows[altflow["uid"]] = altflow
+        if len(self.altflows) > MAX_CACHED_ALTFLOWS:
+            # drop the oldest one
+            del self.altflows[next(iter(self.altflows))]
+
+    def get_altflow(self, profileid, twid, flow) -> Optional[dict]:
+        if alt_flow := self.altflows.pop(flow.uid, None):
+            return alt_flow
+        # only flows with a service recognized by zeek or suricata have
+        # altflows. the altflow may have been received before this module
+        # started, or dropped from the cache
+        if flow.appproto:
+            return self.db.get_altflow_from_uid(profileid, twid, flow.uid)
+
     def process_altflow(self, profileid, twid, flow) -> dict:
-        alt_flow: dict = self.db.get_altflow_from_uid(
-            profileid, twid, flow.uid
-        )
+        alt_flow: Optional[dict] = self.get_altflow(profileid, twid, flow)
         altflow_info = {"info": ""}
 
         if not alt_flow:
@@ -275,10 +312,10 @@ class Timeline(IModule):
         dport_name = "" if not dport_name else dport_name.upper()
         return dport_name
 
-    def process_flow(self, profileid, twid, flow):
+    def process_flow(self, profileid, twid, flow) -> Optional[dict]:
         """
         Process the received flow  for this profileid and twid
-         so its printed by the logprocess later
+        returns the activity line to add to the timeline
         """
         if not flow:
             return
@@ -310,17 +347,11 @@ class Timeline(IModule):
                 activity = {}
             #################################
             # Now process the alternative flows
-            # Sometimes we need to wait a little to give time to Zeek to find
-            # the related flow since they are read very fast together.
-            # This should be improved algorithmically probably
-            time.sleep(0.05)
             alt_activity = self.process_altflow(profileid, twid, flow)
             # Combine the activity of normal flows and activity of alternative
-            # flows and store in the DB for this profileid and twid
+            # flows
             activity.update(alt_activity)
-            self.db.add_timeline_line(
-                profileid, twid, activity, flow.starttime
-            )
+            return activity
 
         except Exception:
             exception_line = sys.exc_info()[2].tb_lineno
@@ -328,16 +359,44 @@ class Timeline(IModule):
                 f"Problem on process_flow() line {exception_line}", 0, 1
             )
             self.print(traceback.format_exc(), 0, 1)
-            return True
+
+    def handle_new_flows(self, msgs: List[dict]):
+        """
+        the flows wait for their altflows before being added to the
+        timeline by add_pending_flows()
+        """
+        now = time.time()
+        for msg in msgs:
+            msg = json.loads(msg["data"])
+            flow = self.classifier.convert_to_flow_obj(msg["flow"])
+            self.pending_flows.append(
+                (now, msg["profileid"], msg["twid"], flow)
+            )
+
+    def add_pending_flows(self, wait: float = ALTFLOW_WAIT):
+        """
+        adds the flows that waited for their altflows for the given
+        seconds to the timeline, using one redis call per tw
+        """
+        lines: Dict[Tuple[str, str], List[Tuple[dict, float]]] = {}
+        now = time.time()
+        while self.pending_flows and now - self.pending_flows[0][0] >= wait:
+            _, profileid, twid, flow = self.pending_flows.popleft()
+            if activity := self.process_flow(profileid, twid, flow):
+                lines.setdefault((profileid, twid), []).append(
+                    (activity, flow.starttime)
+                )
+
+        for (profileid, twid), tw_lines in lines.items():
+            self.db.add_timeline_lines(profileid, twid, tw_lines)
+
+    def shutdown_gracefully(self):
+        # no more flows are coming, don't wait for altflows
+        self.add_pending_flows(wait=0)
 
     def pre_main(self):
         utils.drop_root_privs()
 
     def main(self):
-        # Main loop function
-        if msg := self.get_msg("new_flow"):
-            msg = json.loads(msg["data"])
-            profileid = msg["profileid"]
-            twid = msg["twid"]
-            flow = self.classifier.convert_to_flow_obj(msg["flow"])
-            self.process_flow(profileid, twid, flow)
+        # runs after each batch of msgs is dispatched to the handlers
+        self.add_pending_flows()
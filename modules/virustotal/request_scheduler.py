@@ -0,0 +1,186 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from slips_files.common.data_structures.token_bucket import TokenBucket
+
+# the lower the number, the sooner the ioc is looked up
+EVIDENCE_PRIORITY = 0
+FLOW_PRIORITY = 1
+# the max number of iocs waiting to be looked up
+MAX_QUEUED = 10000
+
+
+class RequestScheduler:
+    """
+    Queues the iocs to look up in VirusTotal, and hands them to the thread
+    that looks them up as fast as the API quota allows.
+    - each ioc is queued once, scheduling a queued or in progress ioc again
+      only raises its priority if needed
+    - the iocs are handed out by priority, then in the order they were
+      queued, so the iocs attached to evidence are looked up first
+    - the lookups are rate limited by a token bucket matching the API
+      quota instead of sleeping for fixed periods
+    - once max_queued iocs are waiting, the oldest ones of the flows are
+      dropped to queue new ones. the iocs of evidence are never dropped
+    """
+
+    def __init__(
+        self, requests_per_minute: float = 4, max_queued: int = MAX_QUEUED
+    ):
+        self.bucket = TokenBucket(
+            requests_per_minute / 60, max(requests_per_minute, 1)
+        )
+        self.max_queued = max_queued
+        # (priority, order, ioc). the entries of the iocs that were
+        # dropped or whose priority was raised are left in the heap,
+        # they're skipped when popped
+        self.heap: List[Tuple[int, int, str]] = []
+        self.order = itertools.count()
+        # {ioc: its entry in the heap} of the queued iocs
+        self.queued: Dict[str, Tuple[int, int, str]] = {}
+        # the queued iocs with FLOW_PRIORITY, oldest first
+        self.queued_flows: OrderedDict = OrderedDict()
+        # {ioc: priority} of the iocs handed out and not done yet
+        self.in_progress: Dict[str, int] = {}
+        self.condition = threading.Condition()
+        self.stopped = False
+        # number of schedule() calls that didn't queue a new request
+        self.duplicates = 0
+        # number of iocs dropped because the queue was full
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self.queued)
+
+    def __contains__(self, ioc: str) -> bool:
+        return ioc in self.queued or ioc in self.in_progress
+
+    def push(self, ioc: str, priority: int) -> bool:
+        """
+        queues the given ioc, or raises its priority if it's queued
+        returns False if it's dropped because the queue is full
+        """
+        if ioc in self.queued:
+            self.queued_flows.pop(ioc, None)
+        elif len(self.queued) >= self.max_queued and not self.make_room(
+            priority
+        ):
+            self.dropped += 1
+            return False
+
+        entry = (priority, next(self.order), ioc)
+        self.queued[ioc] = entry
+        if priority == FLOW_PRIORITY:
+            self.queued_flows[ioc] = None
+        heapq.heappush(self.heap, entry)
+        self.compact()
+        self.condition.notify()
+        return True
+
+    def make_room(self, priority: int) -> bool:
+        """
+        drops the oldest queued ioc of the flows to queue a new ioc with
+        the given priority
+        returns False if there's none and the new ioc should be dropped
+        instead
+        """
+        if not self.queued_flows:
+            # only the iocs of evidence are queued, they're never dropped
+            return priority != FLOW_PRIORITY
+        ioc, _ = self.queued_flows.popitem(last=False)
+        del self.queued[ioc]
+        self.dropped += 1
+        return True
+
+    def compact(self):
+        """removes the stale entries once they're most of the heap"""
+        if len(self.heap) > 2 * len(self.queued) + 100:
+            self.heap = list(self.queued.values())
+            heapq.heapify(self.heap)
+
+    def schedule(self, ioc: str, priority: int = FLOW_PRIORITY) -> bool:
+        """
+        queues the lookup of the given ioc
+        returns False if it's already queued or in progress, or if it's
+        dropped because the queue is full
+        """
+        with self.condition:
+            if ioc in self.in_progress:
+                self.duplicates += 1
+                return False
+
+            if entry := self.queued.get(ioc):
+                self.duplicates += 1
+                if priority < entry[0]:
+                    self.push(ioc, priority)
+                return False
+
+            return self.push(ioc, priority)
+
+    def pop(self) -> Optional[str]:
+        """
+        returns the queued ioc with the highest priority and marks it as in
+        progress, or None if nothing is queued
+        """
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            priority, _, ioc = entry
+            if self.queued.get(ioc) != entry:
+                # stale entry of a dropped ioc or of one whose priority
+                # was raised
+                continue
+            del self.queued[ioc]
+            self.queued_flows.pop(ioc, None)
+            self.in_progress[ioc] = priority
+            return ioc
+        return None
+
+    def get(self) -> Optional[str]:
+        """
+        blocks until an ioc is queued and the quota allows looking it up
+        returns the ioc, or None once the scheduler is stopped
+        """
+        with self.condition:
+            while not self.stopped:
+                if not self.queued:
+                    self.condition.wait()
+                    continue
+
+                if wait_time := self.bucket.get_wait_time(time.monotonic()):
+                    # wakes up early if stopped
+                    self.condition.wait(wait_time)
+                    continue
+
+                self.bucket.consume(time.monotonic())
+                return self.pop()
+            return None
+
+    def retry(self, ioc: str):
+        """
+        requeues the given in progress ioc with the same priority, and
+        waits for the quota to refill, e.g. when VT says it's exceeded
+        """
+        with self.condition:
+            self.bucket.drain(time.monotonic())
+            priority = self.in_progress.pop(ioc, FLOW_PRIORITY)
+            if ioc not in self.queued:
+                self.push(ioc, priority)
+
+    def done(self, ioc: str):
+        """marks the lookup of the given ioc as finished"""
+        with self.condition:
+            self.in_progress.pop(ioc, None)
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
@@ -7,11 +7,23 @@ import time
 import ipaddress
 import threading
 import validators
+from typing import Optional
 
+from modules.virustotal.request_scheduler import (
+    EVIDENCE_PRIORITY,
+    FLOW_PRIORITY,
+    RequestScheduler,
+)
 from slips_files.common.flow_classifier import FlowClassifier
 from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.abstracts.module import IModule
 from slips_files.common.slips_utils import utils
+from slips_files.core.structures.evidence import (
+    Evidence,
+    dict_to_evidence,
+)
+
+VT_API_URL = "https://www.virustotal.com/vtapi/v2"
 
 
 class VT(IModule):
@@ -25,20 +37,21 @@ class VT(IModule):
     ]
 
     def init(self):
-        self.c1 = self.db.subscribe("new_flow")
-        self.c2 = self.db.subscribe("new_dns")
-        self.c3 = self.db.subscribe("new_url")
-        self.channels = {
-            "new_flow": self.c1,
-            "new_dns": self.c2,
-            "new_url": self.c3,
-        }
+        self.register_handler("new_flow", self.handle_new_flow)
+        self.register_handler("new_dns", self.handle_new_dns)
+        self.register_handler("new_url", self.handle_new_url)
+        self.register_handler("evidence_added", self.handle_evidence_added)
         # Read the conf file
         self.__read_configuration()
         # query counter for debugging purposes
         self.counter = 0
-        # Queue of API calls
-        self.api_call_queue = []
+        # the iocs waiting to be looked up by the api calls thread
+        self.scheduler = RequestScheduler(
+            self.requests_per_minute, self.max_queued_lookups
+        )
+        # set when VT says the quota is exceeded during a lookup, so its
+        # empty result isn't cached
+        self.rate_limited = False
         # Pool manager to make HTTP requests with urllib3
         # The certificate provides a bundle of trusted CAs,
         # the certificates are located in certifi.where()
@@ -72,6 +85,8 @@ class VT(IModule):
         conf = ConfigParser()
         self.key_file = conf.vt_api_key_file()
         self.update_period = conf.virustotal_update_period()
+        self.requests_per_minute = conf.virustotal_requests_per_minute()
+        self.max_queued_lookups = conf.virustotal_max_queued_lookups()
 
     def count_positives(
         self, response: dict, response_key: str, positive_key, total_key
@@ -107,6 +122,9 @@ class VT(IModule):
         :param cached_data: info about this ip from IPsInfo key in the db
         """
         vt_scores, passive_dns, as_owner = self.get_ip_vt_data(ip)
+        if self.rate_limited:
+            # looked up again once the quota refills
+            return
 
         ts = time.time()
         vtdata = {
@@ -119,7 +137,7 @@ class VT(IModule):
 
         data = {"VirusTotal": vtdata}
 
-        if as_owner and cached_data and "asn" not in cached_data:
+        if as_owner and "asn" not in (cached_data or {}):
             # we dont have ASN info about this ip
             data["asn"] = {"number": f"AS{as_owner}", "timestamp": ts}
 
@@ -161,6 +179,8 @@ class VT(IModule):
         Function to set VirusTotal data of the URL in the URLInfo.
         """
         score = self.get_url_vt_data(url)
+        if self.rate_limited:
+            return
         # Score of this url didn't change
         vtdata = {"URL": score, "timestamp": time.time()}
         data = {"VirusTotal": vtdata}
@@ -172,6 +192,8 @@ class VT(IModule):
         It also sets asn data if it is unknown or does not exist.
         """
         vt_scores, as_owner = self.get_domain_vt_data(domain)
+        if self.rate_limited:
+            return
         vtdata = {
             "URL": vt_scores[0],
             "down_file": vt_scores[1],
@@ -189,52 +211,78 @@ class VT(IModule):
 
     def api_calls_thread(self):
         """
-        This thread starts if there's an API calls queue,
-        it operates every minute, and executes 4 api calls
-        from the queue then sleeps again.
+        looks up the scheduled iocs as fast as the API quota allows,
+        the iocs attached to evidence first
         """
+        while not self.incorrect_API_key:
+            ioc: Optional[str] = self.scheduler.get()
+            if ioc is None:
+                # slips is stopping
+                return
+            self.rate_limited = False
+            try:
+                self.look_up(ioc)
+            except Exception:
+                self.print(f"Problem looking up {ioc} on VirusTotal", 0, 1)
+                self.print(traceback.format_exc(), 0, 1)
+            finally:
+                self.scheduler.done(ioc)
+
+    def look_up(self, ioc: str):
+        """asks VT about the given ioc and caches its VT data"""
+        ioc_type = self.get_ioc_type(ioc)
+        if ioc_type == "ip":
+            cached_data = self.db.get_ip_info(ioc, ["VirusTotal", "asn"])
+            self.set_vt_data_in_IPInfo(ioc, cached_data)
+        elif ioc_type == "domain":
+            self.update_domain_info_cache(ioc, self.db.get_domain_data(ioc))
+        elif ioc_type == "url":
+            self.set_url_data_in_URLInfo(ioc, None)
 
-        while True:
-            # do not attempt to make more api calls if we already
-            # know that the api key is incorrect
-            if self.incorrect_API_key:
-                return False
-            # wait until the queue is populated
-            if not self.api_call_queue:
-                time.sleep(30)
-            # wait the api limit
-            time.sleep(60)
-            while self.api_call_queue:
-                # get the first element in the queue
-                ioc = self.api_call_queue.pop(0)
-                ioc_type = self.get_ioc_type(ioc)
-                if ioc_type == "ip":
-                    cached_data = self.db.get_ip_info(ioc)
-                    # return an IPv4Address or IPv6Address object
-                    # depending on the IP address passed as argument.
-                    ip_addr = ipaddress.ip_address(ioc)
-                    # if VT data of this IP (not multicast) is not
-                    # in the IPInfo, ask VT.
-                    # if the IP is not a multicast and 'VirusTotal'
-                    # key is not in the IPInfo, proceed.
-                    if (
-                        not cached_data or "VirusTotal" not in cached_data
-                    ) and not ip_addr.is_multicast:
-                        self.set_vt_data_in_IPInfo(ioc, cached_data)
-
-                elif ioc_type == "domain":
-                    cached_data = self.db.get_domain_data(ioc)
-                    if not cached_data or "VirusTotal" not in cached_data:
-                        self.update_domain_info_cache(ioc, cached_data)
-
-                elif ioc_type == "url":
-                    cached_data = self.db.is_cached_url_by_vt(ioc)
-                    # If VT data of this domain is not in the
-                    # DomainInfo, ask VT
-                    # If 'Virustotal' key is not in the DomainInfo
-                    if not cached_data or "VirusTotal" not in cached_data:
-                        # cached data is either False or {}
-                        self.set_url_data_in_URLInfo(ioc, cached_data)
+    def get_cached_data(self, ioc: str, ioc_type: str) -> Optional[dict]:
+        if ioc_type == "ip":
+            return self.db.get_ip_info(ioc, ["VirusTotal", "asn"])
+        if ioc_type == "domain":
+            return self.db.get_domain_data(ioc)
+        if ioc_type == "url":
+            return self.db.is_cached_url_by_vt(ioc)
+
+    def is_outdated(self, cached_data: Optional[dict]) -> bool:
+        """
+        returns True if the given cached info has no VT data, or if it's
+        older than the update period
+        """
+        if not cached_data or "VirusTotal" not in cached_data:
+            return True
+        last_update = cached_data["VirusTotal"]["timestamp"]
+        return time.time() - last_update > self.update_period
+
+    def should_look_up(self, ioc: str, ioc_type: str) -> bool:
+        if ioc_type == "ip":
+            ip_addr = ipaddress.ip_address(ioc)
+            return not (ip_addr.is_multicast or utils.is_private_ip(ip_addr))
+        if ioc_type == "domain":
+            # 'local' is a special-use domain name reserved by
+            # the Internet Engineering Task Force (IETF)
+            return "arpa" not in ioc and ".local" not in ioc
+        return ioc_type == "url"
+
+    def schedule_lookup(self, ioc: str, priority: int = FLOW_PRIORITY):
+        """
+        queues the lookup of the given ioc if its VT data is missing or
+        outdated
+        """
+        if ioc in self.scheduler:
+            # only raises its priority if needed
+            self.scheduler.schedule(ioc, priority)
+            return
+
+        ioc_type = self.get_ioc_type(ioc)
+        if not self.should_look_up(ioc, ioc_type):
+            return
+
+        if self.is_outdated(self.get_cached_data(ioc, ioc_type)):
+            self.scheduler.schedule(ioc, priority)
 
     def get_as_owner(self, response):
         """
@@ -335,13 +383,13 @@ class VT(IModule):
         params = {"apikey": self.key}
         ioc_type = self.get_ioc_type(ioc)
         if ioc_type == "ip":
-            self.url = "https://www.virustotal.com/vtapi/v2/ip-address/report"
+            self.url = f"{VT_API_URL}/ip-address/report"
             params["ip"] = ioc
         elif ioc_type == "domain":
-            self.url = "https://www.virustotal.com/vtapi/v2/domain/report"
+            self.url = f"{VT_API_URL}/domain/report"
             params["domain"] = ioc
         elif ioc_type == "url":
-            self.url = "https://www.virustotal.com/vtapi/v2/url/report"
+            self.url = f"{VT_API_URL}/url/report"
             params["resource"] = ioc
         else:
             # unsupported ioc
@@ -362,12 +410,13 @@ class VT(IModule):
             # than allowed. You have exceeded one of your quotas
             # (minute, daily or monthly).
             if response.status == 204:
-                # Add to the queue of api calls in case of api limit reached.
-                self.api_call_queue.append(ioc)
+                # look it up again once the quota refills
+                self.rate_limited = True
+                self.scheduler.retry(ioc)
             # 403 means you don't have enough privileges to make
             # the request or wrong API key
             elif response.status == 403:
-                # don't add to the api call queue because the user
+                # don't look it up again because the user
                 # will have to restart slips anyway
                 # to add a correct API key and the queue wil be erased
                 self.print("Please check that your API key is correct.", 0, 1)
@@ -547,74 +596,43 @@ class VT(IModule):
             return 1
         self.api_calls_thread.start()
 
+    def shutdown_gracefully(self):
+        if self.scheduler.stopped:
+            # already stopped, e.g. because of an incorrect API key
+            return
+        self.scheduler.stop()
+        self.print(
+            f"VirusTotal lookups: {self.counter}, duplicate lookups "
+            f"skipped: {self.scheduler.duplicates}, lookups dropped because "
+            f"the queue was full: {self.scheduler.dropped}, lookups not "
+            f"done: {len(self.scheduler)}",
+            log_to_logfiles_only=True,
+        )
+
+    def handle_new_flow(self, msg: dict):
+        data = json.loads(msg["data"])
+        flow = self.classifier.convert_to_flow_obj(data["flow"])
+        self.schedule_lookup(flow.daddr)
+
+    def handle_new_dns(self, msg: dict):
+        data = json.loads(msg["data"])
+        flow = self.classifier.convert_to_flow_obj(data["flow"])
+        if flow.query:
+            self.schedule_lookup(flow.query)
+
+    def handle_new_url(self, msg: dict):
+        data = json.loads(msg["data"])
+        flow = self.classifier.convert_to_flow_obj(data["flow"])
+        self.schedule_lookup(f"http://{flow.host}{flow.uri}")
+
+    def handle_evidence_added(self, msg: dict):
+        evidence: Evidence = dict_to_evidence(json.loads(msg["data"]))
+        # the iocs that matter are looked up first
+        self.schedule_lookup(evidence.attacker.value, EVIDENCE_PRIORITY)
+        if evidence.victim:
+            self.schedule_lookup(evidence.victim.value, EVIDENCE_PRIORITY)
+
     def main(self):
         if self.incorrect_API_key:
             self.shutdown_gracefully()
             return 1
-
-        if msg := self.get_msg("new_flow"):
-            data = json.loads(msg["data"])
-            flow = self.classifier.convert_to_flow_obj(data["flow"])
-            ip = flow.daddr
-            cached_data = self.db.get_ip_info(ip)
-            if not cached_data:
-                cached_data = {}
-
-            # return an IPv4Address or IPv6Address object depending on the
-            # IP address passed as argument.
-            ip_addr = ipaddress.ip_address(ip)
-            # if VT data of this IP (not multicast) is not in the IPInfo,
-            # ask VT.  if the IP is not a multicast and 'VirusTotal' key is
-            # not in
-            # the IPInfo, proceed.
-            if (
-                "VirusTotal" not in cached_data
-                and not ip_addr.is_multicast
-                and not utils.is_private_ip(ip_addr)
-            ):
-                self.set_vt_data_in_IPInfo(ip, cached_data)
-
-            # if VT data of this IP is in the IPInfo, check the timestamp.
-            elif "VirusTotal" in cached_data:
-                # If VT is in data, check timestamp. Take time difference,
-                # if not valid, update vt scores.
-                if (
-                    time.time() - cached_data["VirusTotal"]["timestamp"]
-                ) > self.update_period:
-                    self.set_vt_data_in_IPInfo(ip, cached_data)
-
-        if msg := self.get_msg("new_dns"):
-            data = json.loads(msg["data"])
-            flow = self.classifier.convert_to_flow_obj(data["flow"])
-            cached_data = self.db.get_domain_data(flow.query)
-            # If VT data of this domain is not in the DomainInfo, ask VT
-            # If 'Virustotal' key is not in the DomainInfo
-            if flow.query and (
-                not cached_data or "VirusTotal" not in cached_data
-            ):
-                self.update_domain_info_cache(flow.query, cached_data)
-            elif flow.query and cached_data and "VirusTotal" in cached_data:
-                # If VT is in data, check timestamp. Take time difference,
-                # if not valid, update vt scores.
-                if (
-                    time.time() - cached_data["VirusTotal"]["timestamp"]
-                ) > self.update_period:
-                    self.update_domain_info_cache(flow.query, cached_data)
-
-        if msg := self.get_msg("new_url"):
-            data = json.loads(msg["data"])
-            flow = self.classifier.convert_to_flow_obj(data["flow"])
-            url = f"http://{flow.host}{flow.uri}"
-            cached_data = self.db.is_cached_url_by_vt(url)
-            # If VT data of this domain is not in the DomainInfo, ask VT
-            # If 'Virustotal' key is not in the DomainInfo
-            if not cached_data or "VirusTotal" not in cached_data:
-                # cached data is either False or {}
-                self.set_url_data_in_URLInfo(url, cached_data)
-            elif cached_data and "VirusTotal" in cached_data:
-                # If VT is in data, check timestamp. Take time difference,
-                # if not valid, update vt scores.
-                if (
-                    time.time() - cached_data["VirusTotal"]["timestamp"]
-                ) > self.update_period:
-                    self.set_url_data_in_URLInfo(url, cached_data)
@@ -13,11 +13,14 @@ from distutils.dir_util import copy_tree
 from typing import Set
 import logging
 
+from managers.checkpoint_manager import CheckpointManager
 from managers.host_ip_manager import HostIPManager
 from managers.metadata_manager import MetadataManager
 from managers.process_manager import ProcessManager
 from managers.profilers_manager import ProfilersManager
 from managers.redis_manager import RedisManager
+from managers.snapshot_manager import SnapshotManager
+from managers.retention_manager import RetentionManager
 from managers.ui_manager import UIManager
 from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.printer import Printer
@@ -44,6 +47,9 @@ class Main:
         self.conf = ConfigParser()
         self.ui_man = UIManager(self)
         self.profilers_manager = ProfilersManager(self)
+        self.checkpoint_man = CheckpointManager(self)
+        self.snapshot_man = SnapshotManager(self)
+        self.retention_man = RetentionManager(self)
         self.version = utils.get_slips_version()
         # will be filled later
         self.commit = "None"
@@ -168,6 +174,10 @@ class Main:
         Log dirs are stored in output/<input>_%Y-%m-%d_%H:%M:%S
         @return: None
         """
+        if self.args.resume:
+            # the analysis continues in the output dir it was started in
+            return
+
         # default output/
         if "-o" in sys.argv:
             # -o is given
@@ -468,6 +478,7 @@ class Main:
                     self.args.output,
                     self.redis_port,
                     start_redis_server=start_redis_server,
+                    rdb_to_load=self.checkpoint_man.rdb_to_load,
                 )
             except RuntimeError as e:
                 self.print(str(e), 1, 1)
@@ -524,6 +535,15 @@ class Main:
 
             self.db.set_slips_mode(self.mode)
 
+            if not self.args.resume:
+                # the input process continues reading the zeek files from
+                # these offsets when resuming, make sure there are none
+                # left from older analyses
+                self.db.delete_input_offsets()
+            self.checkpoint_man.enable()
+            self.snapshot_man.enable()
+            self.retention_man.enable()
+
             if self.mode == DAEMONIZED_MODE:
                 std_files = {
                     "stderr": self.daemon.stderr,
@@ -621,6 +641,10 @@ class Main:
                 self.update_stats()
 
                 self.db.check_tw_to_close()
+                self.retention_man.update()
+
+                self.checkpoint_man.update()
+                self.snapshot_man.update()
 
                 modified_profiles: Set[str] = (
                     self.metadata_man.update_slips_stats_in_the_db()[1]
@@ -1,4 +1,5 @@
 import asyncio
+import inspect
 from typing import Callable
 from slips_files.common.abstracts.module import IModule
 
@@ -21,7 +22,25 @@ class AsyncModule(IModule):
         """Implement the async shutdown logic here"""
         pass
 
+    async def dispatch_msgs(self):
+        """
+        Waits for msgs in the channels that have handlers, and passes
+        them to their handlers.
+        Waiting is done in a thread, so the tasks created by the handlers
+        keep running while no msgs are received
+        """
+        loop = asyncio.get_event_loop()
+        msgs_per_channel = await loop.run_in_executor(None, self.get_msgs)
+        for handler, arg in self.get_handler_calls(msgs_per_channel):
+            # handlers can be normal or async functions
+            if inspect.iscoroutinefunction(handler):
+                await handler(arg)
+            else:
+                handler(arg)
+
     async def run_main(self):
+        if self.subscription:
+            await self.dispatch_msgs()
         return await self.main()
 
     @staticmethod
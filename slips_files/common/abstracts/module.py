@@ -4,8 +4,18 @@ import warnings
 from abc import ABC, abstractmethod
 from multiprocessing import Process, Event
 from typing import (
+    Any,
+    Callable,
     Dict,
+    List,
     Optional,
+    Union,
+)
+
+import redis
+
+from slips_files.core.database.redis_db.stream_subscription import (
+    StreamSubscription,
 )
 from slips_files.common.printer import Printer
 from slips_files.core.output import Output
@@ -25,6 +35,11 @@ class IModule(ABC, Process):
     authors = ["Template Author"]
     # should be filled with the channels each module subscribes to
     channels = {}
+    # seconds to block waiting for msgs in the channels that have handlers
+    dispatch_timeout = 1
+    # max number of msgs to read from the channels that have handlers
+    # before handling them
+    dispatch_batch_size = 100
 
     def __init__(
         self,
@@ -42,9 +57,24 @@ class IModule(ABC, Process):
         self.termination_event: Event = termination_event
         self.logger = logger
         self.printer = Printer(self.logger, self.name)
-        self.db = DBManager(self.logger, self.output_dir, self.redis_port)
+        self.db = DBManager(
+            self.logger,
+            self.output_dir,
+            self.redis_port,
+            consumer_group=self.name,
+        )
         self.keyboard_int_ctr = 0
+        # {channel: handler}, filled by the module's init() using
+        # register_handler() and register_batch_handler()
+        self.handlers: Dict[str, Callable[[dict], Any]] = {}
+        self.batch_handlers: Dict[str, Callable[[List[dict]], Any]] = {}
         self.init(**kwargs)
+        # one subscription for all the channels that have handlers, this
+        # has to be done here and not after the module starts, so no msgs
+        # are lost before the module starts
+        self.subscription: Union[
+            redis.client.PubSub, StreamSubscription, bool, None
+        ] = self.subscribe_to_handled_channels()
         # should after the module's init() so the module has a chance to
         # set its own channels
         # tracks whether or not in the last iteration there was a msg
@@ -71,8 +101,40 @@ class IModule(ABC, Process):
         tracker = {}
         for channel_name in self.channels:
             tracker[channel_name] = {"msg_received": False}
+        for channel_name in self.get_handled_channels():
+            tracker[channel_name] = {"msg_received": False}
         return tracker
 
+    def register_handler(self, channel: str, handler: Callable[[dict], Any]):
+        """
+        Makes the module call the given handler with every msg received
+        in the given channel, instead of the module's main() polling the
+        channel using get_msg().
+        should be called from the module's init()
+        """
+        self.handlers[channel] = handler
+
+    def register_batch_handler(
+        self, channel: str, handler: Callable[[List[dict]], Any]
+    ):
+        """
+        Makes the module call the given handler with all the msgs
+        received in the given channel since the last call, for modules
+        that handle msgs faster in bulk.
+        should be called from the module's init()
+        """
+        self.batch_handlers[channel] = handler
+
+    def get_handled_channels(self) -> List[str]:
+        """returns the channels that have registered handlers"""
+        return list(dict.fromkeys([*self.handlers, *self.batch_handlers]))
+
+    def subscribe_to_handled_channels(
+        self,
+    ) -> Union[redis.client.PubSub, StreamSubscription, bool, None]:
+        if channels := self.get_handled_channels():
+            return self.db.subscribe_to_channels(channels)
+
     @abstractmethod
     def init(self, **kwargs):
         """
@@ -138,6 +200,60 @@ class IModule(ABC, Process):
 
         self.channel_tracker[channel]["msg_received"] = False
 
+    def get_msgs(self) -> Dict[str, List[dict]]:
+        """
+        Blocks for up to dispatch_timeout seconds waiting for msgs in any
+        of the channels that have handlers
+        returns {channel: [msgs received in this channel]}
+        """
+        if not self.subscription:
+            return {}
+
+        handled_channels: List[str] = self.get_handled_channels()
+        msgs_per_channel = {}
+        for msg in self.db.get_messages(
+            self.subscription,
+            timeout=self.dispatch_timeout,
+            max_msgs=self.dispatch_batch_size,
+        ):
+            channel = msg["channel"]
+            if channel in handled_channels and utils.is_msg_intended_for(
+                msg, channel
+            ):
+                msgs_per_channel.setdefault(channel, []).append(msg)
+
+        for channel in handled_channels:
+            msgs = msgs_per_channel.get(channel, [])
+            self.channel_tracker[channel]["msg_received"] = bool(msgs)
+            if msgs:
+                self.db.incr_msgs_received_in_channel(
+                    self.name, channel, len(msgs)
+                )
+        return msgs_per_channel
+
+    def get_handler_calls(
+        self, msgs_per_channel: Dict[str, List[dict]]
+    ) -> List[tuple]:
+        """
+        returns the (handler, arg) pairs to call to handle the given msgs
+        in the same order they were received per channel
+        """
+        calls = []
+        for channel, msgs in msgs_per_channel.items():
+            if channel in self.batch_handlers:
+                calls.append((self.batch_handlers[channel], msgs))
+                continue
+            calls.extend((self.handlers[channel], msg) for msg in msgs)
+        return calls
+
+    def dispatch_msgs(self):
+        """
+        Waits for msgs in the channels that have handlers, and passes
+        them to their handlers
+        """
+        for handler, arg in self.get_handler_calls(self.get_msgs()):
+            handler(arg)
+
     def print_traceback(self):
         exception_line = sys.exc_info()[2].tb_lineno
         self.print(f"Problem in pre_main() line {exception_line}", 0, 1)
@@ -167,6 +283,9 @@ class IModule(ABC, Process):
                     self.shutdown_gracefully()
                     return
 
+                if self.subscription:
+                    self.dispatch_msgs()
+
                 error: bool = self.main()
                 if error:
                     self.shutdown_gracefully()
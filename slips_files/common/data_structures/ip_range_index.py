@@ -0,0 +1,112 @@
+import ipaddress
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import numpy as np
+
+
+class _FamilyIndex:
+    """
+    Sorted arrays of the ranges of one address family, built from the
+    ranges stored in IPRangeIndex
+    """
+
+    def __init__(self, ranges: Dict[Tuple[int, int], Any], dtype):
+        # sort by start, and put the bigger range first when 2 ranges
+        # start at the same ip, so nested ranges come after their parents
+        sorted_ranges = sorted(
+            ranges.items(), key=lambda rng: (rng[0][0], -rng[0][1])
+        )
+        self.starts = np.array(
+            [start for (start, _), _ in sorted_ranges], dtype=dtype
+        )
+        self.ends = np.array(
+            [end for (_, end), _ in sorted_ranges], dtype=dtype
+        )
+        self.values: List[Any] = [value for _, value in sorted_ranges]
+        self.parents: List[int] = self._get_parents()
+
+    def _get_parents(self) -> List[int]:
+        """
+        returns the index of the closest range that encloses each range,
+        or -1 if the range isn't nested in any other range
+        """
+        parents = []
+        enclosing = []
+        for start, end in zip(self.starts, self.ends):
+            while enclosing and self.ends[enclosing[-1]] < start:
+                enclosing.pop()
+            parents.append(enclosing[-1] if enclosing else -1)
+            enclosing.append(len(parents) - 1)
+        return parents
+
+    def search(self, ip: int) -> Optional[Any]:
+        # the last range that starts at or before the given ip
+        idx = int(np.searchsorted(self.starts, ip, side="right")) - 1
+        # if it doesn't contain the ip, one of the ranges enclosing it may
+        while idx != -1:
+            if self.ends[idx] >= ip:
+                return self.values[idx]
+            idx = self.parents[idx]
+        return None
+
+
+class IPRangeIndex:
+    """
+    Maps IP ranges (CIDRs) to values.
+    Ranges are kept as sorted integer start/end arrays per address family,
+    so finding the range of an IP is a binary search instead of checking
+    the IP against every range.
+    Ranges are expected to be either nested or disjoint (like CIDRs are),
+    when an IP is in more than one range, the most specific one is returned.
+    """
+
+    # ipv6 addresses don't fit in any numpy int type, python ints are used
+    dtypes = {4: np.uint32, 6: object}
+
+    def __init__(self):
+        # {version: {(start, end): value}}
+        self.ranges: Dict[int, Dict[Tuple[int, int], Any]] = {4: {}, 6: {}}
+        # the sorted arrays are rebuilt lazily on the first search after
+        # an insert
+        self.indexes: Dict[int, Optional[_FamilyIndex]] = {4: None, 6: None}
+
+    def __len__(self):
+        return sum(len(ranges) for ranges in self.ranges.values())
+
+    def insert(self, cidr: str, value: Any):
+        """
+        :param cidr: the range to store, e.g. 8.8.8.0/24
+        raises ValueError if the given cidr is invalid
+        """
+        network = ipaddress.ip_network(cidr, strict=False)
+        rng = (int(network.network_address), int(network.broadcast_address))
+        self.ranges[network.version][rng] = value
+        self.indexes[network.version] = None
+
+    def search(self, ip: str) -> Optional[Any]:
+        """
+        returns the value of the most specific range the given ip
+        belongs to, or None if it doesn't belong to any range
+        """
+        try:
+            ip = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+
+        if not self.ranges[ip.version]:
+            return None
+
+        index = self.indexes[ip.version]
+        if index is None:
+            index = _FamilyIndex(
+                self.ranges[ip.version], self.dtypes[ip.version]
+            )
+            self.indexes[ip.version] = index
+
+        return index.search(int(ip))
@@ -0,0 +1,35 @@
+from collections import OrderedDict
+from typing import Hashable
+
+
+class RequestLedger:
+    """
+    Remembers the latest requests sent, so the same request isn't sent
+    again while it's remembered.
+    The ledger is a bounded LRU, once it's full, the least recently
+    requested key is forgotten and may be requested again.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        self.max_size = max_size
+        self.requests: OrderedDict = OrderedDict()
+        # number of requests that weren't needed so far
+        self.suppressed = 0
+
+    def __len__(self) -> int:
+        return len(self.requests)
+
+    def should_request(self, key: Hashable) -> bool:
+        """
+        returns True if the given key wasn't requested recently, and
+        remembers that it's requested now
+        """
+        if key in self.requests:
+            self.requests.move_to_end(key)
+            self.suppressed += 1
+            return False
+
+        self.requests[key] = None
+        if len(self.requests) > self.max_size:
+            self.requests.popitem(last=False)
+        return True
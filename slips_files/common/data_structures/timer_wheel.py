@@ -0,0 +1,92 @@
+import math
+from typing import (
+    Any,
+    List,
+    Optional,
+    Tuple,
+)
+
+
+class TimerWheel:
+    """
+    A hashed timer wheel.
+    Stores records until the time reaches their due time. Each record goes
+    to the slot of its due tick, so scheduling is O(1) and advancing the
+    time only checks the slots of the ticks that passed instead of all the
+    stored records.
+    The wheel doesn't read any clock, the time is whatever the caller
+    passes to schedule() and advance(), e.g. flow timestamps.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 64):
+        """
+        :param tick: the resolution of the wheel in seconds. records are
+            due at the first tick that is >= their due time
+        :param slots: records due more than tick * slots seconds later
+            share slots with the closer ones, and are skipped until they're
+            due
+        """
+        self.tick = tick
+        # each slot is a list of (due tick, record)
+        self.slots: List[List[Tuple[int, Any]]] = [[] for _ in range(slots)]
+        # the last tick whose records were returned by advance()
+        self.current_tick: Optional[int] = None
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def schedule(self, due: float, record: Any):
+        """stores the given record until the time reaches the given due"""
+        due_tick = math.ceil(due / self.tick)
+        if self.current_tick is not None:
+            # records that are already due are returned by the next advance
+            due_tick = max(due_tick, self.current_tick + 1)
+        self.slots[due_tick % len(self.slots)].append((due_tick, record))
+        self.size += 1
+
+    def get_ticks_to_check(self, now_tick: int) -> range:
+        """returns the ticks whose slots may have due records"""
+        slots = len(self.slots)
+        if self.current_tick is None or now_tick - self.current_tick >= slots:
+            # the time moved a full rotation or more, e.g. on the first
+            # advance or after a gap in the flows. all slots may have due
+            # records
+            return range(slots)
+        return range(self.current_tick + 1, now_tick + 1)
+
+    def advance(self, now: float) -> List[Any]:
+        """
+        moves the time of the wheel to the given time, and removes and
+        returns the records that are due, in the order of their due time
+        """
+        now_tick = math.floor(now / self.tick)
+        if self.current_tick is not None and now_tick <= self.current_tick:
+            return []
+
+        due = []
+        for tick in self.get_ticks_to_check(now_tick):
+            idx = tick % len(self.slots)
+            slot = self.slots[idx]
+            if not slot:
+                continue
+            not_due = []
+            for entry in slot:
+                (due if entry[0] <= now_tick else not_due).append(entry)
+            self.slots[idx] = not_due
+
+        self.current_tick = now_tick
+        self.size -= len(due)
+        due.sort(key=lambda entry: entry[0])
+        return [record for _, record in due]
+
+    def pop_all(self) -> List[Any]:
+        """
+        removes and returns all the stored records in the order of their
+        due time, regardless of the current time of the wheel
+        """
+        entries = [entry for slot in self.slots for entry in slot]
+        self.slots = [[] for _ in self.slots]
+        self.size = 0
+        entries.sort(key=lambda entry: entry[0])
+        return [record for _, record in entries]
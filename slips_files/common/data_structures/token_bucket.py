@@ -0,0 +1,59 @@
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    A token bucket rate limiter.
+    The bucket holds up to capacity tokens and is refilled with rate tokens
+    per second, each request consumes one token. So requests are allowed in
+    bursts of up to capacity, and at rate requests/sec on average.
+    The bucket doesn't read any clock, the time is whatever the caller
+    passes, e.g. time.monotonic().
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        :param rate: tokens added per second
+        :param capacity: max number of tokens, the bucket starts full
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        # the time of the last refill
+        self.updated: Optional[float] = None
+
+    def refill(self, now: float):
+        if self.updated is None:
+            self.updated = now
+            return
+        if now <= self.updated:
+            return
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def get_wait_time(self, now: float) -> float:
+        """returns the seconds to wait until a token is available"""
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self, now: float) -> bool:
+        """
+        consumes a token if there's one
+        returns False if the request isn't allowed yet
+        """
+        if self.get_wait_time(now):
+            return False
+        self.tokens -= 1
+        return True
+
+    def drain(self, now: float):
+        """
+        empties the bucket, e.g. when the server says the quota is
+        exceeded before the bucket does
+        """
+        self.refill(now)
+        self.tokens = 0
@@ -0,0 +1,88 @@
+import time
+from typing import (
+    Callable,
+    Optional,
+)
+
+from slips_files.common.data_structures.timer_wheel import TimerWheel
+from slips_files.common.slips_utils import utils
+
+
+class DeferredChecks:
+    """
+    Runs checks that have to wait for some time after their flow, e.g. for
+    the conn.log flow of an ssl.log flow to be read by slips.
+    Instead of one sleeping coroutine per flow, each check is stored as a
+    (function, args) record in a timer wheel until it's due, and the due
+    ones are run in batches by run_due().
+    When slips is reading files, the time of the checks is the flow time of
+    slips (the ts of the latest flow read), so the checks wait the same
+    regardless of how fast slips reads the flows. when running on an
+    interface, it's the wall time
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.is_running_non_stop: bool = db.is_running_non_stop()
+        self.wheel = TimerWheel(tick=1.0, slots=64)
+        # the ts of the latest flow seen by this process or read from the db
+        self.flow_time = 0.0
+        # the wall time of the last read of the flow time from the db
+        self.last_flow_time_read = 0.0
+
+    def __len__(self) -> int:
+        return len(self.wheel)
+
+    def now(self) -> float:
+        if self.is_running_non_stop:
+            return time.time()
+        # the flow time in the db moves with all the flows read by slips,
+        # not only the ones this process gets. read it at most once per sec
+        if time.time() - self.last_flow_time_read >= 1:
+            self.last_flow_time_read = time.time()
+            self.flow_time = max(self.flow_time, self.db.get_flow_time())
+        return self.flow_time
+
+    @staticmethod
+    def get_flow_ts(flow) -> Optional[float]:
+        try:
+            return float(utils.convert_format(flow.starttime, "unixtimestamp"))
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+    def update_time(self, flow) -> float:
+        """
+        moves the time of the checks to the ts of the given flow if it's
+        newer, and returns the ts of the flow
+        """
+        if self.is_running_non_stop:
+            return time.time()
+
+        flow_ts = self.get_flow_ts(flow)
+        if flow_ts is None:
+            return self.flow_time
+        self.flow_time = max(self.flow_time, flow_ts)
+        return flow_ts
+
+    def schedule(self, delay: float, flow, check: Callable, *args):
+        """
+        runs check(*args) once the given seconds pass after the given flow
+        """
+        self.wheel.schedule(self.update_time(flow) + delay, (check, args))
+
+    def run_due(self) -> int:
+        """runs the checks that are due and returns their number"""
+        checks = self.wheel.advance(self.now())
+        for check, args in checks:
+            check(*args)
+        return len(checks)
+
+    def run_all(self) -> int:
+        """
+        runs all the stored checks without waiting for them to be due,
+        e.g. when slips is done reading the flows
+        """
+        checks = self.wheel.pop_all()
+        for check, args in checks:
+            check(*args)
+        return len(checks)
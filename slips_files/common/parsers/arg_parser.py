@@ -217,6 +217,14 @@ class ArgumentParser(argparse.ArgumentParser):
             required=False,
             help="Read an analysed file (rdb) from disk.",
         )
+        self.add_argument(
+            "--resume",
+            action="store",
+            metavar="<output_dir>",
+            required=False,
+            help="Continue the analysis stored in the given output dir "
+            "from its last checkpoint.",
+        )
         self.add_argument(
             "-D",
             "--daemon",
@@ -134,6 +134,71 @@ class ConfigParser(object):
             timeout = 5
         return timeout
 
+    def zeek_workers(self) -> int:
+        workers = self.read_configuration("parameters", "zeek_workers", 1)
+        try:
+            workers = int(workers)
+        except ValueError:
+            workers = 1
+        return max(workers, 1)
+
+    def checkpoint_interval(self) -> float:
+        """returns the seconds between checkpoints, 0 if they're disabled"""
+        interval = self.read_configuration(
+            "parameters", "checkpoint_interval", 0
+        )
+        try:
+            interval = float(interval)
+        except (TypeError, ValueError):
+            interval = 0
+        return max(interval, 0)
+
+    def snapshot_interval(self) -> float:
+        """returns the seconds between snapshots, 0 if they're disabled"""
+        interval = self.read_configuration(
+            "parameters", "snapshot_interval", 0
+        )
+        try:
+            interval = float(interval)
+        except (TypeError, ValueError):
+            interval = 0
+        return max(interval, 0)
+
+    def snapshots_to_keep(self) -> int:
+        to_keep = self.read_configuration("parameters", "snapshots_to_keep", 3)
+        try:
+            to_keep = int(to_keep)
+        except (TypeError, ValueError):
+            to_keep = 3
+        return max(to_keep, 1)
+
+    def keep_closed_tws(self) -> int:
+        """
+        returns the number of closed tws to keep in redis before moving
+        the oldest ones to sqlite, 0 if they're never moved
+        """
+        to_keep = self.read_configuration("parameters", "keep_closed_tws", 0)
+        try:
+            to_keep = int(to_keep)
+        except (TypeError, ValueError):
+            to_keep = 0
+        return max(to_keep, 0)
+
+    def max_redis_memory(self) -> int:
+        """
+        returns the memory budget of redis in bytes, closed tws are moved
+        to sqlite when redis uses more than it. 0 if there's no budget
+        """
+        max_memory = self.read_configuration(
+            "parameters", "max_redis_memory", 0
+        )
+        try:
+            max_memory = float(max_memory)
+        except (TypeError, ValueError):
+            max_memory = 0
+        # the config value is in MBs
+        return int(max(max_memory, 0) * 1024 * 1024)
+
     def online_whitelist_update_period(self):
         update_period = self.read_configuration(
             "threatintelligence", "online_whitelist_update_period", 604800
@@ -144,6 +209,41 @@ class ConfigParser(object):
             update_period = 604800
         return update_period
 
+    def alerts_flush_interval(self) -> float:
+        interval = self.read_configuration(
+            "detection", "alerts_flush_interval", 1
+        )
+        try:
+            return float(interval)
+        except ValueError:
+            return 1
+
+    def alerts_buffer_size(self) -> int:
+        size = self.read_configuration(
+            "detection", "alerts_buffer_size", 65536
+        )
+        try:
+            return int(size)
+        except ValueError:
+            return 65536
+
+    def alerts_rotation_size(self) -> int:
+        """returns the size in bytes to rotate the alerts files at"""
+        size = self.read_configuration("detection", "alerts_rotation_size", 0)
+        try:
+            return int(float(size) * 1024 * 1024)
+        except ValueError:
+            return 0
+
+    def alerts_rotation_interval(self) -> float:
+        interval = self.read_configuration(
+            "detection", "alerts_rotation_interval", 0
+        )
+        try:
+            return float(interval)
+        except ValueError:
+            return 0
+
     def popup_alerts(self):
         return self.read_configuration("detection", "popup_alerts", False)
 
@@ -338,6 +438,16 @@ class ConfigParser(object):
             delay = 3600
         return delay
 
+    def push_batch_size(self) -> int:
+        size = self.read_configuration(
+            "exporting_alerts", "push_batch_size", 100
+        )
+        try:
+            size = int(size)
+        except ValueError:
+            size = 100
+        return size
+
     def collection_name(self):
         return self.read_configuration(
             "exporting_alerts", "collection_name", False
@@ -441,6 +551,16 @@ class ConfigParser(object):
             "threatintelligence", "ssl_feeds", False
         )
 
+    def blocking_backend(self) -> str:
+        """
+        returns how the blocking module should block ips
+        [ipset, iptables, dry_run]
+        """
+        backend = self.read_configuration("blocking", "backend", "ipset")
+        if backend not in ("ipset", "iptables", "dry_run"):
+            return "ipset"
+        return backend
+
     def timeline_human_timestamp(self):
         return self.read_configuration(
             "modules", "timeline_human_timestamp", False
@@ -484,6 +604,30 @@ class ConfigParser(object):
             update_period = 259200
         return update_period
 
+    def virustotal_requests_per_minute(self) -> float:
+        requests_per_minute = self.read_configuration(
+            "virustotal", "api_requests_per_minute", 4
+        )
+        try:
+            requests_per_minute = float(requests_per_minute)
+        except ValueError:
+            requests_per_minute = 4
+        if requests_per_minute <= 0:
+            requests_per_minute = 4
+        return requests_per_minute
+
+    def virustotal_max_queued_lookups(self) -> int:
+        max_queued = self.read_configuration(
+            "virustotal", "max_queued_lookups", 10000
+        )
+        try:
+            max_queued = int(max_queued)
+        except ValueError:
+            max_queued = 10000
+        if max_queued <= 0:
+            max_queued = 10000
+        return max_queued
+
     def riskiq_update_period(self):
         update_period = self.read_configuration(
             "threatintelligence", "update_period", 604800
@@ -697,3 +841,28 @@ class ConfigParser(object):
         return self.read_configuration(
             "Profiling", "memory_profiler_multiprocess", True
         )
+
+    def message_transport(self) -> str:
+        transport = self.read_configuration(
+            "redis", "message_transport", "pubsub"
+        )
+        transport = str(transport).lower()
+        if transport not in ("pubsub", "streams"):
+            return "pubsub"
+        return transport
+
+    def stream_max_len(self) -> int:
+        try:
+            return int(
+                self.read_configuration("redis", "stream_max_len", 100000)
+            )
+        except ValueError:
+            return 100000
+
+    def stream_batch_size(self) -> int:
+        try:
+            return int(
+                self.read_configuration("redis", "stream_batch_size", 100)
+            )
+        except ValueError:
+            return 100
@@ -1,4 +1,5 @@
 from typing import (
+    Callable,
     List,
     Dict,
 )
@@ -28,9 +29,13 @@ class DBManager:
         redis_port,
         start_sqlite=True,
         start_redis_server=True,
+        consumer_group=None,
         **kwargs,
     ):
         self.output_dir = output_dir
+        # the consumer group used when subscribing to channels, only used
+        # by the streams msg transport
+        self.consumer_group = consumer_group
         self.redis_port = redis_port
         self.logger = logger
         self.printer = Printer(self.logger, self.name)
@@ -69,8 +74,19 @@ class DBManager:
         return self.rdb.publish(*args, **kwargs)
 
     def subscribe(self, *args, **kwargs):
+        kwargs.setdefault("consumer_group", self.consumer_group)
         return self.rdb.subscribe(*args, **kwargs)
 
+    def subscribe_to_channels(self, *args, **kwargs):
+        kwargs.setdefault("consumer_group", self.consumer_group)
+        return self.rdb.subscribe_to_channels(*args, **kwargs)
+
+    def get_messages(self, *args, **kwargs):
+        return self.rdb.get_messages(*args, **kwargs)
+
+    def get_msgs_lag(self, *args, **kwargs):
+        return self.rdb.get_msgs_lag(*args, **kwargs)
+
     def publish_stop(self, *args, **kwargs):
         return self.rdb.publish_stop(*args, **kwargs)
 
@@ -83,6 +99,18 @@ class DBManager:
     def get_ip_info(self, *args, **kwargs):
         return self.rdb.get_ip_info(*args, **kwargs)
 
+    def get_jarm_hash(self, *args, **kwargs):
+        return self.rdb.get_jarm_hash(*args, **kwargs)
+
+    def set_jarm_hash(self, *args, **kwargs):
+        return self.rdb.set_jarm_hash(*args, **kwargs)
+
+    def get_cached_user_agent_info(self, *args, **kwargs):
+        return self.rdb.get_cached_user_agent_info(*args, **kwargs)
+
+    def set_cached_user_agent_info(self, *args, **kwargs):
+        return self.rdb.set_cached_user_agent_info(*args, **kwargs)
+
     def set_new_ip(self, *args, **kwargs):
         return self.rdb.set_new_ip(*args, **kwargs)
 
@@ -95,6 +123,12 @@ class DBManager:
     def ask_for_ip_info(self, *args, **kwargs):
         return self.rdb.ask_for_ip_info(*args, **kwargs)
 
+    def store_suppressed_ip_info_requests(self, *args, **kwargs):
+        return self.rdb.store_suppressed_ip_info_requests(*args, **kwargs)
+
+    def get_suppressed_ip_info_requests(self, *args, **kwargs):
+        return self.rdb.get_suppressed_ip_info_requests(*args, **kwargs)
+
     @classmethod
     def discard_obj(cls):
         """
@@ -121,6 +155,12 @@ class DBManager:
     def get_malicious_profiles(self, *args, **kwargs):
         return self.rdb.get_malicious_profiles(*args, **kwargs)
 
+    def get_malicious_profiles_len(self, *args, **kwargs):
+        return self.rdb.get_malicious_profiles_len(*args, **kwargs)
+
+    def get_alerted_tws(self, *args, **kwargs):
+        return self.rdb.get_alerted_tws(*args, **kwargs)
+
     def get_asn_info(self, *args, **kwargs):
         return self.rdb.get_asn_info(*args, **kwargs)
 
@@ -304,8 +344,8 @@ class DBManager:
     def get_passive_dns(self, *args, **kwargs):
         return self.rdb.get_passive_dns(*args, **kwargs)
 
-    def get_reconnections_for_tw(self, *args, **kwargs):
-        return self.rdb.get_reconnections_for_tw(*args, **kwargs)
+    def get_reconnections_for_tw(self, profileid, twid):
+        return self.read_tw(self.rdb.get_reconnections_for_tw, profileid, twid)
 
     def set_reconnections(self, *args, **kwargs):
         return self.rdb.set_reconnections(*args, **kwargs)
@@ -364,6 +404,18 @@ class DBManager:
     def load(self, *args, **kwargs):
         return self.rdb.load(*args, **kwargs)
 
+    def start_background_save(self, *args, **kwargs):
+        return self.rdb.start_background_save(*args, **kwargs)
+
+    def get_background_save_status(self, *args, **kwargs):
+        return self.rdb.get_background_save_status(*args, **kwargs)
+
+    def get_rdb_path(self, *args, **kwargs):
+        return self.rdb.get_rdb_path(*args, **kwargs)
+
+    def backup_sqlite_db(self, *args, **kwargs):
+        return self.sqlite.backup(*args, **kwargs)
+
     def is_valid_rdb_file(self, *args, **kwargs):
         return self.rdb.is_valid_rdb_file(*args, **kwargs)
 
@@ -391,11 +443,19 @@ class DBManager:
     def set_evidence_causing_alert(self, *args, **kwargs):
         return self.rdb.set_evidence_causing_alert(*args, **kwargs)
 
-    def get_evidence_causing_alert(self, *args, **kwargs):
-        return self.rdb.get_evidence_causing_alert(*args, **kwargs)
+    def get_evidence_causing_alert(self, profileid, twid, *args, **kwargs):
+        return self.read_tw(
+            self.rdb.get_evidence_causing_alert,
+            profileid,
+            twid,
+            *args,
+            **kwargs,
+        )
 
-    def get_evidence_by_id(self, *args, **kwargs):
-        return self.rdb.get_evidence_by_id(*args, **kwargs)
+    def get_evidence_by_id(self, profileid, twid, *args, **kwargs):
+        return self.read_tw(
+            self.rdb.get_evidence_by_id, profileid, twid, *args, **kwargs
+        )
 
     def is_detection_disabled(self, *args, **kwargs):
         return self.rdb.is_detection_disabled(*args, **kwargs)
@@ -452,11 +512,19 @@ class DBManager:
     def remove_whitelisted_evidence(self, *args, **kwargs):
         return self.rdb.remove_whitelisted_evidence(*args, **kwargs)
 
-    def get_profileid_twid_alerts(self, *args, **kwargs):
-        return self.rdb.get_profileid_twid_alerts(*args, **kwargs)
+    def get_profileid_twid_alerts(self, profileid, twid, *args, **kwargs):
+        return self.read_tw(
+            self.rdb.get_profileid_twid_alerts,
+            profileid,
+            twid,
+            *args,
+            **kwargs,
+        )
 
-    def get_twid_evidence(self, *args, **kwargs):
-        return self.rdb.get_twid_evidence(*args, **kwargs)
+    def get_twid_evidence(self, profileid, twid, *args, **kwargs):
+        return self.read_tw(
+            self.rdb.get_twid_evidence, profileid, twid, *args, **kwargs
+        )
 
     def update_threat_level(self, *args, **kwargs):
         return self.rdb.update_threat_level(*args, **kwargs)
@@ -515,8 +583,8 @@ class DBManager:
     def get_all_blacklisted_domains(self, *args, **kwargs):
         return self.rdb.get_all_blacklisted_domains(*args, **kwargs)
 
-    def get_all_blacklisted_ja3(self, *args, **kwargs):
-        return self.rdb.get_all_blacklisted_ja3(*args, **kwargs)
+    def is_blacklisted_ja3(self, *args, **kwargs):
+        return self.rdb.is_blacklisted_ja3(*args, **kwargs)
 
     def is_blacklisted_jarm(self, *args, **kwargs):
         return self.rdb.is_blacklisted_jarm(*args, **kwargs)
@@ -560,14 +628,28 @@ class DBManager:
     def cache_url_info_by_virustotal(self, *args, **kwargs):
         return self.rdb.cache_url_info_by_virustotal(*args, **kwargs)
 
-    def get_data_from_profile_tw(self, *args, **kwargs):
-        return self.rdb.get_data_from_profile_tw(*args, **kwargs)
+    def get_data_from_profile_tw(self, profileid, twid, *args, **kwargs):
+        return self.read_tw(
+            self.rdb.get_data_from_profile_tw, profileid, twid, *args, **kwargs
+        )
 
-    def get_outtuples_from_profile_tw(self, *args, **kwargs):
-        return self.rdb.get_outtuples_from_profile_tw(*args, **kwargs)
+    def get_outtuples_from_profile_tw(self, profileid, twid, *args, **kwargs):
+        return self.read_tw(
+            self.rdb.get_outtuples_from_profile_tw,
+            profileid,
+            twid,
+            *args,
+            **kwargs,
+        )
 
-    def get_intuples_from_profile_tw(self, *args, **kwargs):
-        return self.rdb.get_intuples_from_profile_tw(*args, **kwargs)
+    def get_intuples_from_profile_tw(self, profileid, twid, *args, **kwargs):
+        return self.read_tw(
+            self.rdb.get_intuples_from_profile_tw,
+            profileid,
+            twid,
+            *args,
+            **kwargs,
+        )
 
     def incr_msgs_received_in_channel(self, *args, **kwargs):
         return self.rdb.incr_msgs_received_in_channel(*args, **kwargs)
@@ -611,6 +693,12 @@ class DBManager:
     def get_all_flows_in_profileid_twid(self, *args, **kwargs):
         return self.sqlite.get_all_flows_in_profileid_twid(*args, **kwargs)
 
+    def get_flows_page(self, *args, **kwargs):
+        return self.sqlite.get_flows_page(*args, **kwargs)
+
+    def get_tw_flows_count(self, *args, **kwargs):
+        return self.sqlite.get_tw_flows_count(*args, **kwargs)
+
     def get_all_flows_in_profileid(self, *args, **kwargs):
         return self.sqlite.get_all_flows_in_profileid(*args, **kwargs)
 
@@ -655,6 +743,18 @@ class DBManager:
     def get_processed_flows_so_far(self, *args, **kwargs):
         return self.rdb.get_processed_flows_so_far(*args, **kwargs)
 
+    def get_input_offsets(self, *args, **kwargs):
+        return self.rdb.get_input_offsets(*args, **kwargs)
+
+    def delete_input_offsets(self, *args, **kwargs):
+        return self.rdb.delete_input_offsets(*args, **kwargs)
+
+    def set_checkpoint_snapshot(self, *args, **kwargs):
+        return self.rdb.set_checkpoint_snapshot(*args, **kwargs)
+
+    def get_checkpoint_snapshot(self, *args, **kwargs):
+        return self.rdb.get_checkpoint_snapshot(*args, **kwargs)
+
     def add_out_ssh(self, *args, **kwargs):
         return self.rdb.add_out_ssh(*args, **kwargs)
 
@@ -673,6 +773,12 @@ class DBManager:
     def get_profiles(self, *args, **kwargs):
         return self.rdb.get_profiles(*args, **kwargs)
 
+    def scan_profiles(self, *args, **kwargs):
+        return self.rdb.scan_profiles(*args, **kwargs)
+
+    def get_tw_modification_time(self, *args, **kwargs):
+        return self.rdb.get_tw_modification_time(*args, **kwargs)
+
     def get_number_of_alerts_so_far(self, *args, **kwargs):
         return self.rdb.get_number_of_alerts_so_far(*args, **kwargs)
 
@@ -682,11 +788,15 @@ class DBManager:
     def get_number_of_tws_in_profile(self, *args, **kwargs):
         return self.rdb.get_number_of_tws_in_profile(*args, **kwargs)
 
-    def get_srcips_from_profile_tw(self, *args, **kwargs):
-        return self.rdb.get_srcips_from_profile_tw(*args, **kwargs)
+    def get_srcips_from_profile_tw(self, profileid, twid):
+        return self.read_tw(
+            self.rdb.get_srcips_from_profile_tw, profileid, twid
+        )
 
-    def get_dstips_from_profile_tw(self, *args, **kwargs):
-        return self.rdb.get_dstips_from_profile_tw(*args, **kwargs)
+    def get_dstips_from_profile_tw(self, profileid, twid):
+        return self.read_tw(
+            self.rdb.get_dstips_from_profile_tw, profileid, twid
+        )
 
     def get_t2_for_profile_tw(self, *args, **kwargs):
         return self.rdb.get_t2_for_profile_tw(*args, **kwargs)
@@ -800,11 +910,26 @@ class DBManager:
     def add_timeline_line(self, *args, **kwargs):
         return self.rdb.add_timeline_line(*args, **kwargs)
 
-    def get_timeline_last_lines(self, *args, **kwargs):
-        return self.rdb.get_timeline_last_lines(*args, **kwargs)
+    def add_timeline_lines(self, *args, **kwargs):
+        return self.rdb.add_timeline_lines(*args, **kwargs)
+
+    def get_timeline_last_lines(self, profileid, twid, first_index: int):
+        lines, last_index = self.rdb.get_timeline_last_lines(
+            profileid, twid, first_index
+        )
+        if not last_index and self.restore_archived_tw(profileid, twid):
+            return self.rdb.get_timeline_last_lines(
+                profileid, twid, first_index
+            )
+        return lines, last_index
+
+    def get_profiled_tw_timeline(self, profileid, twid, *args, **kwargs):
+        return self.read_tw(
+            self.rdb.get_profiled_tw_timeline, profileid, twid, *args, **kwargs
+        )
 
-    def get_profiled_tw_timeline(self, *args, **kwargs):
-        return self.rdb.get_profiled_tw_timeline(*args, **kwargs)
+    def get_timeline_len(self, profileid, twid):
+        return self.read_tw(self.rdb.get_timeline_len, profileid, twid)
 
     def mark_profile_as_gateway(self, *args, **kwargs):
         return self.rdb.mark_profile_as_gateway(*args, **kwargs)
@@ -818,6 +943,65 @@ class DBManager:
     def get_mac_vendor_from_profile(self, *args, **kwargs):
         return self.rdb.get_mac_vendor_from_profile(*args, **kwargs)
 
+    def archive_tw(self, profileid: str, twid: str) -> bool:
+        """
+        Uses sqlite and rdb
+        moves the data of the given closed tw from redis to sqlite.
+        returns True if the tw was archived
+        """
+        if self.rdb.is_tw_archived(profileid, twid):
+            # the tw was modified after being archived, archive the old
+            # and the new data together
+            self.restore_archived_tw(profileid, twid)
+
+        return self.rdb.archive_tw(
+            profileid,
+            twid,
+            lambda dumps: self.sqlite.archive_tw(profileid, twid, dumps),
+        )
+
+    def restore_archived_tw(self, profileid: str, twid: str) -> bool:
+        """
+        Uses sqlite and rdb
+        reads the data of the given archived tw back from sqlite to redis.
+        returns False if the tw isn't archived
+        """
+        if not self.sqlite or not self.rdb.is_tw_archived(profileid, twid):
+            return False
+
+        dumps: Dict[str, bytes] = self.sqlite.get_archived_tw(profileid, twid)
+        self.rdb.restore_tw(profileid, twid, dumps)
+        self.sqlite.delete_archived_tw(profileid, twid)
+        return True
+
+    def read_tw(self, getter: Callable, profileid, twid, *args, **kwargs):
+        """
+        calls the given rdb getter of the data of a tw. if the tw was
+        archived, it's read back from sqlite and the getter is called again.
+        used by the getters of the tw hash (tuples, ips, reconnections,
+        evidence and alerts) and of the tw timeline. the getters of the
+        start time and of the tws of a profile don't need it, the tws
+        sorted sets of the profiles aren't archived
+        """
+        if res := getter(profileid, twid, *args, **kwargs):
+            return res
+
+        if self.restore_archived_tw(profileid, twid):
+            return getter(profileid, twid, *args, **kwargs)
+        return res
+
+    def get_closed_tws_to_archive(self, *args, **kwargs):
+        return self.rdb.get_closed_tws_to_archive(*args, **kwargs)
+
+    def get_closed_tws_to_archive_len(self, *args, **kwargs):
+        return self.rdb.get_closed_tws_to_archive_len(*args, **kwargs)
+
+    def is_tw_archived(self, *args, **kwargs):
+        return self.rdb.is_tw_archived(*args, **kwargs)
+
+    def get_used_memory(self, *args, **kwargs):
+        return self.rdb.get_used_memory(*args, **kwargs)
+
     def label_flows_causing_alert(self, evidence_ids: List[str]):
         """
         Uses sqlite and rdb
@@ -878,6 +1062,15 @@ class DBManager:
     def set_slips_internal_time(self, ts):
         return self.rdb.set_slips_internal_time(ts)
 
+    def set_flow_time(self, *args, **kwargs):
+        return self.rdb.set_flow_time(*args, **kwargs)
+
+    def get_flow_time(self, *args, **kwargs):
+        return self.rdb.get_flow_time(*args, **kwargs)
+
+    def get_time(self, *args, **kwargs):
+        return self.rdb.get_time(*args, **kwargs)
+
     def add_altflow(self, *args, **kwargs):
         return self.sqlite.add_altflow(*args, **kwargs)
 
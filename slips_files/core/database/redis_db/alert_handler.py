@@ -51,7 +51,10 @@ class AlertHandler:
 
     def get_malicious_profiles(self):
         """returns profiles that generated an alert"""
-        self.r.smembers(self.constants.MALICIOUS_PROFILES)
+        return self.r.smembers(self.constants.MALICIOUS_PROFILES)
+
+    def get_malicious_profiles_len(self) -> int:
+        return self.r.scard(self.constants.MALICIOUS_PROFILES)
 
     def set_evidence_causing_alert(self, alert: Alert):
         """
@@ -304,6 +307,27 @@ class AlertHandler:
         alerts: dict = json.loads(alerts)
         return alerts
 
+    def get_alerted_tws(self, profileid: str, twids: List[str]) -> List[str]:
+        """
+        returns the tws of the given ones that have alerts in the given
+        profile, in one round trip to redis. archived tws are included
+        without reading them back from sqlite
+        """
+        pipe = self.r.pipeline()
+        for twid in twids:
+            pipe.hexists(f"{profileid}_{twid}", "alerts")
+            pipe.sismember(
+                self.constants.ARCHIVED_ALERTED_TWS, f"{profileid}_{twid}"
+            )
+        res = pipe.execute()
+        return [
+            twid
+            for twid, alerted, archived_alerted in zip(
+                twids, res[::2], res[1::2]
+            )
+            if alerted or archived_alerted
+        ]
+
     def get_twid_evidence(self, profileid: str, twid: str) -> Dict[str, dict]:
         """Get the evidence for this TW for this Profile"""
         evidence: Dict[str, dict] = self.r.hgetall(
@@ -426,15 +450,15 @@ class AlertHandler:
         # set the score and confidence of the given ip in the db
         # when it causes an evidence
         # these 2 values will be needed when sharing with peers
-        score_confidence = {"score": max_threat_lvl, "confidence": confidence}
         ip = profileid.split("_")[-1]
-
-        if cached_ip_info := self.get_ip_info(ip):
-            # append the score and confidence to the already existing data
-            cached_ip_info.update(score_confidence)
-            score_confidence = cached_ip_info
-
-        self.rcache.hset("IPsInfo", ip, json.dumps(score_confidence))
+        # only the score and confidence fields of the ip info are updated
+        self.rcache.hset(
+            f"{self.constants.IPS_INFO}_{ip}",
+            mapping={
+                "score": json.dumps(max_threat_lvl),
+                "confidence": json.dumps(confidence),
+            },
+        )
 
     def update_threat_level(
         self, profileid: str, threat_level: str, confidence: float
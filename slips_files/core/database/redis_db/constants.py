@@ -11,13 +11,27 @@ class Constants:
     IOC_JA3 = "IoC_JA3"
     IOC_JARM = "IoC_JARM"
     IOC_SSL = "IoC_SSL"
+    # incremented every time one of the IoC_JA3, IoC_JARM or IoC_SSL keys
+    # is updated, used to invalidate the fingerprints cache of all processes
+    IOC_FINGERPRINTS_VERSION = "IoC_fingerprints_version"
     LABELED_AS_MALICIOUS = "labeled_as_malicious"
     # used to cache url info by the virustotal module only
     VT_CACHED_URL_INFO = "virustotal_cached_url_info"
     # used for Kalipso
     DOMAINS_INFO = "DomainsInfo"
+    # prefix of the hashes storing the info of each ip, with one field
+    # per info type, e.g. IPsInfo_1.1.1.1 {"asn": .., "geocountry": ..}
     IPS_INFO = "IPsInfo"
+    # the ips seen so far, used to know if an ip is new
+    KNOWN_IPS = "known_ips"
+    # the info of all ips stored as one json dict per ip, used by older
+    # versions of slips
+    LEGACY_IPS_INFO = "IPsInfo"
     PROCESSED_FLOWS = "processed_flows_so_far"
+    # the offset of the line after the last processed flow of each zeek file
+    INPUT_OFFSETS = "input_offsets"
+    # the reply of the evidence handler to the last checkpoint request
+    CHECKPOINT_SNAPSHOT = "checkpoint_snapshot"
     MALICIOUS_PROFILES = "malicious_profiles"
     FLOWS_CAUSING_EVIDENCE = "flows_causing_evidence"
     PROCESSED_EVIDENCE = "processed_evidence"
@@ -28,7 +42,17 @@ class Constants:
     # called for every ip in kalipso timeline
     DNS_RESOLUTION = "DNSresolution"
     DOMAINS_RESOLVED = "DomainsResolved"
-    CACHED_ASN = "cached_asn"
+    # suffix of the sorted set of the ips resolved by each profile, e.g.
+    # profile_1.1.1.1_resolved_ips {ip: number of the last tw it was
+    # resolved in}
+    RESOLVED_IPS = "resolved_ips"
+    DNS_RESOLUTIONS_MIGRATED = "dns_resolutions_migrated"
+    CACHED_ASN = "cached_asn_ranges"
+    # prefix of the keys caching the jarm of each ip and port
+    CACHED_JARM = "cached_jarm"
+    CACHED_USER_AGENT = "cached_user_agent"
+    # ASN ranges sorted by first octet, used by older versions of slips
+    LEGACY_CACHED_ASN = "cached_asn"
     PIDS = "PIDs"
     MAC = "MAC"
     MODIFIED_TIMEWINDOWS = "ModifiedTW"
@@ -40,6 +64,9 @@ class Constants:
     DHCP_SERVERS = "DHCP_servers"
     LABELS = "labels"
     MSGS_PUBLISHED_AT_RUNTIME = "msgs_published_at_runtime"
+    # number of ip info requests that weren't published because the same
+    # ip was asked about in the same tw recently
+    SUPPRESSED_IP_INFO_REQUESTS = "suppressed_ip_info_requests"
     ZEEK_FILES = "zeekfiles"
     DEFAULT_GATEWAY = "default_gateway"
     IS_CYST_ENABLED = "is_cyst_enabled"
@@ -50,6 +77,7 @@ class Constants:
     SLIPS_START_TIME = "slips_start_time"
     USED_FTP_PORTS = "used_ftp_ports"
     SLIPS_INTERNAL_TIME = "slips_internal_time"
+    FLOW_TIME = "flow_time"
     WARDEN_INFO = "Warden"
     MODE = "mode"
     ANALYSIS = "analysis"
@@ -63,6 +91,9 @@ class Constants:
     PROFILES = "profiles"
     NUMBER_OF_ALERTS = "number_of_alerts"
     KNOWN_FPS = "known_fps"
+    CLOSED_TWS_TO_ARCHIVE = "closed_tws_to_archive"
+    ARCHIVED_TWS = "archived_tws"
+    ARCHIVED_ALERTED_TWS = "archived_alerted_tws"
 
 
 class Channels:
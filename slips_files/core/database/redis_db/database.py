@@ -1,3 +1,4 @@
+from slips_files.common.data_structures.request_ledger import RequestLedger
 from slips_files.common.printer import Printer
 from slips_files.common.slips_utils import utils
 from slips_files.common.parsers.config_parser import ConfigParser
@@ -8,8 +9,13 @@ from slips_files.core.database.redis_db.constants import (
 from slips_files.core.database.redis_db.ioc_handler import IoCHandler
 from slips_files.core.database.redis_db.alert_handler import AlertHandler
 from slips_files.core.database.redis_db.profile_handler import ProfileHandler
+from slips_files.core.database.redis_db.stream_subscription import (
+    StreamSubscription,
+)
 
 import os
+import shlex
+import shutil
 import signal
 import redis
 import time
@@ -18,14 +24,26 @@ import subprocess
 import ipaddress
 import sys
 import validators
+from uuid import uuid4
 from typing import (
     List,
     Dict,
     Optional,
     Tuple,
+    Union,
 )
 
 RUNNING_IN_DOCKER = os.environ.get("IS_IN_A_DOCKER_CONTAINER", False)
+# number of (profile, tw, ip) whose info was requested that are remembered
+# to avoid requesting it again
+IP_INFO_REQUESTS_TO_REMEMBER = 100000
+# the suppressed ip info requests are counted in the db in batches of this
+# size
+SUPPRESSED_REQUESTS_BATCH = 1000
+# hours to keep the ips resolved by each profile for is_ip_resolved()
+RESOLVED_IPS_TO_KEEP_HRS = 24
+# seconds to wait for redis to write a snapshot when saving the db
+SNAPSHOT_TIMEOUT = 600
 
 
 class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
@@ -77,10 +95,21 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         "report_to_peers",
         "new_tunnel",
         "check_jarm_hash",
+        "take_checkpoint",
         "control_channel",
+        "restore_archived_tw",
         "new_module_flow" "cpu_profile",
         "memory_profile",
     }
+    # channels used to talk to processes outside of slips, like the p2p
+    # pigeon, kalipso and slips.py itself, these always use redis pub/sub
+    # even when the streams transport is used
+    pubsub_only_channels = (
+        "p2p_gopy",
+        "p2p_pygo",
+        "control_channel",
+        "restore_archived_tw",
+    )
     separator = "_"
     normal_label = "benign"
     malicious_label = "malicious"
@@ -107,15 +136,23 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
     connection_retry = 0
 
     def __new__(
-        cls, logger, redis_port, start_redis_server=True, flush_db=True
+        cls,
+        logger,
+        redis_port,
+        start_redis_server=True,
+        flush_db=True,
+        rdb_to_load: Optional[str] = None,
     ):
         """
         treat the db as a singelton per port
         meaning every port will have exactly 1 single obj of this db
         at any given time
+        :param rdb_to_load: path of an .rdb file to start the redis server
+            with, e.g. the snapshot of a checkpoint when using --resume
         """
         cls.redis_port = redis_port
         cls.flush_db = flush_db
+        cls.rdb_to_load = rdb_to_load
         # start the redis server using cli if it's not started?
         cls.start_server = start_redis_server
         cls.printer = Printer(logger, cls.name)
@@ -132,6 +169,8 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
 
             cls._instances[cls.redis_port] = super().__new__(cls)
             super().__init__(cls)
+            # the db was just started or flushed
+            cls._instances[cls.redis_port].reset_ip_info_requests()
 
             # By default the slips internal time is
             # 0 until we receive something
@@ -190,6 +229,14 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         cls.disabled_detections: List[str] = conf.disabled_detections()
         cls.width = conf.get_tw_width_as_float()
         cls.client_ips: List[str] = conf.client_ips()
+        cls.message_transport: str = conf.message_transport()
+        cls.stream_max_len: int = conf.stream_max_len()
+        cls.stream_batch_size: int = conf.stream_batch_size()
+        # the closed tws are only queued to be moved to sqlite if the
+        # RetentionManager is going to move them
+        cls.archive_closed_tws: bool = bool(
+            conf.keep_closed_tws() or conf.max_redis_memory()
+        )
 
     @classmethod
     def set_slips_internal_time(cls, timestamp):
@@ -231,6 +278,7 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
                     "-S" in sys.argv or "-cb" in sys.argv or "-d" in sys.argv
                 )
                 and cls.flush_db
+                and not cls.rdb_to_load
             ):
                 # when stopping the daemon, don't flush bc we need to get
                 # the PIDS to close slips files
@@ -242,6 +290,8 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
             # The original values were 50MB for maxmem and 8MB for soft limit.
             cls.change_redis_limits(cls.r)
             cls.change_redis_limits(cls.rcache)
+            cls._migrate_legacy_ips_info()
+            cls._migrate_legacy_dns_resolutions()
 
             # to fix redis.exceptions.ResponseError MISCONF Redis is
             # configured to save RDB snapshots
@@ -261,7 +311,9 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
             )
 
     @staticmethod
-    def _connect(port: int, db: int) -> redis.StrictRedis:
+    def _connect(
+        port: int, db: int, decode_responses=True
+    ) -> redis.StrictRedis:
         # set health_check_interval to avoid redis ConnectionReset errors:
         # if the connection is idle for more than health_check_interval seconds,
         # a round trip PING/PONG will be attempted before next redis cmd.
@@ -276,7 +328,7 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
             db=db,
             charset="utf-8",
             socket_keepalive=True,
-            decode_responses=True,
+            decode_responses=decode_responses,
             retry_on_timeout=True,
             health_check_interval=20,
         )
@@ -287,6 +339,12 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
             f"redis-server {cls._conf_file} --port {cls.redis_port} "
             f" --daemonize yes"
         )
+        if cls.rdb_to_load:
+            # redis loads the given .rdb when it starts
+            cmd += (
+                f" --dir {shlex.quote(os.path.dirname(cls.rdb_to_load))}"
+                f" --dbfilename {shlex.quote(os.path.basename(cls.rdb_to_load))}"
+            )
         process = subprocess.Popen(
             cmd,
             cwd=os.getcwd(),
@@ -319,6 +377,10 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         try:
             # db 0 changes everytime we run slips
             cls.r = cls._connect(cls.redis_port, 0)
+            # used for DUMP and RESTORE, their values aren't utf-8 strings
+            cls.rbinary = cls._connect(
+                cls.redis_port, 0, decode_responses=False
+            )
             # port 6379 db 0 is cache, delete it using -cc flag
             cls.rcache = cls._connect(6379, 1)
 
@@ -365,28 +427,133 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         now = time.time()
         cls.r.set(cls.constants.SLIPS_START_TIME, now)
 
+    def _uses_streams(self, channel: str) -> bool:
+        """
+        returns True if msgs of the given channel are sent using
+        redis streams instead of pub/sub
+        """
+        return self.message_transport == "streams" and not channel.startswith(
+            self.pubsub_only_channels
+        )
+
+    @staticmethod
+    def _get_stream_key(channel: str) -> str:
+        """returns the key of the redis stream of the given channel"""
+        return f"{channel}_stream"
+
     def publish(self, channel, msg):
         """Publish a msg in the given channel"""
         # keeps track of how many msgs were published in the given channel
         self.r.hincrby(self.constants.MSGS_PUBLISHED_AT_RUNTIME, channel, 1)
+        if self._uses_streams(channel):
+            # old msgs are trimmed once the stream reaches its max len
+            self.r.xadd(
+                self._get_stream_key(channel),
+                {"data": msg},
+                maxlen=self.stream_max_len,
+                approximate=True,
+            )
+            return
         self.r.publish(channel, msg)
 
     def get_msgs_published_in_channel(self, channel: str) -> int:
         """returns the number of msgs published in a channel"""
         return self.r.hget(self.constants.MSGS_PUBLISHED_AT_RUNTIME, channel)
 
-    def subscribe(self, channel: str, ignore_subscribe_messages=True):
-        """Subscribe to channel"""
+    def subscribe(
+        self,
+        channel: str,
+        ignore_subscribe_messages=True,
+        consumer_group: Optional[str] = None,
+    ) -> Union[redis.client.PubSub, StreamSubscription, bool]:
+        """
+        Subscribe to channel
+        :param consumer_group: when using the streams transport, every
+        consumer group receives all the msgs of the channel. modules use
+        their name as the consumer group. if not given, a unique group is
+        created for this subscription
+        """
         # For when a TW is modified
         if channel not in self.supported_channels:
             return False
 
+        if self._uses_streams(channel):
+            return StreamSubscription(
+                self.r,
+                {channel: self._get_stream_key(channel)},
+                consumer_group or f"{channel}_{uuid4()}",
+                self.stream_batch_size,
+            )
+
         self.pubsub = self.r.pubsub()
         self.pubsub.subscribe(
             channel, ignore_subscribe_messages=ignore_subscribe_messages
         )
         return self.pubsub
 
+    def subscribe_to_channels(
+        self,
+        channels: List[str],
+        consumer_group: Optional[str] = None,
+    ) -> Union[redis.client.PubSub, StreamSubscription, bool]:
+        """
+        Subscribes to all the given channels using one subscription, so
+        that msgs of all of them can be waited for at once using
+        get_messages()
+        returns False if none of the given channels is supported
+        """
+        channels = [ch for ch in channels if ch in self.supported_channels]
+        if not channels:
+            return False
+
+        uses_streams = {self._uses_streams(channel) for channel in channels}
+        if len(uses_streams) > 1:
+            raise ValueError(
+                "Can't use one subscription for channels that use redis "
+                "streams and channels that use pub/sub."
+            )
+
+        if uses_streams.pop():
+            return StreamSubscription(
+                self.r,
+                {ch: self._get_stream_key(ch) for ch in channels},
+                consumer_group or f"{'_'.join(channels)}_{uuid4()}",
+                self.stream_batch_size,
+            )
+
+        pubsub = self.r.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(*channels)
+        return pubsub
+
+    def get_msgs_lag(self, channel: str) -> Dict[str, int]:
+        """
+        When using the streams transport, returns the number of msgs
+        published in the given channel that each consumer group didn't
+        read yet
+        returns {consumer_group: lag}
+        """
+        if not self._uses_streams(channel):
+            return {}
+
+        try:
+            groups: List[dict] = self.r.xinfo_groups(
+                self._get_stream_key(channel)
+            )
+        except redis.exceptions.ResponseError:
+            # the stream doesn't exist
+            return {}
+
+        lag = {}
+        for group in groups:
+            # the lag field is only available in redis >= 7, before that
+            # the best we can do is the number of msgs delivered and not
+            # acked yet
+            group_lag = group.get("lag")
+            if group_lag is None:
+                group_lag = group.get("pending", 0)
+            lag[group["name"]] = int(group_lag)
+        return lag
+
     def publish_stop(self):
         """
         Publish stop command to terminate slips
@@ -405,44 +572,141 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         try:
             return channel.get_message(timeout=timeout)
         except redis.exceptions.ConnectionError as ex:
-            # make sure we log the error only once
-            if not self.is_connection_error_logged():
-                self.mark_connection_error_as_logged()
-
-            if self.connection_retry >= self.max_retries:
-                self.publish_stop()
-                self.print(
-                    f"Stopping slips due to "
-                    f"redis.exceptions.ConnectionError: {ex}",
-                    1,
-                    1,
-                )
-            else:
-                # don't log this each retry
-                if self.connection_retry % 10 == 0:
-                    # retry to connect after backing off for a while
-                    self.print(
-                        f"redis.exceptions.ConnectionError: "
-                        f"retrying to connect in {self.backoff}s. "
-                        f"Retries to far: {self.connection_retry}",
-                        0,
-                        1,
-                    )
-                time.sleep(self.backoff)
-                self.backoff = self.backoff * 2
-                self.connection_retry += 1
+            if self._handle_connection_error(ex):
                 self.get_message(channel, timeout)
 
+    def get_messages(
+        self,
+        subscription: Union[redis.client.PubSub, StreamSubscription],
+        timeout: float,
+        max_msgs: int,
+    ) -> List[dict]:
+        """
+        Blocks up to the given timeout until msgs are received in any of
+        the channels of the given subscription, and returns all the
+        received msgs, up to max_msgs
+        :param subscription: the return value of subscribe_to_channels()
+        """
+        try:
+            if isinstance(subscription, StreamSubscription):
+                return subscription.get_messages(timeout=timeout)
+
+            msgs = []
+            msg = subscription.get_message(timeout=timeout)
+            while msg:
+                msgs.append(msg)
+                if len(msgs) >= max_msgs:
+                    break
+                # don't block waiting for the rest of the msgs
+                msg = subscription.get_message(timeout=0.0)
+            return msgs
+        except redis.exceptions.ConnectionError as ex:
+            if self._handle_connection_error(ex):
+                return self.get_messages(subscription, timeout, max_msgs)
+            return []
+
+    def _handle_connection_error(self, ex) -> bool:
+        """
+        backs off before retrying to read msgs after a
+        redis.exceptions.ConnectionError
+        returns True if the caller should retry, False if slips
+        is stopping because of the error
+        """
+        # make sure we log the error only once
+        if not self.is_connection_error_logged():
+            self.mark_connection_error_as_logged()
+
+        if self.connection_retry >= self.max_retries:
+            self.publish_stop()
+            self.print(
+                f"Stopping slips due to "
+                f"redis.exceptions.ConnectionError: {ex}",
+                1,
+                1,
+            )
+            return False
+
+        # don't log this each retry
+        if self.connection_retry % 10 == 0:
+            # retry to connect after backing off for a while
+            self.print(
+                f"redis.exceptions.ConnectionError: "
+                f"retrying to connect in {self.backoff}s. "
+                f"Retries to far: {self.connection_retry}",
+                0,
+                1,
+            )
+        time.sleep(self.backoff)
+        self.backoff = self.backoff * 2
+        self.connection_retry += 1
+        return True
+
     def print(self, *args, **kwargs):
         return self.printer.print(*args, **kwargs)
 
-    def get_ip_info(self, ip: str) -> Optional[dict]:
+    def _get_ip_info_key(self, ip: str) -> str:
+        return f"{self.constants.IPS_INFO}_{ip}"
+
+    def get_ip_info(
+        self, ip: str, fields: Optional[List[str]] = None
+    ) -> Optional[dict]:
+        """
+        Return information about this IP from its IPsInfo hash
+        :param fields: the info types to get, e.g. ["asn", "SNI"]. all of
+        them are returned if not given
+        :return: a dictionary or None if there is no info about this IP
+        """
+        key = self._get_ip_info_key(ip)
+        if fields:
+            values = self.rcache.hmget(key, fields)
+            data = {
+                field: value
+                for field, value in zip(fields, values)
+                if value is not None
+            }
+        else:
+            data = self.rcache.hgetall(key)
+        if not data:
+            return None
+        return {field: json.loads(value) for field, value in data.items()}
+
+    def get_jarm_hash(self, ip: str, port: int) -> Optional[str]:
+        """returns the cached jarm of the given ip and port, if any"""
+        return self.rcache.get(f"{self.constants.CACHED_JARM}_{ip}:{port}")
+
+    def set_jarm_hash(self, ip: str, port: int, jarm: str, ttl: int):
         """
-        Return information about this IP from IPsInfo key
-        :return: a dictionary or False if there is no IP in the database
+        caches the jarm of the given ip and port in the cache db for ttl
+        seconds
         """
-        data = self.rcache.hget(self.constants.IPS_INFO, ip)
-        return json.loads(data) if data else None
+        self.rcache.set(
+            f"{self.constants.CACHED_JARM}_{ip}:{port}", jarm, ex=ttl
+        )
+
+    def get_cached_user_agent_info(
+        self, user_agent: str
+    ) -> Optional[Dict[str, str]]:
+        """
+        returns the cached os_type, os_name and browser of the given UA,
+        if any
+        """
+        info = self.rcache.get(
+            f"{self.constants.CACHED_USER_AGENT}_{user_agent}"
+        )
+        return json.loads(info) if info else None
+
+    def set_cached_user_agent_info(
+        self, user_agent: str, info: Dict[str, str], ttl: int
+    ):
+        """
+        caches the os_type, os_name and browser of the given UA in the
+        cache db for ttl seconds
+        """
+        self.rcache.set(
+            f"{self.constants.CACHED_USER_AGENT}_{user_agent}",
+            json.dumps(info),
+            ex=ttl,
+        )
 
     def _get_from_ip_info(self, ip: str, info_to_get: str):
         """
@@ -452,14 +716,10 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         if utils.is_ignored_ip(ip):
             return
 
-        ip_info = self.get_ip_info(ip)
-        if not ip_info:
-            return
-
-        info = ip_info.get(info_to_get)
+        info = self.rcache.hget(self._get_ip_info_key(ip), info_to_get)
         if not info:
             return
-        return info
+        return json.loads(info) or None
 
     def set_new_ip(self, ip: str):
         """
@@ -470,23 +730,41 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         accessed as str, it is automatically
         converted to str
         """
-        data = self.get_ip_info(ip)
-        if data is False:
-            # If there is no data about this IP
-            # Set this IP for the first time in the IPsInfo
-            # Its VERY important that the data of the first time we see an IP
-            # must be '{}', an empty dictionary! if not the logic breaks.
-            # We use the empty dictionary to find if an IP exists or not
-            self.rcache.hset(self.constants.IPS_INFO, ip, "{}")
+        # sadd returns 0 if the ip is known already
+        if self.rcache.sadd(self.constants.KNOWN_IPS, ip):
             # Publish that there is a new IP ready in the channel
             self.publish("new_ip", ip)
 
+    def reset_ip_info_requests(self):
+        """
+        forgets the ip info requests of this process. they're per
+        instance, so dbs on different ports don't share them
+        """
+        # the latest ip info requests of this process
+        self.ip_info_requests = RequestLedger(IP_INFO_REQUESTS_TO_REMEMBER)
+        # the number of suppressed requests already counted in the db
+        self.counted_suppressed_requests = 0
+
     def ask_for_ip_info(
         self, ip, profileid, twid, flow, ip_state, daddr=False
     ):
         """
         is the ip param src or dst
+        the info of the same ip is requested once per tw, the
+        repeated requests of chatty hosts aren't published
         """
+        if not self.ip_info_requests.should_request(
+            (profileid, twid, ip, ip_state)
+        ):
+            # counted in batches to avoid a redis call per flow
+            if (
+                self.ip_info_requests.suppressed
+                - self.counted_suppressed_requests
+                >= SUPPRESSED_REQUESTS_BATCH
+            ):
+                self.store_suppressed_ip_info_requests()
+            return
+
         # if the daddr key arg is not given, we know for sure that the ip
         # given is the daddr
         daddr = daddr or ip
@@ -511,13 +789,59 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         data_to_send.update({"cache_age": cache_age, "ip": str(ip)})
         self.publish("p2p_data_request", json.dumps(data_to_send))
 
+    def store_suppressed_ip_info_requests(self):
+        """
+        counts the suppressed ip info requests that weren't counted in
+        the db yet, should be called when the process asking for ip info
+        stops
+        """
+        suppressed = self.ip_info_requests.suppressed
+        if to_count := suppressed - self.counted_suppressed_requests:
+            self.r.incrby(self.constants.SUPPRESSED_IP_INFO_REQUESTS, to_count)
+            self.counted_suppressed_requests = suppressed
+
+    def get_suppressed_ip_info_requests(self) -> int:
+        """
+        returns the number of ip info requests that weren't published
+        because they were repeated
+        """
+        return int(self.r.get(self.constants.SUPPRESSED_IP_INFO_REQUESTS) or 0)
+
     def get_slips_internal_time(self):
         return self.r.get(self.constants.SLIPS_INTERNAL_TIME) or 0
 
+    def set_flow_time(self, timestamp: float):
+        """
+        sets the flow time of slips, which is the ts of the latest flow
+        read by the profiler.
+        when reading files, it's the clock slips uses instead of the wall
+        time, so timers (e.g. closing tws) follow the time of the flows
+        and not how fast slips reads them
+        """
+        self.r.set(self.constants.FLOW_TIME, timestamp)
+
+    def get_flow_time(self) -> float:
+        return float(self.r.get(self.constants.FLOW_TIME) or 0)
+
+    def get_time(self) -> float:
+        """
+        returns the current time of slips. the wall time when running on
+        an interface or a growing zeek dir, and the flow time otherwise
+        """
+        if self.running_non_stop is None:
+            self.running_non_stop = self.is_running_non_stop()
+        if self.running_non_stop:
+            return time.time()
+        return self.get_flow_time()
+
     def get_redis_keys_len(self) -> int:
         """returns the length of all keys in the db"""
         return self.r.dbsize()
 
+    def get_used_memory(self) -> int:
+        """returns the number of bytes used by the redis server"""
+        return int(self.r.info("memory")["used_memory"])
+
     def set_cyst_enabled(self):
         return self.r.set(self.constants.IS_CYST_ENABLED, "yes")
 
@@ -625,27 +949,23 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         store for this IP.
         If it was not there before we store it. If it was there before, we
         overwrite it
-        """
-        # Get the previous info already stored
-        cached_ip_info = self.get_ip_info(ip)
-        if not cached_ip_info:
-            # This IP is not in the dictionary, add it first:
-            self.set_new_ip(ip)
-            cached_ip_info = {}
-
-        # make sure we don't already have the same info about this IP in our db
-        is_new_info = False
-        for info_type, info_val in to_store.items():
-            if info_type not in cached_ip_info and not is_new_info:
-                is_new_info = True
-
-            cached_ip_info[info_type] = info_val
-
-        self.rcache.hset(
-            self.constants.IPS_INFO, ip, json.dumps(cached_ip_info)
+        Each info type is a field in the hash of this IP, so only the given
+        ones are updated
+        """
+        # This IP may not be in the db, add it first
+        self.set_new_ip(ip)
+        # hset returns the number of fields that weren't there before
+        new_fields: int = self.rcache.hset(
+            self._get_ip_info_key(ip),
+            mapping={
+                info_type: json.dumps(info_val)
+                for info_type, info_val in to_store.items()
+            },
         )
-        if is_new_info:
-            self.r.publish("ip_info_change", ip)
+        if new_fields:
+            self.r.publish(
+                "ip_info_change", json.dumps({"ip": ip, "info": to_store})
+            )
 
     def get_redis_pid(self):
         """returns the pid of the current redis server"""
@@ -724,24 +1044,26 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
             return ip_info
         return {}
 
-    def is_ip_resolved(self, ip, hrs):
+    def _get_resolved_ips_key(self, profileid: str) -> str:
+        return f"{profileid}_{self.constants.RESOLVED_IPS}"
+
+    def is_ip_resolved(
+        self, profileid: str, twid: str, ip: str, hrs: float
+    ) -> bool:
         """
+        returns True if the given profile resolved the given ip in the
+        given tw or in the tws of the past hrs hours
         :param hrs: float, how many hours to look back for resolutions
         """
-        ip_info = self.get_dns_resolution(ip)
-        if ip_info == {}:
+        last_tw_resolved: Optional[float] = self.r.zscore(
+            self._get_resolved_ips_key(profileid), ip
+        )
+        if last_tw_resolved is None:
             return False
 
-        # these are the tws this ip was resolved in
-        tws_where_ip_was_resolved = ip_info["timewindows"]
-
-        # IP is resolved, was it resolved in the past x hrs?
-        tws_to_search: int = self.get_equivalent_tws(hrs)
-
-        for tw_number in range(tws_to_search):
-            if f"timewindow{tw_number}" in tws_where_ip_was_resolved:
-                return True
-        return False
+        tws_to_search: int = max(self.get_equivalent_tws(hrs), 1)
+        tw_number = int(twid.split("timewindow")[-1])
+        return tw_number - last_tw_resolved < tws_to_search
 
     def delete_dns_resolution(self, ip):
         self.r.hdel(self.constants.DNS_RESOLUTION, ip)
@@ -792,7 +1114,6 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         # Also store these IPs inside the domain
         ips_to_add = []
         CNAMEs = []
-        profileid_twid = f"profile_{srcip}_{twid}"
 
         for answer in answers:
             # Make sure it's an ip not a CNAME
@@ -811,7 +1132,6 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
                 # DNSresolution in the db
                 resolved_by = [srcip]
                 domains = []
-                timewindows = [profileid_twid]
             else:
                 # we have info about this domain in DNSresolution in the db
                 # keep track of all srcips that resolved this domain
@@ -819,11 +1139,6 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
                 if srcip not in resolved_by:
                     resolved_by.append(srcip)
 
-                # timewindows in which this odmain was resolved
-                timewindows = ip_info_from_db.get("timewindows", [])
-                if profileid_twid not in timewindows:
-                    timewindows.append(profileid_twid)
-
                 # we'll be appending the current answer
                 # to these cached domains
                 domains = ip_info_from_db.get("domains", [])
@@ -840,7 +1155,6 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
                 "uid": uid,
                 "domains": domains,
                 "resolved-by": resolved_by,
-                "timewindows": timewindows,
             }
             ip_info = json.dumps(ip_info)
             # we store ALL dns resolutions seen since starting slips
@@ -865,6 +1179,25 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
 
             self.set_info_for_domains(query, domaindata, mode="add")
             self.set_domain_resolution(query, ips_to_add)
+            self.set_resolved_ips(f"profile_{srcip}", twid, ips_to_add)
+
+    def set_resolved_ips(self, profileid: str, twid: str, ips: List[str]):
+        """
+        stores that the given profile resolved the given ips in the given
+        tw, so is_ip_resolved() is one lookup.
+        the ips resolved more than RESOLVED_IPS_TO_KEEP_HRS ago are removed
+        """
+        key = self._get_resolved_ips_key(profileid)
+        tw_number = int(twid.split("timewindow")[-1])
+        pipe = self.r.pipeline(transaction=False)
+        # an older resolution doesn't overwrite a newer tw
+        pipe.zadd(key, {ip: tw_number for ip in ips}, gt=True)
+        pipe.zremrangebyscore(
+            key,
+            "-inf",
+            tw_number - self.get_equivalent_tws(RESOLVED_IPS_TO_KEEP_HRS),
+        )
+        pipe.execute()
 
     def set_domain_resolution(self, domain, ips):
         """
@@ -1049,21 +1382,27 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         TI lists?
         :return: string containing AS, rDNS, and SNI of the IP.
         """
-        ip_info = self.get_ip_info(ip)
         id = ""
+        ip_info = self.get_ip_info(
+            ip, ["asn", "SNI", "reverse_dns", "threatintelligence"]
+        )
         if not ip_info:
             return id
 
-        if asn := self.get_asn_info(ip):
-            asn_org = asn.get("org", "")
-            asn_number = asn.get("number", "")
-            id += f" AS: {asn_org} {asn_number}"
+        # the asn, sni and rdns of ignored ips aren't used
+        if not utils.is_ignored_ip(ip):
+            if asn := ip_info.get("asn"):
+                asn_org = asn.get("org", "")
+                asn_number = asn.get("number", "")
+                id += f" AS: {asn_org} {asn_number}"
 
-        if sni := self.get_sni_info(ip):
-            id += f" SNI: {sni}, "
+            if sni := ip_info.get("SNI"):
+                sni = sni[0] if isinstance(sni, list) else sni
+                if sni := sni.get("server_name"):
+                    id += f" SNI: {sni}, "
 
-        if rdns := self.get_rdns_info(ip):
-            id += f" rDNS: {rdns}, "
+            if rdns := ip_info.get("reverse_dns"):
+                id += f" rDNS: {rdns}, "
 
         threat_intel = ip_info.get("threatintelligence", "")
         if threat_intel and get_ti_data:
@@ -1241,53 +1580,115 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
 
     def set_asn_cache(self, org: str, asn_range: str, asn_number: str) -> None:
         """
-        Stores the range of asn in cached_asn hash
+        Stores the range of asn in cached_asn_ranges hash
+        this is how we store ASNs; one field per range
+        {
+            '192.168.1.0/x': {'number': 'AS123', 'org':'Test'},
+            '10.0.0.0/x': {'number': 'AS123', 'org':'Test'},
+        }
         """
-
-        range_info = {asn_range: {"org": org}}
+        range_info = {"org": org}
         if asn_number:
-            range_info[asn_range].update({"number": f"AS{asn_number}"})
+            range_info["number"] = f"AS{asn_number}"
 
-        first_octet = utils.get_first_octet(asn_range)
-        if not first_octet:
-            return
+        self.rcache.hset(
+            self.constants.CACHED_ASN, asn_range, json.dumps(range_info)
+        )
 
-        # this is how we store ASNs; sorted by first octet
+    @classmethod
+    def _migrate_legacy_ips_info(cls):
         """
-        {
-            '192' : {
-                '192.168.1.0/x': {'number': 'AS123', 'org':'Test'},
-                '192.168.1.0/x': {'number': 'AS123', 'org':'Test'},
-            },
-            '10': {
-                '10.0.0.0/x': {'number': 'AS123', 'org':'Test'},
-            }
+        Older versions of slips stored the info of all ips as one json dict
+        per ip in the IPsInfo hash of the cache db, move them to a hash
+        per ip so they're not looked up again
+        """
+        legacy_key = cls.constants.LEGACY_IPS_INFO
+        if cls.rcache.type(legacy_key) != "hash":
+            return
 
-        }
+        pipe = cls.rcache.pipeline(transaction=False)
+        for ip, ip_info in cls.rcache.hscan_iter(legacy_key, count=1000):
+            pipe.sadd(cls.constants.KNOWN_IPS, ip)
+            if ip_info := json.loads(ip_info):
+                pipe.hset(
+                    f"{cls.constants.IPS_INFO}_{ip}",
+                    mapping={
+                        info_type: json.dumps(info_val)
+                        for info_type, info_val in ip_info.items()
+                    },
+                )
+            if len(pipe) >= 1000:
+                pipe.execute()
+        pipe.delete(legacy_key)
+        pipe.execute()
+
+    @classmethod
+    def _migrate_legacy_dns_resolutions(cls):
         """
-        if cached_asn := self.get_asn_cache(first_octet=first_octet):
-            # we already have a cached asn of a range that
-            # starts with the same first octet
-            cached_asn: dict = json.loads(cached_asn)
-            cached_asn.update(range_info)
-            self.rcache.hset(
-                self.constants.CACHED_ASN, first_octet, json.dumps(cached_asn)
-            )
-        else:
-            # first time storing a range starting with the same first octet
-            self.rcache.hset(
-                self.constants.CACHED_ASN, first_octet, json.dumps(range_info)
-            )
+        Older versions of slips stored the tws each ip was resolved in as
+        a list in its DNSresolution json, e.g. when loading their dbs
+        using -d. move them to the resolved ips of each profile
+        """
+        # init_redis_server() runs in every process, only the first one
+        # to set the marker scans the resolutions
+        if not cls.r.set(cls.constants.DNS_RESOLUTIONS_MIGRATED, 1, nx=True):
+            return
 
-    def get_asn_cache(self, first_octet=False):
+        pipe = cls.r.pipeline(transaction=False)
+        for ip, resolution in cls.r.hscan_iter(
+            cls.constants.DNS_RESOLUTION, count=1000
+        ):
+            resolution = json.loads(resolution)
+            if "timewindows" not in resolution:
+                continue
+            # e.g. profile_1.1.1.1_timewindow1
+            for profileid_twid in resolution.pop("timewindows"):
+                profileid, twid = profileid_twid.rsplit("_", 1)
+                tw_number = int(twid.split("timewindow")[-1])
+                pipe.zadd(
+                    f"{profileid}_{cls.constants.RESOLVED_IPS}",
+                    {ip: tw_number},
+                    gt=True,
+                )
+            pipe.hset(cls.constants.DNS_RESOLUTION, ip, json.dumps(resolution))
+            if len(pipe) >= 1000:
+                pipe.execute()
+        pipe.execute()
+
+    def _migrate_legacy_asn_cache(self):
         """
-         cached ASNs are sorted by first octet
-        Returns cached asn of ip if present, or False.
+        Older versions of slips stored the cached ASN ranges as one json
+        dict per first octet of the range, move them to the
+        cached_asn_ranges hash so they're not looked up again
         """
-        if first_octet:
-            return self.rcache.hget(self.constants.CACHED_ASN, first_octet)
+        legacy_cache: Dict[str, str] = self.rcache.hgetall(
+            self.constants.LEGACY_CACHED_ASN
+        )
+        if not legacy_cache:
+            return
+
+        ranges = {}
+        for cached_ranges in legacy_cache.values():
+            for asn_range, range_info in json.loads(cached_ranges).items():
+                ranges[asn_range] = json.dumps(range_info)
 
-        return self.rcache.hgetall(self.constants.CACHED_ASN)
+        if ranges:
+            self.rcache.hmset(self.constants.CACHED_ASN, ranges)
+        self.rcache.delete(self.constants.LEGACY_CACHED_ASN)
+
+    def get_asn_cache(self) -> Dict[str, Dict[str, str]]:
+        """
+        Returns all cached asn ranges as
+        {range: {'number': 'AS123', 'org':'Test'}}
+        """
+        self._migrate_legacy_asn_cache()
+        cached_asn: Dict[str, str] = self.rcache.hgetall(
+            self.constants.CACHED_ASN
+        )
+        return {
+            asn_range: json.loads(range_info)
+            for asn_range, range_info in cached_asn.items()
+        }
 
     def store_pid(self, process: str, pid: int):
         """
@@ -1404,35 +1805,68 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         if server_addr not in dhcp_servers:
             self.r.lpush(self.constants.DHCP_SERVERS, server_addr)
 
-    def save(self, backup_file):
+    def save(self, backup_file) -> bool:
         """
         Save the db to disk.
         backup_file should be the path+name of the file you want to save the db in
         If you -s the same file twice the old backup will be overwritten.
+        the snapshot is written by redis in the background, so the db keeps
+        serving the rest of slips while it's being saved
         """
 
         # use print statements in this function won't work because by the time this
         # function is executed, the redis database would have already stopped
+        redis_db_path: Optional[str] = self.take_snapshot()
+        if not redis_db_path or not os.path.exists(redis_db_path):
+            print(
+                f"[DB] Error Saving: Cannot find the redis "
+                f"database file {redis_db_path}"
+            )
+            return False
 
-        # saves to /var/lib/redis/dump.rdb
-        # this path is only accessible by root
-        self.r.save()
-
-        # gets the db saved to dump.rdb in the cwd
-        redis_db_path = os.path.join(os.getcwd(), "dump.rdb")
-
-        if os.path.exists(redis_db_path):
-            command = f"{self.sudo} cp {redis_db_path} {backup_file}.rdb"
-            os.system(command)
-            os.remove(redis_db_path)
-            print(f"[Main] Database saved to {backup_file}.rdb")
-            return True
+        try:
+            shutil.copy(redis_db_path, f"{backup_file}.rdb")
+            if redis_db_path == os.path.join(os.getcwd(), "dump.rdb"):
+                # the dump.rdb in the cwd is written because of -s
+                os.remove(redis_db_path)
+        except OSError as e:
+            # e.g. the .rdb is owned by root when redis runs as root
+            print(f"[DB] Error Saving: {e}")
+            return False
+        print(f"[Main] Database saved to {backup_file}.rdb")
+        return True
 
-        print(
-            f"[DB] Error Saving: Cannot find the redis "
-            f"database directory {redis_db_path}"
-        )
-        return False
+    def take_snapshot(self) -> Optional[str]:
+        """
+        asks redis to write a snapshot of the db in the background and
+        waits for it, without blocking the other clients of the db.
+        returns the path of the written .rdb, or None if redis failed to
+        write it or didn't write it within SNAPSHOT_TIMEOUT seconds
+        """
+        started_at: int = self.r.time()[0]
+        deadline = time.time() + SNAPSHOT_TIMEOUT
+        while not self.start_background_save():
+            if self.get_background_save_status() is not None:
+                # redis refused to save for another reason
+                return None
+            if time.time() > deadline:
+                return None
+            # redis is already writing a snapshot, it may have started
+            # before the changes we want to save
+            time.sleep(0.5)
+
+        while (status := self.get_background_save_status()) is None:
+            if time.time() > deadline:
+                return None
+            time.sleep(0.5)
+
+        if not status or self.get_last_save_time() < started_at:
+            return None
+        return self.get_rdb_path()
+
+    def get_last_save_time(self) -> float:
+        """returns the unix time of the last snapshot written by redis"""
+        return self.r.lastsave().timestamp()
 
     def load(self, backup_file: str) -> bool:
         """
@@ -1481,6 +1915,37 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
             self.print(f"Error loading the database {backup_file}.")
             return False
 
+    def start_background_save(self) -> bool:
+        """
+        asks redis to write a snapshot of the db to its .rdb file from a
+        forked process, without blocking the clients of the db.
+        returns False if redis is already writing a snapshot or refused
+        to write one
+        """
+        try:
+            self.r.bgsave()
+            return True
+        except redis.exceptions.ResponseError as e:
+            if "already in progress" not in str(e):
+                self.print(f"Unable to save the db: {e}", 0, 1)
+            return False
+
+    def get_background_save_status(self) -> Optional[bool]:
+        """
+        returns None while redis is still writing the snapshot, and
+        whether the last snapshot was written successfully once it's done
+        """
+        info = self.r.info("persistence")
+        if info["rdb_bgsave_in_progress"]:
+            return None
+        return info["rdb_last_bgsave_status"] == "ok"
+
+    def get_rdb_path(self) -> str:
+        """returns the path of the .rdb file redis writes snapshots to"""
+        redis_dir = self.r.config_get("dir")["dir"]
+        dbfilename = self.r.config_get("dbfilename")["dbfilename"]
+        return os.path.join(redis_dir, dbfilename)
+
     def set_last_warden_poll_time(self, time):
         """
         :param time: epoch
@@ -1536,8 +2001,45 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
         """return the path of zeek log files slips is currently using"""
         return self.r.get(self.constants.ZEEK_PATH)
 
-    def increment_processed_flows(self):
-        return self.r.incr(self.constants.PROCESSED_FLOWS, 1)
+    def increment_processed_flows(
+        self, input_offset: Optional[Tuple[str, int]] = None
+    ):
+        """
+        :param input_offset: (zeek file, offset of the line after the
+            processed flow in that file). stored in the same round trip as
+            the processed flows so a snapshot of the db always has the
+            offsets of the flows it has
+        """
+        if not input_offset:
+            return self.r.incr(self.constants.PROCESSED_FLOWS, 1)
+
+        filename, offset = input_offset
+        pipe = self.r.pipeline()
+        pipe.incr(self.constants.PROCESSED_FLOWS, 1)
+        pipe.hset(self.constants.INPUT_OFFSETS, filename, offset)
+        return pipe.execute()[0]
+
+    def get_input_offsets(self) -> Dict[str, int]:
+        """
+        returns the offset to continue reading each zeek file from, when
+        resuming an analysis from a checkpoint
+        """
+        offsets = self.r.hgetall(self.constants.INPUT_OFFSETS)
+        return {filename: int(offset) for filename, offset in offsets.items()}
+
+    def delete_input_offsets(self):
+        self.r.delete(self.constants.INPUT_OFFSETS)
+
+    def set_checkpoint_snapshot(self, snapshot: dict):
+        """
+        stores whether the snapshot of the requested checkpoint was
+        started and the info of the alerts files when it was
+        """
+        self.r.set(self.constants.CHECKPOINT_SNAPSHOT, json.dumps(snapshot))
+
+    def get_checkpoint_snapshot(self) -> Optional[dict]:
+        if snapshot := self.r.get(self.constants.CHECKPOINT_SNAPSHOT):
+            return json.loads(snapshot)
 
     def get_processed_flows_so_far(self) -> int:
         processed_flows = self.r.get(self.constants.PROCESSED_FLOWS)
@@ -1562,10 +2064,12 @@ class RedisDB(IoCHandler, AlertHandler, ProfileHandler):
     def get_stdfile(self, file_type):
         return self.r.get(file_type)
 
-    def incr_msgs_received_in_channel(self, module: str, channel: str):
+    def incr_msgs_received_in_channel(
+        self, module: str, channel: str, amount: int = 1
+    ):
         """increments the number of msgs received by a module in the given
-        channel by 1"""
-        self.r.hincrby(f"{module}_msgs_received_at_runtime", channel, 1)
+        channel by the given amount"""
+        self.r.hincrby(f"{module}_msgs_received_at_runtime", channel, amount)
 
     def get_msgs_received_at_runtime(self, module: str) -> Dict[str, int]:
         """
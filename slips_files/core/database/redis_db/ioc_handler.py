@@ -1,4 +1,5 @@
 import json
+import time
 from typing import (
     Dict,
     List,
@@ -13,6 +14,9 @@ from slips_files.common.data_structures.trie import Trie
 # change to the self.constants.IOC_DOMAINS key or slips will keep using an
 # invalid cache to lookup malicious domains
 
+# and remember to _invalidate_fingerprints_cache() on every change to the
+# IOC_JA3, IOC_JARM and IOC_SSL keys for the same reason
+
 
 class IoCHandler:
     """
@@ -22,11 +26,22 @@ class IoCHandler:
     """
 
     name = "DB"
+    # how often (in seconds) each process checks if the fingerprint feeds
+    # were updated by another process
+    fingerprints_cache_ttl = 60
+    # max number of fingerprints cached per IoC key before the cache is
+    # flushed
+    fingerprints_cache_max_size = 100_000
 
     def __init__(self):
         # used for faster domain lookups
         self.trie = None
         self.is_trie_cached = False
+        # used for faster ja3, ja3s, jarm and ssl sha1 lookups
+        # {ioc_key: {fingerprint: description or None}}
+        self.fingerprints_cache: Dict[str, Dict[str, Optional[str]]] = {}
+        self.fingerprints_cache_version = None
+        self.fingerprints_cache_last_check = 0
 
     def _build_trie(self):
         """Retrieve domains from Redis and construct the trie."""
@@ -55,6 +70,64 @@ class IoCHandler:
         self.trie = None
         self.is_trie_cached = False
 
+    def _invalidate_fingerprints_cache(self):
+        """
+        Invalidates the fingerprints cache of this process and tells the
+        rest of the processes to invalidate theirs.
+        used whenever the IOC_JA3, IOC_JARM or IOC_SSL keys are updated.
+        """
+        self.fingerprints_cache = {}
+        version: int = self.rcache.incr(
+            self.constants.IOC_FINGERPRINTS_VERSION
+        )
+        # redis returns the version as str when we GET it
+        self.fingerprints_cache_version = str(version)
+
+    def _refresh_fingerprints_cache(self):
+        """
+        Flushes the fingerprints cache if another process updated the
+        fingerprint feeds since the last check.
+        the version is checked once every fingerprints_cache_ttl seconds
+        at most, so we don't do a redis round trip per lookup
+        """
+        now = time.time()
+        if (
+            now - self.fingerprints_cache_last_check
+            < self.fingerprints_cache_ttl
+        ):
+            return
+        self.fingerprints_cache_last_check = now
+
+        version = self.rcache.get(self.constants.IOC_FINGERPRINTS_VERSION)
+        if version != self.fingerprints_cache_version:
+            self.fingerprints_cache = {}
+            self.fingerprints_cache_version = version
+
+    def _lookup_fingerprint(
+        self, ioc_key: str, fingerprint: str
+    ) -> Optional[str]:
+        """
+        Looks up the given fingerprint in the given IoC hash.
+        Both matches and misses are cached in memory so the same
+        fingerprint doesn't cost a redis round trip twice
+        :param ioc_key: one of IOC_JA3, IOC_JARM and IOC_SSL
+        returns the json serialized description of the fingerprint or
+        None if it's not blacklisted
+        """
+        self._refresh_fingerprints_cache()
+        cache = self.fingerprints_cache.setdefault(ioc_key, {})
+        try:
+            return cache[fingerprint]
+        except KeyError:
+            pass
+
+        if len(cache) >= self.fingerprints_cache_max_size:
+            cache.clear()
+
+        info: Optional[str] = self.rcache.hget(ioc_key, fingerprint)
+        cache[fingerprint] = info
+        return info
+
     def set_loaded_ti_files(self, number_of_loaded_files: int):
         """
         Stores the number of successfully loaded TI files
@@ -236,6 +309,7 @@ class IoCHandler:
 
         """
         self.rcache.hmset(self.constants.IOC_JA3, ja3)
+        self._invalidate_fingerprints_cache()
 
     def add_jarm_to_ioc(self, jarm: dict) -> None:
         """
@@ -244,6 +318,7 @@ class IoCHandler:
                             'threat_level':... ,'description'}}
         """
         self.rcache.hmset(self.constants.IOC_JARM, jarm)
+        self._invalidate_fingerprints_cache()
 
     def add_ssl_sha1_to_ioc(self, malicious_ssl_certs):
         """
@@ -252,15 +327,31 @@ class IoCHandler:
                                     'threat_level':... ,'description'}}
         """
         self.rcache.hmset(self.constants.IOC_SSL, malicious_ssl_certs)
+        self._invalidate_fingerprints_cache()
 
     def is_blacklisted_asn(self, asn) -> bool:
         return self.rcache.hget(self.constants.IOC_ASN, asn)
 
-    def is_blacklisted_jarm(self, jarm_hash: str):
+    def is_blacklisted_jarm(self, jarm_hash: str) -> Optional[str]:
         """
         search for the given hash in the malicious hashes stored in the db
         """
-        return self.rcache.hget(self.constants.IOC_JARM, jarm_hash)
+        return self._lookup_fingerprint(self.constants.IOC_JARM, jarm_hash)
+
+    def is_blacklisted_ja3(self, ja3: str) -> Optional[Dict[str, str]]:
+        """
+        Search for the given ja3 or ja3s in the malicious fingerprints
+        stored in the db
+        returns a dict like this or None if the fingerprint isn't malicious
+            {"description": "Dridex",
+            "source": "abuse.ch_ja3_fingerprints.csv",
+            "threat_level": "medium",
+            "tags": "malware"}
+        """
+        ja3_info: Optional[str] = self._lookup_fingerprint(
+            self.constants.IOC_JA3, ja3
+        )
+        return None if ja3_info is None else json.loads(ja3_info)
 
     def is_blacklisted_ip(self, ip: str) -> Union[Dict[str, str], bool]:
         """
@@ -277,7 +368,7 @@ class IoCHandler:
         return False if ip_info is None else json.loads(ip_info)
 
     def is_blacklisted_ssl(self, sha1):
-        info = self.rcache.hmget(self.constants.IOC_SSL, sha1)[0]
+        info = self._lookup_fingerprint(self.constants.IOC_SSL, sha1)
         return False if info is None else info
 
     def _match_exact_domain(self, domain: str) -> Optional[Dict[str, str]]:
@@ -348,12 +439,6 @@ class IoCHandler:
         """
         return self.rcache.hgetall(self.constants.IOC_DOMAINS)
 
-    def get_all_blacklisted_ja3(self):
-        """
-        Get all ja3 and their description from IoC_JA3
-        """
-        return self.rcache.hgetall(self.constants.IOC_JA3)
-
     def is_profile_malicious(self, profileid: str) -> str:
         return (
             self.r.hget(profileid, self.constants.LABELED_AS_MALICIOUS)
@@ -6,6 +6,8 @@ import traceback
 from dataclasses import asdict
 from math import floor
 from typing import (
+    Callable,
+    Dict,
     Tuple,
     Union,
     Optional,
@@ -23,10 +25,13 @@ class ProfileHandler:
     """
 
     name = "DB"
+    # is slips running on an interface or a growing zeek dir? read once
+    # when first needed because the input type doesn't change
+    running_non_stop: Optional[bool] = None
 
     def is_doh_server(self, ip: str) -> bool:
         """returns whether the given ip is a DoH server"""
-        info: dict = self.get_ip_info(ip)
+        info: dict = self.get_ip_info(ip, ["is_doh_server"])
         return info.get("is_doh_server", False) if info else False
 
     def get_outtuples_from_profile_tw(self, profileid, twid):
@@ -934,7 +939,7 @@ class ProfileHandler:
 
         # Save new server name in the IPInfo. There might be several
         # server_name per IP.
-        if ipdata := self.get_ip_info(flow.daddr):
+        if ipdata := self.get_ip_info(flow.daddr, ["SNI"]):
             sni_ipdata = ipdata.get("SNI", [])
         else:
             sni_ipdata = []
@@ -945,16 +950,12 @@ class ProfileHandler:
             # Verify that the SNI is equal to any of the domains in the DNS
             # resolution
             # only add this SNI to our db if it has a DNS resolution
-            if dns_resolutions := self.r.hgetall("DNSresolution"):
-                # dns_resolutions is a dict with {ip:{'ts'..,'domains':...,
-                # 'uid':..}}
-                for ip, resolution in dns_resolutions.items():
-                    resolution = json.loads(resolution)
-                    if sni_port["server_name"] in resolution["domains"]:
-                        # add SNI to our db as it has a DNS resolution
-                        sni_ipdata.append(sni_port)
-                        self.set_ip_info(flow.daddr, {"SNI": sni_ipdata})
-                        break
+            if self.r.hexists(
+                self.constants.DOMAINS_RESOLVED, sni_port["server_name"]
+            ):
+                # add SNI to our db as it has a DNS resolution
+                sni_ipdata.append(sni_port)
+                self.set_ip_info(flow.daddr, {"SNI": sni_ipdata})
 
     def get_profileid_from_ip(self, ip: str) -> Optional[str]:
         """
@@ -976,13 +977,18 @@ class ProfileHandler:
         profiles = self.r.smembers(self.constants.PROFILES)
         return profiles if profiles != set() else {}
 
-    def get_tws_from_profile(self, profileid):
+    def get_tws_from_profile(
+        self, profileid, start: int = 0, end: int = -1, desc=False
+    ):
         """
         Receives a profile id and returns the list of all the TW in that profile
+        or the ones between the given ranks only
         Returns a list of tuples (twid, ts) or an empty list
         """
         return (
-            self.r.zrange(f"tws{profileid}", 0, -1, withscores=True)
+            self.r.zrange(
+                f"tws{profileid}", start, end, desc=desc, withscores=True
+            )
             if profileid
             else False
         )
@@ -1039,6 +1045,31 @@ class ProfileHandler:
             else False
         )
 
+    def scan_profiles(
+        self, cursor: int = 0, match: Optional[str] = None, count: int = 1000
+    ) -> Tuple[int, List[str]]:
+        """
+        returns about count profiles starting from the given cursor
+        without blocking redis the way reading all of them at once does
+        :param match: glob pattern the returned profileids should match
+        :return: the cursor to continue from, 0 once all the profiles
+            are returned, and the profileids
+        """
+        return self.r.sscan(
+            self.constants.PROFILES, cursor=cursor, match=match, count=count
+        )
+
+    def get_tw_modification_time(self, profileid, twid) -> Optional[float]:
+        """
+        returns the time the given tw was last modified at, or None if
+        it's closed. it's the wall time on interfaces, the flow time when
+        reading files
+        """
+        return self.r.zscore(
+            self.constants.MODIFIED_TIMEWINDOWS,
+            f"{profileid}{self.separator}{twid}",
+        )
+
     def get_profiles_len(self) -> int:
         """Return the amount of profiles. Redis should be faster than python
         to do this count"""
@@ -1491,7 +1522,14 @@ class ProfileHandler:
         were modified with the slips internal time
         """
 
-        sit = self.get_slips_internal_time()
+        if self.running_non_stop is None:
+            self.running_non_stop = self.is_running_non_stop()
+        # when reading files, tws are closed based on the flow time
+        sit = (
+            self.get_slips_internal_time()
+            if self.running_non_stop
+            else self.get_flow_time()
+        )
 
         # sit is the ts of the last tw modification detected by slips
         # so this line means if 1h(width) passed since the last
@@ -1530,8 +1568,145 @@ class ProfileHandler:
         """
         self.r.sadd("ClosedTW", profileid_tw)
         self.r.zrem(self.constants.MODIFIED_TIMEWINDOWS, profileid_tw)
+        if self.archive_closed_tws:
+            # closed tws are moved to sqlite from the oldest to the newest
+            self.r.zadd(
+                self.constants.CLOSED_TWS_TO_ARCHIVE,
+                {profileid_tw: time.time()},
+            )
         self.publish("tw_closed", profileid_tw)
 
+    def get_tw_keys(self, profileid: str, twid: str) -> List[str]:
+        """returns the keys that store the data of the given tw"""
+        profileid_tw = f"{profileid}{self.separator}{twid}"
+        return [
+            profileid_tw,
+            f"{profileid_tw}_timeline",
+            f"{profileid_tw}_evidence",
+        ]
+
+    def get_closed_tws_to_archive(self, count: int) -> List[str]:
+        """
+        returns the given number of the oldest closed tws that are still
+        in redis. e.g. ['profile_1.1.1.1_timewindow1']
+        """
+        if count <= 0:
+            return []
+        return self.r.zrange(
+            self.constants.CLOSED_TWS_TO_ARCHIVE, 0, count - 1
+        )
+
+    def get_closed_tws_to_archive_len(self) -> int:
+        return self.r.zcard(self.constants.CLOSED_TWS_TO_ARCHIVE)
+
+    def archive_tw(
+        self,
+        profileid: str,
+        twid: str,
+        store_tw: Callable[[Dict[str, bytes]], bool],
+    ) -> bool:
+        """
+        deletes the data of the given closed tw from redis after passing
+        the serialized keys (redis DUMPs) to store_tw().
+        nothing is deleted if store_tw() fails or if the tw is modified
+        while being stored, e.g. by a late evidence.
+        returns True if the tw was archived
+        """
+        profileid_tw = f"{profileid}{self.separator}{twid}"
+        keys: List[str] = self.get_tw_keys(profileid, twid)
+        with self.rbinary.pipeline() as pipe:
+            try:
+                # redis discards the MULTI below if any of the keys changes
+                # after this
+                pipe.watch(*keys)
+                dumps: Dict[str, bytes] = {}
+                for key in keys:
+                    if dump := pipe.dump(key):
+                        dumps[key] = dump
+                alerted: bool = pipe.hexists(profileid_tw, "alerts")
+
+                if dumps and not store_tw(dumps):
+                    return False
+
+                pipe.multi()
+                pipe.delete(*keys)
+                pipe.zrem(self.constants.CLOSED_TWS_TO_ARCHIVE, profileid_tw)
+                pipe.sadd(self.constants.ARCHIVED_TWS, profileid_tw)
+                if alerted:
+                    pipe.sadd(
+                        self.constants.ARCHIVED_ALERTED_TWS, profileid_tw
+                    )
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+
+    def is_tw_archived(self, profileid: str, twid: str) -> bool:
+        return bool(
+            self.r.sismember(
+                self.constants.ARCHIVED_TWS,
+                f"{profileid}{self.separator}{twid}",
+            )
+        )
+
+    def restore_tw(self, profileid: str, twid: str, dumps: Dict[str, bytes]):
+        """
+        loads the given DUMPs of an archived tw back to redis.
+        the tw is archived again later once it's one of the oldest
+        closed tws again
+        """
+        profileid_tw = f"{profileid}{self.separator}{twid}"
+        for key, dump in dumps.items():
+            try:
+                self.rbinary.restore(key, 0, dump)
+            except redis.ResponseError:
+                # the key was created again after archiving the tw,
+                # e.g. by a late evidence. keep both
+                self.merge_archived_key(key, dump)
+
+        pipe = self.r.pipeline()
+        pipe.srem(self.constants.ARCHIVED_TWS, profileid_tw)
+        pipe.srem(self.constants.ARCHIVED_ALERTED_TWS, profileid_tw)
+        pipe.zadd(
+            self.constants.CLOSED_TWS_TO_ARCHIVE, {profileid_tw: time.time()}
+        )
+        pipe.execute()
+
+    def merge_archived_key(self, key: str, dump: bytes):
+        """
+        merges the given archived DUMP of a key with the current one.
+        the current values are kept for the hash fields that exist in both
+        """
+        archived_key = f"{key}_archived"
+        self.rbinary.restore(archived_key, 0, dump, replace=True)
+        if self.r.type(key) == "zset":
+            self.r.zunionstore(key, [key, archived_key], aggregate="MIN")
+        elif self.r.type(key) == "hash":
+            current_fields = set(self.r.hkeys(key))
+            missing = {
+                field: value
+                for field, value in self.r.hgetall(archived_key).items()
+                if field not in current_fields
+            }
+            if missing:
+                self.r.hset(key, mapping=missing)
+        self.r.delete(archived_key)
+
+    def get_modification_time(self, timestamp) -> float:
+        """
+        returns the time to mark tws as modified at.
+        the wall time when running on an interface, otherwise it's the
+        given flow ts, or the flow time of slips if there's no ts
+        """
+        if self.running_non_stop is None:
+            self.running_non_stop = self.is_running_non_stop()
+        if self.running_non_stop:
+            return time.time()
+        try:
+            return float(timestamp)
+        except (TypeError, ValueError):
+            return self.get_flow_time()
+
     def mark_profile_tw_as_modified(self, profileid, twid, timestamp):
         """
         Mark a TW in a profile as modified
@@ -1542,8 +1717,8 @@ class ProfileHandler:
         3- To update the internal time of slips
         4- To check if we should 'close' some TW
         """
-        timestamp = time.time()
-        data = {f"{profileid}{self.separator}{twid}": float(timestamp)}
+        timestamp = self.get_modification_time(timestamp)
+        data = {f"{profileid}{self.separator}{twid}": timestamp}
         self.r.zadd(self.constants.MODIFIED_TIMEWINDOWS, data)
         self.publish("tw_modified", f"{profileid}:{twid}")
         # Check if we should close some TW
@@ -1689,13 +1864,28 @@ class ProfileHandler:
 
     def add_timeline_line(self, profileid, twid, data, timestamp):
         """Add a line to the timeline of this profileid and twid"""
-        self.print(f"Adding timeline for {profileid}, {twid}: {data}", 3, 0)
+        self.add_timeline_lines(profileid, twid, [(data, timestamp)])
+
+    def add_timeline_lines(
+        self, profileid, twid, lines: List[Tuple[dict, float]]
+    ):
+        """
+        Adds the given (data, timestamp) lines to the timeline of this
+        profileid and twid using one ZADD
+        """
+        if not lines:
+            return
+        self.print(
+            f"Adding {len(lines)} timeline lines for {profileid}, {twid}",
+            3,
+            0,
+        )
         key = str(
             profileid + self.separator + twid + self.separator + "timeline"
         )
-        data = json.dumps(data)
-        mapping = {data: timestamp}
-        self.r.zadd(key, mapping)
+        self.r.zadd(
+            key, {json.dumps(data): timestamp for data, timestamp in lines}
+        )
         # Mark the tw as modified since the timeline line is new data in the TW
         self.mark_profile_tw_as_modified(profileid, twid, timestamp="")
 
@@ -1712,8 +1902,19 @@ class ProfileHandler:
         data = self.r.zrange(key, first_index, last_index - 1)
         return data, last_index
 
-    def get_profiled_tw_timeline(self, profileid, timewindow):
-        return self.r.zrange(f"{profileid}_{timewindow}_timeline", 0, -1)
+    def get_profiled_tw_timeline(
+        self, profileid, timewindow, start: int = 0, end: int = -1, desc=False
+    ):
+        """
+        returns the timeline entries of the given tw sorted by their
+        timestamp, only the ones between the given ranks if given
+        """
+        return self.r.zrange(
+            f"{profileid}_{timewindow}_timeline", start, end, desc=desc
+        )
+
+    def get_timeline_len(self, profileid, timewindow) -> int:
+        return self.r.zcard(f"{profileid}_{timewindow}_timeline")
 
     def mark_profile_as_gateway(self, profileid):
         """
@@ -0,0 +1,168 @@
+from collections import deque
+from typing import (
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import redis
+
+
+class StreamSubscription:
+    """
+    Reads the msgs of one or more channels from their redis streams as a
+    member of a consumer group.
+    Has the same get_message() interface as the redis PubSub objects
+    returned by RedisDB.subscribe(), so modules don't care which
+    transport is used.
+    Msgs are read from all the streams at once in batches and handed out
+    one by one, a batch is acknowledged once all of its msgs are handed
+    out.
+    If the group already exists, e.g. when resuming from a checkpoint,
+    the msgs it read and didn't acknowledge are read again first.
+    """
+
+    def __init__(
+        self,
+        client: redis.StrictRedis,
+        streams: Dict[str, str],
+        group: str,
+        batch_size: int,
+    ):
+        """
+        :param streams: {channel: the key of the stream of that channel}
+        """
+        self.client = client
+        self.channels: Dict[str, str] = {
+            stream: channel for channel, stream in streams.items()
+        }
+        self.group = group
+        # there's only one consumer per group, the module itself
+        self.consumer = group
+        self.batch_size = batch_size
+        # msgs read from the streams and not yet returned by get_message()
+        # as (stream, msg id, fields)
+        self.buffer: Deque[Tuple[str, str, Dict[str, str]]] = deque()
+        # {stream: ids of the msgs returned by get_message() and not
+        # acked yet}
+        self.to_ack: Dict[str, List[str]] = {}
+        # the streams that may have msgs delivered to the group that
+        # weren't acked
+        self.pending_streams: Set[str] = set()
+        for stream in self.channels:
+            self._create_group(stream)
+
+    def _create_group(self, stream: str):
+        """
+        Creates the consumer group of this subscription. the group only
+        receives the msgs published after it's created, same as pub/sub
+        """
+        try:
+            self.client.xgroup_create(
+                stream, self.group, id="$", mkstream=True
+            )
+        except redis.exceptions.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+            # the group already exists
+            self.pending_streams.add(stream)
+
+    def _ack(self):
+        for stream, ids in self.to_ack.items():
+            self.client.xack(stream, self.group, *ids)
+        self.to_ack = {}
+
+    def _read_pending(self):
+        """
+        Reads up to batch_size of the msgs that were delivered to the
+        group and not acked from each stream into the buffer
+        """
+        # reading from id 0 returns the pending msgs instead of new ones
+        response = self.client.xreadgroup(
+            self.group,
+            self.consumer,
+            {stream: "0" for stream in self.pending_streams},
+            count=self.batch_size,
+        )
+        for stream, msgs in response or []:
+            if not msgs:
+                self.pending_streams.discard(stream)
+            for msg_id, fields in msgs:
+                if fields:
+                    self.buffer.append((stream, msg_id, fields))
+                else:
+                    # trimmed from the stream, there's nothing to read
+                    self.to_ack.setdefault(stream, []).append(msg_id)
+        if not response:
+            self.pending_streams.clear()
+
+    def _read_batch(self, timeout: float):
+        """
+        Reads up to batch_size msgs from each stream into the buffer
+        :param timeout: seconds to block waiting for new msgs.
+        """
+        self._ack()
+        while self.pending_streams and not self.buffer:
+            self._read_pending()
+            # acks the pending msgs that were trimmed from the streams
+            self._ack()
+        if self.buffer:
+            return
+
+        # redis treats BLOCK 0 as "block forever", so timeouts that
+        # round down to 0 ms are treated as non blocking reads
+        block_ms: Optional[int] = int(timeout * 1000) or None
+        response = self.client.xreadgroup(
+            self.group,
+            self.consumer,
+            {stream: ">" for stream in self.channels},
+            count=self.batch_size,
+            block=block_ms,
+        )
+        for stream, msgs in response or []:
+            self.buffer.extend(
+                (stream, msg_id, fields) for msg_id, fields in msgs
+            )
+
+    def _to_pubsub_msg(
+        self, stream: str, msg_id: str, fields: Dict[str, str]
+    ) -> dict:
+        self.to_ack.setdefault(stream, []).append(msg_id)
+        return {
+            "type": "message",
+            "pattern": None,
+            "channel": self.channels[stream],
+            "data": fields.get("data"),
+        }
+
+    def get_message(self, timeout: float = 0.0) -> Optional[dict]:
+        """
+        returns the next msg of the subscribed channels in the same
+        format as PubSub.get_message() or None if there's no msg
+        """
+        if not self.buffer:
+            self._read_batch(timeout)
+
+        if not self.buffer:
+            return None
+
+        return self._to_pubsub_msg(*self.buffer.popleft())
+
+    def get_messages(self, timeout: float = 0.0) -> List[dict]:
+        """
+        returns all the available msgs of the subscribed channels, up to
+        batch_size msgs per channel, or an empty list if there are none
+        """
+        if not self.buffer:
+            self._read_batch(timeout)
+
+        msgs = []
+        while self.buffer:
+            msgs.append(self._to_pubsub_msg(*self.buffer.popleft()))
+        return msgs
+
+    def close(self):
+        self._ack()
@@ -1,9 +1,14 @@
 from datetime import datetime
-from typing import List, Dict
+from typing import (
+    Dict,
+    List,
+    Tuple,
+)
 import os.path
 import sqlite3
 import json
 import csv
+import zlib
 from dataclasses import asdict
 from threading import Lock
 from time import sleep
@@ -67,9 +72,21 @@ class SQLiteDB:
             "flows": "uid TEXT PRIMARY KEY, flow TEXT, label TEXT, profileid TEXT, twid TEXT, aid TEXT",
             "altflows": "uid TEXT PRIMARY KEY, flow TEXT, label TEXT, profileid TEXT, twid TEXT, flow_type TEXT",
             "alerts": "alert_id TEXT PRIMARY KEY, alert_time TEXT, ip_alerted TEXT, timewindow TEXT, tw_start TEXT, tw_end TEXT, label TEXT",
+            # closed tws moved out of redis, value is the compressed
+            # redis DUMP of each key
+            "archived_tws": "key TEXT PRIMARY KEY, profileid TEXT, twid TEXT, value BLOB",
         }
         for table_name, schema in table_schema.items():
             self.create_table(table_name, schema)
+        # the flows of each tw are read in pages by the web interface
+        self.execute(
+            "CREATE INDEX IF NOT EXISTS flows_profileid_twid "
+            "ON flows (profileid, twid)"
+        )
+        self.execute(
+            "CREATE INDEX IF NOT EXISTS archived_tws_profileid_twid "
+            "ON archived_tws (profileid, twid)"
+        )
 
     def _init_db(self):
         """
@@ -124,6 +141,61 @@ class SQLiteDB:
             res[uid] = json.loads(flow)
         return res
 
+    def get_flows_page(
+        self,
+        profileid: str,
+        twid: str,
+        offset: int = 0,
+        limit: int = 500,
+        search: str = "",
+        desc=False,
+    ) -> List[str]:
+        """
+        returns up to limit flows of the given tw in the order they were
+        added, skipping the first offset ones
+        :param search: only flows containing this text are returned
+        :return: the flows as json strs
+        """
+        query, params = self.get_flows_query(profileid, twid, search)
+        query = query.format(columns="flow")
+        query += (
+            f" ORDER BY rowid {'DESC' if desc else 'ASC'} LIMIT ? OFFSET ?"
+        )
+        self.execute(query, params + (limit, offset))
+        return [flow for (flow,) in self.fetchall()]
+
+    def get_tw_flows_count(
+        self, profileid: str, twid: str, search: str = ""
+    ) -> int:
+        """
+        returns the number of flows of the given tw, only the ones
+        containing the given text if given
+        """
+        query, params = self.get_flows_query(profileid, twid, search)
+        self.execute(query.format(columns="COUNT(*)"), params)
+        return self.fetchone()[0]
+
+    @staticmethod
+    def get_flows_query(
+        profileid: str, twid: str, search: str
+    ) -> Tuple[str, tuple]:
+        """
+        returns the query selecting the flows of the given tw that contain
+        the given text, with a {columns} placeholder, and its params
+        """
+        query = "SELECT {columns} FROM flows WHERE profileid = ? AND twid = ?"
+        params = (profileid, twid)
+        if search:
+            # the search is a plain text, not a LIKE pattern
+            search = (
+                search.replace("\\", "\\\\")
+                .replace("%", "\\%")
+                .replace("_", "\\_")
+            )
+            query += " AND flow LIKE ? ESCAPE '\\'"
+            params += (f"%{search}%",)
+        return query, params
+
     def get_all_flows_in_profileid(self, profileid) -> Dict[str, dict]:
         """
         Return a list of all the flows in this profileid
@@ -319,6 +391,41 @@ class SQLiteDB:
             ),
         )
 
+    def archive_tw(
+        self, profileid: str, twid: str, dumps: Dict[str, bytes]
+    ) -> bool:
+        """
+        stores the given redis DUMPs of the keys of a closed tw
+        returns True if all of them were stored
+        """
+        rows = [
+            (key, profileid, twid, zlib.compress(dump))
+            for key, dump in dumps.items()
+        ]
+        placeholders = ", ".join(["(?, ?, ?, ?)"] * len(rows))
+        self.execute(
+            "INSERT OR REPLACE INTO archived_tws "
+            f"(key, profileid, twid, value) VALUES {placeholders};",
+            [param for row in rows for param in row],
+        )
+        condition = f'profileid="{profileid}" AND twid="{twid}"'
+        return self.get_count("archived_tws", condition=condition) == len(rows)
+
+    def get_archived_tw(self, profileid: str, twid: str) -> Dict[str, bytes]:
+        """returns the redis DUMPs of the keys of the given archived tw"""
+        self.execute(
+            "SELECT key, value FROM archived_tws "
+            "WHERE profileid = ? AND twid = ?;",
+            (profileid, twid),
+        )
+        return {key: zlib.decompress(value) for key, value in self.fetchall()}
+
+    def delete_archived_tw(self, profileid: str, twid: str):
+        self.execute(
+            "DELETE FROM archived_tws WHERE profileid = ? AND twid = ?;",
+            (profileid, twid),
+        )
+
     def insert(self, table_name, values):
         query = f"INSERT INTO {table_name} VALUES ({values})"
         self.execute(query)
@@ -351,6 +458,19 @@ class SQLiteDB:
         self.execute(query)
         return self.fetchone()[0]
 
+    def backup(self, backup_path: str):
+        """
+        copies the db to the given path using the sqlite online backup api,
+        so the copy is consistent even if other processes are writing to
+        the db
+        """
+        backup_conn = sqlite3.connect(backup_path)
+        try:
+            with self.cursor_lock:
+                self.conn.backup(backup_conn)
+        finally:
+            backup_conn.close()
+
     def close(self):
         self.cursor.close()
         self.conn.close()
@@ -37,6 +37,7 @@ from slips_files.common.parsers.config_parser import ConfigParser
 from slips_files.common.slips_utils import utils
 from slips_files.core.helpers.whitelist.whitelist import Whitelist
 from slips_files.core.helpers.notify import Notify
+from slips_files.core.helpers.alert_writer import AlertWriter
 from slips_files.common.abstracts.core import ICore
 from slips_files.core.structures.evidence import (
     dict_to_evidence,
@@ -78,19 +79,21 @@ class EvidenceHandler(ICore):
 
         self.c1 = self.db.subscribe("evidence_added")
         self.c2 = self.db.subscribe("new_blame")
+        self.c3 = self.db.subscribe("take_checkpoint")
         self.channels = {
             "evidence_added": self.c1,
             "new_blame": self.c2,
+            "take_checkpoint": self.c3,
         }
 
         # clear output/alerts.log
-        self.logfile = self.clean_file(self.output_dir, "alerts.log")
+        self.logfile = self.create_alerts_writer("alerts.log")
         utils.change_logfiles_ownership(self.logfile.name, self.UID, self.GID)
 
         self.is_running_non_stop = self.db.is_running_non_stop()
 
         # clear output/alerts.json
-        self.jsonfile = self.clean_file(self.output_dir, "alerts.json")
+        self.jsonfile = self.create_alerts_writer("alerts.json")
         utils.change_logfiles_ownership(self.jsonfile.name, self.UID, self.GID)
         # this list will have our local and public ips when using -i
         self.our_ips = utils.get_own_ips()
@@ -109,6 +112,10 @@ class EvidenceHandler(ICore):
         )
         self.GID = conf.get_GID()
         self.UID = conf.get_UID()
+        self.alerts_flush_interval: float = conf.alerts_flush_interval()
+        self.alerts_buffer_size: int = conf.alerts_buffer_size()
+        self.alerts_rotation_size: int = conf.alerts_rotation_size()
+        self.alerts_rotation_interval: float = conf.alerts_rotation_interval()
 
         self.popup_alerts = conf.popup_alerts()
         # In docker, disable alerts no matter what slips.yaml says
@@ -140,10 +147,29 @@ class EvidenceHandler(ICore):
         Clear the file if exists and return an open handle to it
         """
         logfile_path = os.path.join(output_dir, file_to_clean)
-        if path.exists(logfile_path):
+        # when resuming from a checkpoint, the alerts of the checkpoint
+        # are kept and the new ones are appended to them
+        if path.exists(logfile_path) and "--resume" not in sys.argv:
             open(logfile_path, "w").close()
         return open(logfile_path, "a")
 
+    def create_alerts_writer(self, filename: str) -> AlertWriter:
+        """
+        clears the given alerts file and returns a writer that writes to
+        it in the background
+        """
+        return AlertWriter(
+            self.clean_file(self.output_dir, filename),
+            flush_interval=self.alerts_flush_interval,
+            buffer_size=self.alerts_buffer_size,
+            rotation_size=self.alerts_rotation_size,
+            rotation_interval=self.alerts_rotation_interval,
+            on_new_file=lambda path: utils.change_logfiles_ownership(
+                path, self.UID, self.GID
+            ),
+            on_error=self.handle_unable_to_log,
+        )
+
     def handle_unable_to_log(self):
         self.print("Error logging evidence/alert.")
 
@@ -157,8 +183,7 @@ class EvidenceHandler(ICore):
             return
 
         try:
-            json.dump(idmef_alert, self.jsonfile)
-            self.jsonfile.write("\n")
+            self.jsonfile.write(f"{json.dumps(idmef_alert)}\n")
         except KeyboardInterrupt:
             return True
         except Exception:
@@ -192,8 +217,7 @@ class EvidenceHandler(ICore):
                     )
                 }
             )
-            json.dump(idmef_evidence, self.jsonfile)
-            self.jsonfile.write("\n")
+            self.jsonfile.write(f"{json.dumps(idmef_evidence)}\n")
         except KeyboardInterrupt:
             return True
         except Exception:
@@ -205,11 +229,10 @@ class EvidenceHandler(ICore):
         logging is enabled.
         """
         try:
-            # write to alerts.log
-            self.logfile.write(data)
+            # write to alerts.log, the writer flushes in the background
             if not data.endswith("\n"):
-                self.logfile.write("\n")
-            self.logfile.flush()
+                data += "\n"
+            self.logfile.write(data)
         except KeyboardInterrupt:
             return True
         except Exception:
@@ -309,6 +332,26 @@ class EvidenceHandler(ICore):
         self.logfile.close()
         self.jsonfile.close()
 
+    def start_checkpoint_snapshot(self, requested_at: str):
+        """
+        writes the waiting alerts and asks redis to write the snapshot of
+        the checkpoint requested by main.
+        nothing is written to the alerts files between getting their
+        sizes and starting the snapshot, so the alerts files restored
+        with --resume match the alerts in the snapshot
+        """
+        alerts_files: Dict[str, Dict[str, int]] = {
+            path.basename(writer.name): writer.get_file_info()
+            for writer in (self.logfile, self.jsonfile)
+        }
+        self.db.set_checkpoint_snapshot(
+            {
+                "requested_at": requested_at,
+                "started": self.db.start_background_save(),
+                "alerts_files": alerts_files,
+            }
+        )
+
     def get_evidence_that_were_part_of_a_past_alert(
         self, profileid: str, twid: str
     ) -> List[str]:
@@ -739,3 +782,6 @@ class EvidenceHandler(ICore):
                 }
                 blocking_data = json.dumps(blocking_data)
                 self.db.publish("new_blocking", blocking_data)
+
+            if msg := self.get_msg("take_checkpoint"):
+                self.start_checkpoint_snapshot(msg["data"])
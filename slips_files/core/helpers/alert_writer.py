@@ -0,0 +1,201 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    TextIO,
+)
+
+ROTATION_DATE_FORMAT = "%Y-%m-%d_%H-%M-%S"
+# <date>.<n> is used when rotating twice in the same second
+ROTATED_FILE_SUFFIX = re.compile(
+    r"\.(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})(?:\.(\d+))?"
+)
+
+
+class AlertWriter:
+    """
+    Writes the lines given to write() to an alerts file, e.g. alerts.log,
+    from a background thread, so the evidence handler doesn't wait for
+    the disk with every evidence.
+    - the lines are written every flush_interval seconds, or once
+      buffer_size chars are waiting
+    - the file is rotated once it reaches rotation_size bytes or is
+      older than rotation_interval seconds. the rotated file is renamed
+      to <file>.<date>
+    - close() writes the remaining lines and fsyncs the file
+    """
+
+    def __init__(
+        self,
+        file: TextIO,
+        flush_interval: float = 1,
+        buffer_size: int = 65536,
+        rotation_size: int = 0,
+        rotation_interval: float = 0,
+        on_new_file: Optional[Callable[[str], None]] = None,
+        on_error: Optional[Callable[[], None]] = None,
+    ):
+        """
+        :param file: the alerts file opened for appending
+        :param rotation_size: 0 to never rotate because of the size
+        :param rotation_interval: 0 to never rotate because of the age
+        :param on_new_file: called with the path of the file after each
+            rotation
+        :param on_error: called when writing fails
+        """
+        self.file = file
+        self.name: str = file.name
+        self.flush_interval = flush_interval
+        self.buffer_size = buffer_size
+        self.rotation_size = rotation_size
+        self.rotation_interval = rotation_interval
+        self.on_new_file = on_new_file
+        self.on_error = on_error
+        # the lines waiting to be written and their total length
+        self.lines: List[str] = []
+        self.buffered = 0
+        self.lines_lock = threading.Lock()
+        # held while writing to or rotating the file
+        self.file_lock = threading.Lock()
+        self.opened_at = time.time()
+        self.flush_needed = threading.Event()
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        # the pid of the process the thread was started in
+        self.writer_pid: Optional[int] = None
+
+    def start_thread(self):
+        """
+        the thread is started with the first write, because the writer is
+        usually created before the process that uses it is forked, and
+        threads don't survive forks
+        """
+        if self.writer_pid == os.getpid():
+            return
+        self.writer_pid = os.getpid()
+        self.thread = threading.Thread(
+            target=self.run,
+            name=f"{os.path.basename(self.name)}_writer",
+            daemon=True,
+        )
+        self.thread.start()
+
+    def write(self, data: str):
+        self.start_thread()
+        with self.lines_lock:
+            self.lines.append(data)
+            self.buffered += len(data)
+            is_full = self.buffered >= self.buffer_size
+        if is_full:
+            self.flush_needed.set()
+
+    def run(self):
+        while not self.stopped.is_set():
+            self.flush_needed.wait(self.flush_interval)
+            self.flush_needed.clear()
+            self.flush()
+
+    def flush(self):
+        """writes the waiting lines to the file"""
+        # the lines are taken while holding the file lock, so once a
+        # flush() returns, the lines written before it are in the file
+        # even if the thread was flushing them at the same time
+        with self.file_lock:
+            with self.lines_lock:
+                lines, self.lines, self.buffered = self.lines, [], 0
+            if not lines:
+                return
+
+            data = "".join(lines)
+            try:
+                if self.should_rotate(len(data)):
+                    self.rotate()
+                self.file.write(data)
+                self.file.flush()
+            except (OSError, ValueError):
+                if self.on_error:
+                    self.on_error()
+
+    def should_rotate(self, size_to_write: int) -> bool:
+        current_size = self.file.tell()
+        if not current_size:
+            # never rotate to an empty file
+            return False
+        if (
+            self.rotation_size
+            and current_size + size_to_write > self.rotation_size
+        ):
+            return True
+        return bool(
+            self.rotation_interval
+            and time.time() - self.opened_at >= self.rotation_interval
+        )
+
+    def get_file_info(self) -> Dict[str, int]:
+        """
+        writes the waiting lines and returns the size of the file and the
+        number of files rotated before it, which identifies the file
+        once it's rotated too
+        """
+        self.flush()
+        with self.file_lock:
+            return {
+                "size": self.file.tell(),
+                "rotated_files": len(self.get_rotated_paths(self.name)),
+            }
+
+    @staticmethod
+    def get_rotated_paths(path: str) -> List[str]:
+        """
+        returns the paths of the files rotated from the given one, oldest
+        first
+        """
+        dirname, basename = os.path.split(path)
+        rotated = []
+        for filename in os.listdir(dirname or "."):
+            if not filename.startswith(basename):
+                continue
+            suffix = ROTATED_FILE_SUFFIX.fullmatch(filename[len(basename) :])
+            if suffix:
+                date, n = suffix.groups()
+                rotated.append(((date, int(n or 0)), filename))
+        return [
+            os.path.join(dirname, filename) for _, filename in sorted(rotated)
+        ]
+
+    def get_rotated_path(self) -> str:
+        path = f"{self.name}.{datetime.now().strftime(ROTATION_DATE_FORMAT)}"
+        rotated_path, suffix = path, 1
+        while os.path.exists(rotated_path):
+            # rotated twice in the same second
+            rotated_path = f"{path}.{suffix}"
+            suffix += 1
+        return rotated_path
+
+    def rotate(self):
+        self.file.close()
+        os.replace(self.name, self.get_rotated_path())
+        self.file = open(self.name, "a")
+        self.opened_at = time.time()
+        if self.on_new_file:
+            self.on_new_file(self.name)
+
+    def close(self):
+        """writes the remaining lines, fsyncs and closes the file"""
+        self.stopped.set()
+        self.flush_needed.set()
+        if self.writer_pid == os.getpid():
+            self.thread.join()
+        self.flush()
+        with self.file_lock:
+            try:
+                os.fsync(self.file.fileno())
+            except (OSError, ValueError):
+                pass
+            self.file.close()
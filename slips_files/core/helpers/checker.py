@@ -29,6 +29,10 @@ class Checker:
             self.main.redis_man.load_db()
             return
 
+        if self.main.args.resume:
+            # continue the analysis of the input of the given output dir
+            self.main.args.filepath = self.main.checkpoint_man.resume()
+
         if self.main.args.input_module:
             input_information = "input_module"
             input_type = self.main.args.input_module
@@ -138,6 +142,7 @@ class Checker:
             self.main.args.interface
             and self.main.args.blocking
             and os.geteuid() != 0
+            and self.main.conf.blocking_backend() != "dry_run"
         ):
             # If the user wants to blocks, we need permission to modify
             # iptables
@@ -153,6 +158,19 @@ class Checker:
             else:
                 self.delete_blocking_chain()
             self.main.terminate_slips()
+        if self.main.args.resume and (
+            self.main.args.interface
+            or self.main.args.filepath
+            or self.main.args.db
+            or self.main.args.input_module
+        ):
+            print(
+                "--resume continues the analysis of the input of the given "
+                "output dir, it can't be used with -f, -i, -d or "
+                "--input-module. Stopping Slips."
+            )
+            self.main.terminate_slips()
+
         # Check if user want to save and load a db at the same time
         if self.main.args.save and self.main.args.db:
             print("Can't use -s and -d together")
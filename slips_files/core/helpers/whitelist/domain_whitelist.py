@@ -22,7 +22,7 @@ class DomainAnalyzer(IWhitelistAnalyzer):
         returns the domains of this IP, e.g. the DNS resolution, the SNI, etc.
         """
         domains = []
-        if ip_data := self.db.get_ip_info(ip):
+        if ip_data := self.db.get_ip_info(ip, ["SNI"]):
             if sni_info := ip_data.get("SNI", [{}])[0]:
                 domains.append(sni_info.get("server_name", ""))
 
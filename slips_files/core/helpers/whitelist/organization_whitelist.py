@@ -90,7 +90,7 @@ class OrgAnalyzer(IWhitelistAnalyzer):
         returns true if the ASN of the given IP is listed in
          the ASNs of the given org
         """
-        ip_data = self.db.get_ip_info(ip)
+        ip_data = self.db.get_ip_info(ip, ["asn"])
         if not ip_data:
             return
 
@@ -14,11 +14,18 @@
 import datetime
 import json
 import os
+import shutil
 import signal
 import subprocess
 import sys
 import threading
 import time
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
 
 # You should have received a copy of the GNU General Public License
 # along with this program; if not, write to the Free Software
@@ -115,6 +122,18 @@ class Input(ICore):
         # the input process and shut down and close the profiler queue no issue
         self.is_profiler_done_event = is_profiler_done_event
         self.is_running_non_stop: bool = self.db.is_running_non_stop()
+        # set when reading zeek files that are done being written, e.g. a
+        # given zeek dir. in this case slips stops reading once all of them
+        # reach their end instead of waiting for the bro_timeout
+        self.are_zeek_files_complete = False
+        # zeek files that returned no more lines the last time they were read
+        self.files_at_eof = set()
+        # the offset of the line after the last line read from each zeek
+        # file, only tracked when checkpoints are enabled
+        self.file_offsets: Dict[str, int] = {}
+        # where to continue reading each zeek file from when resuming an
+        # analysis from a checkpoint
+        self.resumed_offsets: Dict[str, int] = {}
 
     def mark_self_as_done_processing(self):
         """
@@ -140,6 +159,10 @@ class Input(ICore):
         # over the configuration file
         self.packet_filter = self.packet_filter or conf.packet_filter()
         self.tcp_inactivity_timeout = conf.tcp_inactivity_timeout()
+        self.zeek_workers: int = conf.zeek_workers()
+        # the profiler stores the offset of each flow read from zeek
+        # files only when they're needed for checkpoints
+        self.are_checkpoints_enabled: bool = conf.checkpoint_interval() > 0
         self.enable_rotation = conf.rotation()
         self.rotation_period = conf.rotation_period()
         self.keep_rotated_files_for = conf.keep_rotated_files_for()
@@ -214,6 +237,11 @@ class Input(ICore):
             # First time opening this file.
             try:
                 file_handler = open(filename, "r")
+                offset = self.resumed_offsets.get(filename, 0)
+                if offset:
+                    # skip the flows processed before the checkpoint
+                    file_handler.seek(offset)
+                self.file_offsets[filename] = offset
                 lock = threading.Lock()
                 lock.acquire()
                 self.open_file_handlers[filename] = file_handler
@@ -285,9 +313,19 @@ class Input(ICore):
             return False
 
         # Did the file end?
-        if not zeek_line or zeek_line.startswith("#"):
+        if not zeek_line:
             # We reached the end of one of the files that we were reading.
             # Wait for more lines to come from another file
+            self.files_at_eof.add(filename)
+            return False
+        self.files_at_eof.discard(filename)
+
+        if self.are_checkpoints_enabled:
+            # zeek files are utf-8 with \n line endings, so this is the
+            # number of bytes read
+            self.file_offsets[filename] += len(zeek_line.encode())
+
+        if zeek_line.startswith("#"):
             return False
 
         timestamp, nline = self.get_ts_from_line(zeek_line)
@@ -299,10 +337,26 @@ class Input(ICore):
         self.cache_lines[filename] = {"type": filename, "data": nline}
         return True
 
+    def is_done_reading_zeek_files(self) -> bool:
+        """
+        checks if all the zeek files that slips reads reached their end
+        """
+        return all(
+            filename in self.files_at_eof
+            for filename in self.zeek_files
+            if not self.is_ignored_file(filename)
+        )
+
     def reached_timeout(self) -> bool:
         # If we don't have any cached lines to send,
         # it may mean that new lines are not arriving. Check
         if not self.cache_lines:
+            if (
+                self.are_zeek_files_complete
+                and self.is_done_reading_zeek_files()
+            ):
+                # no need to wait for new lines, there are none
+                return True
             # Verify that we didn't have any new lines in the
             # last 10 seconds. Seems enough for any network to have
             # ANY traffic
@@ -359,6 +413,8 @@ class Input(ICore):
     def read_zeek_files(self) -> int:
         self.zeek_files = self.db.get_all_zeek_files()
         self.open_file_handlers = {}
+        # only set when resuming, slips deletes them otherwise
+        self.resumed_offsets = self.db.get_input_offsets()
         self.file_time = {}
         self.cache_lines = {}
         # Try to keep track of when was the last update so we stop this reading
@@ -384,7 +440,10 @@ class Input(ICore):
 
             # self.print('	> Sent Line: {}'.format(earliest_line), 0, 3)
 
-            self.give_profiler(earliest_line)
+            self.give_profiler(
+                earliest_line,
+                offset=self.get_input_offset(file_with_earliest_flow),
+            )
             self.lines += 1
             # when testing, no need to read the whole file!
             if self.lines == 10 and self.testing:
@@ -399,6 +458,15 @@ class Input(ICore):
         self.close_all_handles()
         return self.lines
 
+    def get_input_offset(self, filename: str) -> Optional[Tuple[str, int]]:
+        """
+        returns the given zeek file and the offset of the line after its
+        cached line, for the profiler to store once it processes that line
+        """
+        if not self.are_checkpoints_enabled:
+            return None
+        return filename, self.file_offsets[filename]
+
     def _make_gen(self, reader):
         """yeilds (64 kilobytes) at a time from the file"""
         while True:
@@ -443,6 +511,7 @@ class Input(ICore):
             self.bro_timeout = float("inf")
 
         self.zeek_dir = self.given_path
+        self.are_zeek_files_complete = not growing_zeek_dir
         self.start_observer()
 
         # if 1 file is zeek tabs the rest should be the same
@@ -607,6 +676,7 @@ class Input(ICore):
             total_flows = self.get_flows_number(self.given_path)
             self.db.set_input_metadata({"total_flows": total_flows})
             self.total_flows = total_flows
+            self.are_zeek_files_complete = True
 
         # Add log file to database
         self.db.add_zeek_file(self.given_path)
@@ -672,7 +742,15 @@ class Input(ICore):
         if len(zeek_files) > 0:
             # First clear the zeek folder of old .log files
             for f in zeek_files:
-                os.remove(os.path.join(self.zeek_dir, f))
+                path = os.path.join(self.zeek_dir, f)
+                if os.path.isdir(path):
+                    # the dir of a zeek worker of a previous run
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+
+        if self.input_type == "pcap" and self.zeek_workers > 1:
+            return self.handle_pcap_with_zeek_workers()
 
         # run zeek
         self.zeek_thread.start()
@@ -698,6 +776,92 @@ class Input(ICore):
         self.stop_observer()
         return True
 
+    def handle_pcap_with_zeek_workers(self) -> bool:
+        """
+        Runs zeek_workers zeeks on the given pcap in parallel, and once
+        they're all done, reads their logs ordered by ts like a zeek dir
+        """
+        self.run_zeek_workers()
+        if self.should_stop():
+            return True
+
+        if not hasattr(self, "is_zeek_tabs"):
+            self.is_zeek_tabs = False
+
+        total_flows = 0
+        for worker_dir in self.get_zeek_workers_dirs():
+            for file in os.listdir(worker_dir):
+                full_path = os.path.join(worker_dir, file)
+                if self.is_ignored_file(full_path):
+                    continue
+                total_flows += self.get_flows_number(full_path)
+                self.db.add_zeek_file(full_path)
+
+        self.total_flows = total_flows
+        self.db.set_input_metadata({"total_flows": total_flows})
+        # zeek is done, all the flows are there already
+        self.bro_timeout = 10
+        self.are_zeek_files_complete = True
+        self.lines = self.read_zeek_files()
+        self.print_lines_read()
+        self.mark_self_as_done_processing()
+        self.stop_observer()
+        return True
+
+    def get_zeek_workers_dirs(self) -> List[str]:
+        return [
+            os.path.join(self.zeek_dir, f"worker_{worker}")
+            for worker in range(self.zeek_workers)
+        ]
+
+    def get_zeek_worker_packet_filter(self, worker: int) -> str:
+        """
+        returns the bpf filter of the packets the given zeek worker
+        analyzes.
+        Packets are split by a hash of their src and dst ips that is the
+        same in both directions, so all the packets of a connection (and all
+        the conns between the same 2 hosts) are analyzed by the same worker.
+        non-ip packets (arp, etc.) are analyzed by the first worker
+        """
+        workers = self.zeek_workers
+        share = (
+            f"(ip and (ip[12:4] + ip[16:4]) % {workers} = {worker}) "
+            f"or (ip6 and (ip6[20:4] + ip6[36:4]) % {workers} = {worker})"
+        )
+        if worker == 0:
+            share = f"{share} or not (ip or ip6)"
+
+        if self.packet_filter:
+            user_filter = self.packet_filter.strip("'")
+            return f"({user_filter}) and ({share})"
+        return share
+
+    def run_zeek_workers(self):
+        """
+        Starts the zeek workers on the given pcap, each one in its own dir
+        inside the zeek dir, and waits for them to finish
+        """
+        self.print(
+            f"Analyzing {self.given_path} using {self.zeek_workers} zeek "
+            f"workers."
+        )
+        workers = []
+        for worker, worker_dir in enumerate(self.get_zeek_workers_dirs()):
+            os.makedirs(worker_dir, exist_ok=True)
+            command = self.get_zeek_command(
+                ["-r", self.get_abs_pcap_path()],
+                packet_filter=[
+                    "-f",
+                    self.get_zeek_worker_packet_filter(worker),
+                ],
+            )
+            workers.append(self.start_zeek(command, worker_dir))
+            self.db.store_pid(f"Zeek worker {worker}", workers[-1].pid)
+
+        self.zeek_pids = [zeek.pid for zeek in workers]
+        for zeek in workers:
+            self.wait_for_zeek(zeek)
+
     def stop_observer(self):
         # Stop the observer
         try:
@@ -772,64 +936,41 @@ class Input(ICore):
         if hasattr(self, "open_file_handlers"):
             self.close_all_handles()
 
+        zeek_pids = list(getattr(self, "zeek_pids", []))
         if hasattr(self, "zeek_pid"):
+            zeek_pids.append(self.zeek_pid)
+        for zeek_pid in zeek_pids:
             # kill zeek manually if it started bc it's detached from this
             # process and will never recv the sigint also withoutt this,
             # inputproc will never shutdown and will always remain in memory
             # causing 1000 bugs in proc_man:shutdown_gracefully()
             try:
-                os.kill(self.zeek_pid, signal.SIGKILL)
+                os.kill(zeek_pid, signal.SIGKILL)
             except Exception:
                 pass
 
         return True
 
-    def run_zeek(self):
-        """
-        This thread sets the correct zeek parameters and starts zeek
-        """
-
-        def detach_child():
-            """
-            Detach zeek from the parent process group(inputprocess), the child(zeek)
-             will no longer receive signals
-            """
-            # we're doing this to fix zeek rotating on sigint, not when zeek has it's own
-            # process group, it won't get the signals sent to slips.py
-            os.setpgrp()
-
-        # rotation is disabled unless it's an interface
-        rotation = []
-        if self.input_type == "interface":
-            if self.enable_rotation:
-                # how often to rotate zeek files? taken from slips.yaml
-                rotation = [
-                    "-e",
-                    f"redef Log::default_rotation_interval = {self.rotation_period} ;",
-                ]
-            bro_parameter = ["-i", self.given_path]
-
-        elif self.input_type == "pcap":
-            # Find if the pcap file name was absolute or relative
-            given_path = self.given_path
-            if not os.path.isabs(self.given_path):
-                # now the given pcap is relative to slips main dir
-                # slips can store the zeek logs dir either in the
-                # output dir (by default in Slips/output/<filename>_<date>/zeek_files/),
-                # or in any dir specified with -o
-                # construct an abs path from the given path so slips can find the given pcap
-                # no matter where the zeek dir is placed
-                given_path = os.path.join(os.getcwd(), self.given_path)
-
-            # using a list of params instead of a str for storing the cmd
-            # becaus ethe given path may contain spaces
-            bro_parameter = ["-r", given_path]
-
+    def get_abs_pcap_path(self) -> str:
+        # Find if the pcap file name was absolute or relative
+        if os.path.isabs(self.given_path):
+            return self.given_path
+        # now the given pcap is relative to slips main dir
+        # slips can store the zeek logs dir either in the
+        # output dir (by default in Slips/output/<filename>_<date>/zeek_files/),
+        # or in any dir specified with -o
+        # construct an abs path from the given path so slips can find the given pcap
+        # no matter where the zeek dir is placed
+        return os.path.join(os.getcwd(), self.given_path)
+
+    def get_zeek_command(
+        self,
+        bro_parameter: List[str],
+        rotation: Optional[List[str]] = None,
+        packet_filter: Optional[List[str]] = None,
+    ) -> List[str]:
         # Run zeek on the pcap or interface. The redef is to have json files
         zeek_scripts_dir = os.path.join(os.getcwd(), "zeek-scripts")
-        packet_filter = (
-            ["-f ", self.packet_filter] if self.packet_filter else []
-        )
 
         # 'local' is removed from the command because it
         # loads policy/protocols/ssl/expiring-certs and
@@ -843,22 +984,25 @@ class Input(ICore):
             "tcp_attempt_delay=1min",
             zeek_scripts_dir,
         ]
-        command += rotation
-        command += packet_filter
+        command += rotation or []
+        command += packet_filter or []
+        return command
 
+    def start_zeek(self, command: List[str], cwd: str) -> subprocess.Popen:
         self.print(f'Zeek command: {" ".join(command)}', 3, 0)
-
-        zeek = subprocess.Popen(
+        # start_new_session detaches zeek from the parent process group
+        # (inputprocess), so it won't get the signals sent to slips.py.
+        # we're doing this to fix zeek rotating on sigint
+        return subprocess.Popen(
             command,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             stdin=subprocess.PIPE,
-            cwd=self.zeek_dir,
+            cwd=cwd,
             start_new_session=True,
         )
-        # you have to get the pid before communicate()
-        self.zeek_pid = zeek.pid
 
+    def wait_for_zeek(self, zeek: subprocess.Popen):
         out, error = zeek.communicate()
         if out:
             print(f"Zeek: {out}")
@@ -867,6 +1011,35 @@ class Input(ICore):
                 f"Zeek error. return code: {zeek.returncode} error:{error.strip()}"
             )
 
+    def run_zeek(self):
+        """
+        This thread sets the correct zeek parameters and starts zeek
+        """
+        # rotation is disabled unless it's an interface
+        rotation = []
+        if self.input_type == "interface":
+            if self.enable_rotation:
+                # how often to rotate zeek files? taken from slips.yaml
+                rotation = [
+                    "-e",
+                    f"redef Log::default_rotation_interval = {self.rotation_period} ;",
+                ]
+            bro_parameter = ["-i", self.given_path]
+
+        elif self.input_type == "pcap":
+            # using a list of params instead of a str for storing the cmd
+            # becaus ethe given path may contain spaces
+            bro_parameter = ["-r", self.get_abs_pcap_path()]
+
+        packet_filter = (
+            ["-f ", self.packet_filter] if self.packet_filter else []
+        )
+        command = self.get_zeek_command(bro_parameter, rotation, packet_filter)
+        zeek = self.start_zeek(command, self.zeek_dir)
+        # you have to get the pid before communicate()
+        self.zeek_pid = zeek.pid
+        self.wait_for_zeek(zeek)
+
     def handle_cyst(self):
         """
         Read flows sent by any external module (for example the cYST module)
@@ -907,12 +1080,16 @@ class Input(ICore):
 
         self.mark_self_as_done_processing()
 
-    def give_profiler(self, line):
+    def give_profiler(self, line, offset: Optional[Tuple[str, int]] = None):
         """
         sends the given txt/dict to the profilerqueue for process
         sends the total amount of flows to process with the first flow only
+        :param offset: (file, offset of the line after the given line),
+            stored by the profiler for resuming from checkpoints
         """
         to_send = {"line": line, "input_type": self.input_type}
+        if offset:
+            to_send["offset"] = offset
         # when the queue is full, the default behaviour is to block
         # if necessary until a free slot is available
         self.profiler_queue.put(to_send)
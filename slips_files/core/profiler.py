@@ -100,6 +100,10 @@ class Profiler(ICore, IObservable):
         self.is_profiler_done_event = is_profiler_done_event
         self.gw_mac = None
         self.gw_ip = None
+        self.is_running_non_stop: bool = self.db.is_running_non_stop()
+        # the ts of the latest flow read, stored in the db as the
+        # flow time of slips
+        self.flow_time = 0.0
 
     def read_configuration(self):
         conf = ConfigParser()
@@ -126,6 +130,22 @@ class Profiler(ICore, IObservable):
                 1,
             )
 
+    def update_flow_time(self):
+        """
+        moves the flow time of slips to the ts of the current flow if
+        it's newer. the db is only updated once per second of flow time
+        """
+        if self.is_running_non_stop:
+            return
+        try:
+            ts = float(self.flow.starttime)
+        except (TypeError, ValueError):
+            return
+        if ts < self.flow_time + 1:
+            return
+        self.flow_time = ts
+        self.db.set_flow_time(ts)
+
     def get_rev_profile(self):
         """
         get the profileid and twid of the daddr at the current starttime,
@@ -277,6 +297,7 @@ class Profiler(ICore, IObservable):
         # in this tw for this profile
         self.print(f"Storing data in the profile: {self.profileid}", 3, 0)
         self.convert_starttime_to_epoch()
+        self.update_flow_time()
         # For this 'forward' profile, find the id in the
         # database of the tw where the flow belongs.
         self.twid = self.db.get_timewindow(self.flow.starttime, self.profileid)
@@ -329,7 +350,9 @@ class Profiler(ICore, IObservable):
 
         # if the flow type matched any of the ifs above,
         # mark this profile as modified
-        self.db.mark_profile_tw_as_modified(self.profileid, self.twid, "")
+        self.db.mark_profile_tw_as_modified(
+            self.profileid, self.twid, self.flow.starttime
+        )
 
     def store_features_going_in(self, profileid: str, twid: str):
         """
@@ -373,7 +396,9 @@ class Profiler(ICore, IObservable):
             twid=twid,
             label=self.label,
         )
-        self.db.mark_profile_tw_as_modified(profileid, twid, "")
+        self.db.mark_profile_tw_as_modified(
+            profileid, twid, self.flow.starttime
+        )
 
     def handle_in_flows(self):
         """
@@ -436,6 +461,12 @@ class Profiler(ICore, IObservable):
             return input_type
 
     def shutdown_gracefully(self):
+        self.db.store_suppressed_ip_info_requests()
+        self.print(
+            f"Repeated ip info requests not sent: "
+            f"{self.db.get_suppressed_ip_info_requests()}",
+            log_to_logfiles_only=True,
+        )
         self.print(
             f"Stopping. Total lines read: {self.rec_lines}",
             log_to_logfiles_only=True,
@@ -602,7 +633,9 @@ class Profiler(ICore, IObservable):
                 if self.flow:
                     self.add_flow_to_profile()
                     self.handle_setting_local_net()
-                    self.db.increment_processed_flows()
+                    # the offset of the line in its file is only sent
+                    # when checkpoints are enabled
+                    self.db.increment_processed_flows(msg.get("offset"))
             except Exception as e:
                 self.print_traceback()
                 self.print(
@@ -0,0 +1,125 @@
+"""
+Floods alerts.log and alerts.json with synthetic evidence, once writing
+and flushing each line like the evidence handler used to, and once using
+the AlertWriter, and prints the evidence/sec of each.
+
+usage:
+    python3 -m tests.benchmarks.alert_writer_benchmark
+    python3 -m tests.benchmarks.alert_writer_benchmark -n 500000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Tuple,
+)
+
+from slips_files.core.helpers.alert_writer import AlertWriter
+
+
+def get_evidence_flood(evidence: int) -> List[Tuple[str, dict]]:
+    """returns the alerts.log line and alerts.json dict of each evidence"""
+    flood = []
+    for i in range(evidence):
+        ip = f"10.0.{i // 256 % 256}.{i % 256}"
+        line = (
+            f"2024/10/04 15:45:30.123456+0000 (TW {i // 1000 + 1}): "
+            f"Src IP {ip:26}. Detected Horizontal port scan to port 443/TCP."
+            f" From {ip} to 1000 unique destination IPs. threat level: "
+            f"medium."
+        )
+        idmef = {
+            "Status": "Event",
+            "ID": f"evidence-{i}",
+            "Description": line,
+            "Source": [{"IP": ip}],
+            "Note": json.dumps({"uids": [f"uid{i}"], "timewindow": 1}),
+        }
+        flood.append((line, idmef))
+    return flood
+
+
+def write_and_flush_each_line(
+    logfile, jsonfile, flood: List[Tuple[str, dict]]
+):
+    """how the evidence handler wrote alerts before the AlertWriter"""
+    for line, idmef in flood:
+        logfile.write(line)
+        logfile.write("\n")
+        logfile.flush()
+        json.dump(idmef, jsonfile)
+        jsonfile.write("\n")
+
+
+def write_using_alert_writer(logfile, jsonfile, flood: List[Tuple[str, dict]]):
+    for line, idmef in flood:
+        logfile.write(f"{line}\n")
+        jsonfile.write(f"{json.dumps(idmef)}\n")
+
+
+def benchmark(
+    name: str,
+    writer: Callable,
+    flood: List[Tuple[str, dict]],
+    use_alert_writer: bool,
+) -> Dict[str, float]:
+    with tempfile.TemporaryDirectory() as output_dir:
+        logfile = open(os.path.join(output_dir, "alerts.log"), "a")
+        jsonfile = open(os.path.join(output_dir, "alerts.json"), "a")
+        if use_alert_writer:
+            logfile, jsonfile = AlertWriter(logfile), AlertWriter(jsonfile)
+
+        start = time.perf_counter()
+        writer(logfile, jsonfile, flood)
+        # the time the evidence handler waits for the writes
+        critical_path = time.perf_counter() - start
+        logfile.close()
+        jsonfile.close()
+        total = time.perf_counter() - start
+
+    results = {
+        "evidence_per_sec": round(len(flood) / critical_path, 3),
+        "critical_path_seconds": round(critical_path, 3),
+        "total_seconds": round(total, 3),
+    }
+    print(
+        f"{name}: {results['evidence_per_sec']} evidence/sec, "
+        f"{results['critical_path_seconds']}s spent by the evidence "
+        f"handler, {results['total_seconds']}s until the files were closed"
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks writing the alerts files during an "
+        "evidence flood"
+    )
+    parser.add_argument(
+        "-n",
+        "--evidence",
+        type=int,
+        default=100000,
+        help="number of evidence to write",
+    )
+    args = parser.parse_args()
+
+    flood = get_evidence_flood(args.evidence)
+    old = benchmark(
+        "write and flush each line", write_and_flush_each_line, flood, False
+    )
+    new = benchmark("AlertWriter", write_using_alert_writer, flood, True)
+    print(
+        f"AlertWriter speedup: "
+        f"{new['evidence_per_sec'] / old['evidence_per_sec']:.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Functions that turn the samples collected while slips is running into the
+benchmark results
+"""
+
+from collections import Counter
+from typing import (
+    Dict,
+    List,
+    Optional,
+)
+
+
+def get_stage_latency(
+    timestamps: List[float],
+    upstream: List[int],
+    downstream: List[int],
+) -> Optional[float]:
+    """
+    Estimates the avg seconds a msg spends between 2 stages using the
+    number of msgs that went through each stage so far at each sample.
+    by little's law, the area between the 2 cumulative curves divided by
+    the number of msgs that went through the downstream stage is the avg
+    time each msg waited between the 2 stages.
+    :param timestamps: the time of each sample
+    :param upstream: number of msgs sent by the first stage at each sample
+    :param downstream: number of msgs received by the second stage at
+    each sample
+    returns None if no msgs reached the downstream stage
+    """
+    if not downstream or not downstream[-1]:
+        return None
+
+    area = 0.0
+    for idx in range(len(timestamps) - 1):
+        # the counters aren't read at the exact same time, so the
+        # downstream counter may be a bit ahead
+        in_between = max(upstream[idx] - downstream[idx], 0)
+        area += in_between * (timestamps[idx + 1] - timestamps[idx])
+    return area / downstream[-1]
+
+
+def get_redis_commands(
+    commandstats: Dict[str, dict], own_commands: Counter
+) -> Dict[str, int]:
+    """
+    returns {command: number of calls} from the output of
+    INFO commandstats, minus the commands sent by the benchmark itself
+    """
+    commands = {}
+    for stat, info in commandstats.items():
+        # stats look like cmdstat_hset
+        command = stat.replace("cmdstat_", "")
+        calls = info["calls"] - own_commands.get(command, 0)
+        if calls > 0:
+            commands[command] = calls
+    return commands
+
+
+def compare_results(old: dict, new: dict) -> Dict[str, dict]:
+    """
+    compares the results of 2 benchmark runs of the same input
+    returns {metric: {"old": x, "new": y, "change": percentage}}
+    """
+    metrics = {
+        "flows_per_sec": (old["flows_per_sec"], new["flows_per_sec"]),
+        "duration": (old["duration"], new["duration"]),
+        "total_redis_commands": (
+            old["total_redis_commands"],
+            new["total_redis_commands"],
+        ),
+        "total_peak_rss": (
+            sum(old["peak_rss"].values()),
+            sum(new["peak_rss"].values()),
+        ),
+    }
+    for stage in old["stage_latency"].keys() & new["stage_latency"].keys():
+        metrics[f"latency_{stage}"] = (
+            old["stage_latency"][stage],
+            new["stage_latency"][stage],
+        )
+
+    comparison = {}
+    for metric, (old_value, new_value) in metrics.items():
+        change = None
+        if old_value and new_value is not None:
+            change = round((new_value - old_value) / old_value * 100, 2)
+        comparison[metric] = {
+            "old": old_value,
+            "new": new_value,
+            "change": change,
+        }
+    return comparison
@@ -0,0 +1,374 @@
+"""
+Replays the given inputs (or the default ones in dataset/) through slips as
+fast as possible, and stores the throughput, per stage latency, peak memory
+and redis usage of each run as json, so the results of different commits
+can be compared.
+
+usage:
+    python3 -m tests.benchmarks.run_benchmarks
+    python3 -m tests.benchmarks.run_benchmarks -f dataset/test9-mixed-zeek-dir
+    python3 -m tests.benchmarks.run_benchmarks --dns
+    python3 -m tests.benchmarks.run_benchmarks --compare old.json new.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime
+from typing import (
+    Dict,
+    List,
+    Optional,
+)
+
+import psutil
+import redis
+
+from slips_files.core.database.redis_db.constants import Constants
+from tests.benchmarks.metrics import (
+    compare_results,
+    get_redis_commands,
+    get_stage_latency,
+)
+
+SLIPS_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+RESULTS_DIR = os.path.join(SLIPS_DIR, "output", "benchmarks")
+# one input of each supported type that doesn't need zeek or nfdump to
+# be installed
+DEFAULT_INPUTS = (
+    "dataset/test9-mixed-zeek-dir",
+    "dataset/test3-mixed.binetflow",
+    "dataset/test6-malicious.suricata.json",
+)
+# the inputs with the most dns flows, to benchmark the dns resolution
+# detections
+DNS_HEAVY_INPUTS = (
+    "dataset/test9-mixed-zeek-dir",
+    "dataset/test10-mixed-zeek-dir",
+)
+
+
+class Sampler:
+    """
+    Periodically reads the msg counters slips keeps in redis and the
+    memory used by each slips process while slips is running
+    """
+
+    def __init__(self, redis_port: int, slips_pid: int):
+        self.r = redis.StrictRedis(
+            host="localhost", port=redis_port, decode_responses=True
+        )
+        self.slips = psutil.Process(slips_pid)
+        # the commands sent by the sampler, so they're not counted as
+        # slips commands
+        self.own_commands = Counter()
+        self.timestamps: List[float] = []
+        self.processed_flows: List[int] = []
+        # {channel: number of published msgs at each sample}
+        self.published: Dict[str, List[int]] = {}
+        # {(module, channel): number of received msgs at each sample}
+        self.received: Dict[tuple, List[int]] = {}
+        # {pid: max rss in bytes}
+        self.peak_rss: Dict[int, int] = {}
+        # {pid: process name}, slips stores the names of its processes
+        # once they start, the rest use the name of their executable
+        self.pids: Dict[int, str] = {}
+        self.executables: Dict[int, str] = {}
+
+    def call(self, command: str, *args):
+        self.own_commands[command] += 1
+        return getattr(self.r, command)(*args)
+
+    def sample_memory(self):
+        try:
+            processes = [self.slips] + self.slips.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return
+
+        for proc in processes:
+            try:
+                self.executables.setdefault(proc.pid, proc.name())
+                rss = proc.memory_info().rss
+            except psutil.NoSuchProcess:
+                continue
+            self.peak_rss[proc.pid] = max(self.peak_rss.get(proc.pid, 0), rss)
+
+    def get_peak_rss(self) -> Dict[str, int]:
+        """returns {process name: max rss in bytes}"""
+        peak_rss = {}
+        for pid, rss in self.peak_rss.items():
+            name = self.pids.get(pid) or f"{self.executables[pid]} ({pid})"
+            peak_rss[name] = rss
+        return peak_rss
+
+    def sample_counters(self):
+        try:
+            pids: Dict[str, str] = self.call("hgetall", Constants.PIDS)
+            processed = self.call("get", Constants.PROCESSED_FLOWS)
+            published: Dict[str, str] = self.call(
+                "hgetall", Constants.MSGS_PUBLISHED_AT_RUNTIME
+            )
+            received = {
+                module: self.call(
+                    "hgetall", f"{module}_msgs_received_at_runtime"
+                )
+                for module in pids
+            }
+        except redis.exceptions.ConnectionError:
+            # slips didn't start its redis server yet or already closed it
+            return
+
+        self.pids = {int(pid): name for name, pid in pids.items()}
+        self.timestamps.append(time.time())
+        self.processed_flows.append(int(processed or 0))
+        samples = len(self.timestamps)
+        for channel, msgs in published.items():
+            # channels that get their first msg late were at 0 before
+            self.published.setdefault(channel, [0] * (samples - 1))
+            self.published[channel].append(int(msgs))
+        for module, channels in received.items():
+            for channel, msgs in channels.items():
+                key = (module, channel)
+                self.received.setdefault(key, [0] * (samples - 1))
+                self.received[key].append(int(msgs))
+        # counters that didn't change in this sample
+        for counters in (*self.published.values(), *self.received.values()):
+            if len(counters) < samples:
+                counters.append(counters[-1] if counters else 0)
+
+    def sample(self):
+        self.sample_memory()
+        self.sample_counters()
+
+    def get_stage_latencies(self) -> Dict[str, float]:
+        """
+        returns the avg seconds msgs waited between being published and
+        being received by each module in each channel
+        """
+        latencies = {}
+        for (module, channel), received in self.received.items():
+            if channel not in self.published:
+                continue
+            latency = get_stage_latency(
+                self.timestamps, self.published[channel], received
+            )
+            if latency is not None:
+                latencies[f"{channel} -> {module}"] = round(latency, 6)
+        return latencies
+
+    def get_redis_stats(self) -> dict:
+        self.own_commands["info"] += 2
+        commands = get_redis_commands(
+            self.r.info("commandstats"), self.own_commands
+        )
+        return {
+            "redis_commands": commands,
+            "total_redis_commands": sum(commands.values()),
+            "redis_used_memory_peak": self.r.info("memory")[
+                "used_memory_peak"
+            ],
+        }
+
+    def shutdown_redis(self):
+        try:
+            self.r.shutdown(nosave=True)
+        except redis.exceptions.ConnectionError:
+            pass
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=SLIPS_DIR, text=True
+        ).strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def run_benchmark(
+    input_path: str, config: Optional[str], interval: float
+) -> dict:
+    """runs slips on the given input and returns the benchmark results"""
+    redis_port = get_free_port()
+    input_name = os.path.basename(os.path.normpath(input_path))
+    output_dir = os.path.join(RESULTS_DIR, "slips_output", input_name)
+    os.makedirs(output_dir, exist_ok=True)
+    # slips clears its output dir on startup, so the log is kept outside
+    log_path = f"{output_dir}.txt"
+
+    cmd = [
+        "./slips.py",
+        "-e",
+        "1",
+        "-f",
+        input_path,
+        "-o",
+        output_dir,
+        "-P",
+        str(redis_port),
+    ]
+    if config:
+        cmd += ["-c", config]
+
+    print(f"Benchmarking {input_path} ...")
+    with open(log_path, "w") as log:
+        start = time.time()
+        slips = subprocess.Popen(
+            cmd, cwd=SLIPS_DIR, stdout=log, stderr=subprocess.STDOUT
+        )
+        sampler = Sampler(redis_port, slips.pid)
+        while slips.poll() is None:
+            sampler.sample()
+            time.sleep(interval)
+        duration = time.time() - start
+
+    # the counters after slips is done
+    sampler.sample_counters()
+    processed_flows = (
+        sampler.processed_flows[-1] if sampler.processed_flows else 0
+    )
+    first_flow = next(
+        (
+            ts
+            for ts, flows in zip(sampler.timestamps, sampler.processed_flows)
+            if flows
+        ),
+        None,
+    )
+    results = {
+        "input": input_path,
+        "return_code": slips.returncode,
+        "duration": round(duration, 3),
+        "time_to_first_flow": (
+            round(first_flow - start, 3) if first_flow else None
+        ),
+        "processed_flows": processed_flows,
+        "flows_per_sec": round(processed_flows / duration, 3),
+        "stage_latency": sampler.get_stage_latencies(),
+        "peak_rss": sampler.get_peak_rss(),
+    }
+    try:
+        results.update(sampler.get_redis_stats())
+    except redis.exceptions.ConnectionError:
+        results.update(
+            {
+                "redis_commands": {},
+                "total_redis_commands": 0,
+                "redis_used_memory_peak": None,
+            }
+        )
+    sampler.shutdown_redis()
+    return results
+
+
+def print_results(results: dict):
+    print(
+        f"{results['input']}: {results['processed_flows']} flows in "
+        f"{results['duration']}s, {results['flows_per_sec']} flows/sec, "
+        f"{results['total_redis_commands']} redis commands"
+    )
+    for stage, latency in sorted(results["stage_latency"].items()):
+        print(f"\t{stage}: {latency * 1000:.2f}ms")
+    for process, rss in sorted(results["peak_rss"].items()):
+        print(f"\t{process}: {rss / 1024 / 1024:.1f}MB peak RSS")
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path) as old_file, open(new_path) as new_file:
+        old, new = json.load(old_file), json.load(new_file)
+
+    old_runs = {run["input"]: run for run in old["runs"]}
+    for run in new["runs"]:
+        if run["input"] not in old_runs:
+            continue
+        print(f"{run['input']} ({old['commit']} -> {new['commit']}):")
+        comparison = compare_results(old_runs[run["input"]], run)
+        for metric, values in comparison.items():
+            change = (
+                f"{values['change']:+}%"
+                if values["change"] is not None
+                else "-"
+            )
+            print(f"\t{metric}: {values['old']} -> {values['new']} ({change})")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks slips on the given inputs"
+    )
+    parser.add_argument(
+        "-f",
+        "--filepath",
+        action="append",
+        help="input to replay, can be given more than once. "
+        "defaults to one input of each type in dataset/",
+    )
+    parser.add_argument(
+        "--dns",
+        action="store_true",
+        help="replay the dns heavy inputs in dataset/ instead of the "
+        "default ones",
+    )
+    parser.add_argument("-c", "--config", help="slips config file to use")
+    parser.add_argument(
+        "-i",
+        "--interval",
+        type=float,
+        default=0.5,
+        help="seconds between samples",
+    )
+    parser.add_argument(
+        "-r",
+        "--results",
+        help="where to store the results. defaults to output/benchmarks/",
+    )
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("OLD", "NEW"),
+        help="compare 2 stored results instead of running the benchmarks",
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    commit = get_commit()
+    runs = []
+    default_inputs = DNS_HEAVY_INPUTS if args.dns else DEFAULT_INPUTS
+    for input_path in args.filepath or default_inputs:
+        results = run_benchmark(input_path, args.config, args.interval)
+        print_results(results)
+        runs.append(results)
+
+    now = datetime.now()
+    results_path = args.results or os.path.join(
+        RESULTS_DIR,
+        f"{now.strftime('%Y-%m-%d_%H-%M-%S')}_{(commit or 'unknown')[:8]}"
+        f".json",
+    )
+    os.makedirs(os.path.dirname(results_path) or ".", exist_ok=True)
+    with open(results_path, "w") as results_file:
+        json.dump(
+            {"commit": commit, "timestamp": now.isoformat(), "runs": runs},
+            results_file,
+            indent=2,
+        )
+    print(f"Results stored in {results_path}")
+
+
+if __name__ == "__main__":
+    main()
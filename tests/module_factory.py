@@ -7,6 +7,7 @@ from unittest.mock import (
 )
 import os
 
+from managers.checkpoint_manager import CheckpointManager
 from managers.host_ip_manager import HostIPManager
 from modules.flowalerts.conn import Conn
 from modules.threat_intelligence.circl_lu import Circllu
@@ -49,6 +50,8 @@ from slips_files.core.helpers.whitelist.whitelist import Whitelist
 from modules.virustotal.virustotal import VT
 from managers.process_manager import ProcessManager
 from managers.redis_manager import RedisManager
+from managers.snapshot_manager import SnapshotManager
+from managers.retention_manager import RetentionManager
 from modules.ip_info.asn_info import ASN
 from multiprocessing import Queue
 from slips_files.core.helpers.flow_handler import FlowHandler
@@ -64,6 +67,7 @@ from slips_files.core.helpers.checker import Checker
 from modules.timeline.timeline import Timeline
 from modules.cesnet.cesnet import CESNET
 from modules.riskiq.riskiq import RiskIQ
+from modules.exporting_alerts.stix_exporter import StixExporter
 from slips_files.common.markov_chains import Matrix
 from slips_files.core.structures.evidence import (
     Attacker,
@@ -345,6 +349,22 @@ class ModuleFactory:
     def create_host_ip_manager_obj(self, main):
         return HostIPManager(main)
 
+    def create_checkpoint_manager_obj(self, output_dir: str):
+        main = Mock()
+        main.args.output = output_dir
+        main.args.resume = None
+        main.input_type = "zeek_folder"
+        main.input_information = "dataset/test9-mixed-zeek-dir"
+        return CheckpointManager(main)
+
+    def create_snapshot_manager_obj(self, output_dir: str):
+        main = Mock()
+        main.args.output = output_dir
+        return SnapshotManager(main)
+
+    def create_retention_manager_obj(self):
+        return RetentionManager(Mock())
+
     def create_process_manager_obj(self):
         return ProcessManager(self.create_main_obj())
 
@@ -506,6 +526,7 @@ class ModuleFactory:
         mock_main.args.output = "test_output"
         mock_main.args.verbose = "0"
         mock_main.args.debug = "0"
+        mock_main.args.resume = None
         mock_main.redis_man = Mock()
         mock_main.terminate_slips = Mock()
         mock_main.print_version = Mock()
@@ -644,3 +665,15 @@ class ModuleFactory:
         handler.width = 3600
         handler.print = Mock()
         return handler
+
+    def create_stix_exporter_obj(self):
+        db = Mock()
+        db.is_running_non_stop.return_value = True
+        with patch(
+            "slips_files.common.parsers.config_parser.ConfigParser"
+            ".export_to",
+            return_value=["stix"],
+        ):
+            stix = StixExporter(self.logger, db)
+        stix.print = Mock()
+        return stix
@@ -270,27 +270,26 @@ def test_cache_whitelisted_evidence_id(evidence_id, expected_calls):
 
 
 @pytest.mark.parametrize(
-    "profileid, max_threat_lvl, confidence, expected_ip_info",
+    "profileid, max_threat_lvl, confidence, expected_key",
     [
-        # Testcase 1: No previous IP info
-        ("profile1_10.0.0.1", 0.8, 0.9, {"score": 0.8, "confidence": 0.9}),
-        # Testcase 2: Update existing IP info
-        ("profile2_10.0.0.2", 0.6, 0.7, {"score": 0.6, "confidence": 0.7}),
+        # Testcase 1: ipv4 profile
+        ("profile1_10.0.0.1", 0.8, 0.9, "IPsInfo_10.0.0.1"),
+        # Testcase 2: ipv6 profile
+        ("profile_2001:db8::1", 0.6, 0.7, "IPsInfo_2001:db8::1"),
     ],
 )
-def test_update_ips_info(
-    profileid, max_threat_lvl, confidence, expected_ip_info
-):
+def test_update_ips_info(profileid, max_threat_lvl, confidence, expected_key):
     alert_handler = ModuleFactory().create_alert_handler_obj()
     alert_handler.rcache = MagicMock()
-    alert_handler.get_ip_info = MagicMock(
-        return_value={"score": 0.5, "confidence": 0.6}
-    )
 
     alert_handler.update_ips_info(profileid, max_threat_lvl, confidence)
 
     alert_handler.rcache.hset.assert_called_once_with(
-        "IPsInfo", profileid.split("_")[-1], json.dumps(expected_ip_info)
+        expected_key,
+        mapping={
+            "score": json.dumps(max_threat_lvl),
+            "confidence": json.dumps(confidence),
+        },
     )
 
 
@@ -0,0 +1,144 @@
+"""Unit test for slips_files/core/helpers/alert_writer.py"""
+
+import os
+import time
+from unittest.mock import (
+    Mock,
+    patch,
+)
+
+import pytest
+
+from slips_files.core.helpers.alert_writer import AlertWriter
+
+
+def create_alert_writer(tmp_path, **kwargs) -> AlertWriter:
+    return AlertWriter(open(tmp_path / "alerts.log", "a"), **kwargs)
+
+
+def read(path) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+def test_lines_are_written_in_the_background(tmp_path):
+    writer = create_alert_writer(tmp_path, flush_interval=0.05)
+    writer.write("line 1\n")
+    writer.write("line 2\n")
+    assert read(writer.name) == ""
+
+    time.sleep(0.3)
+    assert read(writer.name) == "line 1\nline 2\n"
+    writer.close()
+
+
+def test_full_buffer_is_flushed_before_the_interval(tmp_path):
+    writer = create_alert_writer(tmp_path, flush_interval=60, buffer_size=10)
+    writer.write("0123456789\n")
+    time.sleep(0.3)
+    assert read(writer.name) == "0123456789\n"
+    writer.close()
+
+
+def test_close_writes_the_remaining_lines(tmp_path):
+    writer = create_alert_writer(tmp_path, flush_interval=60)
+    for i in range(1000):
+        writer.write(f"line {i}\n")
+
+    with patch("os.fsync") as fsync:
+        writer.close()
+    fsync.assert_called_once()
+    assert writer.file.closed
+    assert read(writer.name).splitlines()[-1] == "line 999"
+
+
+@pytest.mark.parametrize(
+    "rotation_size, rotation_interval, expected_rotated_files",
+    [
+        # Testcase 1: no rotation
+        (0, 0, 0),
+        # Testcase 2: rotation by size
+        (15, 0, 1),
+        # Testcase 3: rotation by age
+        (0, 0.01, 1),
+    ],
+)
+def test_rotation(
+    tmp_path, rotation_size, rotation_interval, expected_rotated_files
+):
+    on_new_file = Mock()
+    writer = create_alert_writer(
+        tmp_path,
+        flush_interval=60,
+        rotation_size=rotation_size,
+        rotation_interval=rotation_interval,
+        on_new_file=on_new_file,
+    )
+    writer.write("first line\n")
+    writer.flush()
+    time.sleep(0.02)
+    writer.write("second line\n")
+    writer.flush()
+    writer.close()
+
+    rotated = [f for f in os.listdir(tmp_path) if f != "alerts.log"]
+    assert len(rotated) == expected_rotated_files
+    assert on_new_file.call_count == expected_rotated_files
+    if expected_rotated_files:
+        assert read(tmp_path / rotated[0]) == "first line\n"
+        assert read(writer.name) == "second line\n"
+    else:
+        assert read(writer.name) == "first line\nsecond line\n"
+
+
+def test_rotated_files_have_unique_names(tmp_path):
+    writer = create_alert_writer(tmp_path, flush_interval=60, rotation_size=1)
+    for i in range(3):
+        writer.write(f"line {i}\n")
+        writer.flush()
+    writer.close()
+    # rotated twice in the same second
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_write_error(tmp_path):
+    on_error = Mock()
+    writer = create_alert_writer(
+        tmp_path, flush_interval=60, on_error=on_error
+    )
+    writer.file.close()
+    writer.write("line\n")
+    writer.flush()
+    on_error.assert_called_once()
+
+
+def test_get_file_info_writes_the_waiting_lines(tmp_path):
+    writer = create_alert_writer(tmp_path, flush_interval=60, rotation_size=15)
+    writer.write("first line\n")
+    writer.flush()
+    writer.write("second line\n")
+
+    # the second line is written to a new file
+    assert writer.get_file_info() == {"size": 12, "rotated_files": 1}
+    assert read(writer.name) == "second line\n"
+    writer.close()
+
+
+def test_get_rotated_paths(tmp_path):
+    for filename in (
+        "alerts.log",
+        "alerts.log.2024-01-02_10-00-00",
+        "alerts.log.2024-01-01_10-00-00.10",
+        "alerts.log.2024-01-01_10-00-00.2",
+        "alerts.log.2024-01-01_10-00-00",
+        "alerts.json.2024-01-01_09-00-00",
+        "alerts.log.old",
+    ):
+        (tmp_path / filename).write_text("")
+
+    assert AlertWriter.get_rotated_paths(str(tmp_path / "alerts.log")) == [
+        str(tmp_path / "alerts.log.2024-01-01_10-00-00"),
+        str(tmp_path / "alerts.log.2024-01-01_10-00-00.2"),
+        str(tmp_path / "alerts.log.2024-01-01_10-00-00.10"),
+        str(tmp_path / "alerts.log.2024-01-02_10-00-00"),
+    ]
@@ -83,60 +83,88 @@ def test_cache_ip_range(ip_address, expected_whois_info, expected_cached_data):
 
 
 @pytest.mark.parametrize(
-    "ip_address, first_octet, cached_data, expected_result",
+    "ip_address, cached_data, expected_result",
     [
         # Testcase 1: IP in cached range
         (
             "192.168.1.100",
-            "192",
-            json.dumps(
-                {"192.168.0.0/16": {"org": "Test Org", "number": "AS12345"}}
-            ),
+            {"192.168.0.0/16": {"org": "Test Org", "number": "AS12345"}},
             {"asn": {"org": "Test Org", "number": "AS12345"}},
         ),
         # Testcase 2: IP not in cached range
         (
             "10.0.0.1",
-            "10",
-            json.dumps(
-                {"192.168.0.0/16": {"org": "Test Org", "number": "AS12345"}}
-            ),
+            {"192.168.0.0/16": {"org": "Test Org", "number": "AS12345"}},
             None,
         ),
-        # Testcase 3: No cached data for first octet
+        # Testcase 3: No cached ranges
         (
             "172.16.0.1",
-            "172",
-            None,
+            {},
             None,
         ),
         # Testcase 4: Invalid IP
         (
             "invalid_ip",
-            None,
-            None,
+            {"192.168.0.0/16": {"org": "Test Org", "number": "AS12345"}},
             None,
         ),
         # Testcase 5: Cached range without 'number'
         (
             "192.168.1.100",
-            "192",
-            json.dumps({"192.168.0.0/16": {"org": "Test Org"}}),
+            {"192.168.0.0/16": {"org": "Test Org"}},
             {"asn": {"org": "Test Org"}},
         ),
+        # Testcase 6: IP in a range nested in another cached range
+        (
+            "8.8.8.8",
+            {
+                "8.0.0.0/8": {"org": "Level3", "number": "AS3356"},
+                "8.8.8.0/24": {"org": "Google", "number": "AS15169"},
+            },
+            {"asn": {"org": "Google", "number": "AS15169"}},
+        ),
+        # Testcase 7: IPv6 in cached range
+        (
+            "2001:4860:4860::8888",
+            {"2001:4860::/32": {"org": "Google", "number": "AS15169"}},
+            {"asn": {"org": "Google", "number": "AS15169"}},
+        ),
     ],
 )
-def test_get_cached_asn(ip_address, first_octet, cached_data, expected_result):
+def test_get_cached_asn(ip_address, cached_data, expected_result):
+    asn_info = ModuleFactory().create_asn_obj()
+    asn_info.db.get_asn_cache.return_value = cached_data
+    result = asn_info.get_cached_asn(ip_address)
+    assert result == expected_result
+
+
+def test_get_cached_asn_loads_cached_ranges_once():
     asn_info = ModuleFactory().create_asn_obj()
+    asn_info.db.get_asn_cache.return_value = {
+        "192.168.0.0/16": {"org": "Test Org", "number": "AS12345"}
+    }
+    asn_info.get_cached_asn("192.168.1.1")
+    asn_info.get_cached_asn("10.0.0.1")
+    asn_info.db.get_asn_cache.assert_called_once()
 
-    with patch(
-        "slips_files.common.slips_utils.utils.get_first_octet"
-    ) as mock_get_first_octet:
-        mock_get_first_octet.return_value = first_octet
 
-        asn_info.db.get_asn_cache.return_value = cached_data
-        result = asn_info.get_cached_asn(ip_address)
-        assert result == expected_result
+def test_cache_ip_range_updates_loaded_ranges():
+    asn_info = ModuleFactory().create_asn_obj()
+    asn_info.db.get_asn_cache.return_value = {}
+    assert asn_info.get_cached_asn("1.1.1.1") is None
+
+    with patch("ipwhois.IPWhois.lookup_rdap") as mock_lookup_rdap:
+        mock_lookup_rdap.return_value = {
+            "asn_description": "CLOUDFLARENET, US",
+            "asn_cidr": "1.1.1.0/24",
+            "asn": "13335",
+        }
+        asn_info.cache_ip_range("1.1.1.1")
+
+    assert asn_info.get_cached_asn("1.1.1.2") == {
+        "asn": {"org": "CLOUDFLARENET, US", "number": "AS13335"}
+    }
 
 
 @pytest.mark.parametrize(
@@ -244,58 +272,62 @@ def test_get_asn_online(
 
 
 @pytest.mark.parametrize(
-    "ip, cached_ip_info, asn, expected_call",
+    "ip, cached_ip_info, asn, expected_stored_info, expected_cached_ip_info",
     [
         # Testcase 1: Update with new ASN info
         (
             "192.168.1.1",
             {},
             {"asn": {"number": "AS12345", "org": "Test Org"}},
-            (
-                "192.168.1.1",
-                {
-                    "asn": {"number": "AS12345", "org": "Test Org"},
-                    "timestamp": 1625097600,
-                },
-            ),
+            {
+                "asn": {"number": "AS12345", "org": "Test Org"},
+                "timestamp": 1625097600,
+            },
+            {
+                "asn": {"number": "AS12345", "org": "Test Org"},
+                "timestamp": 1625097600,
+            },
         ),
         # Testcase 2: Update existing ASN info
         (
             "10.0.0.1",
             {"country": "US"},
             {"asn": {"number": "AS67890", "org": "Another Org"}},
-            (
-                "10.0.0.1",
-                {
-                    "country": "US",
-                    "asn": {"number": "AS67890", "org": "Another Org"},
-                    "timestamp": 1625097600,
-                },
-            ),
+            {
+                "asn": {"number": "AS67890", "org": "Another Org"},
+                "timestamp": 1625097600,
+            },
+            {
+                "country": "US",
+                "asn": {"number": "AS67890", "org": "Another Org"},
+                "timestamp": 1625097600,
+            },
         ),
         # Testcase 3: Update with empty ASN info
         (
             "172.16.0.1",
             {"some_key": "some_value"},
             {},
-            (
-                "172.16.0.1",
-                {
-                    "some_key": "some_value",
-                    "timestamp": 1625097600,
-                },
-            ),
+            {"timestamp": 1625097600},
+            {
+                "some_key": "some_value",
+                "timestamp": 1625097600,
+            },
         ),
     ],
 )
-def test_update_ip_info(ip, cached_ip_info, asn, expected_call):
+def test_update_ip_info(
+    ip, cached_ip_info, asn, expected_stored_info, expected_cached_ip_info
+):
     asn_info = ModuleFactory().create_asn_obj()
 
     with patch("time.time", return_value=1625097600):
         asn_info.update_ip_info(ip, cached_ip_info, asn)
 
-        asn_info.db.set_ip_info.assert_called_once_with(*expected_call)
-        expected_cached_ip_info = expected_call[1]
+        # only the asn is stored, not the rest of the cached info
+        asn_info.db.set_ip_info.assert_called_once_with(
+            ip, expected_stored_info
+        )
         assert cached_ip_info == expected_cached_ip_info
 
 
@@ -381,7 +413,7 @@ def test_get_asn_with_result(
     ) as mock_get_online, patch.object(
         asn_info, "update_ip_info"
     ) as mock_update_ip_info:
-        asn_info.get_asn(ip, cached_ip_info)
+        assert asn_info.get_asn(ip, cached_ip_info) == expected_result
 
         actual_calls = (
             mock_get_cached_asn.mock_calls
@@ -420,7 +452,7 @@ def test_get_asn_without_result():
     ) as mock_get_online, patch.object(
         asn_info, "update_ip_info"
     ) as mock_update_ip_info:
-        asn_info.get_asn(ip, cached_ip_info)
+        assert asn_info.get_asn(ip, cached_ip_info) is None
 
         actual_calls = (
             mock_get_cached_asn.mock_calls
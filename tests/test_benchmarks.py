@@ -0,0 +1,75 @@
+from collections import Counter
+
+import pytest
+
+from tests.benchmarks.metrics import (
+    compare_results,
+    get_redis_commands,
+    get_stage_latency,
+)
+
+
+@pytest.mark.parametrize(
+    "timestamps, upstream, downstream, expected_latency",
+    [
+        # Testcase 1: every msg is received 1s after it's published
+        ([0, 1, 2, 3], [2, 4, 4, 4], [0, 2, 4, 4], 1.0),
+        # Testcase 2: msgs are received before the next sample
+        ([0, 1, 2], [2, 4, 4], [2, 4, 4], 0.0),
+        # Testcase 3: no msgs received
+        ([0, 1, 2], [2, 4, 4], [0, 0, 0], None),
+        # Testcase 4: the downstream counter is read after the upstream one
+        ([0, 1, 2], [2, 4, 4], [3, 4, 4], 0.0),
+        # Testcase 5: no samples
+        ([], [], [], None),
+    ],
+)
+def test_get_stage_latency(timestamps, upstream, downstream, expected_latency):
+    assert (
+        get_stage_latency(timestamps, upstream, downstream) == expected_latency
+    )
+
+
+def test_get_redis_commands():
+    commandstats = {
+        "cmdstat_hset": {"calls": 10, "usec": 20},
+        "cmdstat_hgetall": {"calls": 7, "usec": 20},
+        "cmdstat_info": {"calls": 2, "usec": 20},
+    }
+    own_commands = Counter({"hgetall": 5, "info": 2})
+    assert get_redis_commands(commandstats, own_commands) == {
+        "hset": 10,
+        "hgetall": 2,
+    }
+
+
+def test_compare_results():
+    old = {
+        "flows_per_sec": 100,
+        "duration": 10,
+        "total_redis_commands": 1000,
+        "peak_rss": {"Profiler": 100, "Input": 100},
+        "stage_latency": {"new_flow -> Flow Alerts": 0.5},
+    }
+    new = {
+        "flows_per_sec": 150,
+        "duration": 8,
+        "total_redis_commands": 1000,
+        "peak_rss": {"Profiler": 150, "Input": 150},
+        "stage_latency": {
+            "new_flow -> Flow Alerts": 0.25,
+            "new_dns -> Flow Alerts": 0.1,
+        },
+    }
+    comparison = compare_results(old, new)
+    assert comparison["flows_per_sec"]["change"] == 50.0
+    assert comparison["duration"]["change"] == -20.0
+    assert comparison["total_redis_commands"]["change"] == 0.0
+    assert comparison["total_peak_rss"] == {
+        "old": 200,
+        "new": 300,
+        "change": 50.0,
+    }
+    assert comparison["latency_new_flow -> Flow Alerts"]["change"] == -50.0
+    # stages that aren't in both runs aren't compared
+    assert "latency_new_dns -> Flow Alerts" not in comparison
@@ -4,6 +4,8 @@ this file needs sudoroot to run
 
 from tests.common_test_utils import IS_IN_A_DOCKER_CONTAINER
 from tests.module_factory import ModuleFactory
+from unittest.mock import patch
+import json
 import platform
 import pytest
 import os
@@ -100,3 +102,71 @@ def test_unblock_ip():
     if not blocking.is_ip_blocked("2.2.0.0"):
         assert blocking.block_ip(ip, from_, to) is True
     assert blocking.unblock_ip(ip, from_, to) is True
+
+
+def create_dry_run_blocking_obj():
+    with patch(
+        "slips_files.common.parsers.config_parser.ConfigParser"
+        ".blocking_backend",
+        return_value="dry_run",
+    ):
+        return ModuleFactory().create_blocking_obj()
+
+
+def test_handle_blocking_requests_in_dry_run():
+    blocking = create_dry_run_blocking_obj()
+    msgs = [
+        {"data": json.dumps({"ip": ip, "block": True})}
+        for ip in ("2.2.0.0", "3.3.0.0", "2.2.0.0")
+    ]
+    blocking.handle_blocking_requests(msgs)
+
+    assert blocking.is_ip_blocked("2.2.0.0")
+    assert blocking.is_ip_blocked("3.3.0.0")
+    # all the blocks are applied by one ipset restore
+    batches = [
+        call.args[0]
+        for call in blocking.print.call_args_list
+        if "ipset restore" in call.args[0]
+    ]
+    assert batches[-1].count("add slips_blocked_v4") == 2
+
+
+@pytest.mark.parametrize(
+    "blocking_data, expected_result",
+    [
+        # Testcase 1: block all traffic
+        ({"from": None, "to": None}, True),
+        # Testcase 2: block all traffic explicitly
+        ({"from": True, "to": True}, True),
+        # Testcase 3: block one direction only
+        ({"from": True, "to": False}, False),
+        # Testcase 4: block one port only
+        ({"dport": 443}, False),
+    ],
+)
+def test_should_use_backend(blocking_data, expected_result):
+    blocking = create_dry_run_blocking_obj()
+    args = {
+        "from_": None,
+        "to": None,
+        "dport": None,
+        "sport": None,
+        "protocol": None,
+    }
+    if "from" in blocking_data:
+        args["from_"] = blocking_data.pop("from")
+    args.update(blocking_data)
+    assert blocking.should_use_backend(**args) is expected_result
+
+
+def test_unblock_after_block_for_in_dry_run():
+    blocking = create_dry_run_blocking_obj()
+    with patch("time.time", return_value=1000):
+        blocking.block_ip("2.2.0.0", block_for=10)
+    blocking.flush_backend()
+
+    with patch("time.time", return_value=1011):
+        blocking.main()
+    assert not blocking.is_ip_blocked("2.2.0.0")
+    blocking.print.assert_any_call("Unblocked: 2.2.0.0")
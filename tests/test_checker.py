@@ -155,6 +155,24 @@ def test_check_input_type_filepath(filepath, is_file, is_dir, expected_result):
         assert result == expected_result
 
 
+def test_check_input_type_resume():
+    checker = ModuleFactory().create_checker_obj()
+    checker.main.args.interface = None
+    checker.main.args.filepath = None
+    checker.main.args.db = None
+    checker.main.args.input_module = None
+    checker.main.args.resume = "output/old_analysis"
+    checker.main.checkpoint_man.resume.return_value = "/path/to/dir"
+
+    with mock.patch("os.path.isdir", return_value=True), mock.patch.object(
+        checker.main, "get_input_file_type", return_value="zeek_folder"
+    ):
+        result = checker.check_input_type()
+
+    assert result == ("zeek_folder", "/path/to/dir", False)
+    checker.main.checkpoint_man.resume.assert_called_once()
+
+
 def test_check_input_type_stdin():
 
     checker = ModuleFactory().create_checker_obj()
@@ -0,0 +1,286 @@
+import json
+import os
+import sqlite3
+from unittest.mock import (
+    MagicMock,
+    Mock,
+    patch,
+)
+
+import pytest
+
+from managers.checkpoint_manager import (
+    CheckpointManager,
+    INFO_FILE,
+    RDB_FILE,
+    RESUMED_RDB,
+    SQLITE_FILE,
+)
+from slips_files.core.database.sqlite_db.database import SQLiteDB
+from tests.module_factory import ModuleFactory
+
+
+@pytest.mark.parametrize(
+    "interval, input_type, is_growing, transport, expected_interval",
+    [
+        # Testcase 1: disabled in the config
+        (0, "zeek_folder", False, "streams", 0),
+        # Testcase 2: zeek dir
+        (600, "zeek_folder", False, "streams", 600),
+        # Testcase 3: zeek log file
+        (600, "zeek_log_file", False, "streams", 600),
+        # Testcase 4: unsupported input
+        (600, "pcap", False, "streams", 0),
+        # Testcase 5: growing zeek dir
+        (600, "zeek_folder", True, "streams", 0),
+        # Testcase 6: pub/sub msgs aren't in the snapshots
+        (600, "zeek_folder", False, "pubsub", 0),
+    ],
+)
+def test_enable(
+    tmp_path, interval, input_type, is_growing, transport, expected_interval
+):
+    checkpoint_man = ModuleFactory().create_checkpoint_manager_obj(
+        str(tmp_path)
+    )
+    checkpoint_man.main.conf.checkpoint_interval.return_value = interval
+    checkpoint_man.main.conf.message_transport.return_value = transport
+    checkpoint_man.main.input_type = input_type
+    checkpoint_man.main.db.is_growing_zeek_dir.return_value = is_growing
+
+    checkpoint_man.enable()
+
+    assert checkpoint_man.interval == expected_interval
+
+
+@pytest.mark.parametrize(
+    "last_checkpoint_time, expected_requested_at",
+    [
+        # Testcase 1: not time for a checkpoint yet
+        (995, None),
+        # Testcase 2: time for a checkpoint
+        (800, "1000"),
+    ],
+)
+def test_update_requests_checkpoints(
+    tmp_path, last_checkpoint_time, expected_requested_at
+):
+    checkpoint_man = ModuleFactory().create_checkpoint_manager_obj(
+        str(tmp_path)
+    )
+    checkpoint_man.interval = 100
+    checkpoint_man.last_checkpoint_time = last_checkpoint_time
+    db = checkpoint_man.main.db
+
+    with patch("time.time", return_value=1000):
+        checkpoint_man.update()
+
+    assert checkpoint_man.requested_at == expected_requested_at
+    if expected_requested_at:
+        db.publish.assert_called_once_with("take_checkpoint", "1000")
+    else:
+        db.publish.assert_not_called()
+    db.start_background_save.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "snapshot, expected_requested_at, expected_is_saving",
+    [
+        # Testcase 1: the evidence handler didn't reply yet
+        (None, "1000", False),
+        # Testcase 2: the reply to an older request
+        ({"requested_at": "900", "started": True}, "1000", False),
+        # Testcase 3: the snapshot was started
+        ({"requested_at": "1000", "started": True}, None, True),
+        # Testcase 4: redis is busy writing another snapshot
+        ({"requested_at": "1000", "started": False}, None, False),
+    ],
+)
+def test_update_starts_checkpoints(
+    tmp_path, snapshot, expected_requested_at, expected_is_saving
+):
+    checkpoint_man = ModuleFactory().create_checkpoint_manager_obj(
+        str(tmp_path)
+    )
+    checkpoint_man.interval = 100
+    checkpoint_man.requested_at = "1000"
+    alerts_files = {"alerts.log": {"size": 10, "rotated_files": 0}}
+    if snapshot:
+        snapshot["alerts_files"] = alerts_files
+    checkpoint_man.main.db.get_checkpoint_snapshot.return_value = snapshot
+
+    checkpoint_man.update()
+
+    assert checkpoint_man.requested_at == expected_requested_at
+    assert checkpoint_man.is_saving == expected_is_saving
+    if expected_requested_at is None:
+        assert checkpoint_man.alerts_files == alerts_files
+    checkpoint_man.main.db.publish.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "status, expected_is_saving, expected_stored",
+    [
+        # Testcase 1: redis is still writing the snapshot
+        (None, True, False),
+        # Testcase 2: the snapshot is done
+        (True, False, True),
+        # Testcase 3: redis failed to write the snapshot
+        (False, False, False),
+    ],
+)
+def test_update_finishes_checkpoints(
+    tmp_path, status, expected_is_saving, expected_stored
+):
+    checkpoint_man = ModuleFactory().create_checkpoint_manager_obj(
+        str(tmp_path)
+    )
+    checkpoint_man.interval = 100
+    checkpoint_man.is_saving = True
+    checkpoint_man.main.db.get_background_save_status.return_value = status
+    checkpoint_man.store_checkpoint = Mock()
+
+    checkpoint_man.update()
+
+    assert checkpoint_man.is_saving == expected_is_saving
+    assert checkpoint_man.store_checkpoint.called == expected_stored
+    checkpoint_man.main.db.start_background_save.assert_not_called()
+
+
+def create_checkpoint_man_with_dbs(tmp_path):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    checkpoint_man = ModuleFactory().create_checkpoint_manager_obj(
+        str(output_dir)
+    )
+    rdb = tmp_path / "dump.rdb"
+    rdb.write_bytes(b"REDIS0011")
+    db = checkpoint_man.main.db
+    db.get_rdb_path.return_value = str(rdb)
+    sqlite_db = SQLiteDB(MagicMock(), str(tmp_path))
+    db.backup_sqlite_db.side_effect = sqlite_db.backup
+    db.get_processed_flows_so_far.return_value = 10
+    return checkpoint_man, sqlite_db
+
+
+def test_store_checkpoint(tmp_path):
+    checkpoint_man, sqlite_db = create_checkpoint_man_with_dbs(tmp_path)
+    sqlite_db.execute(
+        "INSERT INTO flows (uid, flow, label, profileid, twid, aid) "
+        "VALUES ('uid1', '{}', 'benign', 'profile_1.1.1.1', "
+        "'timewindow1', '')"
+    )
+    checkpoint_man.alerts_files = {
+        "alerts.log": {"size": 100, "rotated_files": 0}
+    }
+    checkpoint_dir = tmp_path / "output" / "checkpoint"
+
+    checkpoint_man.store_checkpoint()
+    # a newer checkpoint replaces the old one
+    checkpoint_man.alerts_files = {
+        "alerts.log": {"size": 200, "rotated_files": 0}
+    }
+    checkpoint_man.store_checkpoint()
+
+    assert sorted(os.listdir(tmp_path / "output")) == ["checkpoint"]
+    assert (checkpoint_dir / RDB_FILE).read_bytes() == b"REDIS0011"
+    info = json.loads((checkpoint_dir / INFO_FILE).read_text())
+    assert info["input_information"] == "dataset/test9-mixed-zeek-dir"
+    assert info["input_type"] == "zeek_folder"
+    assert info["alerts_files"] == {
+        "alerts.log": {"size": 200, "rotated_files": 0}
+    }
+    backup = sqlite3.connect(checkpoint_dir / SQLITE_FILE)
+    assert backup.execute("SELECT uid FROM flows").fetchall() == [("uid1",)]
+    backup.close()
+    sqlite_db.close()
+
+
+def test_resume(tmp_path):
+    checkpoint_man, sqlite_db = create_checkpoint_man_with_dbs(tmp_path)
+    output_dir = tmp_path / "output"
+    (output_dir / "alerts.log").write_text("alert 1\n")
+    checkpoint_man.alerts_files = {
+        "alerts.log": {"size": 8, "rotated_files": 0}
+    }
+    checkpoint_man.store_checkpoint()
+    sqlite_db.close()
+    # alerts added after the checkpoint
+    with open(output_dir / "alerts.log", "a") as f:
+        f.write("alert 2\n")
+
+    # slips is started again using --resume
+    checkpoint_man = ModuleFactory().create_checkpoint_manager_obj("output")
+    checkpoint_man.main.args.resume = str(output_dir)
+
+    assert checkpoint_man.resume() == "dataset/test9-mixed-zeek-dir"
+    assert checkpoint_man.main.args.output == str(output_dir)
+    assert checkpoint_man.rdb_to_load == str(output_dir / RESUMED_RDB)
+    assert (output_dir / RESUMED_RDB).read_bytes() == b"REDIS0011"
+    assert (output_dir / SQLITE_FILE).exists()
+    assert (output_dir / "alerts.log").read_text() == "alert 1\n"
+    checkpoint_man.main.terminate_slips.assert_not_called()
+
+
+def test_resume_without_a_checkpoint(tmp_path):
+    checkpoint_man = ModuleFactory().create_checkpoint_manager_obj("output")
+    checkpoint_man.main.args.resume = str(tmp_path)
+
+    assert checkpoint_man.resume() is None
+    checkpoint_man.main.terminate_slips.assert_called_once()
+    assert checkpoint_man.rdb_to_load is None
+
+
+@pytest.mark.parametrize(
+    "files, rotated_files, expected_files",
+    [
+        # Testcase 1: no rotation
+        (
+            {"alerts.log": "alert 1\nalert 2\n"},
+            0,
+            {"alerts.log": "alert 1\n"},
+        ),
+        # Testcase 2: rotated after the checkpoint
+        (
+            {
+                "alerts.log.2024-01-01_10-00-00": "alert 1\nalert 2\n",
+                "alerts.log.2024-01-01_11-00-00": "alert 3\n",
+                "alerts.log": "alert 4\n",
+            },
+            0,
+            {"alerts.log": "alert 1\n"},
+        ),
+        # Testcase 3: rotated before and after the checkpoint
+        (
+            {
+                "alerts.log.2024-01-01_10-00-00": "alert 0\n",
+                "alerts.log.2024-01-01_11-00-00": "alert 1\nalert 2\n",
+                "alerts.log": "alert 3\n",
+            },
+            1,
+            {
+                "alerts.log.2024-01-01_10-00-00": "alert 0\n",
+                "alerts.log": "alert 1\n",
+            },
+        ),
+        # Testcase 4: the alerts file was rotated before the checkpoint
+        # and nothing was written to the new one since
+        (
+            {"alerts.log.2024-01-01_10-00-00": "alert 0\n"},
+            1,
+            {"alerts.log.2024-01-01_10-00-00": "alert 0\n"},
+        ),
+    ],
+)
+def test_restore_alerts_file(tmp_path, files, rotated_files, expected_files):
+    for filename, content in files.items():
+        (tmp_path / filename).write_text(content)
+
+    CheckpointManager.restore_alerts_file(
+        str(tmp_path / "alerts.log"), size=8, rotated_files=rotated_files
+    )
+
+    assert {
+        filename: (tmp_path / filename).read_text()
+        for filename in os.listdir(tmp_path)
+    } == expected_files
@@ -514,6 +514,54 @@ def test_should_ignore_conn_without_dns(
     assert conn.should_ignore_conn_without_dns(flow) is expected_result
 
 
+@pytest.mark.parametrize(
+    "is_ip_resolved, expected_result",
+    [
+        # Testcase 1: the profile resolved the ip in the past 24hs
+        (True, False),
+        # Testcase 2: no resolution
+        (False, True),
+    ],
+)
+def test_recheck_connection_without_dns_resolution(
+    is_ip_resolved, expected_result
+):
+    conn = ModuleFactory().create_conn_analyzer_obj()
+    flow = Conn(
+        starttime="1726249372.312124",
+        uid=uid,
+        saddr=saddr,
+        daddr="93.184.216.34",
+        dur=1,
+        proto="tcp",
+        appproto="http",
+        sport="5353",
+        dport="80",
+        spkts=0,
+        dpkts=0,
+        sbytes=0,
+        dbytes=0,
+        smac="",
+        dmac="",
+        state="Established",
+        history="",
+    )
+    conn.db.is_ip_resolved.return_value = is_ip_resolved
+    conn.check_if_resolution_was_made_by_different_version = Mock(
+        return_value=False
+    )
+    conn.is_well_known_org = Mock(return_value=False)
+    conn.set_evidence.conn_without_dns = Mock()
+
+    assert (
+        conn.recheck_connection_without_dns_resolution(profileid, twid, flow)
+        is expected_result
+    )
+    conn.db.is_ip_resolved.assert_called_once_with(
+        profileid, twid, "93.184.216.34", 24
+    )
+
+
 @pytest.mark.parametrize(
     "profileid, daddr, mock_get_the_other_ip_version_return_value, "
     "mock_get_dns_resolution_return_value, expected_result",
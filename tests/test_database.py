@@ -1,6 +1,7 @@
 from unittest.mock import (
     Mock,
     call,
+    patch,
 )
 
 import redis
@@ -281,3 +282,186 @@ def test_update_max_threat_level(
     assert (
         db.update_max_threat_level(profileid, cur_threat_level) == expected_max
     )
+
+
+def test_increment_processed_flows_with_input_offset():
+    db = ModuleFactory().create_db_manager_obj(6394, flush_db=True)
+    db.increment_processed_flows(("conn.log", 100))
+    db.increment_processed_flows(("conn.log", 250))
+    db.increment_processed_flows()
+    assert db.get_processed_flows_so_far() == 3
+    assert db.get_input_offsets() == {"conn.log": 250}
+    db.delete_input_offsets()
+    assert db.get_input_offsets() == {}
+
+
+def test_set_ip_info():
+    db = ModuleFactory().create_db_manager_obj(6395, flush_db=True)
+    ip = "203.0.113.7"
+    db.rdb.rcache.delete(f"IPsInfo_{ip}")
+    db.rdb.rcache.srem("known_ips", ip)
+
+    db.set_ip_info(ip, {"geocountry": "US"})
+    db.set_ip_info(ip, {"asn": {"number": "AS15169", "org": "GOOGLE"}})
+    # only the given info types are updated
+    db.set_ip_info(ip, {"geocountry": "CZ"})
+
+    assert db.get_ip_info(ip) == {
+        "geocountry": "CZ",
+        "asn": {"number": "AS15169", "org": "GOOGLE"},
+    }
+    assert db.get_ip_info(ip, ["asn", "SNI"]) == {
+        "asn": {"number": "AS15169", "org": "GOOGLE"}
+    }
+    assert db.get_ip_info(ip, ["SNI"]) is None
+    db.rdb.rcache.delete(f"IPsInfo_{ip}")
+
+
+def test_migrate_legacy_ips_info():
+    db = ModuleFactory().create_db_manager_obj(6396, flush_db=True)
+    ip = "203.0.113.8"
+    db.rdb.rcache.delete(f"IPsInfo_{ip}")
+    db.rdb.rcache.hset(
+        "IPsInfo", ip, json.dumps({"geocountry": "US", "score": 0.5})
+    )
+
+    db.rdb._migrate_legacy_ips_info()
+
+    assert db.rdb.rcache.type("IPsInfo") == "none"
+    assert db.get_ip_info(ip) == {"geocountry": "US", "score": 0.5}
+    assert db.rdb.rcache.sismember("known_ips", ip)
+    db.rdb.rcache.delete(f"IPsInfo_{ip}")
+
+
+def test_ask_for_ip_info_once_per_tw():
+    db = ModuleFactory().create_db_manager_obj(6397, flush_db=True)
+    p2p_requests = db.subscribe("p2p_data_request")
+    for tw in ("timewindow1", "timewindow1", "timewindow2"):
+        db.ask_for_ip_info("8.8.8.8", profileid, tw, flow, "dstip")
+
+    # the repeated request in timewindow1 isn't published
+    assert db.get_msgs_published_in_channel("p2p_data_request") == "2"
+    db.store_suppressed_ip_info_requests()
+    # already counted
+    db.store_suppressed_ip_info_requests()
+    assert db.get_suppressed_ip_info_requests() == 1
+    p2p_requests.close()
+
+
+@pytest.mark.parametrize(
+    "resolved_in_tw, twid, expected_result",
+    [
+        # Testcase 1: resolved in the same tw
+        ("timewindow5", "timewindow5", True),
+        # Testcase 2: resolved in the past 24hs
+        ("timewindow5", "timewindow20", True),
+        # Testcase 3: resolved more than 24hs ago
+        ("timewindow5", "timewindow40", False),
+        # Testcase 4: never resolved by this profile
+        (None, "timewindow5", False),
+    ],
+)
+def test_is_ip_resolved(resolved_in_tw, twid, expected_result):
+    db = ModuleFactory().create_db_manager_obj(6398, flush_db=True)
+    # the db is only flushed when the first testcase creates it
+    db.r.flushdb()
+    db.rdb.width = 3600
+    if resolved_in_tw:
+        db.set_dns_resolution(
+            "example.com",
+            ["93.184.216.34"],
+            time.time(),
+            "uid",
+            "A",
+            test_ip,
+            resolved_in_tw,
+        )
+    assert (
+        db.is_ip_resolved(profileid, twid, "93.184.216.34", 24)
+        == expected_result
+    )
+    # resolutions of other profiles don't count
+    assert not db.is_ip_resolved("profile_10.0.0.1", twid, "93.184.216.34", 24)
+
+
+def test_set_resolved_ips_keeps_the_newest_tw():
+    db = ModuleFactory().create_db_manager_obj(6402, flush_db=True)
+    db.rdb.set_resolved_ips(profileid, "timewindow20", ["93.184.216.34"])
+    # an older resolution read later
+    db.rdb.set_resolved_ips(profileid, "timewindow5", ["93.184.216.34"])
+    assert db.r.zscore(f"{profileid}_resolved_ips", "93.184.216.34") == 20
+
+
+def test_migrate_legacy_dns_resolutions():
+    db = ModuleFactory().create_db_manager_obj(6401, flush_db=True)
+    db.rdb.width = 3600
+    # set when the db was created
+    db.r.delete("dns_resolutions_migrated")
+    resolution = {
+        "ts": 1.0,
+        "uid": "uid",
+        "domains": ["example.com"],
+        "resolved-by": [test_ip],
+    }
+    db.r.hset(
+        "DNSresolution",
+        "93.184.216.34",
+        json.dumps(
+            {
+                **resolution,
+                "timewindows": [
+                    f"{profileid}_timewindow1",
+                    f"{profileid}_timewindow3",
+                ],
+            }
+        ),
+    )
+
+    db.rdb._migrate_legacy_dns_resolutions()
+
+    assert db.get_dns_resolution("93.184.216.34") == resolution
+    assert db.r.zscore(f"{profileid}_resolved_ips", "93.184.216.34") == 3
+    assert db.is_ip_resolved(profileid, "timewindow3", "93.184.216.34", 24)
+
+    # the other processes don't scan the resolutions again
+    db.r.hset("DNSresolution", "1.1.1.1", json.dumps({"timewindows": []}))
+    db.rdb._migrate_legacy_dns_resolutions()
+    assert "timewindows" in db.get_dns_resolution("1.1.1.1")
+
+
+def test_take_snapshot_when_redis_refuses_to_save():
+    db = ModuleFactory().create_db_manager_obj(6404, flush_db=True)
+    with (
+        patch.object(db.rdb, "start_background_save", return_value=False),
+        # no save in progress, so redis refused for another reason
+        patch.object(db.rdb, "get_background_save_status", return_value=False),
+        patch("time.sleep") as sleep,
+    ):
+        assert db.rdb.take_snapshot() is None
+    sleep.assert_not_called()
+
+
+def test_save_without_permission_to_copy_the_snapshot(tmp_path):
+    db = ModuleFactory().create_db_manager_obj(6404, flush_db=True)
+    with (
+        patch.object(
+            db.rdb, "take_snapshot", return_value=str(tmp_path / "dump.rdb")
+        ),
+        patch("os.path.exists", return_value=True),
+        patch("shutil.copy", side_effect=PermissionError("denied")),
+    ):
+        assert db.save(str(tmp_path / "backup")) is False
+
+
+def test_cached_user_agent_info():
+    db = ModuleFactory().create_db_manager_obj(6403, flush_db=True)
+    ua = "curl/8.4.0"
+    info = {"os_type": "", "os_name": "", "browser": "cURL"}
+    # the cache db is shared by all ports and isn't flushed with them
+    db.rdb.rcache.delete(f"cached_user_agent_{ua}")
+    assert db.get_cached_user_agent_info(ua) is None
+
+    db.set_cached_user_agent_info(ua, info, 60)
+
+    assert db.get_cached_user_agent_info(ua) == info
+    assert 0 < db.rdb.rcache.ttl(f"cached_user_agent_{ua}") <= 60
@@ -0,0 +1,105 @@
+from unittest.mock import (
+    Mock,
+    patch,
+)
+
+import pytest
+
+from slips_files.common.deferred_checks import DeferredChecks
+
+
+def create_flow(starttime):
+    return Mock(starttime=starttime)
+
+
+def create_deferred_checks(is_running_non_stop: bool, flow_time=0.0):
+    db = Mock()
+    db.is_running_non_stop.return_value = is_running_non_stop
+    db.get_flow_time.return_value = flow_time
+    return DeferredChecks(db)
+
+
+def test_schedule_in_flow_time():
+    deferred_checks = create_deferred_checks(False)
+    check = Mock()
+    deferred_checks.schedule(15, create_flow("1726249372.0"), check, 1, 2)
+
+    # 10 seconds of flows later
+    deferred_checks.update_time(create_flow("1726249382.0"))
+    assert deferred_checks.run_due() == 0
+    check.assert_not_called()
+
+    deferred_checks.update_time(create_flow("1726249387.0"))
+    assert deferred_checks.run_due() == 1
+    check.assert_called_once_with(1, 2)
+    assert len(deferred_checks) == 0
+
+
+def test_flow_time_doesnt_go_back():
+    deferred_checks = create_deferred_checks(False)
+    deferred_checks.update_time(create_flow("1726249382.0"))
+    deferred_checks.update_time(create_flow("1726249372.0"))
+    assert deferred_checks.now() == 1726249382.0
+
+
+@pytest.mark.parametrize(
+    "starttime",
+    [
+        # Testcase 1: unknown format
+        ("not a ts"),
+        # Testcase 2: missing
+        (None),
+    ],
+)
+def test_invalid_flow_ts(starttime):
+    deferred_checks = create_deferred_checks(False)
+    deferred_checks.update_time(create_flow("1726249372.0"))
+    check = Mock()
+    # scheduled after the last valid ts
+    deferred_checks.schedule(15, create_flow(starttime), check)
+
+    deferred_checks.update_time(create_flow("1726249387.0"))
+    deferred_checks.run_due()
+    check.assert_called_once()
+
+
+def test_schedule_in_wall_time():
+    deferred_checks = create_deferred_checks(True)
+    check = Mock()
+    with patch("time.time", return_value=1000):
+        # the ts of the flow doesn't matter when running on an interface
+        deferred_checks.schedule(15, create_flow("1726249372.0"), check)
+        deferred_checks.run_due()
+    check.assert_not_called()
+
+    with patch("time.time", return_value=1015):
+        deferred_checks.run_due()
+    check.assert_called_once()
+
+
+def test_flow_time_from_the_db():
+    deferred_checks = create_deferred_checks(False)
+    check = Mock()
+    deferred_checks.schedule(15, create_flow("1726249372.0"), check)
+
+    # other processes read newer flows
+    deferred_checks.db.get_flow_time.return_value = 1726249390.0
+    with patch("time.time", return_value=1000):
+        deferred_checks.run_due()
+    check.assert_called_once()
+
+    # the db is read at most once per second
+    deferred_checks.db.get_flow_time.return_value = 1726249400.0
+    with patch("time.time", return_value=1000.5):
+        assert deferred_checks.now() == 1726249390.0
+
+
+def test_run_all():
+    deferred_checks = create_deferred_checks(False)
+    check = Mock()
+    deferred_checks.schedule(40, create_flow("1726249372.0"), check, "a")
+    deferred_checks.schedule(15, create_flow("1726249372.0"), check, "b")
+
+    assert deferred_checks.run_all() == 2
+    assert [call.args for call in check.call_args_list] == [("b",), ("a",)]
+    assert len(deferred_checks) == 0
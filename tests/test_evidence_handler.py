@@ -1,6 +1,6 @@
 import pytest
 import os
-from unittest.mock import Mock, patch, call
+from unittest.mock import Mock, patch
 
 from slips_files.core.structures.alerts import Alert
 from slips_files.core.structures.evidence import (
@@ -52,6 +52,44 @@ def test_shutdown_gracefully():
     evidence_handler.jsonfile.close.assert_called_once()
 
 
+def test_start_checkpoint_snapshot():
+    evidence_handler = ModuleFactory().create_evidence_handler_obj()
+    evidence_handler.logfile = Mock()
+    evidence_handler.logfile.name = "/tmp/alerts.log"
+    evidence_handler.logfile.get_file_info.return_value = {
+        "size": 10,
+        "rotated_files": 1,
+    }
+    evidence_handler.jsonfile = Mock()
+    evidence_handler.jsonfile.name = "/tmp/alerts.json"
+    evidence_handler.jsonfile.get_file_info.return_value = {
+        "size": 20,
+        "rotated_files": 0,
+    }
+
+    def start_background_save():
+        # the alerts files are flushed before redis starts the snapshot
+        evidence_handler.logfile.get_file_info.assert_called_once()
+        evidence_handler.jsonfile.get_file_info.assert_called_once()
+        return True
+
+    db = evidence_handler.db
+    db.start_background_save.side_effect = start_background_save
+
+    evidence_handler.start_checkpoint_snapshot("1000.0")
+
+    db.set_checkpoint_snapshot.assert_called_once_with(
+        {
+            "requested_at": "1000.0",
+            "started": True,
+            "alerts_files": {
+                "alerts.log": {"size": 10, "rotated_files": 1},
+                "alerts.json": {"size": 20, "rotated_files": 0},
+            },
+        }
+    )
+
+
 @pytest.mark.parametrize(
     "profileid, twid, past_alerts, expected_output",
     [
@@ -191,9 +229,9 @@ def test_add_to_log_file(data):
     mock_file = Mock()
     evidence_handler.logfile = mock_file
     evidence_handler.add_to_log_file(data)
-    assert mock_file.write.call_count == 2
-    mock_file.write.assert_has_calls([call(data), call("\n")])
-    mock_file.flush.assert_called_once()
+    # the writer flushes in the background
+    mock_file.write.assert_called_once_with(f"{data}\n")
+    mock_file.flush.assert_not_called()
 
 
 @pytest.mark.parametrize(
@@ -242,11 +280,11 @@ def test_add_alert_to_json_log_file(
     )
     evidence_handler = ModuleFactory().create_evidence_handler_obj()
     evidence_handler.jsonfile = mock_file
-    evidence_handler.idmefv2.convert_to_idmef_alert = Mock(return_value=True)
-    with patch("json.dump") as mock_json_dump:
-        evidence_handler.add_alert_to_json_log_file(alert)
-        mock_json_dump.assert_called_once()
-    mock_file.write.assert_any_call("\n")
+    evidence_handler.idmefv2.convert_to_idmef_alert = Mock(
+        return_value={"ID": "1"}
+    )
+    evidence_handler.add_alert_to_json_log_file(alert)
+    mock_file.write.assert_called_once_with('{"ID": "1"}\n')
 
 
 def test_show_popup():
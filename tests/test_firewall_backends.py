@@ -0,0 +1,142 @@
+"""Unit test for modules/blocking/firewall_backends.py"""
+
+from unittest.mock import patch
+
+import pytest
+
+from modules.blocking.firewall_backends import (
+    DryRunBackend,
+    IpsetBackend,
+)
+
+
+@pytest.mark.parametrize(
+    "ip, expected_ipset",
+    [
+        # Testcase 1: ipv4
+        ("2.2.0.0", "slips_blocked_v4"),
+        # Testcase 2: ipv6
+        ("2001:db8::1", "slips_blocked_v6"),
+        # Testcase 3: not an ip
+        ("example.com", None),
+    ],
+)
+def test_get_ipset(ip, expected_ipset):
+    assert IpsetBackend.get_ipset(ip) == expected_ipset
+
+
+def test_init():
+    backend = DryRunBackend("sudo ")
+    assert backend.init() is True
+    cmds = [cmd for cmd, _ in backend.commands]
+    assert ["sudo", "ipset", "restore", "-exist"] in cmds
+    assert ["sudo", "iptables-restore", "--noflush"] in cmds
+    assert ["sudo", "ip6tables-restore", "--noflush"] in cmds
+    rules = dict((cmd[1], input_) for cmd, input_ in backend.commands)
+    assert (
+        "-A slipsBlocking -m set --match-set slips_blocked_v4 src -j DROP"
+        in rules["iptables-restore"]
+    )
+    assert (
+        "-A slipsBlocking -m set --match-set slips_blocked_v6 dst -j DROP"
+        in rules["ip6tables-restore"]
+    )
+
+
+def test_blocks_are_applied_in_one_batch():
+    backend = DryRunBackend()
+    ips = [f"10.0.{i // 256}.{i % 256}" for i in range(500)]
+    for ip in ips:
+        assert backend.block(ip) is True
+    assert backend.block("2001:db8::1") is True
+
+    assert backend.commands == []
+    assert backend.flush() is True
+    assert len(backend.commands) == 1
+    cmd, batch = backend.commands[0]
+    assert cmd == ["ipset", "restore", "-exist"]
+    assert batch.count("add slips_blocked_v4") == 500
+    assert "add slips_blocked_v6 2001:db8::1\n" in batch
+    assert all(backend.is_blocked(ip) for ip in ips)
+    # nothing is queued anymore
+    assert backend.flush() is True
+    assert len(backend.commands) == 1
+
+
+@pytest.mark.parametrize(
+    "ip, expected_result",
+    [
+        # Testcase 1: already blocked
+        ("2.2.0.0", False),
+        # Testcase 2: not an ip
+        ("example.com", False),
+        # Testcase 3: new ip
+        ("3.3.0.0", True),
+    ],
+)
+def test_block(ip, expected_result):
+    backend = DryRunBackend()
+    backend.block("2.2.0.0")
+    assert backend.block(ip) is expected_result
+
+
+def test_unblock():
+    backend = DryRunBackend()
+    backend.block("2.2.0.0")
+    backend.flush()
+
+    assert backend.unblock("2.2.0.0") is True
+    assert backend.unblock("2.2.0.0") is False
+    assert not backend.is_blocked("2.2.0.0")
+    backend.flush()
+    assert backend.commands[-1][1] == "del slips_blocked_v4 2.2.0.0\n"
+
+
+def test_block_and_unblock_before_flush():
+    backend = DryRunBackend()
+    backend.block("2.2.0.0")
+    backend.unblock("2.2.0.0")
+    backend.flush()
+    # nothing changed, so nothing is run
+    assert backend.commands == []
+
+
+def test_unblock_expired():
+    backend = DryRunBackend()
+    with patch("time.time", return_value=1000):
+        backend.block("2.2.0.0", block_for=10)
+        backend.block("3.3.0.0")
+    backend.flush()
+
+    assert backend.unblock_expired(1005) == []
+    assert backend.unblock_expired(1010) == ["2.2.0.0"]
+    assert not backend.is_blocked("2.2.0.0")
+    assert backend.is_blocked("3.3.0.0")
+
+
+def test_unblock_expired_after_blocking_again():
+    backend = DryRunBackend()
+    with patch("time.time", return_value=1000):
+        backend.block("2.2.0.0", block_for=10)
+        backend.unblock("2.2.0.0")
+    with patch("time.time", return_value=1005):
+        backend.block("2.2.0.0", block_for=10)
+
+    # the timer of the first block is ignored
+    assert backend.unblock_expired(1010) == []
+    assert backend.unblock_expired(1015) == ["2.2.0.0"]
+
+
+def test_failed_flush_reverts_the_mirror():
+    backend = IpsetBackend()
+    backend.block("3.3.0.0")
+    with patch.object(backend, "run", return_value=True):
+        backend.flush()
+
+    backend.block("2.2.0.0")
+    backend.unblock("3.3.0.0")
+    with patch.object(backend, "run", return_value=False):
+        assert backend.flush() is False
+
+    assert not backend.is_blocked("2.2.0.0")
+    assert backend.is_blocked("3.3.0.0")
@@ -0,0 +1,103 @@
+from unittest.mock import Mock
+import asyncio
+
+import pytest
+
+from tests.module_factory import ModuleFactory
+
+
+def test_handlers_are_registered_for_all_channels():
+    flowalerts = ModuleFactory().create_flowalerts_obj()
+    assert set(flowalerts.handlers) == set(flowalerts.analyzers_map)
+    # one subscription for all channels
+    flowalerts.db.subscribe_to_channels.assert_called_once()
+    assert flowalerts.subscription
+
+
+@pytest.mark.parametrize(
+    "msgs, expected_received",
+    [
+        # Testcase 1: msgs in 2 channels
+        (
+            [
+                {"type": "message", "channel": "new_flow", "data": "1"},
+                {"type": "message", "channel": "new_dns", "data": "2"},
+                {"type": "message", "channel": "new_flow", "data": "3"},
+            ],
+            {"new_flow": 2, "new_dns": 1},
+        ),
+        # Testcase 2: no msgs before the timeout
+        ([], {}),
+        # Testcase 3: msg in a channel flowalerts doesn't handle
+        (
+            [{"type": "message", "channel": "new_arp", "data": "1"}],
+            {},
+        ),
+    ],
+)
+def test_get_msgs(msgs, expected_received):
+    flowalerts = ModuleFactory().create_flowalerts_obj()
+    flowalerts.db.get_messages.return_value = msgs
+    msgs_per_channel = flowalerts.get_msgs()
+
+    assert {
+        channel: len(msgs) for channel, msgs in msgs_per_channel.items()
+    } == expected_received
+    assert flowalerts.is_msg_received_in_any_channel() == bool(
+        expected_received
+    )
+    for channel, count in expected_received.items():
+        flowalerts.db.incr_msgs_received_in_channel.assert_any_call(
+            flowalerts.name, channel, count
+        )
+
+
+def test_dispatch_msgs():
+    flowalerts = ModuleFactory().create_flowalerts_obj()
+    conn, ssl, dns = Mock(), Mock(), Mock()
+    flowalerts.analyzers_map = {
+        "new_flow": [conn, ssl],
+        "new_dns": [dns],
+    }
+    flow_msg = {"type": "message", "channel": "new_flow", "data": "1"}
+    dns_msg = {"type": "message", "channel": "new_dns", "data": "2"}
+    flowalerts.db.get_messages.return_value = [flow_msg, dns_msg]
+
+    asyncio.run(flowalerts.dispatch_msgs())
+
+    conn.assert_called_once_with(flow_msg)
+    ssl.assert_called_once_with(flow_msg)
+    dns.assert_called_once_with(dns_msg)
+
+
+def test_batch_handler():
+    flowalerts = ModuleFactory().create_flowalerts_obj()
+    batch_handler = Mock()
+    flowalerts.register_batch_handler("new_flow", batch_handler)
+    msgs = [
+        {"type": "message", "channel": "new_flow", "data": "1"},
+        {"type": "message", "channel": "new_flow", "data": "2"},
+    ]
+    flowalerts.db.get_messages.return_value = msgs
+
+    asyncio.run(flowalerts.dispatch_msgs())
+
+    batch_handler.assert_called_once_with(msgs)
+
+
+def test_main_runs_due_checks():
+    flowalerts = ModuleFactory().create_flowalerts_obj()
+    flowalerts.deferred_checks = Mock()
+
+    asyncio.run(flowalerts.main())
+
+    flowalerts.deferred_checks.run_due.assert_called_once()
+
+
+def test_shutdown_gracefully_runs_pending_checks():
+    flowalerts = ModuleFactory().create_flowalerts_obj()
+    flowalerts.deferred_checks = Mock()
+
+    asyncio.run(flowalerts.shutdown_gracefully())
+
+    flowalerts.deferred_checks.run_all.assert_called_once()
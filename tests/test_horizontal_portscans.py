@@ -1,7 +1,8 @@
 import pytest
 import random
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
 from modules.network_discovery.horizontal_portscan import HorizontalPortscan
+from slips_files.core.flows.zeek import Conn
 from tests.module_factory import ModuleFactory
 from slips_files.core.structures.evidence import (
     Proto,
@@ -16,6 +17,30 @@ random_ports = {
 }
 
 
+def create_flow(
+    saddr: str, daddr: str, uid="uid", proto="tcp", history="S"
+) -> Conn:
+    return Conn(
+        starttime="1726249372.312124",
+        uid=uid,
+        saddr=saddr,
+        daddr=daddr,
+        dur=1,
+        proto=proto,
+        appproto="",
+        sport="5555",
+        dport="80",
+        spkts=1,
+        dpkts=0,
+        sbytes=0,
+        dbytes=0,
+        smac="",
+        dmac="",
+        state="S0",
+        history=history,
+    )
+
+
 def generate_random_ip():
     return ".".join(str(random.randint(0, 255)) for _ in range(4))
 
@@ -180,46 +205,6 @@ def test_check_if_enough_dstips_to_trigger_an_evidence_min_dstips_threshold(
     )
 
 
-def test_get_not_estab_dst_ports():
-    horizontal_ps = ModuleFactory().create_horizontal_portscan_obj()
-    profileid = "profile_1.1.1.1"
-    twid = "timewindow0"
-    protocol = "TCP"
-    state = "Not Established"
-
-    mock_dports = {
-        80: {"dstips": {"8.8.8.8": {"dstports": {80: 10}}}},
-        443: {
-            "dstips": {
-                "8.8.8.8": {"dstports": {443: 20}},
-                "1.1.1.1": {"dstports": {443: 30}},
-            }
-        },
-    }
-    horizontal_ps.db.get_data_from_profile_tw.return_value = mock_dports
-
-    dports = horizontal_ps.get_not_estab_dst_ports(
-        protocol, state, profileid, twid
-    )
-    assert dports == mock_dports
-
-
-def test_get_not_estab_dst_ports_missing_dstports():
-    horizontal_ps = ModuleFactory().create_horizontal_portscan_obj()
-    profileid = "profile_1.1.1.1"
-    twid = "timewindow0"
-    protocol = "TCP"
-    state = "Not Established"
-
-    mock_dports = {80: {"dstips": {"8.8.8.8": {}}}}
-    horizontal_ps.db.get_data_from_profile_tw.return_value = mock_dports
-
-    dports = horizontal_ps.get_not_estab_dst_ports(
-        protocol, state, profileid, twid
-    )
-    assert dports == mock_dports
-
-
 def test_get_uids_empty_dstips():
     """
     Test the get_uids method with an empty dstips dictionary.
@@ -256,24 +241,6 @@ def test_get_uids_duplicate():
     assert set(uids) == {"uid1", "uid2", "uid3", "uid4", "uid5"}
 
 
-def test_get_not_estab_dst_ports_no_data():
-    """
-    Test the get_not_estab_dst_ports method when there is no data.
-    """
-    horizontal_ps = ModuleFactory().create_horizontal_portscan_obj()
-    profileid = "profile_1.1.1.1"
-    twid = "timewindow0"
-    protocol = "TCP"
-    state = "Not Established"
-
-    horizontal_ps.db.get_data_from_profile_tw.return_value = {}
-
-    dports = horizontal_ps.get_not_estab_dst_ports(
-        protocol, state, profileid, twid
-    )
-    assert dports == {}
-
-
 def test_get_packets_sent():
     horizontal_ps = HorizontalPortscan(MagicMock())
     dstips = {
@@ -338,18 +305,14 @@ def test_get_cache_key_none_dport():
     assert cache_key is False
 
 
-@patch(
-    "modules.network_discovery.horizontal_portscan.HorizontalPortscan.get_not_estab_dst_ports"
-)
-def test_check_broadcast_or_multicast_address(
-    mock_get_not_estab_dst_ports,
-):
+def test_check_broadcast_or_multicast_address():
     horizontal_ps = ModuleFactory().create_horizontal_portscan_obj()
     horizontal_ps.db.get_field_separator.return_value = "_"
     profileid = "profile_255.255.255.255"
     twid = "timewindow0"
-    horizontal_ps.check(profileid, twid)
-    mock_get_not_estab_dst_ports.assert_not_called()
+    flow = create_flow("255.255.255.255", "1.1.1.1")
+    assert not horizontal_ps.check(profileid, twid, flow, "Not Established")
+    assert horizontal_ps.not_estab_dports == {}
 
 
 def test_set_evidence_horizontal_portscan_empty_port_info():
@@ -478,23 +441,99 @@ def test_is_valid_saddr(ip, expected_val):
     assert horizontal_ps.is_valid_saddr(profileid) == expected_val
 
 
-def test_check_valid_ip():
+def test_check_invalid_profileid():
     horizontal_ps = ModuleFactory().create_horizontal_portscan_obj()
-    horizontal_ps.db.get_field_separator.return_value = "_"
+    profileid = None
+    twid = "timewindow0"
+    flow = create_flow("10.0.0.1", "1.1.1.1")
+    with pytest.raises(Exception):
+        horizontal_ps.check(profileid, twid, flow, "Not Established")
+
 
+@pytest.mark.parametrize(
+    "amount_of_dstips, expected_evidence",
+    [
+        # Testcase 1: below the minimum dstips
+        (4, 0),
+        # Testcase 2: the first evidence is set on 5 dstips
+        (5, 1),
+        # Testcase 3: no new evidence until 15 more dstips are scanned
+        (19, 1),
+        # Testcase 4: the second evidence is set on 20 dstips
+        (20, 2),
+    ],
+)
+def test_check(amount_of_dstips, expected_evidence):
+    horizontal_ps = ModuleFactory().create_horizontal_portscan_obj()
+    horizontal_ps.db.get_dns_resolution.return_value = {}
+    horizontal_ps.set_evidence_horizontal_portscan = MagicMock()
     profileid = "profile_10.0.0.1"
     twid = "timewindow0"
 
-    with patch.object(horizontal_ps, "get_not_estab_dst_ports"):
-        horizontal_ps.check(profileid, twid)
+    for octet in range(amount_of_dstips):
+        flow = create_flow("10.0.0.1", f"8.8.8.{octet}", uid=f"uid{octet}")
+        horizontal_ps.check(profileid, twid, flow, "Not Established")
+        # the same dstip again doesn't change the amount of scanned ips
+        horizontal_ps.check(profileid, twid, flow, "Not Established")
 
+    calls = horizontal_ps.set_evidence_horizontal_portscan.call_args_list
+    assert len(calls) == expected_evidence
+    if calls:
+        evidence = calls[-1][0][0]
+        assert evidence["amount_of_dips"] in (5, 20)
+        assert evidence["dport"] == "80"
+        # the evidence is set by the first flow to the last scanned dstip
+        assert len(evidence["uids"]) == evidence["amount_of_dips"] * 2 - 1
+        assert evidence["pkts_sent"] == evidence["amount_of_dips"] * 2 - 1
+    horizontal_ps.db.get_data_from_profile_tw.assert_not_called()
 
-def test_check_invalid_profileid():
+
+@pytest.mark.parametrize(
+    "state, proto, history, dns_resolution",
+    [
+        # Testcase 1: established flows
+        ("Established", "tcp", "S", {}),
+        # Testcase 2: unsupported protocol
+        ("Not Established", "icmp", "", {}),
+        # Testcase 3: flipped flows
+        ("Not Established", "tcp", "^S", {}),
+        # Testcase 4: resolved tcp dstips
+        ("Not Established", "tcp", "S", {"domains": ["example.com"]}),
+    ],
+)
+def test_check_ignored_flows(state, proto, history, dns_resolution):
     horizontal_ps = ModuleFactory().create_horizontal_portscan_obj()
-    profileid = None
-    twid = "timewindow0"
-    with pytest.raises(Exception):
-        horizontal_ps.check(profileid, twid)
+    horizontal_ps.db.get_dns_resolution.return_value = dns_resolution
+    horizontal_ps.set_evidence_horizontal_portscan = MagicMock()
+
+    for octet in range(5):
+        flow = create_flow(
+            "10.0.0.1", f"8.8.8.{octet}", proto=proto, history=history
+        )
+        assert not horizontal_ps.check(
+            "profile_10.0.0.1", "timewindow0", flow, state
+        )
+    horizontal_ps.set_evidence_horizontal_portscan.assert_not_called()
+
+
+def test_clear_tw():
+    horizontal_ps = ModuleFactory().create_horizontal_portscan_obj()
+    horizontal_ps.db.get_dns_resolution.return_value = {}
+    horizontal_ps.set_evidence_horizontal_portscan = MagicMock()
+    profileid = "profile_10.0.0.1"
+    for twid in ("timewindow0", "timewindow1"):
+        for octet in range(5):
+            flow = create_flow("10.0.0.1", f"8.8.8.{octet}")
+            horizontal_ps.check(profileid, twid, flow, "Not Established")
+
+    horizontal_ps.clear_tw(profileid, "timewindow0")
+
+    assert list(horizontal_ps.not_estab_dports) == [
+        "profile_10.0.0.1_timewindow1"
+    ]
+    assert list(horizontal_ps.cached_thresholds_per_tw) == [
+        "profile_10.0.0.1:timewindow1:dport:80"
+    ]
 
 
 def test_is_valid_twid():
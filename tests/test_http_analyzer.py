@@ -1,7 +1,13 @@
 """Unit test for modules/http_analyzer/http_analyzer.py"""
 
 import json
+import threading
+import urllib.parse
 from dataclasses import asdict
+from http.server import (
+    BaseHTTPRequestHandler,
+    HTTPServer,
+)
 import pytest
 
 from slips_files.core.flows.zeek import (
@@ -15,6 +21,7 @@ from unittest.mock import (
     MagicMock,
     Mock,
 )
+from modules.http_analyzer import http_analyzer as http_analyzer_module
 from modules.http_analyzer.http_analyzer import utils
 import requests
 
@@ -100,6 +107,12 @@ def test_parsing_online_ua_info(mocker):
     profileid = "profile_192.168.99.99"
 
     http_analyzer.db.get_user_agent_from_profile.return_value = None
+    http_analyzer.db.get_cached_user_agent_info.return_value = None
+    # make the offline parser unaware of the ua
+    mocker.patch(
+        "modules.http_analyzer.http_analyzer.parse_user_agent",
+        return_value=None,
+    )
     # mock the function that gets info about the given ua from an online db
     mock_requests = mocker.patch("requests.get")
     mock_requests.return_value.status_code = 200
@@ -129,6 +142,11 @@ def test_get_user_agent_info(mocker):
 
     http_analyzer.db.add_all_user_agent_to_profile.return_value = True
     http_analyzer.db.get_user_agent_from_profile.return_value = None
+    http_analyzer.db.get_cached_user_agent_info.return_value = None
+    mocker.patch(
+        "modules.http_analyzer.http_analyzer.parse_user_agent",
+        return_value=None,
+    )
 
     expected_ret_value = {
         "browser": "Safari",
@@ -416,7 +434,7 @@ def test_read_configuration_valid(mocker, config_value):
         ),
     ],
 )
-async def test_check_weird_http_method(mocker, flow_name, evidence_expected):
+def test_check_weird_http_method(mocker, flow_name, evidence_expected):
     http_analyzer = ModuleFactory().create_http_analyzer_obj()
     http_analyzer.set_evidence_weird_http_method = Mock()
     mocker.spy(http_analyzer, "set_evidence_weird_http_method")
@@ -439,7 +457,9 @@ async def test_check_weird_http_method(mocker, flow_name, evidence_expected):
         "slips_files.common.slips_utils.utils.get_original_conn_flow"
     ) as mock_get_original_conn_flow:
         mock_get_original_conn_flow.side_effect = [None, {"flow": {}}]
-        await http_analyzer.check_weird_http_method(msg)
+        http_analyzer.check_weird_http_method(msg)
+        # the conn.log flow arrived later
+        http_analyzer.deferred_checks.run_all()
 
     if evidence_expected:
         http_analyzer.set_evidence_weird_http_method.assert_called_once()
@@ -565,3 +585,121 @@ def test_get_ua_info_online_error_cases(mock_response):
     http_analyzer = ModuleFactory().create_http_analyzer_obj()
     with patch("requests.get", return_value=mock_response):
         assert http_analyzer.get_ua_info_online(SAFARI_UA) is False
+
+
+class UserAgentDBStub(BaseHTTPRequestHandler):
+    """
+    replies to each UA lookup like useragentstring.com, and stores the
+    looked up UAs in server.lookups
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        self.server.lookups.append(query["uas"][0])
+        reply = json.dumps(
+            {
+                "agent_type": "Crawler",
+                "agent_name": "Googlebot",
+                "os_type": "unknown",
+                "os_name": "unknown",
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+
+@pytest.fixture
+def user_agent_db(mocker):
+    server = HTTPServer(("localhost", 0), UserAgentDBStub)
+    server.lookups = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    mocker.patch.object(
+        http_analyzer_module,
+        "USER_AGENT_DB_URL",
+        f"http://localhost:{server.server_address[1]}/",
+    )
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_get_user_agent_info_of_a_fleet(user_agent_db):
+    http_analyzer = ModuleFactory().create_http_analyzer_obj()
+    http_analyzer.db.get_user_agent_from_profile.return_value = None
+    http_analyzer.db.get_cached_user_agent_info.return_value = None
+    unknown_ua = "Googlebot/2.1 (+http://www.google.com/bot.html)"
+
+    for i in range(50):
+        for ua in (unknown_ua, SAFARI_UA):
+            http_analyzer.get_user_agent_info(ua, f"profile_10.0.0.{i}")
+
+    # the common UA is classified offline, the unknown one is only
+    # looked up once
+    assert user_agent_db.lookups == [unknown_ua]
+    assert http_analyzer.ua_cache.local[unknown_ua] == {
+        "os_type": "",
+        "os_name": "",
+        "browser": "Googlebot",
+    }
+    assert http_analyzer.offline_classifications == 1
+    assert http_analyzer.online_classifications == 1
+    assert http_analyzer.ua_cache.get_hit_rate() == 98
+    assert http_analyzer.db.set_cached_user_agent_info.call_count == 2
+
+
+def test_get_user_agent_info_from_the_cache_db(user_agent_db):
+    http_analyzer = ModuleFactory().create_http_analyzer_obj()
+    http_analyzer.db.get_user_agent_from_profile.return_value = None
+    # classified by another slips instance
+    cached = {"os_type": "Linux", "os_name": "Linux", "browser": "Wget"}
+    http_analyzer.db.get_cached_user_agent_info.return_value = cached
+
+    ua_info = http_analyzer.get_user_agent_info("Wget/1.21.4", profileid)
+
+    assert ua_info == {"user_agent": "Wget/1.21.4", **cached}
+    assert not user_agent_db.lookups
+    assert http_analyzer.ua_cache.db_hits == 1
+    http_analyzer.db.set_cached_user_agent_info.assert_not_called()
+
+
+def test_get_user_agent_info_when_the_ua_db_is_down(mocker):
+    http_analyzer = ModuleFactory().create_http_analyzer_obj()
+    http_analyzer.db.get_user_agent_from_profile.return_value = None
+    http_analyzer.db.get_cached_user_agent_info.return_value = None
+    mocker.patch(
+        "requests.get", side_effect=requests.exceptions.ConnectionError
+    )
+
+    ua_info = http_analyzer.get_user_agent_info("UnknownClient", profileid)
+
+    assert ua_info == {
+        "user_agent": "UnknownClient",
+        "os_type": "",
+        "os_name": "",
+    }
+    # asked again next time
+    assert not http_analyzer.ua_cache.local
+    http_analyzer.db.set_cached_user_agent_info.assert_not_called()
+
+
+def test_get_ua_classification_stats():
+    http_analyzer = ModuleFactory().create_http_analyzer_obj()
+    http_analyzer.db.get_cached_user_agent_info.return_value = None
+    for _ in range(4):
+        http_analyzer.classify_user_agent(SAFARI_UA)
+    http_analyzer.ua_classification_time = 0.002
+
+    stats = http_analyzer.get_ua_classification_stats()
+
+    assert stats == (
+        "Classified 4 user agents (2000 user agents/sec). "
+        "Cache hit rate: 75.00% (in memory: 3, cache db: 0). "
+        "Classified offline: 1, online: 0"
+    )
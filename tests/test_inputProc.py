@@ -180,6 +180,29 @@ def test_reached_timeout(
         assert input.reached_timeout() == expected_val
 
 
+@pytest.mark.parametrize(
+    "files_at_eof, expected_val",
+    [
+        # Testcase 1: all files were read completely
+        ({"conn.log", "dns.log"}, True),
+        # Testcase 2: some files still have lines
+        ({"conn.log"}, False),
+    ],
+)
+def test_reached_timeout_with_complete_zeek_files(files_at_eof, expected_val):
+    input = ModuleFactory().create_input_obj("", "zeek_folder")
+    input.last_updated_file_time = 0
+    input.bro_timeout = 10
+    input.cache_lines = {}
+    input.are_zeek_files_complete = True
+    # ignored files are never read
+    input.zeek_files = {"conn.log", "dns.log", "stats.log"}
+    input.files_at_eof = files_at_eof
+    with patch("datetime.datetime") as dt:
+        dt.now.return_value = 5
+        assert input.reached_timeout() == expected_val
+
+
 @pytest.mark.skipif(
     "nfdump" not in shutil.which("nfdump"), reason="nfdump is not installed"
 )
@@ -331,6 +354,53 @@ def test_give_profiler(line, input_type, expected_line, expected_input_type):
     assert line_sent["input_type"] == expected_input_type
 
 
+def test_give_profiler_with_offset():
+    input_process = ModuleFactory().create_input_obj("", "zeek_folder")
+    line = {"type": "conn.log", "data": {"ts": 12345}}
+    input_process.give_profiler(line, offset=("conn.log", 100))
+    line_sent = input_process.profiler_queue.get()
+    assert line_sent["line"] == line
+    assert line_sent["offset"] == ("conn.log", 100)
+
+
+def write_zeek_json_log(path, timestamps):
+    with open(path, "w") as f:
+        for ts in timestamps:
+            f.write(json.dumps({"ts": ts, "uid": f"uid{ts}"}) + "\n")
+
+
+def test_cache_nxt_line_in_file_tracks_offsets(tmp_path):
+    path = str(tmp_path / "conn.log")
+    write_zeek_json_log(path, [1, 2])
+    input = ModuleFactory().create_input_obj(path, "zeek_log_file")
+    input.are_checkpoints_enabled = True
+    input.is_zeek_tabs = False
+    input.cache_lines = {}
+    input.file_time = {}
+
+    assert input.cache_nxt_line_in_file(path)
+    first_line_len = len(json.dumps({"ts": 1, "uid": "uid1"})) + 1
+    assert input.get_input_offset(path) == (path, first_line_len)
+    del input.cache_lines[path]
+    assert input.cache_nxt_line_in_file(path)
+    assert input.get_input_offset(path) == (path, os.path.getsize(path))
+
+
+def test_get_file_handle_resumes_from_offset(tmp_path):
+    path = str(tmp_path / "conn.log")
+    write_zeek_json_log(path, [1, 2])
+    first_line_len = len(json.dumps({"ts": 1, "uid": "uid1"})) + 1
+    input = ModuleFactory().create_input_obj(path, "zeek_log_file")
+    input.resumed_offsets = {path: first_line_len}
+    input.is_zeek_tabs = False
+    input.cache_lines = {}
+    input.file_time = {}
+
+    assert input.cache_nxt_line_in_file(path)
+    assert input.cache_lines[path]["data"]["ts"] == 2
+    input.close_all_handles()
+
+
 @pytest.mark.parametrize(
     "filepath, expected_result",
     [  # Testcase 1: Supported file
@@ -543,3 +613,101 @@ def test__make_gen(data, expected_chunks):
     gen = input_process._make_gen(reader)
     for expected_chunk in expected_chunks:
         assert next(gen) == expected_chunk
+
+
+@pytest.mark.parametrize(
+    "worker, packet_filter, expected_filter",
+    [
+        # Testcase 1: the first worker also gets the non ip packets
+        (
+            0,
+            False,
+            "(ip and (ip[12:4] + ip[16:4]) % 4 = 0) "
+            "or (ip6 and (ip6[20:4] + ip6[36:4]) % 4 = 0) "
+            "or not (ip or ip6)",
+        ),
+        # Testcase 2: any other worker
+        (
+            3,
+            False,
+            "(ip and (ip[12:4] + ip[16:4]) % 4 = 3) "
+            "or (ip6 and (ip6[20:4] + ip6[36:4]) % 4 = 3)",
+        ),
+        # Testcase 3: with a user packet filter
+        (
+            1,
+            "'not port 53'",
+            "(not port 53) and ((ip and (ip[12:4] + ip[16:4]) % 4 = 1) "
+            "or (ip6 and (ip6[20:4] + ip6[36:4]) % 4 = 1))",
+        ),
+    ],
+)
+def test_get_zeek_worker_packet_filter(worker, packet_filter, expected_filter):
+    input = ModuleFactory().create_input_obj("test.pcap", "pcap")
+    input.zeek_workers = 4
+    input.packet_filter = packet_filter
+    assert input.get_zeek_worker_packet_filter(worker) == expected_filter
+
+
+def test_run_zeek_workers():
+    input = ModuleFactory().create_input_obj("/tmp/test.pcap", "pcap")
+    input.zeek_dir = "zeek_dir_for_testing"
+    input.zeek_workers = 2
+    workers = [Mock(pid=10), Mock(pid=11)]
+    input.start_zeek = Mock(side_effect=workers)
+    input.wait_for_zeek = Mock()
+
+    with patch("os.makedirs"):
+        input.run_zeek_workers()
+
+    for worker, start_zeek_call in enumerate(input.start_zeek.call_args_list):
+        command, cwd = start_zeek_call.args
+        assert cwd == os.path.join("zeek_dir_for_testing", f"worker_{worker}")
+        assert command[command.index("-r") + 1] == "/tmp/test.pcap"
+        assert command[command.index("-f") + 1] == (
+            input.get_zeek_worker_packet_filter(worker)
+        )
+    assert input.zeek_pids == [10, 11]
+    input.db.store_pid.assert_any_call("Zeek worker 1", 11)
+    assert input.wait_for_zeek.call_count == 2
+
+
+def test_handle_pcap_with_zeek_workers(tmp_path):
+    input = ModuleFactory().create_input_obj("test.pcap", "pcap")
+    input.zeek_dir = str(tmp_path)
+    input.zeek_workers = 2
+    input.run_zeek_workers = Mock()
+    input.read_zeek_files = Mock(return_value=3)
+    input.stop_observer = Mock()
+    input.should_stop = Mock(return_value=False)
+    for worker, lines in enumerate((2, 1)):
+        worker_dir = tmp_path / f"worker_{worker}"
+        worker_dir.mkdir()
+        (worker_dir / "conn.log").write_text("{}\n" * lines)
+        # ignored by slips
+        (worker_dir / "stats.log").write_text("{}\n")
+
+    assert input.handle_pcap_with_zeek_workers() is True
+
+    assert {
+        call.args[0] for call in input.db.add_zeek_file.call_args_list
+    } == {
+        str(tmp_path / "worker_0" / "conn.log"),
+        str(tmp_path / "worker_1" / "conn.log"),
+    }
+    input.db.set_input_metadata.assert_called_once_with({"total_flows": 3})
+    input.read_zeek_files.assert_called_once()
+    input.mark_self_as_done_processing.assert_called_once()
+
+
+def test_shutdown_gracefully_kills_zeek_workers():
+    input_process = ModuleFactory().create_input_obj("", "pcap")
+    input_process.stop_observer = MagicMock(return_value=True)
+    input_process.remover_thread = MagicMock()
+    input_process.zeek_thread = MagicMock()
+    input_process.zeek_pids = [10, 11]
+
+    with patch("os.kill") as mock_kill:
+        assert input_process.shutdown_gracefully() is True
+    assert mock_kill.call_count == 2
+    mock_kill.assert_any_call(11, signal.SIGKILL)
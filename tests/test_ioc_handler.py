@@ -102,11 +102,51 @@ def test_give_threat_intelligence(
 )
 def test_is_blacklisted_ssl(mocker, sha1, expected_result):
     ioc_handler = ModuleFactory().create_ioc_handler_obj()
-    ioc_handler.rcache.hmget.return_value = [expected_result]
+    ioc_handler.rcache.hget.return_value = expected_result or None
     result = ioc_handler.is_blacklisted_ssl(sha1)
     assert result == expected_result
 
 
+@pytest.mark.parametrize(
+    "ja3, stored_info, expected_result",
+    [
+        # Testcase 1: malicious ja3
+        (
+            "6734f37431670b3ab4292b8f60f29984",
+            '{"threat_level": "high", "description": "Dridex"}',
+            {"threat_level": "high", "description": "Dridex"},
+        ),
+        # Testcase 2: benign ja3
+        ("e7d705a3286e19ea42f587b344ee6865", None, None),
+    ],
+)
+def test_is_blacklisted_ja3(ja3, stored_info, expected_result):
+    ioc_handler = ModuleFactory().create_ioc_handler_obj()
+    ioc_handler.rcache.hget.return_value = stored_info
+    assert ioc_handler.is_blacklisted_ja3(ja3) == expected_result
+    # the second lookup of the same ja3 should be served from the cache
+    assert ioc_handler.is_blacklisted_ja3(ja3) == expected_result
+    ioc_handler.rcache.hget.assert_called_once_with(
+        ioc_handler.constants.IOC_JA3, ja3
+    )
+
+
+def test_fingerprints_cache_is_flushed_on_feed_update():
+    ioc_handler = ModuleFactory().create_ioc_handler_obj()
+    ioc_handler.rcache.hget.return_value = None
+    ioc_handler.rcache.get.return_value = "1"
+    assert ioc_handler.is_blacklisted_jarm("jarm") is None
+
+    # another process updated the feeds
+    ioc_handler.rcache.get.return_value = "2"
+    ioc_handler.fingerprints_cache_last_check = 0
+    ioc_handler.rcache.hget.return_value = '{"threat_level": "high"}'
+    assert ioc_handler.is_blacklisted_jarm("jarm") == (
+        '{"threat_level": "high"}'
+    )
+    assert ioc_handler.rcache.hget.call_count == 2
+
+
 @pytest.mark.parametrize(
     "file, expected_file_info",
     [
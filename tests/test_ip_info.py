@@ -2,6 +2,7 @@
 
 import asyncio
 
+from modules.ip_info.ip_info import JARM_CACHE_TTL
 from tests.module_factory import ModuleFactory
 import maxminddb
 import pytest
@@ -155,7 +156,7 @@ def test_get_domain_info_no_creation_date():
 
     result = ip_info.get_domain_info(domain)
 
-    assert result is None
+    assert result is False
     ip_info.db.set_info_for_domains.assert_not_called()
 
 
@@ -164,7 +165,7 @@ def test_get_domain_info_invalid_tld():
     ip_info = ModuleFactory().create_ip_info_obj()
     result = ip_info.get_domain_info(domain)
 
-    assert result is None
+    assert result is False
     ip_info.db.get_domain_data.assert_not_called()
     ip_info.db.set_info_for_domains.assert_not_called()
 
@@ -176,16 +177,30 @@ def test_get_domain_info_cached_data():
 
     result = ip_info.get_domain_info(domain)
 
-    assert result is None
+    assert result is True
     ip_info.db.set_info_for_domains.assert_not_called()
 
 
+def test_get_domain_info_found():
+    ip_info = ModuleFactory().create_ip_info_obj()
+    ip_info.db.get_domain_data.return_value = None
+    ip_info.is_valid_domain = Mock(return_value=True)
+    ip_info.query_whois = Mock(
+        return_value=Mock(creation_date=None, registrant="Example LLC")
+    )
+
+    assert ip_info.get_domain_info("example.com") is True
+    ip_info.db.set_info_for_domains.assert_called_once_with(
+        "example.com", {"Org": "Example LLC"}
+    )
+
+
 @pytest.mark.parametrize("domain", ["example.arpa", "example.local"])
 def test_get_domain_info_special_domains(domain):
     ip_info = ModuleFactory().create_ip_info_obj()
     result = ip_info.get_domain_info(domain)
 
-    assert result is None
+    assert result is False
     ip_info.db.get_domain_data.assert_not_called()
     ip_info.db.set_info_for_domains.assert_not_called()
 
@@ -402,6 +417,22 @@ async def test_shutdown_gracefully(
     mock_mac_db.close.assert_called_once()
 
 
+async def test_run_in_background_prints_errors():
+    ip_info = ModuleFactory().create_ip_info_obj()
+    ip_info.print = Mock()
+
+    async def failing_lookup():
+        raise ValueError("invalid response")
+
+    await ip_info.run_in_background(failing_lookup())
+    await asyncio.gather(*ip_info.pending_lookups, return_exceptions=True)
+    # let the done callback run
+    await asyncio.sleep(0)
+
+    assert not ip_info.pending_lookups
+    assert "invalid response" in ip_info.print.call_args_list[0].args[0]
+
+
 @pytest.mark.parametrize(
     "platform_system, subprocess_output, expected_ip",
     [
@@ -448,7 +479,9 @@ def test_get_gateway_ip(
         ),
     ],
 )
-def test_handle_new_ip(mocker, ip, is_multicast, cached_info, expected_calls):
+async def test_handle_new_ip(
+    mocker, ip, is_multicast, cached_info, expected_calls
+):
     ip_info = ModuleFactory().create_ip_info_obj()
 
     mock_ip_address = mocker.patch("ipaddress.ip_address")
@@ -460,7 +493,7 @@ def test_handle_new_ip(mocker, ip, is_multicast, cached_info, expected_calls):
     mock_get_asn = mocker.patch.object(ip_info.asn, "get_asn")
     mock_get_rdns = mocker.patch.object(ip_info, "get_rdns")
     ip_info.asn.update_asn = Mock(return_value=True)
-    ip_info.handle_new_ip(ip)
+    await ip_info.handle_new_ip(ip)
     assert mock_get_geocountry.call_count == expected_calls.get(
         "get_geocountry", 0
     )
@@ -654,3 +687,46 @@ def test_get_gateway_mac_ip_command_failure(
 def test_get_ip_family(ip_address, expected_family):
     ip_info = ModuleFactory().create_ip_info_obj()
     assert ip_info.get_ip_family(ip_address) == expected_family
+
+
+@pytest.mark.parametrize(
+    "cached_jarm, expected_probes",
+    [
+        # Testcase 1: the jarm of the ip and port is cached
+        ("cached_jarm", 0),
+        # Testcase 2: the jarm isn't cached
+        (None, 1),
+    ],
+)
+async def test_get_jarm_hash(mocker, cached_jarm, expected_probes):
+    ip_info = ModuleFactory().create_ip_info_obj()
+    ip_info.db.get_jarm_hash.return_value = cached_jarm
+    mock_jarm_hash = mocker.patch.object(
+        ip_info.JARM, "async_JARM_hash", return_value="new_jarm"
+    )
+
+    jarm_hash = await ip_info.get_jarm_hash("8.8.8.8", 443)
+
+    assert mock_jarm_hash.call_count == expected_probes
+    assert jarm_hash == (cached_jarm or "new_jarm")
+    if expected_probes:
+        ip_info.db.set_jarm_hash.assert_called_once_with(
+            "8.8.8.8", 443, "new_jarm", JARM_CACHE_TTL
+        )
+    else:
+        ip_info.db.set_jarm_hash.assert_not_called()
+
+
+@pytest.mark.parametrize("is_blacklisted", [True, False])
+async def test_check_jarm_hash(mocker, is_blacklisted):
+    ip_info = ModuleFactory().create_ip_info_obj()
+    mocker.patch.object(ip_info, "get_jarm_hash", return_value="jarm")
+    ip_info.db.is_blacklisted_jarm.return_value = is_blacklisted
+    mock_set_evidence = mocker.patch.object(
+        ip_info, "set_evidence_malicious_jarm_hash"
+    )
+    flow = {"daddr": "8.8.8.8", "dport": 443}
+
+    await ip_info.check_jarm_hash(flow, "timewindow1")
+
+    assert mock_set_evidence.called == is_blacklisted
@@ -0,0 +1,49 @@
+import pytest
+from slips_files.common.data_structures.ip_range_index import IPRangeIndex
+
+
+@pytest.mark.parametrize(
+    "ranges, ip, expected_value",
+    [
+        # testcase1: ip in the only range
+        ({"10.0.0.0/8": "a"}, "10.1.2.3", "a"),
+        # testcase2: ip outside all ranges
+        ({"10.0.0.0/8": "a", "192.168.0.0/16": "b"}, "172.16.0.1", None),
+        # testcase3: first and last ip of a range
+        ({"10.0.0.0/24": "a"}, "10.0.0.255", "a"),
+        ({"10.0.0.0/24": "a"}, "10.0.0.0", "a"),
+        # testcase4: the most specific range wins
+        ({"8.0.0.0/8": "a", "8.8.8.0/24": "b"}, "8.8.8.8", "b"),
+        # testcase5: ip after a nested range but in the enclosing one
+        (
+            {"8.0.0.0/8": "a", "8.8.8.0/24": "b", "8.9.0.0/16": "c"},
+            "8.8.9.1",
+            "a",
+        ),
+        # testcase6: ipv6
+        ({"2001:db8::/32": "a", "10.0.0.0/8": "b"}, "2001:db8::1", "a"),
+        ({"2001:db8::/32": "a"}, "2001:db9::1", None),
+        # testcase7: invalid ip
+        ({"10.0.0.0/8": "a"}, "not an ip", None),
+    ],
+)
+def test_search(ranges, ip, expected_value):
+    index = IPRangeIndex()
+    for cidr, value in ranges.items():
+        index.insert(cidr, value)
+    assert index.search(ip) == expected_value
+
+
+def test_insert_after_search():
+    index = IPRangeIndex()
+    index.insert("10.0.0.0/8", "a")
+    assert index.search("192.168.1.1") is None
+    index.insert("192.168.0.0/16", "b")
+    assert index.search("192.168.1.1") == "b"
+    assert len(index) == 2
+
+
+def test_insert_invalid_range():
+    index = IPRangeIndex()
+    with pytest.raises(ValueError):
+        index.insert("10.0.0.0/33", "a")
@@ -0,0 +1,130 @@
+import asyncio
+import struct
+
+import pytest
+
+from modules.ip_info import jarm
+from modules.ip_info.jarm import JARM
+
+
+def get_server_hello(cipher: bytes = b"\xc0\x2f") -> bytes:
+    """returns a tls 1.2 server hello with the given cipher"""
+    hello = b"\x03\x03" + b"\x00" * 32 + b"\x00" + cipher + b"\x00"
+    # no extensions
+    hello += b"\x00\x00"
+    handshake = b"\x02" + struct.pack(">I", len(hello))[1:] + hello
+    return b"\x16\x03\x03" + struct.pack(">H", len(handshake)) + handshake
+
+
+async def start_server(reply: bytes = None, delay: float = 0):
+    """
+    starts a tcp server on localhost that replies to each client hello
+    with the given reply after the given delay.
+    returns the server, its port and the list of the received client hellos
+    """
+    received = []
+
+    async def handle(reader, writer):
+        received.append(await reader.read(4096))
+        await asyncio.sleep(delay)
+        if reply:
+            writer.write(reply)
+            await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1], received
+
+
+async def test_async_jarm_hash_matches_jarm_hash():
+    server, port, received = await start_server(get_server_hello())
+    async with server:
+        async_hash = await JARM().async_JARM_hash("127.0.0.1", port)
+        sync_hash = await asyncio.to_thread(
+            JARM().JARM_hash, "127.0.0.1", port
+        )
+
+    assert async_hash == sync_hash
+    assert async_hash != "0" * 62
+    assert len(received) == 20
+
+
+async def test_async_jarm_hash_sends_probes_concurrently():
+    connected = 0
+    max_connected = 0
+
+    async def handle(reader, writer):
+        nonlocal connected, max_connected
+        connected += 1
+        max_connected = max(max_connected, connected)
+        await reader.read(4096)
+        # give the other probes time to connect
+        await asyncio.sleep(0.2)
+        writer.write(get_server_hello())
+        await writer.drain()
+        connected -= 1
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    async with server:
+        await JARM().async_JARM_hash(
+            "127.0.0.1", server.sockets[0].getsockname()[1]
+        )
+    # sending them one after the other would connect them one at a time
+    assert max_connected > 1
+
+
+async def test_async_jarm_hash_timeout(mocker):
+    mocker.patch.object(jarm, "PROBE_TIMEOUT", 0.1)
+    server, port, _ = await start_server(get_server_hello(), delay=1)
+    async with server:
+        jarm_hash = await JARM().async_JARM_hash("127.0.0.1", port)
+    assert jarm_hash == "0" * 62
+
+
+async def test_async_jarm_hash_of_closed_port():
+    server, port, _ = await start_server()
+    server.close()
+    await server.wait_closed()
+    jarm_hash = await JARM().async_JARM_hash("127.0.0.1", port)
+    assert jarm_hash == "0" * 62
+
+
+async def test_concurrent_async_jarm_hash_of_the_same_host():
+    server, port, received = await start_server(get_server_hello(), 0.1)
+    jarm_obj = JARM()
+    async with server:
+        hashes = await asyncio.gather(
+            jarm_obj.async_JARM_hash("127.0.0.1", port),
+            jarm_obj.async_JARM_hash("127.0.0.1", port),
+        )
+    assert hashes[0] == hashes[1]
+    assert len(received) == 10
+    assert not jarm_obj.pending
+
+
+@pytest.mark.parametrize("max_concurrent_probes", [1, 3])
+async def test_async_jarm_hash_max_concurrent_probes(
+    mocker, max_concurrent_probes
+):
+    mocker.patch.object(jarm, "MAX_CONCURRENT_PROBES", max_concurrent_probes)
+    connected = 0
+    max_connected = 0
+
+    async def handle(reader, writer):
+        nonlocal connected, max_connected
+        connected += 1
+        max_connected = max(max_connected, connected)
+        await reader.read(4096)
+        await asyncio.sleep(0.01)
+        writer.write(get_server_hello())
+        await writer.drain()
+        connected -= 1
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    async with server:
+        await JARM().async_JARM_hash(
+            "127.0.0.1", server.sockets[0].getsockname()[1]
+        )
+    assert max_connected <= max_concurrent_probes
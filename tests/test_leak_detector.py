@@ -3,10 +3,12 @@
 from tests.module_factory import ModuleFactory
 from unittest import mock
 import pytest
-from unittest.mock import patch, mock_open
-import json
+from unittest.mock import patch
+import struct
 from unittest.mock import MagicMock
 
+from modules.leak_detector.pcap_index import PcapIndex
+
 
 @pytest.mark.parametrize(
     "return_code, expected_result",
@@ -77,79 +79,28 @@ def test_main(mock_db):
 
 
 @pytest.mark.parametrize(
-    "input_json, mock_json_loads_return, " "expected_output",
-    [
-        (
-            # Testcase1: Valid JSON with extra characters
-            '{"some": "data"}Killed',
-            {"some": "data"},
-            {"some": "data"},
-        ),
-        (
-            # Testcase2: Valid JSON without extra characters
-            '{"some": "data"}',
-            {"some": "data"},
-            {"some": "data"},
-        ),
-        (
-            # Testcase3: Invalid JSON, JSONDecodeError raised
-            "Invalid JSON",
-            json.JSONDecodeError("Expecting ',' delimiter", "", 0),
-            False,
-        ),
-    ],
-)
-@patch("json.loads")
-def test_fix_json_packet(
-    mock_json_loads,
-    mock_db,
-    input_json,
-    mock_json_loads_return,
-    expected_output,
-):
-    """Tests the fix_json_packet method of LeakDetector."""
-
-    mock_json_loads.side_effect = (
-        mock_json_loads_return
-        if isinstance(mock_json_loads_return, Exception)
-        else lambda x: mock_json_loads_return
-    )
-
-    leak_detector = ModuleFactory().create_leak_detector_obj()
-    result = leak_detector.fix_json_packet(input_json)
-
-    assert result == expected_output
-
-
-@pytest.mark.parametrize(
-    "listdir_return, popen_communicate_return, " "evidence_set_call_count",
+    "popen_communicate_return, evidence_set_call_count",
     [
         (
             # Test case 1: Matches found, evidence set
-            ["test_rule_compiled"],
             (b"test_rule\n0x4e15c:$rgx_gps_loc: 37.7749,-122.4194", None),
             True,
         ),
         (
             # Test case 2: No matches found, no evidence set
-            ["test_rule_compiled"],
             (b"", None),
             False,
         ),
         (
             # Test case 3: Error during YARA execution, no action taken
-            ["test_rule_compiled"],
             (b"", b"Error during YARA execution"),
             False,
         ),
     ],
 )
 @mock.patch("subprocess.Popen")
-@mock.patch("os.listdir")
 def test_find_matches(
-    mock_listdir,
     mock_popen,
-    listdir_return,
     popen_communicate_return,
     evidence_set_call_count,
     mock_db,
@@ -158,7 +109,6 @@ def test_find_matches(
 
     leak_detector = ModuleFactory().create_leak_detector_obj()
 
-    mock_listdir.return_value = listdir_return
     mock_popen.return_value.communicate.return_value = popen_communicate_return
     leak_detector.set_evidence_yara_match = MagicMock()
     leak_detector.delete_compiled_rules = MagicMock()
@@ -172,72 +122,135 @@ def test_find_matches(
     )
 
 
+def udp_packet(srcip: bytes, dstip: bytes, sport: int, dport: int):
+    """returns an ethernet frame of a udp packet"""
+    ip_header = (
+        b"\x45\x00\x00\x20\x00\x00\x00\x00\x40\x11\x00\x00" + srcip + dstip
+    )
+    udp = struct.pack(">HHHH", sport, dport, 12, 0) + b"leak"
+    return b"\x00" * 12 + b"\x08\x00" + ip_header + udp
+
+
+def write_pcap(path, packets):
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1))
+        for ts, packet in packets:
+            f.write(struct.pack("<IIII", ts, 500000, len(packet), len(packet)))
+            f.write(packet)
+
+
+def write_pcapng(path, packets, interface_id: int = 0):
+    with open(path, "wb") as f:
+        # section header block
+        f.write(
+            struct.pack("<IIIHHqI", 0x0A0D0D0A, 28, 0x1A2B3C4D, 1, 0, -1, 28)
+        )
+        # interface description block with a ms ts resolution
+        f.write(
+            struct.pack("<IIHHIHHBxxxHHI", 1, 32, 1, 0, 0, 9, 1, 3, 0, 0, 32)
+        )
+        for ts, packet in packets:
+            padding = b"\x00" * (-len(packet) % 4)
+            block_len = 32 + len(packet) + len(padding)
+            f.write(
+                struct.pack(
+                    "<IIIIIII",
+                    6,
+                    block_len,
+                    interface_id,
+                    (ts * 1000) >> 32,
+                    (ts * 1000) & 0xFFFFFFFF,
+                    len(packet),
+                    len(packet),
+                )
+            )
+            f.write(packet + padding + struct.pack("<I", block_len))
+
+
 @pytest.mark.parametrize(
-    "pcap_data, offset, tshark_output, expected_result",
+    "writer, expected_ts",
     [
+        # Testcase1: pcap
+        (write_pcap, 1669852801.5),
+        # Testcase2: pcapng
+        (write_pcapng, 1669852801.0),
+    ],
+)
+def test_pcap_index(tmp_path, writer, expected_ts):
+    pcap = str(tmp_path / "test.pcap")
+    packets = [
         (
-            # Testcase1: Packet found successfully
-            b"\x00" * 24 + b"\x00" * 16 + b"\x00\x00\x00\x14" + b"\x00" * 20,
-            25,
-            json.dumps(
-                [
-                    {
-                        "_source": {
-                            "layers": {
-                                "frame": {
-                                    "frame.protocols": "ip:ipv4:ip:tcp",
-                                    "frame.time_epoch": 1669852800,
-                                },
-                                "ip": {
-                                    "ip.src": "10.0.0.1",
-                                    "ip.dst": "10.0.0.2",
-                                },
-                                "tcp": {
-                                    "tcp.srcport": "80",
-                                    "tcp.dstport": "443",
-                                },
-                            }
-                        }
-                    }
-                ]
-            ).encode(),
-            ("10.0.0.1", "10.0.0.2", "tcp", "80", "443", 1669852800),
+            1669852800,
+            udp_packet(b"\x0a\x00\x00\x01", b"\x0a\x00\x00\x02", 80, 443),
         ),
         (
-            # Testcase3: Error during tshark execution
-            b"\x00" * 24 + b"\x00" * 16 + b"\x00\x00\x00\x14" + b"\x00" * 20,
-            25,
-            b"",
-            None,
+            1669852801,
+            udp_packet(b"\x0a\x00\x00\x03", b"\x08\x08\x08\x08", 5353, 53),
         ),
-    ],
-)
-def test_get_packet_info(
-    mock_db,
-    pcap_data,
-    offset,
-    tshark_output,
-    expected_result,
-):
-    """Tests the get_packet_info method of LeakDetector."""
+    ]
+    writer(pcap, packets)
+    index = PcapIndex(pcap)
+    assert len(index) == 2
+
+    # the offset of "leak" in the second packet
+    with open(pcap, "rb") as f:
+        offset = f.read().rindex(b"leak")
+    assert index.get_packet_info(offset) == (
+        "10.0.0.3",
+        "8.8.8.8",
+        "udp",
+        5353,
+        53,
+        pytest.approx(expected_ts),
+    )
+    # offsets in the file headers aren't part of any packet
+    assert index.get_packet_info(4) is None
+
+
+def test_pcap_index_skips_packets_of_unknown_interfaces(tmp_path):
+    pcap = str(tmp_path / "test.pcapng")
+    packet = udp_packet(b"\x0a\x00\x00\x01", b"\x0a\x00\x00\x02", 80, 443)
+    # the pcapng has only 1 interface, with id 0
+    write_pcapng(pcap, [(1669852800, packet)], interface_id=1)
+    assert len(PcapIndex(pcap)) == 0
 
+
+def test_get_packet_info_builds_the_index_once(mock_db):
     leak_detector = ModuleFactory().create_leak_detector_obj()
-    leak_detector.fix_json_packet = MagicMock()
-    with patch(
-        "builtins.open", mock_open(read_data=pcap_data)
-    ) as mock_file, patch("subprocess.Popen") as mock_popen:
-        mock_file.return_value.tell.side_effect = [
-            24,
-            100,
-        ]
-
-        mock_popen.return_value.communicate.return_value = (
-            tshark_output,
-            None,
+    with patch("modules.leak_detector.leak_detector.PcapIndex") as mock_index:
+        mock_index.return_value.get_packet_info.return_value = (
+            "10.0.0.1",
+            "10.0.0.2",
+            "tcp",
+            80,
+            443,
+            1669852800.0,
         )
+        leak_detector.get_packet_info(25)
+        result = leak_detector.get_packet_info("30")
+
+    mock_index.assert_called_once_with(leak_detector.pcap)
+    mock_index.return_value.get_packet_info.assert_called_with(30)
+    assert result == ("10.0.0.1", "10.0.0.2", "tcp", 80, 443, 1669852800.0)
 
-        result = leak_detector.get_packet_info(offset)
-        assert result == expected_result
+
+def test_parse_yara_output(mock_db):
+    leak_detector = ModuleFactory().create_leak_detector_obj()
+    lines = (
+        "rule_a test.pcap\n"
+        "0x4e15c:$rgx_gps_loc: ll=12.34,-56.78\n"
+        "rule_b test.pcap\n"
+        "0x10:$rgx_gps_lat: lat=12.34\n"
+        "0x20:$rgx_gps_lon: lon=56.78\n"
+    )
+    matches = leak_detector.parse_yara_output(lines)
+    assert [(m["rule"], m["offset"]) for m in matches] == [
+        ("rule_a", 0x4E15C),
+        ("rule_b", 0x10),
+        ("rule_b", 0x20),
+    ]
+    assert matches[0]["vars_matched"] == "rgx_gps_loc"
+    assert matches[0]["strings_matched"] == " ll=12.34,-56.78"
 
 
 @pytest.mark.parametrize(
@@ -0,0 +1,95 @@
+import asyncio
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from modules.ip_info.lookup_pool import LookupPool
+
+
+@pytest.mark.parametrize(
+    "result, expected_negatively_cached",
+    [
+        # Testcase 1: the lookup found something
+        ("dns.google", False),
+        # Testcase 2: the lookup found nothing
+        (None, True),
+        # Testcase 3: the lookup found an empty result
+        ({}, True),
+    ],
+)
+async def test_lookup(result, expected_negatively_cached):
+    pool = LookupPool("rdns", workers=2, timeout=1, negative_ttl=60)
+    func = Mock(return_value=result)
+
+    assert await pool.lookup("8.8.8.8", func, "8.8.8.8") == result
+    func.assert_called_once_with("8.8.8.8")
+    assert pool.is_negatively_cached("8.8.8.8") == expected_negatively_cached
+    assert not pool.in_flight
+    pool.shutdown()
+
+
+async def test_lookup_is_skipped_when_negatively_cached():
+    pool = LookupPool("rdns", workers=2, timeout=1, negative_ttl=60)
+    func = Mock(return_value=None)
+
+    await pool.lookup("8.8.8.8", func, "8.8.8.8")
+    assert await pool.lookup("8.8.8.8", func, "8.8.8.8") is None
+    func.assert_called_once()
+    pool.shutdown()
+
+
+async def test_lookup_after_negative_ttl():
+    pool = LookupPool("rdns", workers=2, timeout=1, negative_ttl=60)
+    func = Mock(return_value=None)
+
+    await pool.lookup("8.8.8.8", func, "8.8.8.8")
+    # make the negative result expire
+    pool.negative_cache["8.8.8.8"] = time.time() - 1
+    await pool.lookup("8.8.8.8", func, "8.8.8.8")
+    assert func.call_count == 2
+    pool.shutdown()
+
+
+async def test_lookup_timeout():
+    pool = LookupPool("whois", workers=1, timeout=0.1, negative_ttl=60)
+
+    def slow_lookup(domain):
+        time.sleep(0.5)
+        return "info"
+
+    assert await pool.lookup("example.com", slow_lookup, "example.com") is None
+    assert pool.is_negatively_cached("example.com")
+    pool.shutdown()
+
+
+async def test_concurrent_lookups_of_the_same_key():
+    pool = LookupPool("asn", workers=2, timeout=1, negative_ttl=60)
+
+    def lookup(ip):
+        time.sleep(0.1)
+        return {"asnorg": "GOOGLE"}
+
+    func = Mock(side_effect=lookup)
+    first, second = await asyncio.gather(
+        pool.lookup("8.8.8.8", func, "8.8.8.8"),
+        pool.lookup("8.8.8.8", func, "8.8.8.8"),
+    )
+    assert first == second == {"asnorg": "GOOGLE"}
+    func.assert_called_once()
+    pool.shutdown()
+
+
+def test_negative_cache_size_is_bounded():
+    pool = LookupPool(
+        "rdns",
+        workers=1,
+        timeout=1,
+        negative_ttl=60,
+        max_negative_cache_size=2,
+    )
+    for ip in ("1.1.1.1", "2.2.2.2", "3.3.3.3"):
+        pool.cache_negative_result(ip)
+
+    assert list(pool.negative_cache) == ["2.2.2.2", "3.3.3.3"]
+    pool.shutdown()
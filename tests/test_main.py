@@ -512,6 +512,7 @@ def test_prepare_output_dir_with_o_flag():
     main.args = MagicMock()
     main.args.output = "custom_output_dir"
     main.args.testing = False
+    main.args.resume = None
 
     with (
         patch.object(sys, "argv", ["-o"]),
@@ -525,6 +526,24 @@ def test_prepare_output_dir_with_o_flag():
         assert mock_remove.call_count == 2
 
 
+def test_prepare_output_dir_when_resuming():
+    main = ModuleFactory().create_main_obj()
+    main.args = MagicMock()
+    main.args.output = "output/old_analysis"
+    main.args.resume = "output/old_analysis"
+
+    with (
+        patch.object(sys, "argv", ["--resume"]),
+        patch("os.remove") as mock_remove,
+        patch("os.makedirs") as mock_makedirs,
+    ):
+        main.prepare_output_dir()
+
+    assert main.args.output == "output/old_analysis"
+    mock_remove.assert_not_called()
+    mock_makedirs.assert_not_called()
+
+
 @pytest.mark.parametrize(
     "testing, filename, " "expected_call_count",
     [
@@ -549,6 +568,7 @@ def test_prepare_output_dir_testing_mode(
     main.args = MagicMock()
     main.args.output = "test_output"
     main.args.testing = testing
+    main.args.resume = None
 
     with (
         patch.object(sys, "argv", ["-o"]),
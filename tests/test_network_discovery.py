@@ -3,6 +3,7 @@ from unittest.mock import (
     Mock,
 )
 
+from slips_files.core.flows.argus import ArgusConn
 from slips_files.core.flows.zeek import (
     Notice,
     DHCP,
@@ -429,134 +430,85 @@ def test_set_evidence_dhcp_scan(
     assert called_evidence.description == expected_description
 
 
+def create_icmp_flow(daddr: str, uid: str, sport: str = "0x0008"):
+    # argus flows, zeek doesn't use hex icmp ports
+    return ArgusConn(
+        starttime="1726249372.312124",
+        endtime="",
+        dur="1",
+        proto="icmp",
+        appproto="",
+        saddr="10.0.0.1",
+        sport=sport,
+        dir_="->",
+        daddr=daddr,
+        dport="0x0000",
+        state="ECO",
+        pkts=2,
+        spkts=1,
+        dpkts=1,
+        bytes=0,
+        sbytes=0,
+        dbytes=0,
+        uid=uid,
+    )
+
+
 @pytest.mark.parametrize(
-    "profileid, twid, sports, expected_set_evidence_calls, "
+    "daddrs, sport, state, expected_set_evidence_calls, "
     "expected_cache_det_thresholds",
     [
-        # Testcase 1: No ICMP scans
-        (
-            "profile_192.168.1.100",
-            "timewindow5",
-            {},
-            0,
-            {},
-        ),
-        # Testcase 2: Single IP ICMP Timestamp Scan,
-        # below minimum flows
-        (
-            "profile_192.168.1.100",
-            "timewindow5",
-            {
-                "0x0013": {
-                    "dstips": {
-                        "192.168.1.1": {
-                            "uid": ["uid1234"],
-                            "spkts": 5,
-                            "stime": "2023-04-01 12:00:00",
-                        }
-                    }
-                }
-            },
-            0,
-            {},
-        ),
+        # Testcase 1: not an icmp scan type
+        (["192.168.1.1"] * 5, "0x0000", "Established", 0, {}),
+        # Testcase 2: not established icmp flows
+        (["192.168.1.1"] * 5, "0x0013", "Not Established", 0, {}),
         # Testcase 3: Single IP ICMP Timestamp Scan,
+        # below minimum flows
+        (["192.168.1.1"] * 4, "0x0013", "Established", 0, {}),
+        # Testcase 4: Single IP ICMP Timestamp Scan,
         # meets minimum flows
         (
-            "profile_192.168.1.100",
-            "timewindow5",
-            {
-                "0x0013": {
-                    "dstips": {
-                        "192.168.1.1": {
-                            "uid": [
-                                "uid1234",
-                                "uid1235",
-                                "uid1236",
-                                "uid1237",
-                                "uid1238",
-                            ],
-                            "spkts": 10,
-                            "stime": "2023-04-01 12:00:00",
-                        }
-                    }
-                }
-            },
+            ["192.168.1.1"] * 5,
+            "0x0013",
+            "Established",
             1,
             {
-                "profile_192.168.1.100:timewindow5:dstip:"
+                "profile_10.0.0.1:timewindow10:dstip:"
                 "192.168.1.1:0x0013:ICMP_TIMESTAMP_SCAN": 5
             },
         ),
-        # Testcase 4: Multiple IP ICMP Address Scan,
+        # Testcase 5: Multiple IP ICMP Address Scan,
         # below minimum scanned IPs
         (
-            "profile_10.0.0.1",
-            "timewindow10",
-            {
-                "0x0008": {
-                    "dstips": {
-                        "192.168.1.2": {
-                            "uid": ["uid5678"],
-                            "spkts": 5,
-                            "stime": "2023-04-01 13:00:00",
-                        },
-                        "192.168.1.3": {
-                            "uid": ["uid5679"],
-                            "spkts": 6,
-                            "stime": "2023-04-01 13:00:01",
-                        },
-                    }
-                }
-            },
+            [f"192.168.1.{octet}" for octet in range(4)],
+            "0x0008",
+            "Established",
             0,
             {},
         ),
-        # Testcase 5: Multiple IP ICMP Address Scan,
+        # Testcase 6: Multiple IP ICMP Address Scan,
         # meets minimum scanned IPs
         (
-            "profile_10.0.0.1",
-            "timewindow10",
-            {
-                "0x0008": {
-                    "dstips": {
-                        "192.168.1.2": {
-                            "uid": ["uid5678"],
-                            "spkts": 5,
-                            "stime": "2023-04-01 13:00:00",
-                        },
-                        "192.168.1.3": {
-                            "uid": ["uid5679"],
-                            "spkts": 6,
-                            "stime": "2023-04-01 13:00:01",
-                        },
-                        "192.168.1.4": {
-                            "uid": ["uid5680"],
-                            "spkts": 7,
-                            "stime": "2023-04-01 13:00:02",
-                        },
-                        "192.168.1.5": {
-                            "uid": ["uid5681"],
-                            "spkts": 8,
-                            "stime": "2023-04-01 13:00:03",
-                        },
-                        "192.168.1.6": {
-                            "uid": ["uid5682"],
-                            "spkts": 9,
-                            "stime": "2023-04-01 13:00:04",
-                        },
-                    }
-                }
-            },
+            [f"192.168.1.{octet}" for octet in range(5)],
+            "0x0008",
+            "Established",
+            1,
+            {"profile_10.0.0.1:timewindow10:ICMP_ADDRESS_SCAN": 5},
+        ),
+        # Testcase 7: the same ips don't trigger the evidence again
+        (
+            [f"192.168.1.{octet}" for octet in range(5)] * 2,
+            "0x0008",
+            "Established",
             1,
             {"profile_10.0.0.1:timewindow10:ICMP_ADDRESS_SCAN": 5},
         ),
     ],
 )
 def test_check_icmp_scan(
-    profileid,
-    twid,
-    sports,
+    daddrs,
+    sport,
+    state,
     expected_set_evidence_calls,
     expected_cache_det_thresholds,
 ):
@@ -564,15 +516,15 @@ def test_check_icmp_scan(
     network_discovery.pingscan_minimum_flows = 5
     network_discovery.pingscan_minimum_scanned_ips = 5
     network_discovery.cache_det_thresholds = {}
-
-    network_discovery.db.get_data_from_profile_tw = Mock()
-    network_discovery.db.get_data_from_profile_tw.return_value = sports
-
     network_discovery.db.set_evidence = Mock()
 
-    network_discovery.check_icmp_scan(profileid, twid)
+    for uid, daddr in enumerate(daddrs):
+        flow = create_icmp_flow(daddr, f"uid{uid}", sport)
+        network_discovery.check_icmp_scan(
+            "profile_10.0.0.1", "timewindow10", flow, state
+        )
 
-    assert network_discovery.db.get_data_from_profile_tw.call_count == 1
+    network_discovery.db.get_data_from_profile_tw.assert_not_called()
     assert (
         network_discovery.db.set_evidence.call_count
         == expected_set_evidence_calls
@@ -580,3 +532,24 @@ def test_check_icmp_scan(
     assert (
         network_discovery.cache_det_thresholds == expected_cache_det_thresholds
     )
+
+
+def test_clear_tw():
+    network_discovery = ModuleFactory().create_network_discovery_obj()
+    network_discovery.db.set_evidence = Mock()
+    profileid, twid = "profile_10.0.0.1", "timewindow10"
+    for octet in range(5):
+        flow = create_icmp_flow(f"192.168.1.{octet}", f"uid{octet}")
+        network_discovery.check_icmp_scan(profileid, twid, flow, "Established")
+    # a scan in another tw shouldn't be forgotten
+    flow = create_icmp_flow("192.168.1.1", "uid")
+    network_discovery.check_icmp_scan(
+        profileid, "timewindow11", flow, "Established"
+    )
+
+    network_discovery.clear_tw(profileid, twid)
+
+    assert list(network_discovery.icmp_sports) == [
+        "profile_10.0.0.1_timewindow11"
+    ]
+    assert network_discovery.cache_det_thresholds == {}
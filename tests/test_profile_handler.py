@@ -1,6 +1,7 @@
 from dataclasses import asdict
 from unittest.mock import patch, MagicMock, call
 import json
+import redis
 from tests.module_factory import ModuleFactory
 from slips_files.core.flows.zeek import HTTP, DNS, Conn
 from unittest.mock import ANY
@@ -1146,7 +1147,7 @@ def test_check_tw_to_close(
     close_all, zrangebyscore_return_value, expected_calls
 ):
     handler = ModuleFactory().create_profile_handler_obj()
-
+    handler.running_non_stop = True
     handler.get_slips_internal_time = MagicMock(return_value=1000.0)
     handler.width = 100
     handler.mark_profile_tw_as_closed = MagicMock()
@@ -1159,25 +1160,39 @@ def test_check_tw_to_close(
 
 
 @pytest.mark.parametrize(
-    "sadd_return_value, zrem_return_value, publish_call_count",
+    "sadd_return_value, zrem_return_value, publish_call_count, "
+    "archive_closed_tws",
     [  # Testcase 1: Successful execution
         (
             1,
             1,
             1,
+            True,
         ),
         # Testcase 2: Profile/TW already marked as closed
         (
             0,
             0,
             1,
+            True,
+        ),
+        # Testcase 3: archiving is disabled
+        (
+            1,
+            1,
+            1,
+            False,
         ),
     ],
 )
 def test_mark_profile_tw_as_closed(
-    sadd_return_value, zrem_return_value, publish_call_count
+    sadd_return_value,
+    zrem_return_value,
+    publish_call_count,
+    archive_closed_tws,
 ):
     handler = ModuleFactory().create_profile_handler_obj()
+    handler.archive_closed_tws = archive_closed_tws
 
     handler.r.sadd.return_value = sadd_return_value
     handler.r.zrem.return_value = zrem_return_value
@@ -1189,6 +1204,12 @@ def test_mark_profile_tw_as_closed(
 
     handler.r.sadd.assert_called_once_with("ClosedTW", profileid_tw)
     handler.r.zrem.assert_called_once_with("ModifiedTW", profileid_tw)
+    if archive_closed_tws:
+        handler.r.zadd.assert_called_once_with(
+            "closed_tws_to_archive", {profileid_tw: ANY}
+        )
+    else:
+        handler.r.zadd.assert_not_called()
     assert handler.publish.call_count == publish_call_count
 
 
@@ -2307,7 +2328,7 @@ def test_is_blocked_profile_and_tw(profile_tws, twid, expected_result):
 )
 def test_mark_profile_tw_as_modified(timestamp, expected_zadd_call):
     handler = ModuleFactory().create_profile_handler_obj()
-
+    handler.running_non_stop = True
     handler.publish = MagicMock()
     handler.check_tw_to_close = MagicMock()
 
@@ -2537,3 +2558,143 @@ def test_get_ipv6_from_profile(hmget_return_value, expected_ipv6):
 
     handler.r.hmget.assert_called_once_with(profileid, "IPv6")
     assert ipv6 == expected_ipv6
+
+
+@pytest.mark.parametrize(
+    "timestamp, expected_time",
+    [
+        # Testcase 1: the ts of the flow
+        (500.0, 500.0),
+        # Testcase 2: ts as str
+        ("500.0", 500.0),
+        # Testcase 3: no ts, uses the flow time of slips
+        ("", 700.0),
+    ],
+)
+def test_get_modification_time_when_reading_files(timestamp, expected_time):
+    handler = ModuleFactory().create_profile_handler_obj()
+    handler.running_non_stop = False
+    handler.get_flow_time = MagicMock(return_value=700.0)
+    with patch("time.time", return_value=1000.0):
+        assert handler.get_modification_time(timestamp) == expected_time
+
+
+def test_check_tw_to_close_uses_flow_time_when_reading_files():
+    handler = ModuleFactory().create_profile_handler_obj()
+    handler.running_non_stop = False
+    handler.get_flow_time = MagicMock(return_value=5000.0)
+    handler.get_slips_internal_time = MagicMock()
+    handler.width = 3600
+    handler.mark_profile_tw_as_closed = MagicMock()
+    handler.r.zrangebyscore.return_value = []
+
+    handler.check_tw_to_close()
+
+    handler.get_slips_internal_time.assert_not_called()
+    handler.r.zrangebyscore.assert_called_once_with(
+        "ModifiedTW", 0, 1400.0, withscores=True
+    )
+
+
+@pytest.mark.parametrize(
+    "dumps, stored, expected_result, expected_deleted",
+    [
+        # Testcase 1: the tw is stored and deleted from redis
+        ([b"tw", b"timeline", None], True, True, True),
+        # Testcase 2: storing the tw failed
+        ([b"tw", b"timeline", None], False, False, False),
+        # Testcase 3: the tw has no data
+        ([None, None, None], False, True, True),
+    ],
+)
+def test_archive_tw(dumps, stored, expected_result, expected_deleted):
+    handler = ModuleFactory().create_profile_handler_obj()
+    handler.rbinary = MagicMock()
+    pipe = handler.rbinary.pipeline.return_value.__enter__.return_value
+    pipe.dump.side_effect = dumps
+    pipe.hexists.return_value = False
+    store_tw = MagicMock(return_value=stored)
+
+    result = handler.archive_tw("profile_1.1.1.1", "timewindow1", store_tw)
+
+    assert result == expected_result
+    if any(dumps):
+        store_tw.assert_called_once_with(
+            {
+                "profile_1.1.1.1_timewindow1": b"tw",
+                "profile_1.1.1.1_timewindow1_timeline": b"timeline",
+            }
+        )
+    else:
+        store_tw.assert_not_called()
+    assert pipe.delete.called == expected_deleted
+    if expected_deleted:
+        pipe.sadd.assert_called_once_with(
+            "archived_tws", "profile_1.1.1.1_timewindow1"
+        )
+
+
+def test_archive_tw_modified_while_storing():
+    handler = ModuleFactory().create_profile_handler_obj()
+    handler.rbinary = MagicMock()
+    pipe = handler.rbinary.pipeline.return_value.__enter__.return_value
+    pipe.dump.return_value = b"dump"
+    pipe.execute.side_effect = redis.WatchError
+
+    assert not handler.archive_tw(
+        "profile_1.1.1.1", "timewindow1", MagicMock(return_value=True)
+    )
+
+
+def test_restore_tw_merges_recreated_keys():
+    handler = ModuleFactory().create_profile_handler_obj()
+    handler.rbinary = MagicMock()
+    handler.rbinary.restore.side_effect = [
+        None,
+        redis.ResponseError("BUSYKEY"),
+        None,
+    ]
+    handler.r.type.return_value = "hash"
+    handler.r.hkeys.return_value = ["alerts"]
+    handler.r.hgetall.return_value = {"alerts": "{}", "OutTuples": "{}"}
+
+    handler.restore_tw(
+        "profile_1.1.1.1",
+        "timewindow1",
+        {
+            "profile_1.1.1.1_timewindow1_timeline": b"timeline",
+            "profile_1.1.1.1_timewindow1": b"tw",
+        },
+    )
+
+    # only the fields that weren't set again are restored
+    handler.r.hset.assert_called_once_with(
+        "profile_1.1.1.1_timewindow1", mapping={"OutTuples": "{}"}
+    )
+    handler.r.delete.assert_called_once_with(
+        "profile_1.1.1.1_timewindow1_archived"
+    )
+    pipe = handler.r.pipeline.return_value
+    pipe.srem.assert_any_call("archived_tws", "profile_1.1.1.1_timewindow1")
+    pipe.zadd.assert_called_once_with(
+        "closed_tws_to_archive", {"profile_1.1.1.1_timewindow1": ANY}
+    )
+
+
+def test_add_timeline_lines():
+    handler = ModuleFactory().create_profile_handler_obj()
+    handler.mark_profile_tw_as_modified = MagicMock()
+
+    handler.add_timeline_lines(
+        "profile_1.1.1.1",
+        "timewindow1",
+        [({"info": "a"}, 1.0), ({"info": "b"}, 2.0)],
+    )
+
+    handler.r.zadd.assert_called_once_with(
+        "profile_1.1.1.1_timewindow1_timeline",
+        {'{"info": "a"}': 1.0, '{"info": "b"}': 2.0},
+    )
+    handler.mark_profile_tw_as_modified.assert_called_once_with(
+        "profile_1.1.1.1", "timewindow1", timestamp=""
+    )
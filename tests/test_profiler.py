@@ -555,9 +555,14 @@ def test_shutdown_gracefully(monkeypatch):
     profiler.print = Mock()
     profiler.mark_process_as_done_processing = Mock()
     profiler.rec_lines = 100
+    profiler.db.get_suppressed_ip_info_requests.return_value = 5
 
     # monkeypatch.setattr(profiler, "print", Mock())
     profiler.shutdown_gracefully()
+    profiler.db.store_suppressed_ip_info_requests.assert_called_once()
+    profiler.print.assert_any_call(
+        "Repeated ip info requests not sent: 5", log_to_logfiles_only=True
+    )
     profiler.print.assert_called_with(
         "Stopping. Total lines read: 100", log_to_logfiles_only=True
     )
@@ -782,3 +787,41 @@ def test_is_gw_info_detected_when_attribute_is_already_set():
     # assertions
     assert result
     assert profiler.gw_mac == "00:1A:2B:3C:4D:5E"
+
+
+@pytest.mark.parametrize(
+    "flow_time, starttime, expected_flow_time",
+    [
+        # Testcase 1: newer flow
+        (1000.0, 1005.0, 1005.0),
+        # Testcase 2: less than a second newer, the db isn't updated
+        (1000.0, 1000.5, 1000.0),
+        # Testcase 3: older flow
+        (1000.0, 900.0, 1000.0),
+        # Testcase 4: invalid ts
+        (1000.0, "", 1000.0),
+    ],
+)
+def test_update_flow_time(flow_time, starttime, expected_flow_time):
+    profiler = ModuleFactory().create_profiler_obj()
+    profiler.is_running_non_stop = False
+    profiler.flow_time = flow_time
+    profiler.flow = Mock(starttime=starttime)
+
+    profiler.update_flow_time()
+
+    assert profiler.flow_time == expected_flow_time
+    if expected_flow_time != flow_time:
+        profiler.db.set_flow_time.assert_called_once_with(expected_flow_time)
+    else:
+        profiler.db.set_flow_time.assert_not_called()
+
+
+def test_update_flow_time_on_an_interface():
+    profiler = ModuleFactory().create_profiler_obj()
+    profiler.is_running_non_stop = True
+    profiler.flow = Mock(starttime=1005.0)
+
+    profiler.update_flow_time()
+
+    profiler.db.set_flow_time.assert_not_called()
@@ -0,0 +1,40 @@
+import pytest
+
+from slips_files.common.data_structures.request_ledger import RequestLedger
+
+
+@pytest.mark.parametrize(
+    "requests, expected_results, expected_suppressed",
+    [
+        # Testcase 1: different keys
+        (["a", "b", "c"], [True, True, True], 0),
+        # Testcase 2: repeated keys
+        (["a", "a", "b", "a"], [True, False, True, False], 2),
+        # Testcase 3: tuple keys
+        (
+            [("1.1.1.1", "timewindow1"), ("1.1.1.1", "timewindow2")],
+            [True, True],
+            0,
+        ),
+    ],
+)
+def test_should_request(requests, expected_results, expected_suppressed):
+    ledger = RequestLedger()
+    assert [ledger.should_request(key) for key in requests] == (
+        expected_results
+    )
+    assert ledger.suppressed == expected_suppressed
+
+
+def test_should_request_forgets_least_recently_requested():
+    ledger = RequestLedger(max_size=2)
+    ledger.should_request("a")
+    ledger.should_request("b")
+    # "a" is now the most recently requested
+    assert not ledger.should_request("a")
+    # forgets "b"
+    ledger.should_request("c")
+
+    assert len(ledger) == 2
+    assert not ledger.should_request("a")
+    assert ledger.should_request("b")
@@ -0,0 +1,221 @@
+import threading
+
+import pytest
+
+from modules.virustotal.request_scheduler import (
+    EVIDENCE_PRIORITY,
+    FLOW_PRIORITY,
+    RequestScheduler,
+)
+
+
+def pop_all(scheduler: RequestScheduler):
+    popped = []
+    while ioc := scheduler.pop():
+        popped.append(ioc)
+    return popped
+
+
+@pytest.mark.parametrize(
+    "to_schedule, expected_order, expected_duplicates",
+    [
+        # Testcase 1: fifo
+        (
+            [("8.8.8.8", FLOW_PRIORITY), ("1.1.1.1", FLOW_PRIORITY)],
+            ["8.8.8.8", "1.1.1.1"],
+            0,
+        ),
+        # Testcase 2: duplicates
+        (
+            [
+                ("8.8.8.8", FLOW_PRIORITY),
+                ("8.8.8.8", FLOW_PRIORITY),
+                ("1.1.1.1", FLOW_PRIORITY),
+                ("8.8.8.8", FLOW_PRIORITY),
+            ],
+            ["8.8.8.8", "1.1.1.1"],
+            2,
+        ),
+        # Testcase 3: evidence first
+        (
+            [("8.8.8.8", FLOW_PRIORITY), ("example.com", EVIDENCE_PRIORITY)],
+            ["example.com", "8.8.8.8"],
+            0,
+        ),
+        # Testcase 4: evidence raises the priority of a queued ioc
+        (
+            [
+                ("8.8.8.8", FLOW_PRIORITY),
+                ("1.1.1.1", FLOW_PRIORITY),
+                ("1.1.1.1", EVIDENCE_PRIORITY),
+            ],
+            ["1.1.1.1", "8.8.8.8"],
+            1,
+        ),
+        # Testcase 5: flows don't lower the priority
+        (
+            [
+                ("8.8.8.8", FLOW_PRIORITY),
+                ("1.1.1.1", EVIDENCE_PRIORITY),
+                ("1.1.1.1", FLOW_PRIORITY),
+            ],
+            ["1.1.1.1", "8.8.8.8"],
+            1,
+        ),
+    ],
+)
+def test_schedule(to_schedule, expected_order, expected_duplicates):
+    scheduler = RequestScheduler()
+    for ioc, priority in to_schedule:
+        scheduler.schedule(ioc, priority)
+
+    assert len(scheduler) == len(expected_order)
+    assert pop_all(scheduler) == expected_order
+    assert scheduler.duplicates == expected_duplicates
+    assert not scheduler.heap
+
+
+@pytest.mark.parametrize(
+    "to_schedule, expected_order, expected_dropped",
+    [
+        # Testcase 1: the oldest flow ioc is dropped
+        (
+            [
+                ("1.1.1.1", FLOW_PRIORITY),
+                ("2.2.2.2", FLOW_PRIORITY),
+                ("3.3.3.3", FLOW_PRIORITY),
+            ],
+            ["2.2.2.2", "3.3.3.3"],
+            1,
+        ),
+        # Testcase 2: evidence iocs are never dropped
+        (
+            [
+                ("1.1.1.1", EVIDENCE_PRIORITY),
+                ("2.2.2.2", FLOW_PRIORITY),
+                ("3.3.3.3", EVIDENCE_PRIORITY),
+            ],
+            ["1.1.1.1", "3.3.3.3"],
+            1,
+        ),
+        # Testcase 3: a new flow ioc is dropped if only evidence iocs are
+        # queued
+        (
+            [
+                ("1.1.1.1", EVIDENCE_PRIORITY),
+                ("2.2.2.2", EVIDENCE_PRIORITY),
+                ("3.3.3.3", FLOW_PRIORITY),
+            ],
+            ["1.1.1.1", "2.2.2.2"],
+            1,
+        ),
+        # Testcase 4: an ioc whose priority was raised isn't dropped
+        (
+            [
+                ("1.1.1.1", FLOW_PRIORITY),
+                ("2.2.2.2", FLOW_PRIORITY),
+                ("1.1.1.1", EVIDENCE_PRIORITY),
+                ("3.3.3.3", FLOW_PRIORITY),
+            ],
+            ["1.1.1.1", "3.3.3.3"],
+            1,
+        ),
+    ],
+)
+def test_schedule_when_the_queue_is_full(
+    to_schedule, expected_order, expected_dropped
+):
+    scheduler = RequestScheduler(max_queued=2)
+    for ioc, priority in to_schedule:
+        scheduler.schedule(ioc, priority)
+
+    assert pop_all(scheduler) == expected_order
+    assert scheduler.dropped == expected_dropped
+
+
+def test_stale_entries_are_removed():
+    scheduler = RequestScheduler(max_queued=10)
+    for i in range(1000):
+        scheduler.schedule(f"ioc{i}")
+
+    assert len(scheduler) == 10
+    assert len(scheduler.heap) <= 2 * 10 + 100
+    assert pop_all(scheduler) == [f"ioc{i}" for i in range(990, 1000)]
+
+
+def test_schedule_in_progress_ioc():
+    scheduler = RequestScheduler()
+    scheduler.schedule("8.8.8.8")
+    scheduler.pop()
+
+    assert "8.8.8.8" in scheduler
+    assert not scheduler.schedule("8.8.8.8")
+    scheduler.done("8.8.8.8")
+    assert "8.8.8.8" not in scheduler
+    assert scheduler.schedule("8.8.8.8")
+
+
+def test_retry():
+    scheduler = RequestScheduler()
+    scheduler.schedule("8.8.8.8")
+    scheduler.schedule("example.com", EVIDENCE_PRIORITY)
+    assert scheduler.pop() == "example.com"
+
+    scheduler.retry("example.com")
+
+    # keeps its priority
+    assert pop_all(scheduler) == ["example.com", "8.8.8.8"]
+    # waits for the quota to refill
+    assert scheduler.bucket.tokens == 0
+
+
+def test_get_is_rate_limited(mocker):
+    now = 0
+    mocker.patch(
+        "modules.virustotal.request_scheduler.time.monotonic",
+        side_effect=lambda: now,
+    )
+    scheduler = RequestScheduler(requests_per_minute=2)
+    for ioc in ("1.1.1.1", "2.2.2.2", "3.3.3.3"):
+        scheduler.schedule(ioc)
+    waits = []
+
+    def wait(timeout=None):
+        nonlocal now
+        waits.append(timeout)
+        now += timeout
+
+    scheduler.condition.wait = wait
+
+    assert [scheduler.get() for _ in range(3)] == [
+        "1.1.1.1",
+        "2.2.2.2",
+        "3.3.3.3",
+    ]
+    # the first 2 are a burst, the third waits for the bucket to refill
+    assert waits == [pytest.approx(30)]
+
+
+def test_get_waits_for_iocs():
+    scheduler = RequestScheduler(requests_per_minute=600)
+    got = []
+    thread = threading.Thread(target=lambda: got.append(scheduler.get()))
+    thread.start()
+
+    scheduler.schedule("8.8.8.8")
+    thread.join(timeout=5)
+
+    assert got == ["8.8.8.8"]
+
+
+def test_stop_wakes_up_get():
+    scheduler = RequestScheduler()
+    got = []
+    thread = threading.Thread(target=lambda: got.append(scheduler.get()))
+    thread.start()
+
+    scheduler.stop()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert got == [None]
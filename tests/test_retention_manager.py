@@ -0,0 +1,140 @@
+from unittest.mock import Mock, call
+
+import pytest
+
+from tests.module_factory import ModuleFactory
+
+
+@pytest.mark.parametrize(
+    "keep_closed_tws, max_redis_memory, closed_tws, used_memory, expected",
+    [
+        # Testcase 1: disabled
+        (0, 0, 1000, 10**9, 0),
+        # Testcase 2: more closed tws than the ones to keep
+        (100, 0, 130, 0, 30),
+        # Testcase 3: less closed tws than the ones to keep
+        (100, 0, 30, 0, -70),
+        # Testcase 4: redis uses more memory than allowed
+        (0, 1024, 30, 2048, 50),
+        # Testcase 5: redis uses less memory than allowed
+        (0, 1024, 30, 100, 0),
+        # Testcase 6: too many tws to archive at once
+        (10, 0, 10000, 0, 500),
+    ],
+)
+def test_get_number_of_tws_to_archive(
+    keep_closed_tws, max_redis_memory, closed_tws, used_memory, expected
+):
+    retention_man = ModuleFactory().create_retention_manager_obj()
+    retention_man.keep_closed_tws = keep_closed_tws
+    retention_man.max_redis_memory = max_redis_memory
+    retention_man.main.db.get_closed_tws_to_archive_len.return_value = (
+        closed_tws
+    )
+    retention_man.main.db.get_used_memory.return_value = used_memory
+
+    assert retention_man.get_number_of_tws_to_archive() == expected
+
+
+def test_update_archives_the_oldest_closed_tws():
+    retention_man = ModuleFactory().create_retention_manager_obj()
+    retention_man.keep_closed_tws = 1
+    retention_man.restore_channel = Mock()
+    retention_man.restore_channel.get_message.return_value = None
+    retention_man.main.db.get_closed_tws_to_archive_len.return_value = 3
+    retention_man.main.db.get_closed_tws_to_archive.return_value = [
+        "profile_1.1.1.1_timewindow1",
+        "profile_fe80::1_timewindow2",
+    ]
+    retention_man.main.db.archive_tw = Mock(side_effect=[True, False])
+
+    retention_man.update()
+
+    retention_man.main.db.get_closed_tws_to_archive.assert_called_once_with(2)
+    retention_man.main.db.archive_tw.assert_has_calls(
+        [
+            call("profile_1.1.1.1", "timewindow1"),
+            call("profile_fe80::1", "timewindow2"),
+        ]
+    )
+
+
+def test_update_when_disabled():
+    retention_man = ModuleFactory().create_retention_manager_obj()
+
+    retention_man.update()
+
+    retention_man.main.db.get_closed_tws_to_archive.assert_not_called()
+    retention_man.main.db.archive_tw.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "msgs, expected_calls",
+    [
+        # Testcase 1: no restore requests
+        ([], []),
+        # Testcase 2: one request
+        (
+            [
+                {
+                    "channel": "restore_archived_tw",
+                    "data": "profile_1.1.1.1_timewindow1",
+                }
+            ],
+            [call("profile_1.1.1.1", "timewindow1")],
+        ),
+        # Testcase 3: msgs of other channels and invalid msgs are skipped
+        (
+            [
+                {
+                    "channel": "tw_closed",
+                    "data": "profile_2.2.2.2_timewindow3",
+                },
+                {"channel": "restore_archived_tw", "data": 1},
+                {
+                    "channel": "restore_archived_tw",
+                    "data": "profile_fe80::1_timewindow2",
+                },
+            ],
+            [call("profile_fe80::1", "timewindow2")],
+        ),
+    ],
+)
+def test_restore_requested_tws(msgs, expected_calls):
+    retention_man = ModuleFactory().create_retention_manager_obj()
+    retention_man.restore_channel = Mock()
+    retention_man.restore_channel.get_message.side_effect = msgs + [None]
+
+    retention_man.restore_requested_tws()
+
+    assert (
+        retention_man.main.db.restore_archived_tw.call_args_list
+        == expected_calls
+    )
+
+
+@pytest.mark.parametrize(
+    "keep_closed_tws, max_redis_memory, expected_subscribed",
+    [
+        # Testcase 1: disabled, there's nothing to restore
+        (0, 0, False),
+        # Testcase 2: enabled using keep_closed_tws
+        (10, 0, True),
+        # Testcase 3: enabled using max_redis_memory
+        (0, 1024, True),
+    ],
+)
+def test_enable_subscribes_to_restore_requests(
+    keep_closed_tws, max_redis_memory, expected_subscribed
+):
+    retention_man = ModuleFactory().create_retention_manager_obj()
+    retention_man.main.conf.keep_closed_tws.return_value = keep_closed_tws
+    retention_man.main.conf.max_redis_memory.return_value = max_redis_memory
+
+    retention_man.enable()
+
+    assert retention_man.main.db.subscribe.called == expected_subscribed
+    if expected_subscribed:
+        retention_man.main.db.subscribe.assert_called_once_with(
+            "restore_archived_tw"
+        )
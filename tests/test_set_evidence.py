@@ -1398,10 +1398,16 @@ def test_for_port_0_connection(
 def test_malicious_ja3s(attacker_ip, threat_level, profile_ip, ja3s):
     """Testing the malicious_ja3s method."""
     malicious_ja3_dict = {
-        "e7d705a3286e19ea42f587b344ee6865": '{"threat_level": "high", '
-        '"description": "Potential malware", "tags": "malware"}',
-        "6734f37431670b3ab4292b8f60f29984": '{"threat_level": "medium", '
-        '"description": "Suspicious activity", "tags": "suspicious"}',
+        "e7d705a3286e19ea42f587b344ee6865": {
+            "threat_level": "high",
+            "description": "Potential malware",
+            "tags": "malware",
+        },
+        "6734f37431670b3ab4292b8f60f29984": {
+            "threat_level": "medium",
+            "description": "Suspicious activity",
+            "tags": "suspicious",
+        },
     }
     flow = SSL(
         starttime="1726593782.8840969",
@@ -1429,7 +1435,7 @@ def test_malicious_ja3s(attacker_ip, threat_level, profile_ip, ja3s):
     set_ev.malicious_ja3s(
         twid="timewindow9",
         flow=flow,
-        malicious_ja3_dict=malicious_ja3_dict,
+        ja3_info=malicious_ja3_dict[ja3s],
     )
 
     assert set_ev.db.set_evidence.call_count == 2
@@ -1463,12 +1469,16 @@ def test_malicious_ja3s(attacker_ip, threat_level, profile_ip, ja3s):
 def test_malicious_ja3(attacker_ip, threat_level, description, tags, ja3):
     """Testing the malicious_ja3 method."""
     malicious_ja3_dict = {
-        "e7d705a3286e19ea42f587b344ee6865": '{"threat_level": "high", '
-        '"description": "Potential malware", '
-        '"tags": "malware"}',
-        "6734f37431670b3ab4292b8f60f29984": '{"threat_level": "medium", '
-        '"description": "Suspicious activity", '
-        '"tags": ""}',
+        "e7d705a3286e19ea42f587b344ee6865": {
+            "threat_level": "high",
+            "description": "Potential malware",
+            "tags": "malware",
+        },
+        "6734f37431670b3ab4292b8f60f29984": {
+            "threat_level": "medium",
+            "description": "Suspicious activity",
+            "tags": "",
+        },
     }
     flow = SSL(
         starttime="1726593782.8840969",
@@ -1497,7 +1507,7 @@ def test_malicious_ja3(attacker_ip, threat_level, description, tags, ja3):
     set_ev.malicious_ja3(
         twid="timewindow10",
         flow=flow,
-        malicious_ja3_dict=malicious_ja3_dict,
+        ja3_info=malicious_ja3_dict[ja3],
     )
 
     assert set_ev.db.set_evidence.call_count == 1
@@ -0,0 +1,98 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from tests.module_factory import ModuleFactory
+
+
+@pytest.mark.parametrize(
+    "last_snapshot_time, bgsave_started, expected_is_saving",
+    [
+        # Testcase 1: not time for a snapshot yet
+        (995, True, False),
+        # Testcase 2: time for a snapshot
+        (800, True, True),
+        # Testcase 3: redis is busy writing another snapshot
+        (800, False, False),
+    ],
+)
+def test_update_starts_snapshots(
+    tmp_path, last_snapshot_time, bgsave_started, expected_is_saving
+):
+    snapshot_man = ModuleFactory().create_snapshot_manager_obj(str(tmp_path))
+    snapshot_man.interval = 100
+    snapshot_man.last_snapshot_time = last_snapshot_time
+    snapshot_man.main.db.start_background_save.return_value = bgsave_started
+
+    with patch("time.time", return_value=1000):
+        snapshot_man.update()
+
+    assert snapshot_man.is_saving == expected_is_saving
+
+
+def test_update_when_disabled(tmp_path):
+    snapshot_man = ModuleFactory().create_snapshot_manager_obj(str(tmp_path))
+    snapshot_man.main.conf.snapshot_interval.return_value = 0
+    snapshot_man.enable()
+
+    snapshot_man.update()
+
+    snapshot_man.main.db.start_background_save.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "status, expected_is_saving, expected_copied",
+    [
+        # Testcase 1: redis is still writing the snapshot
+        (None, True, False),
+        # Testcase 2: the snapshot is done
+        (True, False, True),
+        # Testcase 3: redis failed to write the snapshot
+        (False, False, False),
+    ],
+)
+def test_update_finishes_snapshots(
+    tmp_path, status, expected_is_saving, expected_copied
+):
+    rdb = tmp_path / "dump.rdb"
+    rdb.write_bytes(b"REDIS0011")
+    snapshot_man = ModuleFactory().create_snapshot_manager_obj(
+        str(tmp_path / "output")
+    )
+    snapshot_man.interval = 100
+    snapshot_man.is_saving = True
+    db = snapshot_man.main.db
+    db.get_background_save_status.return_value = status
+    db.get_rdb_path.return_value = str(rdb)
+
+    snapshot_man.update()
+    if snapshot_man.copy_thread:
+        snapshot_man.copy_thread.join()
+
+    assert snapshot_man.is_saving == expected_is_saving
+    snapshots_dir = tmp_path / "output" / "snapshots"
+    assert snapshots_dir.exists() == expected_copied
+    if expected_copied:
+        (snapshot,) = os.listdir(snapshots_dir)
+        assert (snapshots_dir / snapshot).read_bytes() == b"REDIS0011"
+
+
+def test_store_snapshot_removes_old_snapshots(tmp_path):
+    rdb = tmp_path / "dump.rdb"
+    rdb.write_bytes(b"REDIS0011")
+    snapshot_man = ModuleFactory().create_snapshot_manager_obj(
+        str(tmp_path / "output")
+    )
+    snapshot_man.to_keep = 2
+    snapshots_dir = tmp_path / "output" / "snapshots"
+    snapshots_dir.mkdir(parents=True)
+    for old_snapshot in ("2024-01-01_10:00:00", "2024-01-01_11:00:00"):
+        (snapshots_dir / f"{old_snapshot}.rdb").write_bytes(b"old")
+
+    snapshot_man.store_snapshot(str(rdb))
+
+    snapshots = snapshot_man.get_snapshots()
+    assert len(snapshots) == 2
+    assert os.path.basename(snapshots[0]) == "2024-01-01_11:00:00.rdb"
+    assert open(snapshots[1], "rb").read() == b"REDIS0011"
@@ -10,7 +10,6 @@ from unittest.mock import (
 )
 from unittest.mock import MagicMock
 import pytest
-from tests.common_test_utils import get_mock_coro
 
 # dummy params used for testing
 profileid = "profile_192.168.1.1"
@@ -40,7 +39,7 @@ daddr = "192.168.1.2"
         ("some_other_value", False, True),
     ],
 )
-async def test_check_successful_ssh(
+def test_check_successful_ssh(
     mocker, auth_success, expected_zeek_evidence, expected_called_slips
 ):
     ssh = ModuleFactory().create_ssh_analyzer_obj()
@@ -71,7 +70,9 @@ async def test_check_successful_ssh(
         "slips_files.common.slips_utils.utils.get_original_conn_flow"
     ) as mock_get_original_conn_flow:
         mock_get_original_conn_flow.side_effect = [None, {"flow": {}}]
-        await ssh.check_successful_ssh(twid, flow)
+        ssh.check_successful_ssh(twid, flow)
+        # the conn.log flow arrived later
+        ssh.flowalerts.deferred_checks.run_all()
 
     assert (
         mock_set_evidence_ssh_successful_by_zeek.called
@@ -180,23 +181,23 @@ def test_detect_successful_ssh_by_slips():
     )
 
 
-async def test_analyze_no_message():
+def test_analyze_no_message():
     ssh = ModuleFactory().create_ssh_analyzer_obj()
     ssh.flowalerts = MagicMock()
     ssh.flowalerts.get_msg.return_value = None
     ssh.check_successful_ssh = MagicMock()
     ssh.check_ssh_password_guessing = MagicMock()
 
-    await ssh.analyze({})
+    ssh.analyze({})
 
     ssh.check_successful_ssh.assert_not_called()
     ssh.check_ssh_password_guessing.assert_not_called()
 
 
 @pytest.mark.parametrize("auth_success", ["true", "false"])
-async def test_analyze_with_message(auth_success):
+def test_analyze_with_message(auth_success):
     ssh = ModuleFactory().create_ssh_analyzer_obj()
-    ssh.check_successful_ssh = get_mock_coro(True)
+    ssh.check_successful_ssh = MagicMock()
     ssh.check_ssh_password_guessing = MagicMock()
     flow = SSH(
         starttime="1726655400.0",
@@ -222,7 +223,7 @@ async def test_analyze_with_message(auth_success):
         "flow": asdict(flow),
     }
 
-    await ssh.analyze({"channel": "new_ssh", "data": json.dumps(msg_data)})
+    ssh.analyze({"channel": "new_ssh", "data": json.dumps(msg_data)})
 
     ssh.check_successful_ssh.assert_called_once_with(twid, flow)
     ssh.check_ssh_password_guessing.assert_called_once_with(
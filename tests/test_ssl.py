@@ -103,10 +103,11 @@ def test_detect_malicious_ja3(
         "modules.flowalerts.set_evidence.SetEvidnceHelper.malicious_ja3s"
     )
 
-    ssl.db.get_all_blacklisted_ja3.return_value = {
-        "malicious_ja3": "Malicious JA3",
-        "malicious_ja3s": "Malicious JA3S",
+    malicious_fingerprints = {
+        "malicious_ja3": {"description": "Malicious JA3"},
+        "malicious_ja3s": {"description": "Malicious JA3S"},
     }
+    ssl.db.is_blacklisted_ja3.side_effect = malicious_fingerprints.get
     flow = SSL(
         starttime="1726593782.8840969",
         uid="123",
@@ -192,7 +193,7 @@ def test_detect_doh(mocker, is_doh, expected_calls):
         ("www.example.com", 15000, False),
     ],
 )
-async def test_check_pastebin_download(
+def test_check_pastebin_download(
     mocker,
     server_name,
     downloaded_bytes,
@@ -231,7 +232,9 @@ async def test_check_pastebin_download(
         "slips_files.common.slips_utils.utils.get_original_conn_flow"
     ) as mock_get_original_conn_flow:
         mock_get_original_conn_flow.side_effect = [None, conn_log_flow]
-        await ssl.check_pastebin_download(twid, flow)
+        ssl.check_pastebin_download(twid, flow)
+        # the conn.log flow arrived later
+        ssl.flowalerts.deferred_checks.run_all()
 
     assert mock_set_evidence.call_count == expected_call_count
 
@@ -449,7 +452,7 @@ def test_check_non_ssl_port_443_conns(
     assert mock_set_evidence.call_count == expected_call_count
 
 
-async def test_analyze_new_ssl_msg(mocker):
+def test_analyze_new_ssl_msg(mocker):
     ssl = ModuleFactory().create_ssl_analyzer_obj()
     mock_check_self_signed_certs = mocker.patch.object(
         ssl, "check_self_signed_certs"
@@ -496,7 +499,7 @@ async def test_analyze_new_ssl_msg(mocker):
         ),
     }
 
-    await ssl.analyze(msg)
+    ssl.analyze(msg)
     mock_check_self_signed_certs.assert_called_once_with("timewindow1", flow)
     mock_detect_malicious_ja3.assert_called_once_with("timewindow1", flow)
     mock_detect_incompatible_cn.assert_called_once_with(
@@ -506,7 +509,7 @@ async def test_analyze_new_ssl_msg(mocker):
     mock_detect_doh.assert_called_once_with("timewindow1", flow)
 
 
-async def test_analyze_new_flow_msg(mocker):
+def test_analyze_new_flow_msg(mocker):
     ssl = ModuleFactory().create_ssl_analyzer_obj()
     mock_check_non_ssl_port_443_conns = mocker.patch.object(
         ssl, "check_non_ssl_port_443_conns"
@@ -542,14 +545,14 @@ async def test_analyze_new_flow_msg(mocker):
         ),
     }
 
-    await ssl.analyze(msg)
+    ssl.analyze(msg)
 
     mock_check_non_ssl_port_443_conns.assert_called_once_with(
         "timewindow1", flow
     )
 
 
-async def test_analyze_no_messages(
+def test_analyze_no_messages(
     mocker,
 ):
     ssl = ModuleFactory().create_ssl_analyzer_obj()
@@ -568,7 +571,7 @@ async def test_analyze_no_messages(
         ssl, "check_non_ssl_port_443_conns"
     )
 
-    await ssl.analyze({})
+    ssl.analyze({})
 
     mock_check_self_signed_certs.assert_not_called()
     mock_detect_malicious_ja3.assert_not_called()
@@ -0,0 +1,207 @@
+"""Unit test for modules/exporting_alerts/stix_exporter.py"""
+
+import json
+import os
+import threading
+from http.server import (
+    BaseHTTPRequestHandler,
+    HTTPServer,
+)
+
+import libtaxii.messages_11 as tm11
+import pytest
+from libtaxii.constants import (
+    ST_SUCCESS,
+    SVC_INBOX,
+    VID_TAXII_HTTP_10,
+    VID_TAXII_SERVICES_11,
+    VID_TAXII_XML_11,
+)
+
+from tests.module_factory import ModuleFactory
+
+
+class TAXIIStub(BaseHTTPRequestHandler):
+    """
+    a TAXII 1.1 server with one inbox service, that stores the content
+    pushed to it in server.pushed
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        msg = tm11.get_message_from_xml(body)
+        if isinstance(msg, tm11.DiscoveryRequest):
+            port = self.server.server_address[1]
+            inbox = tm11.ServiceInstance(
+                service_type=SVC_INBOX,
+                services_version=VID_TAXII_SERVICES_11,
+                protocol_binding=VID_TAXII_HTTP_10,
+                service_address=f"http://localhost:{port}/services/inbox-a",
+                message_bindings=[VID_TAXII_XML_11],
+            )
+            reply = tm11.DiscoveryResponse(
+                tm11.generate_message_id(),
+                msg.message_id,
+                service_instances=[inbox],
+            )
+        else:
+            self.server.pushed.append(
+                (
+                    msg.destination_collection_names,
+                    msg.content_blocks[0].content,
+                )
+            )
+            reply = tm11.StatusMessage(
+                tm11.generate_message_id(),
+                msg.message_id,
+                status_type=ST_SUCCESS,
+            )
+
+        reply = reply.to_xml()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("X-TAXII-Content-Type", VID_TAXII_XML_11)
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+
+@pytest.fixture
+def taxii_server():
+    server = HTTPServer(("localhost", 0), TAXIIStub)
+    server.pushed = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stix(tmp_path, taxii_server):
+    stix = ModuleFactory().create_stix_exporter_obj()
+    stix.stix_filename = str(tmp_path / "STIX_data.json")
+    stix.journal_filename = str(tmp_path / "STIX_indicators.jsonl")
+    stix.TAXII_server = "localhost"
+    stix.port = taxii_server.server_address[1]
+    stix.use_https = False
+    stix.discovery_path = "/services/discovery-a"
+    stix.inbox_path = "/services/inbox-a"
+    stix.collection_name = "collection-a"
+    stix.jwt_auth_path = ""
+    return stix
+
+
+def get_pushed_indicators(taxii_server) -> list:
+    """returns the ioc patterns of each bundle pushed to the server"""
+    return [
+        [indicator["pattern"] for indicator in json.loads(bundle)["objects"]]
+        for _, bundle in taxii_server.pushed
+    ]
+
+
+def test_add_to_stix_file_appends_to_the_journal(stix):
+    for ip in ("1.1.1.1", "2.2.2.2", "1.1.1.1"):
+        assert stix.add_to_stix_file(("PortScan", ip)) is True
+
+    with open(stix.journal_filename) as journal:
+        lines = journal.readlines()
+    # duplicates aren't added
+    assert len(lines) == 2
+    assert json.loads(lines[1])["pattern"] == "[ip-addr:value = '2.2.2.2']"
+    assert stix.indicators_to_push == 2
+
+
+def test_create_bundle(stix):
+    assert stix.create_bundle() is None
+    stix.add_to_stix_file(("PortScan", "1.1.1.1"))
+    stix.add_to_stix_file(("ThreatIntelligence", "example.com"))
+
+    bundle = json.loads(stix.create_bundle())
+    assert bundle["type"] == "bundle"
+    assert bundle["id"].startswith("bundle--")
+    assert [indicator["name"] for indicator in bundle["objects"]] == [
+        "PortScan",
+        "ThreatIntelligence",
+    ]
+    with open(stix.stix_filename) as stix_file:
+        assert json.load(stix_file) == bundle
+
+
+def test_export(stix, taxii_server):
+    assert stix.export() is False
+
+    stix.add_to_stix_file(("PortScan", "1.1.1.1"))
+    assert stix.export() is True
+    stix.add_to_stix_file(("PortScan", "2.2.2.2"))
+    assert stix.export() is True
+
+    # each push has only the indicators added since the last one
+    assert get_pushed_indicators(taxii_server) == [
+        ["[ip-addr:value = '1.1.1.1']"],
+        ["[ip-addr:value = '2.2.2.2']"],
+    ]
+    assert taxii_server.pushed[0][0] == ["collection-a"]
+    assert stix.indicators_to_push == 0
+
+
+def test_failed_export_keeps_the_journal(stix, taxii_server):
+    stix.add_to_stix_file(("PortScan", "1.1.1.1"))
+    # no inbox service
+    stix.inbox_service_exists_in_taxii_server = lambda services: False
+    assert stix.export() is False
+    assert stix.indicators_to_push == 1
+
+    del stix.inbox_service_exists_in_taxii_server
+    stix.add_to_stix_file(("PortScan", "2.2.2.2"))
+    assert stix.export() is True
+    assert get_pushed_indicators(taxii_server) == [
+        ["[ip-addr:value = '1.1.1.1']", "[ip-addr:value = '2.2.2.2']"]
+    ]
+
+
+@pytest.mark.parametrize(
+    "push_succeeds, expected_journal",
+    [
+        # Testcase 1: only the indicator added while pushing is left
+        (True, ["2.2.2.2"]),
+        # Testcase 2: the pushed indicators are put back before it
+        (False, ["1.1.1.1", "2.2.2.2"]),
+    ],
+)
+def test_indicators_added_while_pushing(stix, push_succeeds, expected_journal):
+    stix.add_to_stix_file(("PortScan", "1.1.1.1"))
+
+    def push(bundle: str) -> bool:
+        # the journal isn't locked while pushing
+        assert not stix.journal_lock.locked()
+        stix.add_to_stix_file(("PortScan", "2.2.2.2"))
+        return push_succeeds
+
+    stix.push = push
+    assert stix.export() is push_succeeds
+
+    with open(stix.journal_filename) as journal:
+        patterns = [json.loads(line)["pattern"] for line in journal]
+    assert patterns == [f"[ip-addr:value = '{ip}']" for ip in expected_journal]
+    assert stix.indicators_to_push == len(expected_journal)
+    assert not os.path.exists(stix.get_pushed_journal_filename())
+
+
+@pytest.mark.parametrize(
+    "indicators, push_batch_size, expected_result",
+    [
+        # Testcase 1: less indicators than the batch size
+        (2, 3, False),
+        # Testcase 2: a full batch
+        (3, 3, True),
+    ],
+)
+def test_should_push(stix, indicators, push_batch_size, expected_result):
+    stix.push_batch_size = push_batch_size
+    for i in range(indicators):
+        stix.add_to_stix_file(("PortScan", f"1.1.1.{i}"))
+    assert stix.should_push() is expected_result
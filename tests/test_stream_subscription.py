@@ -0,0 +1,251 @@
+from unittest.mock import Mock
+
+import pytest
+import redis
+
+from slips_files.core.database.redis_db.database import RedisDB
+from slips_files.core.database.redis_db.stream_subscription import (
+    StreamSubscription,
+)
+
+
+def create_subscription(client=None, batch_size=10):
+    return StreamSubscription(
+        client or Mock(),
+        {"new_flow": "new_flow_stream"},
+        "FlowAlerts",
+        batch_size,
+    )
+
+
+def test_group_is_created_on_subscription():
+    client = Mock()
+    create_subscription(client)
+    client.xgroup_create.assert_called_once_with(
+        "new_flow_stream", "FlowAlerts", id="$", mkstream=True
+    )
+
+
+def test_existing_group_is_reused():
+    client = Mock()
+    client.xgroup_create.side_effect = redis.exceptions.ResponseError(
+        "BUSYGROUP Consumer Group name already exists"
+    )
+    # shouldn't raise
+    create_subscription(client)
+
+
+def test_pending_msgs_are_read_first():
+    client = Mock()
+    client.xgroup_create.side_effect = redis.exceptions.ResponseError(
+        "BUSYGROUP Consumer Group name already exists"
+    )
+    subscription = create_subscription(client, batch_size=2)
+    client.xreadgroup.side_effect = [
+        # msgs read before a checkpoint and not acked, 1-0 was trimmed
+        [["new_flow_stream", [("1-0", None), ("2-0", {"data": "a"})]]],
+        # no pending msgs left
+        [["new_flow_stream", []]],
+        [["new_flow_stream", [("3-0", {"data": "b"})]]],
+    ]
+
+    assert subscription.get_message()["data"] == "a"
+    client.xack.assert_called_once_with("new_flow_stream", "FlowAlerts", "1-0")
+    assert subscription.get_message()["data"] == "b"
+
+    assert [call.args[2] for call in client.xreadgroup.call_args_list] == [
+        {"new_flow_stream": "0"},
+        {"new_flow_stream": "0"},
+        {"new_flow_stream": ">"},
+    ]
+    client.xack.assert_called_with("new_flow_stream", "FlowAlerts", "2-0")
+
+
+def test_get_message_reads_in_batches_and_acks():
+    client = Mock()
+    client.xreadgroup.return_value = [
+        ["new_flow_stream", [("1-0", {"data": "a"}), ("2-0", {"data": "b"})]]
+    ]
+    subscription = create_subscription(client, batch_size=2)
+
+    assert subscription.get_message(timeout=0.5) == {
+        "type": "message",
+        "pattern": None,
+        "channel": "new_flow",
+        "data": "a",
+    }
+    assert subscription.get_message()["data"] == "b"
+    client.xreadgroup.assert_called_once_with(
+        "FlowAlerts",
+        "FlowAlerts",
+        {"new_flow_stream": ">"},
+        count=2,
+        block=500,
+    )
+    client.xack.assert_not_called()
+
+    # the whole batch is acked before reading the next one
+    client.xreadgroup.return_value = []
+    assert subscription.get_message() is None
+    client.xack.assert_called_once_with(
+        "new_flow_stream", "FlowAlerts", "1-0", "2-0"
+    )
+
+
+@pytest.mark.parametrize(
+    "timeout, expected_block",
+    [
+        # Testcase 1: non blocking read, BLOCK 0 means block forever
+        (0.0, None),
+        # Testcase 2: timeout smaller than 1ms
+        (0.0000001, None),
+        # Testcase 3: blocking read
+        (1, 1000),
+    ],
+)
+def test_read_timeout(timeout, expected_block):
+    client = Mock()
+    client.xreadgroup.return_value = None
+    subscription = create_subscription(client)
+    assert subscription.get_message(timeout=timeout) is None
+    assert client.xreadgroup.call_args.kwargs["block"] == expected_block
+
+
+def test_get_messages():
+    client = Mock()
+    client.xreadgroup.return_value = [
+        ["new_flow_stream", [("1-0", {"data": "a"}), ("2-0", {"data": "b"})]]
+    ]
+    subscription = create_subscription(client)
+    msgs = subscription.get_messages()
+    assert [msg["data"] for msg in msgs] == ["a", "b"]
+    subscription.close()
+    client.xack.assert_called_once_with(
+        "new_flow_stream", "FlowAlerts", "1-0", "2-0"
+    )
+
+
+def test_one_subscription_for_many_channels():
+    client = Mock()
+    client.xreadgroup.return_value = [
+        ["new_flow_stream", [("1-0", {"data": "a"})]],
+        ["new_dns_stream", [("1-1", {"data": "b"})]],
+    ]
+    subscription = StreamSubscription(
+        client,
+        {"new_flow": "new_flow_stream", "new_dns": "new_dns_stream"},
+        "FlowAlerts",
+        10,
+    )
+    assert client.xgroup_create.call_count == 2
+
+    msgs = subscription.get_messages(timeout=1)
+    assert [(msg["channel"], msg["data"]) for msg in msgs] == [
+        ("new_flow", "a"),
+        ("new_dns", "b"),
+    ]
+    # both streams are read using one command
+    client.xreadgroup.assert_called_once_with(
+        "FlowAlerts",
+        "FlowAlerts",
+        {"new_flow_stream": ">", "new_dns_stream": ">"},
+        count=10,
+        block=1000,
+    )
+    subscription.close()
+    client.xack.assert_any_call("new_flow_stream", "FlowAlerts", "1-0")
+    client.xack.assert_any_call("new_dns_stream", "FlowAlerts", "1-1")
+
+
+def create_redis_db(transport: str) -> RedisDB:
+    db = object.__new__(RedisDB)
+    db.r = Mock()
+    db.constants = Mock()
+    db.message_transport = transport
+    db.stream_max_len = 100
+    db.stream_batch_size = 10
+    return db
+
+
+@pytest.mark.parametrize(
+    "transport, channel, uses_streams",
+    [
+        # Testcase 1: pubsub transport
+        ("pubsub", "new_flow", False),
+        # Testcase 2: streams transport
+        ("streams", "new_flow", True),
+        # Testcase 3: channels used by processes outside slips
+        ("streams", "p2p_gopy", False),
+        ("streams", "control_channel", False),
+    ],
+)
+def test_publish(transport, channel, uses_streams):
+    db = create_redis_db(transport)
+    db.publish(channel, "msg")
+    if uses_streams:
+        db.r.xadd.assert_called_once_with(
+            f"{channel}_stream",
+            {"data": "msg"},
+            maxlen=100,
+            approximate=True,
+        )
+        db.r.publish.assert_not_called()
+    else:
+        db.r.publish.assert_called_once_with(channel, "msg")
+        db.r.xadd.assert_not_called()
+
+
+def test_get_msgs_lag():
+    db = create_redis_db("streams")
+    db.r.xinfo_groups.return_value = [
+        {"name": "FlowAlerts", "pending": 3, "lag": 10},
+        # redis < 7 has no lag field
+        {"name": "Timeline", "pending": 2},
+    ]
+    assert db.get_msgs_lag("new_flow") == {"FlowAlerts": 10, "Timeline": 2}
+    db.r.xinfo_groups.assert_called_once_with("new_flow_stream")
+
+
+def test_get_messages_from_pubsub():
+    db = create_redis_db("pubsub")
+    pubsub = Mock()
+    pubsub.get_message.side_effect = [
+        {"channel": "new_flow", "data": "a"},
+        {"channel": "new_dns", "data": "b"},
+        None,
+    ]
+    msgs = db.get_messages(pubsub, timeout=1, max_msgs=10)
+    assert [msg["data"] for msg in msgs] == ["a", "b"]
+    # only the first read blocks
+    assert pubsub.get_message.call_args_list[0].kwargs == {"timeout": 1}
+    assert pubsub.get_message.call_args_list[1].kwargs == {"timeout": 0.0}
+
+
+def test_get_messages_max_msgs():
+    db = create_redis_db("pubsub")
+    pubsub = Mock()
+    pubsub.get_message.return_value = {"channel": "new_flow", "data": "a"}
+    assert len(db.get_messages(pubsub, timeout=1, max_msgs=3)) == 3
+    assert pubsub.get_message.call_count == 3
+
+
+def test_subscribe_to_channels_using_pubsub():
+    db = create_redis_db("pubsub")
+    db.supported_channels = {"new_flow", "new_dns"}
+    pubsub = db.subscribe_to_channels(["new_flow", "new_dns", "invalid"])
+    assert pubsub == db.r.pubsub.return_value
+    pubsub.subscribe.assert_called_once_with("new_flow", "new_dns")
+
+
+def test_subscribe_to_channels_using_streams():
+    db = create_redis_db("streams")
+    db.supported_channels = {"new_flow", "new_dns"}
+    subscription = db.subscribe_to_channels(
+        ["new_flow", "new_dns"], consumer_group="FlowAlerts"
+    )
+    assert isinstance(subscription, StreamSubscription)
+    assert subscription.channels == {
+        "new_flow_stream": "new_flow",
+        "new_dns_stream": "new_dns",
+    }
+    assert subscription.group == "FlowAlerts"
@@ -1290,43 +1290,33 @@ def test_is_malicious_url(url, result, is_malicious, mocker):
         ),
     ],
 )
-def test_main_domain_lookup(mocker, msg_data, expected_call):
+def test_handle_give_threat_intelligence_domain_lookup(
+    mocker, msg_data, expected_call
+):
     """
-    Test the `main` function's handling of domain name lookups,
-    covering scenarios with DNS responses and direct domain queries.
+    Test the `handle_give_threat_intelligence` function's handling of
+    domain name lookups, covering scenarios with DNS responses and direct
+    domain queries.
     """
     threatintel = ModuleFactory().create_threatintel_obj()
     mock_call = mocker.patch.object(threatintel, expected_call)
-    mock_get_msg = mocker.patch.object(threatintel, "get_msg")
-    mock_get_msg.return_value = {"data": json.dumps(msg_data)}
 
-    threatintel.main()
+    threatintel.handle_give_threat_intelligence({"data": json.dumps(msg_data)})
 
     mock_call.assert_called_once()
 
 
-def test_main_empty_message(mocker):
+def test_handle_new_downloaded_file(mocker):
     """
-    Test the `main` function's behavior when receiving an empty message,
-    """
-    threatintel = ModuleFactory().create_threatintel_obj()
-    mock_get_msg = mocker.patch.object(threatintel, "get_msg")
-    mock_get_msg.return_value = None
-    threatintel.main()
-
-
-def test_main_file_hash_lookup(mocker):
-    """
-    Test the `main` function's handling of file hash lookups,
-    verifying it calls the appropriate malicious hash checks.
+    Test the `handle_new_downloaded_file` function's handling of file hash
+    lookups, verifying it calls the appropriate malicious hash checks.
     """
     threatintel = ModuleFactory().create_threatintel_obj()
 
     mock_is_malicious_hash = mocker.patch.object(
         threatintel, "is_malicious_hash"
     )
-    mock_get_msg = mocker.patch.object(threatintel, "get_msg")
-    mock_get_msg.return_value = {
+    msg = {
         "data": json.dumps(
             {
                 "flow": {
@@ -1343,7 +1333,7 @@ def test_main_file_hash_lookup(mocker):
             }
         )
     }
-    threatintel.main()
+    threatintel.handle_new_downloaded_file(msg)
     mock_is_malicious_hash.assert_called_once()
 
 
@@ -1384,7 +1374,7 @@ def test_main_file_hash_lookup(mocker):
         ),
     ],
 )
-def test_main_ip_lookup(
+def test_handle_give_threat_intelligence_ip_lookup(
     mocker,
     ip_address,
     is_malicious,
@@ -1392,7 +1382,8 @@ def test_main_ip_lookup(
     expected_calls,
 ):
     """
-    Test the main function's handling of IP address lookups.
+    Test the handle_give_threat_intelligence function's handling of IP
+    address lookups.
     """
     threatintel = ModuleFactory().create_threatintel_obj()
     mock_is_malicious_ip = mocker.patch.object(
@@ -1404,13 +1395,11 @@ def test_main_ip_lookup(
     mock_ip_has_blacklisted_asn = mocker.patch.object(
         threatintel, "ip_has_blacklisted_asn"
     )
-    mock_get_msg = mocker.patch.object(threatintel, "get_msg")
-
     mocker.patch.object(
         threatintel, "should_lookup", return_value=should_lookup_return
     )
 
-    mock_get_msg.return_value = {
+    msg = {
         "data": json.dumps(
             {
                 "profileid": "profile_10.0.0.1",
@@ -1426,7 +1415,7 @@ def test_main_ip_lookup(
         )
     }
 
-    threatintel.main()
+    threatintel.handle_give_threat_intelligence(msg)
 
     assert mock_is_malicious_ip.call_count == (
         expected_calls["is_malicious_ip"]
@@ -1,3 +1,4 @@
+import json
 import pytest
 from unittest.mock import Mock, patch
 
@@ -109,10 +110,93 @@ def test_process_altflow(profileid, twid, uid, alt_flow, expected):
     timeline = ModuleFactory().create_timeline_object()
 
     timeline.db.get_altflow_from_uid.return_value = alt_flow
-    result = timeline.process_altflow(profileid, twid, Mock())
+    flow = Mock(uid=uid, appproto=alt_flow["type_"])
+    result = timeline.process_altflow(profileid, twid, flow)
     assert result == expected
 
 
+def test_process_altflow_from_cache():
+    timeline = ModuleFactory().create_timeline_object()
+    altflow = {
+        "uid": "uid123",
+        "type_": "ssh",
+        "auth_success": False,
+        "auth_attempts": 3,
+        "client": "SSH-2.0-OpenSSH_8.2p1",
+    }
+    timeline.cache_altflow(
+        {"data": json.dumps({"profileid": "p", "twid": "t", "flow": altflow})}
+    )
+
+    flow = Mock(uid="uid123", appproto="ssh")
+    result = timeline.process_altflow("p", "t", flow)
+
+    assert result["info"]["login"] == "Not Successful"
+    timeline.db.get_altflow_from_uid.assert_not_called()
+    # each altflow is used once
+    assert "uid123" not in timeline.altflows
+
+
+@pytest.mark.parametrize(
+    "appproto, expected_db_calls",
+    [
+        # testcase1: the flow may have an altflow that isn't cached
+        ("dns", 1),
+        # testcase2: flows without a known service have no altflows
+        ("", 0),
+    ],
+)
+def test_get_altflow_not_cached(appproto, expected_db_calls):
+    timeline = ModuleFactory().create_timeline_object()
+    flow = Mock(uid="uid123", appproto=appproto)
+
+    timeline.get_altflow("p", "t", flow)
+
+    assert timeline.db.get_altflow_from_uid.call_count == expected_db_calls
+
+
+def test_cache_altflow_drops_the_oldest():
+    timeline = ModuleFactory().create_timeline_object()
+    with patch("modules.timeline.timeline.MAX_CACHED_ALTFLOWS", 2):
+        for uid in ("uid1", "uid2", "uid3"):
+            timeline.cache_altflow(
+                {"data": json.dumps({"flow": {"uid": uid, "type_": "dns"}})}
+            )
+    assert list(timeline.altflows) == ["uid2", "uid3"]
+
+
+def test_add_pending_flows():
+    timeline = ModuleFactory().create_timeline_object()
+    timeline.process_flow = Mock(
+        side_effect=lambda profileid, twid, flow: {"uid": flow.uid}
+    )
+    flows = [Mock(uid=f"uid{i}", starttime=float(i)) for i in range(3)]
+    timeline.pending_flows.extend(
+        [
+            (100.0, "profile_1", "timewindow1", flows[0]),
+            (100.0, "profile_1", "timewindow1", flows[1]),
+            # waiting for its altflows
+            (100.5, "profile_2", "timewindow1", flows[2]),
+        ]
+    )
+
+    with patch("time.time", return_value=101.2):
+        timeline.add_pending_flows()
+
+    timeline.db.add_timeline_lines.assert_called_once_with(
+        "profile_1",
+        "timewindow1",
+        [({"uid": "uid0"}, 0.0), ({"uid": "uid1"}, 1.0)],
+    )
+    assert len(timeline.pending_flows) == 1
+
+    timeline.shutdown_gracefully()
+    timeline.db.add_timeline_lines.assert_called_with(
+        "profile_2", "timewindow1", [({"uid": "uid2"}, 2.0)]
+    )
+    assert not timeline.pending_flows
+
+
 @pytest.mark.parametrize(
     "ip, db_dns_resolution, expected",
     [
@@ -0,0 +1,62 @@
+import pytest
+
+from slips_files.common.data_structures.timer_wheel import TimerWheel
+
+
+@pytest.mark.parametrize(
+    "scheduled, now, expected_due",
+    [
+        # Testcase 1: nothing is due yet
+        ([(10, "a")], 9, []),
+        # Testcase 2: due exactly now
+        ([(10, "a")], 10, ["a"]),
+        # Testcase 3: returned in the order of their due time
+        ([(12, "b"), (10, "a"), (30, "c")], 20, ["a", "b"]),
+        # Testcase 4: due after more than a full rotation of the wheel
+        ([(5, "a"), (5 + 8 * 3, "b")], 10, ["a"]),
+        # Testcase 5: a jump of more than a full rotation
+        ([(5, "a"), (1000, "b")], 2000, ["a", "b"]),
+    ],
+)
+def test_advance(scheduled, now, expected_due):
+    wheel = TimerWheel(tick=1, slots=8)
+    for due, record in scheduled:
+        wheel.schedule(due, record)
+
+    assert wheel.advance(now) == expected_due
+    assert len(wheel) == len(scheduled) - len(expected_due)
+
+
+def test_advance_step_by_step():
+    wheel = TimerWheel(tick=1, slots=8)
+    wheel.advance(100)
+    wheel.schedule(103, "a")
+    wheel.schedule(120, "b")
+
+    assert wheel.advance(102) == []
+    assert wheel.advance(103) == ["a"]
+    # already returned
+    assert wheel.advance(104) == []
+    assert wheel.advance(119) == []
+    assert wheel.advance(120) == ["b"]
+    assert len(wheel) == 0
+
+
+def test_schedule_in_the_past():
+    wheel = TimerWheel(tick=1, slots=8)
+    wheel.advance(100)
+    wheel.schedule(50, "a")
+    # the time didn't move, the record is returned by the next advance
+    assert wheel.advance(100) == []
+    assert wheel.advance(101) == ["a"]
+
+
+def test_pop_all():
+    wheel = TimerWheel(tick=1, slots=8)
+    wheel.schedule(300, "c")
+    wheel.schedule(10, "a")
+    wheel.schedule(20, "b")
+
+    assert wheel.pop_all() == ["a", "b", "c"]
+    assert len(wheel) == 0
+    assert wheel.advance(1000) == []
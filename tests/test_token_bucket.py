@@ -0,0 +1,44 @@
+import pytest
+
+from slips_files.common.data_structures.token_bucket import TokenBucket
+
+
+def test_consume_burst():
+    bucket = TokenBucket(rate=1, capacity=3)
+    assert [bucket.consume(0) for _ in range(4)] == [True, True, True, False]
+
+
+@pytest.mark.parametrize(
+    "now, expected_wait_time",
+    [
+        # Testcase 1: no time passed
+        (0, 2),
+        # Testcase 2: half a token was added
+        (1, 1),
+        # Testcase 3: a token was added
+        (2, 0),
+        # Testcase 4: the time went backwards
+        (-1, 2),
+    ],
+)
+def test_get_wait_time(now, expected_wait_time):
+    bucket = TokenBucket(rate=0.5, capacity=1)
+    bucket.consume(0)
+    assert bucket.get_wait_time(now) == expected_wait_time
+
+
+def test_refill_stops_at_capacity():
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.consume(0)
+    bucket.consume(0)
+    # 100 tokens worth of time passed
+    assert bucket.get_wait_time(100) == 0
+    assert bucket.tokens == 2
+
+
+def test_drain():
+    bucket = TokenBucket(rate=4 / 60, capacity=4)
+    bucket.drain(0)
+    assert not bucket.consume(0)
+    assert bucket.get_wait_time(0) == pytest.approx(15)
+    assert bucket.consume(15)
@@ -0,0 +1,59 @@
+from unittest.mock import Mock
+
+from modules.http_analyzer.user_agent_cache import UserAgentCache
+
+SAFARI = {"os_type": "Macintosh", "os_name": "OS X", "browser": "Safari"}
+CHROME = {"os_type": "Windows", "os_name": "Windows 10", "browser": "Chrome"}
+
+
+def get_cache(max_size: int = 10000) -> UserAgentCache:
+    db = Mock()
+    db.get_cached_user_agent_info.return_value = None
+    return UserAgentCache(db, max_size=max_size, ttl=60)
+
+
+def test_get_missing_user_agent():
+    cache = get_cache()
+    assert cache.get("ua") is None
+    assert cache.lookups == 1
+    assert cache.get_hit_rate() == 0
+
+
+def test_set_and_get():
+    cache = get_cache()
+    cache.set("safari", SAFARI)
+
+    assert cache.get("safari") == SAFARI
+    cache.db.set_cached_user_agent_info.assert_called_once_with(
+        "safari", SAFARI, 60
+    )
+    # found in memory
+    cache.db.get_cached_user_agent_info.assert_not_called()
+    assert cache.local_hits == 1
+    assert cache.get_hit_rate() == 100
+
+
+def test_get_from_the_cache_db():
+    cache = get_cache()
+    cache.db.get_cached_user_agent_info.return_value = CHROME
+
+    assert cache.get("chrome") == CHROME
+    assert cache.get("chrome") == CHROME
+    # only asked the db once
+    cache.db.get_cached_user_agent_info.assert_called_once_with("chrome")
+    assert cache.db_hits == 1
+    assert cache.local_hits == 1
+
+
+def test_forgets_least_recently_used():
+    cache = get_cache(max_size=2)
+    cache.set("safari", SAFARI)
+    cache.set("chrome", CHROME)
+    # safari is now the most recently used
+    cache.get("safari")
+    # forgets chrome
+    cache.set("firefox", SAFARI)
+
+    assert len(cache) == 2
+    assert list(cache.local) == ["safari", "firefox"]
+    assert cache.get("chrome") is None
@@ -0,0 +1,104 @@
+import pytest
+
+from modules.http_analyzer.user_agent_parser import parse_user_agent
+
+
+@pytest.mark.parametrize(
+    "user_agent, expected_info",
+    [
+        # Testcase 1: safari on macos
+        (
+            "Mozilla/5.0 (Macintosh; Intel Mac OS X 12_3_1) "
+            "AppleWebKit/605.1.15 (KHTML, like Gecko) "
+            "Version/15.3 Safari/605.1.15",
+            {"os_type": "Macintosh", "os_name": "OS X", "browser": "Safari"},
+        ),
+        # Testcase 2: chrome on windows 10, chrome UAs contain Safari/
+        (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/120.0.0.0 Safari/537.36",
+            {
+                "os_type": "Windows",
+                "os_name": "Windows 10",
+                "browser": "Chrome",
+            },
+        ),
+        # Testcase 3: edge on windows 7, edge UAs contain Chrome/
+        (
+            "Mozilla/5.0 (Windows NT 6.1; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/109.0.0.0 Safari/537.36 Edg/109.0.1518.78",
+            {"os_type": "Windows", "os_name": "Windows 7", "browser": "Edge"},
+        ),
+        # Testcase 4: firefox on linux
+        (
+            "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:121.0) "
+            "Gecko/20100101 Firefox/121.0",
+            {"os_type": "Linux", "os_name": "Linux", "browser": "Firefox"},
+        ),
+        # Testcase 5: chrome on android, android UAs contain Linux
+        (
+            "Mozilla/5.0 (Linux; Android 13; Pixel 7) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/120.0.0.0 Mobile Safari/537.36",
+            {"os_type": "Android", "os_name": "Android", "browser": "Chrome"},
+        ),
+        # Testcase 6: safari on iphone, iphone UAs contain Mac OS X
+        (
+            "Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) "
+            "AppleWebKit/605.1.15 (KHTML, like Gecko) "
+            "Version/17.1 Mobile/15E148 Safari/604.1",
+            {
+                "os_type": "Macintosh",
+                "os_name": "iPhone OS",
+                "browser": "Safari",
+            },
+        ),
+        # Testcase 7: internet explorer 11
+        (
+            "Mozilla/5.0 (Windows NT 6.3; Trident/7.0; rv:11.0) like Gecko",
+            {
+                "os_type": "Windows",
+                "os_name": "Windows 8.1",
+                "browser": "Internet Explorer",
+            },
+        ),
+        # Testcase 8: unknown windows version
+        (
+            "Mozilla/5.0 (Windows NT 4.0)",
+            {"os_type": "Windows", "os_name": "Windows", "browser": ""},
+        ),
+        # Testcase 9: cli tool without an os
+        ("curl/8.4.0", {"os_type": "", "os_name": "", "browser": "cURL"}),
+        # Testcase 10: unknown UA
+        ("Googlebot/2.1 (+http://www.google.com/bot.html)", None),
+        # Testcase 11: ssh client
+        ("SSH-2.0-OpenSSH_8.6", None),
+    ],
+)
+def test_parse_user_agent(user_agent, expected_info):
+    assert parse_user_agent(user_agent) == expected_info
+
+
+@pytest.mark.parametrize(
+    "user_agent",
+    [
+        "Mozilla/5.0 (Windows Phone 10.0; Android 6.0.1; Microsoft; "
+        "Lumia 950) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/52.0.2743.116 Mobile Safari/537.36 Edge/15.15063",
+        "Mozilla/5.0 (iPad; CPU OS 16_6 like Mac OS X) "
+        "AppleWebKit/605.1.15 (KHTML, like Gecko) "
+        "Version/16.6 Mobile/15E148 Safari/604.1",
+        "Mozilla/5.0 (X11; CrOS x86_64 14541.0.0) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36",
+    ],
+)
+def test_parsed_os_is_found_in_the_user_agent(user_agent):
+    """
+    check_multiple_user_agents_in_a_row() shouldn't alert when a profile
+    uses the same UA twice
+    """
+    info = parse_user_agent(user_agent)
+    assert info["os_type"] in user_agent or info["os_name"] in user_agent
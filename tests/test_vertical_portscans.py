@@ -3,6 +3,9 @@ import random
 import binascii
 import base64
 import os
+from unittest.mock import MagicMock
+
+from slips_files.core.flows.zeek import Conn
 from tests.module_factory import ModuleFactory
 
 
@@ -10,6 +13,28 @@ def get_random_uid():
     return base64.b64encode(binascii.b2a_hex(os.urandom(9))).decode("utf-8")
 
 
+def create_flow(dport: int, uid="uid", proto="tcp") -> Conn:
+    return Conn(
+        starttime="1726249372.312124",
+        uid=uid,
+        saddr="10.0.0.1",
+        daddr="8.8.8.8",
+        dur=1,
+        proto=proto,
+        appproto="",
+        sport="5555",
+        dport=str(dport),
+        spkts=1,
+        dpkts=0,
+        sbytes=0,
+        dbytes=0,
+        smac="",
+        dmac="",
+        state="S0",
+        history="S",
+    )
+
+
 def not_enough_dports_to_reach_the_threshold():
     """
     returns a dict with conns to dport that are not enough
@@ -152,3 +177,64 @@ def test_check_if_enough_dports_to_trigger_an_evidence(
         key, cur_amount_of_dports
     )
     assert enough == expected_return_val
+
+
+@pytest.mark.parametrize(
+    "amount_of_dports, state, proto, expected_evidence",
+    [
+        # Testcase 1: below the minimum dports
+        (4, "Not Established", "tcp", 0),
+        # Testcase 2: the first evidence is set on 5 dports
+        (5, "Not Established", "tcp", 1),
+        # Testcase 3: no new evidence until 15 more dports are scanned
+        (19, "Not Established", "udp", 1),
+        # Testcase 4: the second evidence is set on 20 dports
+        (20, "Not Established", "udp", 2),
+        # Testcase 5: established flows are ignored
+        (20, "Established", "tcp", 0),
+        # Testcase 6: unsupported protocol
+        (20, "Not Established", "icmp", 0),
+    ],
+)
+def test_check(amount_of_dports, state, proto, expected_evidence):
+    vertical_ps = ModuleFactory().create_vertical_portscan_obj()
+    vertical_ps.set_evidence_vertical_portscan = MagicMock()
+    profileid = "profile_10.0.0.1"
+    twid = "timewindow0"
+
+    for dport in range(amount_of_dports):
+        flow = create_flow(dport, uid=f"uid{dport}", proto=proto)
+        vertical_ps.check(profileid, twid, flow, state)
+        # the same dport again doesn't change the amount of scanned ports
+        vertical_ps.check(profileid, twid, flow, state)
+
+    calls = vertical_ps.set_evidence_vertical_portscan.call_args_list
+    assert len(calls) == expected_evidence
+    if calls:
+        evidence = calls[-1][0][0]
+        assert evidence["amount_of_dports"] in (5, 20)
+        assert evidence["dstip"] == "8.8.8.8"
+        assert evidence["protocol"] == proto.upper()
+        # the evidence is set by the first flow to the last scanned dport
+        assert evidence["pkts_sent"] == evidence["amount_of_dports"] * 2 - 1
+    vertical_ps.db.get_data_from_profile_tw.assert_not_called()
+
+
+def test_clear_tw():
+    vertical_ps = ModuleFactory().create_vertical_portscan_obj()
+    vertical_ps.set_evidence_vertical_portscan = MagicMock()
+    profileid = "profile_10.0.0.1"
+    for twid in ("timewindow0", "timewindow1"):
+        for dport in range(5):
+            vertical_ps.check(
+                profileid, twid, create_flow(dport), "Not Established"
+            )
+
+    vertical_ps.clear_tw(profileid, "timewindow0")
+
+    assert list(vertical_ps.not_estab_dstips) == [
+        "profile_10.0.0.1_timewindow1"
+    ]
+    assert list(vertical_ps.cached_thresholds_per_tw) == [
+        "profile_10.0.0.1:timewindow1:dstip:8.8.8.8"
+    ]
@@ -7,6 +7,30 @@ from tests.module_factory import ModuleFactory
 import pytest
 import requests
 import json
+import threading
+import time
+import urllib.parse
+from http.server import (
+    BaseHTTPRequestHandler,
+    HTTPServer,
+)
+
+from modules.virustotal import virustotal as virustotal_module
+from modules.virustotal.request_scheduler import (
+    EVIDENCE_PRIORITY,
+    RequestScheduler,
+)
+from slips_files.common.slips_utils import utils
+from slips_files.core.structures.evidence import (
+    Attacker,
+    Direction,
+    Evidence,
+    EvidenceType,
+    IoCType,
+    ProfileID,
+    ThreatLevel,
+    TimeWindow,
+)
 
 
 def get_vt_key():
@@ -99,3 +123,157 @@ def test_interpret_rsponse(ip):
 def test_get_domain_vt_data():
     virustotal = ModuleFactory().create_virustotal_obj()
     assert virustotal.get_domain_vt_data("google.com") is not False
+
+
+class VTStub(BaseHTTPRequestHandler):
+    """
+    a VT v2 API server that stores the looked up iocs in server.lookups,
+    and replies with 204 (quota exceeded) server.rate_limit times first
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        query = urllib.parse.parse_qs(url.query)
+        ioc = (query.get("ip") or query.get("domain") or query["resource"])[0]
+        self.server.lookups.append(ioc)
+        if self.server.rate_limit:
+            self.server.rate_limit -= 1
+            self.send_response(204)
+            self.end_headers()
+            return
+
+        reply = json.dumps(
+            {
+                "response_code": 1,
+                "asn": 15169,
+                "detected_urls": [{"positives": 1, "total": 4}],
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+
+@pytest.fixture
+def vt_server(mocker):
+    server = HTTPServer(("localhost", 0), VTStub)
+    server.lookups = []
+    server.rate_limit = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    mocker.patch.object(
+        virustotal_module,
+        "VT_API_URL",
+        f"http://localhost:{server.server_address[1]}/vtapi/v2",
+    )
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def virustotal():
+    virustotal = ModuleFactory().create_virustotal_obj()
+    virustotal.key = "a" * 64
+    virustotal.scheduler = RequestScheduler(requests_per_minute=6000)
+    virustotal.db.get_ip_info.return_value = None
+    virustotal.db.get_domain_data.return_value = None
+    virustotal.db.is_cached_url_by_vt.return_value = None
+    return virustotal
+
+
+def look_up_scheduled_iocs(virustotal, vt_server, lookups: int):
+    """runs the api calls thread until vt_server gets the given lookups"""
+    # created by init()
+    thread = virustotal.api_calls_thread
+    thread.start()
+    deadline = time.time() + 5
+    while (
+        len(vt_server.lookups) < lookups or virustotal.scheduler.in_progress
+    ) and time.time() < deadline:
+        time.sleep(0.01)
+    virustotal.scheduler.stop()
+    thread.join(timeout=5)
+
+
+def test_scheduled_iocs_are_looked_up_once(virustotal, vt_server):
+    for ioc in ("8.8.8.8", "8.8.8.8", "1.1.1.1", "8.8.8.8"):
+        virustotal.schedule_lookup(ioc)
+    virustotal.schedule_lookup("example.com", EVIDENCE_PRIORITY)
+
+    look_up_scheduled_iocs(virustotal, vt_server, 3)
+
+    assert vt_server.lookups == ["example.com", "8.8.8.8", "1.1.1.1"]
+    assert virustotal.scheduler.duplicates == 2
+    assert virustotal.db.set_ip_info.call_count == 2
+    virustotal.db.set_info_for_domains.assert_called_once()
+
+
+def test_rate_limited_lookup_is_retried(virustotal, vt_server):
+    vt_server.rate_limit = 1
+    virustotal.schedule_lookup("8.8.8.8")
+
+    look_up_scheduled_iocs(virustotal, vt_server, 2)
+
+    assert vt_server.lookups == ["8.8.8.8", "8.8.8.8"]
+    # only the successful lookup is cached
+    virustotal.db.set_ip_info.assert_called_once()
+    vt_data = virustotal.db.set_ip_info.call_args[0][1]["VirusTotal"]
+    assert vt_data["URL"] == 25
+
+
+@pytest.mark.parametrize(
+    "ioc, cached_data, expected_scheduled",
+    [
+        # Testcase 1: not cached
+        ("8.8.8.8", None, True),
+        # Testcase 2: cached recently
+        ("8.8.8.8", {"VirusTotal": {"timestamp": time.time()}}, False),
+        # Testcase 3: cached before the update period
+        ("8.8.8.8", {"VirusTotal": {"timestamp": 0}}, True),
+        # Testcase 4: cached without VT data
+        ("8.8.8.8", {"asn": {"number": "AS15169"}}, True),
+        # Testcase 5: private ip
+        ("192.168.1.1", None, False),
+        # Testcase 6: multicast ip
+        ("224.0.0.251", None, False),
+        # Testcase 7: local domain
+        ("printer.local", None, False),
+        # Testcase 8: domain
+        ("example.com", None, True),
+    ],
+)
+def test_schedule_lookup(virustotal, ioc, cached_data, expected_scheduled):
+    virustotal.db.get_ip_info.return_value = cached_data
+    virustotal.db.get_domain_data.return_value = cached_data
+    virustotal.schedule_lookup(ioc)
+    assert (ioc in virustotal.scheduler) == expected_scheduled
+
+
+def test_evidence_iocs_are_looked_up_first(virustotal):
+    evidence = Evidence(
+        evidence_type=EvidenceType.MALICIOUS_JARM,
+        description="Malicious JARM hash detected",
+        attacker=Attacker(
+            direction=Direction.DST,
+            attacker_type=IoCType.IP,
+            value="1.1.1.1",
+        ),
+        threat_level=ThreatLevel.MEDIUM,
+        profile=ProfileID("192.168.1.5"),
+        timewindow=TimeWindow(1),
+        uid=["uid"],
+        timestamp="2024/10/04 15:45:30.123456+0000",
+    )
+    msg = {"data": json.dumps(utils.to_dict(evidence))}
+    virustotal.schedule_lookup("8.8.8.8")
+    virustotal.schedule_lookup("1.1.1.1")
+
+    virustotal.handle_evidence_added(msg)
+
+    assert virustotal.scheduler.pop() == "1.1.1.1"
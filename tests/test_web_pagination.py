@@ -0,0 +1,222 @@
+import json
+from unittest.mock import (
+    MagicMock,
+    patch,
+)
+
+import pytest
+
+from slips_files.core.database.sqlite_db.database import SQLiteDB
+from webinterface.analysis.pagination import (
+    MAX_CHUNKS_PER_PAGE,
+    MAX_PAGE_SIZE,
+    Page,
+    ResponseCache,
+    read_page,
+    table_page,
+)
+
+
+@pytest.mark.parametrize(
+    "args, expected_page",
+    [
+        # Testcase 1: defaults
+        ({}, Page()),
+        # Testcase 2: all params given
+        (
+            {
+                "cursor": "10",
+                "limit": "20",
+                "search": " DNS ",
+                "order": "desc",
+            },
+            Page(cursor=10, limit=20, search="dns", desc=True),
+        ),
+        # Testcase 3: invalid values
+        ({"cursor": "-1", "limit": "x"}, Page()),
+        # Testcase 4: too big pages
+        ({"limit": "1000000"}, Page(limit=MAX_PAGE_SIZE)),
+        # Testcase 5: the params datatables sends in server side mode
+        (
+            {
+                "draw": "3",
+                "start": "40",
+                "length": "20",
+                "search[value]": "DNS",
+                "order[0][dir]": "desc",
+            },
+            Page(cursor=40, limit=20, search="dns", desc=True, draw=3),
+        ),
+        # Testcase 6: datatables asking for all the rows
+        ({"length": "-1"}, Page(limit=MAX_PAGE_SIZE)),
+    ],
+)
+def test_page_from_args(args, expected_page):
+    assert Page.from_args(args) == expected_page
+
+
+def read_chunk_from(rows: list):
+    return lambda start, end: rows[start : end + 1]
+
+
+@pytest.mark.parametrize(
+    "rows, page, expected_rows, expected_cursor",
+    [
+        # Testcase 1: first page
+        (list(range(10)), Page(limit=4), [0, 1, 2, 3], 4),
+        # Testcase 2: last page
+        (list(range(10)), Page(cursor=8, limit=4), [8, 9], None),
+        # Testcase 3: last page that's exactly full
+        (list(range(8)), Page(cursor=4, limit=4), [4, 5, 6, 7], 8),
+        # Testcase 4: search
+        (
+            [1, 11, 2, 12, 3, 13, 111],
+            Page(limit=2, search="1"),
+            [1, 11],
+            2,
+        ),
+        # Testcase 5: search continued from a cursor
+        (
+            [1, 11, 2, 12, 3, 13, 111],
+            Page(cursor=2, limit=2, search="1"),
+            [12, 13],
+            6,
+        ),
+        # Testcase 6: search reaching the end
+        (
+            [1, 11, 2, 12, 3, 13, 111],
+            Page(cursor=6, limit=2, search="1"),
+            [111],
+            None,
+        ),
+    ],
+)
+def test_read_page(rows, page, expected_rows, expected_cursor):
+    data, next_cursor = read_page(
+        page, read_chunk_from(rows), lambda row: {"value": row}
+    )
+    assert [row["value"] for row in data] == expected_rows
+    assert next_cursor == expected_cursor
+
+
+def test_read_page_stops_after_max_chunks():
+    rows = list(range(MAX_CHUNKS_PER_PAGE * 2 * 10))
+    read_chunk = MagicMock(side_effect=read_chunk_from(rows))
+    page = Page(limit=10, search="no match")
+
+    data, next_cursor = read_page(page, read_chunk, lambda row: {"v": row})
+
+    assert data == []
+    assert next_cursor == MAX_CHUNKS_PER_PAGE * 10
+    assert read_chunk.call_count == MAX_CHUNKS_PER_PAGE
+
+
+def test_table_page():
+    page = Page(cursor=2, limit=2, draw=7)
+    assert table_page(page, [{"a": 1}], 10, 3) == {
+        "draw": 7,
+        "recordsTotal": 10,
+        "recordsFiltered": 3,
+        "data": [{"a": 1}],
+    }
+
+
+def test_response_cache():
+    cache = ResponseCache(ttl=5)
+    get_page = MagicMock(return_value=(["row"], None))
+
+    assert cache.get_or_set("key", 1, get_page) == (["row"], None)
+    # cached
+    assert cache.get_or_set("key", 1, get_page) == (["row"], None)
+    assert get_page.call_count == 1
+    # the data changed
+    cache.get_or_set("key", 2, get_page)
+    assert get_page.call_count == 2
+
+
+def test_response_cache_expiry():
+    cache = ResponseCache(ttl=5)
+    get_page = MagicMock(return_value=(["row"], None))
+    with patch("time.time", return_value=1000):
+        cache.get_or_set("key", 1, get_page)
+    with patch("time.time", return_value=1006):
+        cache.get_or_set("key", 1, get_page)
+    assert get_page.call_count == 2
+
+
+def test_response_cache_max_entries():
+    cache = ResponseCache(ttl=5, max_entries=2)
+    for key in range(3):
+        cache.set(key, 1, "page")
+    assert list(cache.pages) == [1, 2]
+
+
+@pytest.fixture
+def sqlite_db(tmp_path):
+    db = SQLiteDB(MagicMock(), str(tmp_path))
+    for idx in range(5):
+        flow = {"uid": f"uid{idx}", "daddr": f"8.8.8.{idx}"}
+        db.execute(
+            "INSERT INTO flows (uid, flow, label, profileid, twid, aid) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                f"uid{idx}",
+                json.dumps(flow),
+                "benign",
+                "profile_1.1.1.1",
+                "timewindow1",
+                "",
+            ),
+        )
+    # a flow in another tw
+    db.execute(
+        "INSERT INTO flows (uid, flow, label, profileid, twid, aid) "
+        "VALUES ('uid5', '{}', 'benign', 'profile_1.1.1.1', "
+        "'timewindow2', '')"
+    )
+    yield db
+    db.close()
+
+
+@pytest.mark.parametrize(
+    "kwargs, expected_uids",
+    [
+        # Testcase 1: first page
+        ({"limit": 2}, ["uid0", "uid1"]),
+        # Testcase 2: second page
+        ({"offset": 2, "limit": 2}, ["uid2", "uid3"]),
+        # Testcase 3: desc
+        ({"limit": 2, "desc": True}, ["uid4", "uid3"]),
+        # Testcase 4: second page of desc
+        ({"offset": 2, "limit": 2, "desc": True}, ["uid2", "uid1"]),
+        # Testcase 5: search
+        ({"search": "8.8.8.3"}, ["uid3"]),
+    ],
+)
+def test_get_flows_page(sqlite_db, kwargs, expected_uids):
+    flows = sqlite_db.get_flows_page(
+        "profile_1.1.1.1", "timewindow1", **kwargs
+    )
+    assert [json.loads(flow)["uid"] for flow in flows] == expected_uids
+
+
+@pytest.mark.parametrize(
+    "search, expected_count",
+    [
+        # Testcase 1: all the flows of the tw
+        ("", 5),
+        # Testcase 2: the ones matching the search
+        ("8.8.8.3", 1),
+        # Testcase 3: no matches
+        ("1.2.3.4", 0),
+        # Testcase 4: _ isn't a wildcard
+        ("uid_", 0),
+        # Testcase 5: % isn't a wildcard
+        ("8.8.%.3", 0),
+    ],
+)
+def test_get_tw_flows_count(sqlite_db, search, expected_count):
+    assert (
+        sqlite_db.get_tw_flows_count("profile_1.1.1.1", "timewindow1", search)
+        == expected_count
+    )
@@ -1,9 +1,23 @@
 from flask import Blueprint
 from flask import render_template
+from flask import request
 import json
+import re
 from collections import defaultdict
-from typing import Dict, List
+from typing import (
+    Any,
+    Dict,
+    List,
+    Tuple,
+)
 from ..database.database import db
+from .pagination import (
+    MAX_CHUNKS_PER_PAGE,
+    Page,
+    ResponseCache,
+    read_page,
+    table_page,
+)
 from slips_files.common.slips_utils import utils
 
 analysis = Blueprint(
@@ -13,6 +27,8 @@ analysis = Blueprint(
     static_url_path="/analysis/static",
     template_folder="templates",
 )
+# the pages of the paginated endpoints, cached for a few seconds
+cache = ResponseCache()
 
 
 # ----------------------------------------
@@ -24,6 +40,59 @@ def ts_to_date(ts, seconds=False):
     return utils.convert_format(ts, "%Y/%m/%d %H:%M:%S")
 
 
+def glob_escape(text: str) -> str:
+    """escapes the chars redis treats as wildcards in SCAN patterns"""
+    return re.sub(r"([*?\[\]\\])", r"\\\1", text)
+
+
+def tw_to_row(tw_tuple: Tuple[str, float]) -> dict:
+    tw_n, tw_ts = tw_tuple
+    return {
+        "tw": tw_n,
+        "name": "TW " + tw_n.split("timewindow")[1] + ":" + ts_to_date(tw_ts),
+        "blocked": False,  # needed to color profiles
+    }
+
+
+def parse_timeline_flow(flow: str) -> dict:
+    flow = json.loads(flow)
+
+    # TODO: check IGMP
+    if flow["dport_name"] == "IGMP":
+        fields = [
+            "dns_resolution",
+            "dport/proto",
+            "state",
+            "sent",
+            "recv",
+            "tot",
+            "warning",
+            "critical",
+        ]
+        for field in fields:
+            flow[field] = "????"
+
+    # TODO: check this logic
+    if flow["preposition"] == "from":
+        temp = flow["saddr"]
+        flow["daddr"] = temp
+    return flow
+
+
+def parse_flow(flow: str) -> dict:
+    flow = json.loads(flow)
+
+    # convert timestamp to date
+    timestamp = flow["ts"]
+    dt_obj = ts_to_date(timestamp, seconds=True)
+    flow["ts"] = dt_obj
+
+    # limit duration decimals
+    duration = float(flow["dur"])
+    flow["dur"] = "{:.5f}".format(duration)
+    return flow
+
+
 def get_all_tw_with_ts(profileid):
     tws = db.get_tws_from_profile(profileid)
     dict_tws = defaultdict(dict)
@@ -122,24 +191,39 @@ def set_profile_tws():
     """
     Set profiles and their timewindows into the tree.
     Blocked are highligted in red.
+    The profiles are returned in pages, the cursor of each page is the
+    redis SSCAN cursor, so they're in no particular order.
     """
-    profiles_dict = {}
-    # Fetch profiles
-    profiles = db.get_profiles()
-    for profileid in profiles:
-        profile_word, profile_ip = profileid.split("_")
-        profiles_dict[profile_ip] = False
-
-    if blocked_profiles := db.get_malicious_profiles():
-        for profile in blocked_profiles:
-            blocked_ip = profile.split("_")[-1]
-            profiles_dict[blocked_ip] = True
-
-    data = [
-        {"profile": profile_ip, "blocked": blocked_state}
-        for profile_ip, blocked_state in profiles_dict.items()
-    ]
-    return {"data": data}
+    page = Page.from_args(request.args)
+    version = (db.get_profiles_len(), db.get_malicious_profiles_len())
+
+    def get_page() -> Dict[str, Any]:
+        match = None
+        if page.search:
+            match = f"profile_*{glob_escape(page.search)}*"
+
+        # {profileid: None}, SSCAN may return the same profile twice
+        profiles = {}
+        cursor = page.cursor
+        for _ in range(MAX_CHUNKS_PER_PAGE):
+            cursor, chunk = db.scan_profiles(
+                cursor, match=match, count=page.limit
+            )
+            profiles.update(dict.fromkeys(chunk))
+            if not cursor or len(profiles) >= page.limit:
+                break
+
+        blocked_profiles = db.get_malicious_profiles() or set()
+        data = [
+            {
+                "profile": profileid.split("_", 1)[1],
+                "blocked": profileid in blocked_profiles,
+            }
+            for profileid in profiles
+        ]
+        return {"data": data, "next_cursor": cursor or None}
+
+    return cache.get_or_set(("profiles", page.key()), version, get_page)
 
 
 @analysis.route("/info/<ip>")
@@ -159,33 +243,34 @@ def set_ip_info(ip):
 @analysis.route("/tws/<ip>")
 def set_tws(ip):
     """
-    Set timewindows for selected profile
+    Set timewindows for selected profile, in pages
     :param ip: ip of the profile
     :return:
     """
-
-    # Fetch all profile TWs
     profileid = f"profile_{ip}"
-    tws: Dict[str, dict] = get_all_tw_with_ts(profileid)
-
-    blocked_tws: List[str] = []
-    for tw_id, twid_details in tws.items():
-        is_blocked: bool = db.get_profileid_twid_alerts(profileid, tw_id)
-        if is_blocked:
-            blocked_tws.append(tw_id)
-
-    for tw in blocked_tws:
-        tws[tw]["blocked"] = True
-
-    data = [
-        {
-            "tw": tw_value["tw"],
-            "name": tw_value["name"],
-            "blocked": tw_value["blocked"],
-        }
-        for tw_key, tw_value in tws.items()
-    ]
-    return {"data": data}
+    page = Page.from_args(request.args)
+    version = (
+        db.get_number_of_tws(profileid),
+        db.get_number_of_alerts_so_far(),
+    )
+
+    def get_page() -> Dict[str, Any]:
+        tws, next_cursor = read_page(
+            page,
+            lambda start, end: db.get_tws_from_profile(
+                profileid, start, end, desc=page.desc
+            ),
+            tw_to_row,
+        )
+        # one db call for all the tws of the page
+        blocked_tws = set(
+            db.get_alerted_tws(profileid, [tw["tw"] for tw in tws])
+        )
+        for tw in tws:
+            tw["blocked"] = tw["tw"] in blocked_tws
+        return {"data": tws, "next_cursor": next_cursor}
+
+    return cache.get_or_set(("tws", profileid, page.key()), version, get_page)
 
 
 @analysis.route("/intuples/<ip>/<timewindow>")
@@ -237,29 +322,39 @@ def set_outtuples(ip, timewindow):
 @analysis.route("/timeline_flows/<ip>/<timewindow>")
 def set_timeline_flows(ip, timewindow):
     """
-    Set timeline flows of a chosen profile and timewindow.
+    Set timeline flows of a chosen profile and timewindow, one datatables
+    page at a time.
     :return: list of timeline flows as set initially in database
     """
-    data = []
     profileid = f"profile_{ip}"
-    if timeline_flows := db.get_all_flows_in_profileid_twid(
-        profileid, timewindow
-    ):
-        for key, value in timeline_flows.items():
-            value = json.loads(value)
-
-            # convert timestamp to date
-            timestamp = value["ts"]
-            dt_obj = ts_to_date(timestamp, seconds=True)
-            value["ts"] = dt_obj
-
-            # limit duration decimals
-            duration = float(value["dur"])
-            value["dur"] = "{:.5f}".format(duration)
-
-            data.append(value)
-
-    return {"data": data}
+    page = Page.from_args(request.args)
+    version = db.get_tw_modification_time(profileid, timewindow)
+
+    def get_page() -> Tuple[List[dict], int, int]:
+        flows: List[str] = db.get_flows_page(
+            profileid,
+            timewindow,
+            offset=page.cursor,
+            limit=page.limit,
+            search=page.search,
+            desc=page.desc,
+        )
+        total = db.get_tw_flows_count(profileid, timewindow)
+        filtered = total
+        if page.search:
+            filtered = db.get_tw_flows_count(
+                profileid, timewindow, page.search
+            )
+        return [parse_flow(flow) for flow in flows], total, filtered
+
+    return table_page(
+        page,
+        *cache.get_or_set(
+            ("timeline_flows", profileid, timewindow, page.key()),
+            version,
+            get_page,
+        ),
+    )
 
 
 @analysis.route("/timeline/<ip>/<timewindow>")
@@ -268,38 +363,58 @@ def set_timeline(
     timewindow,
 ):
     """
-    Set timeline data of a chosen profile and timewindow
+    Set timeline data of a chosen profile and timewindow, one datatables
+    page at a time.
     :return: list of timeline as set initially in database
     """
-    data = []
     profileid = f"profile_{ip}"
-    if timeline := db.get_profiled_tw_timeline(profileid, timewindow):
-        for flow in timeline:
-            flow = json.loads(flow)
-
-            # TODO: check IGMP
-            if flow["dport_name"] == "IGMP":
-                fields = [
-                    "dns_resolution",
-                    "dport/proto",
-                    "state",
-                    "sent",
-                    "recv",
-                    "tot",
-                    "warning",
-                    "critical",
-                ]
-                for field in fields:
-                    flow[field] = "????"
-
-            # TODO: check this logic
-            if flow["preposition"] == "from":
-                temp = flow["saddr"]
-                flow["daddr"] = temp
-
-            data.append(flow)
+    page = Page.from_args(request.args)
+    version = db.get_tw_modification_time(profileid, timewindow)
+
+    def search_timeline() -> List[dict]:
+        """
+        returns all the entries of the tw matching the search, cached
+        so the next pages of the same search are sliced from it
+        """
+        return [
+            row
+            for row in map(
+                parse_timeline_flow,
+                db.get_profiled_tw_timeline(
+                    profileid, timewindow, desc=page.desc
+                ),
+            )
+            if page.matches(row)
+        ]
 
-    return {"data": data}
+    def get_page() -> Tuple[List[dict], int, int]:
+        total = db.get_timeline_len(profileid, timewindow)
+        if not page.search:
+            timeline = db.get_profiled_tw_timeline(
+                profileid,
+                timewindow,
+                page.cursor,
+                page.cursor + page.limit - 1,
+                desc=page.desc,
+            )
+            return [parse_timeline_flow(row) for row in timeline], total, total
+
+        matches = cache.get_or_set(
+            ("timeline_search", profileid, timewindow, page.search, page.desc),
+            version,
+            search_timeline,
+        )
+        rows = matches[page.cursor : page.cursor + page.limit]
+        return rows, total, len(matches)
+
+    return table_page(
+        page,
+        *cache.get_or_set(
+            ("timeline", profileid, timewindow, page.key()),
+            version,
+            get_page,
+        ),
+    )
 
 
 @analysis.route("/alerts/<ip>/<timewindow>")
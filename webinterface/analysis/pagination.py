@@ -0,0 +1,199 @@
+"""
+Helpers for the analysis endpoints that return their rows in pages
+instead of whole datasets, so busy profiles and timewindows don't freeze
+the web interface or keep redis busy.
+
+The profiles and tws endpoints accept the following query string params
+    cursor: where to continue from, returned as next_cursor by the
+        previous page. 0 or missing for the first page
+    limit: max rows per page
+    search: only rows containing this text are returned
+    order: asc or desc
+and return {"data": [rows], "next_cursor": <cursor or null>}
+next_cursor is null once there are no more rows.
+
+The timeline and flows endpoints are read by datatables in server side
+mode, so they accept the params datatables sends instead
+    start: the offset of the first row, length: max rows per page,
+    search[value], order[0][dir] and draw
+and return {"draw", "recordsTotal", "recordsFiltered", "data": [rows]}
+"""
+
+import time
+from dataclasses import dataclass
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+# a page with a search that matches nothing shouldn't read a whole
+# timeline in one request, after reading this many chunks the rows found
+# so far are returned with a cursor to continue
+MAX_CHUNKS_PER_PAGE = 20
+
+
+def to_int(value: Optional[str], default: int) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class Page:
+    """The page of rows requested from a paginated endpoint"""
+
+    cursor: int = 0
+    limit: int = DEFAULT_PAGE_SIZE
+    search: str = ""
+    desc: bool = False
+    # echoed back to datatables so it drops the responses of old requests
+    draw: int = 0
+
+    @classmethod
+    def from_args(cls, args: Dict[str, str]) -> "Page":
+        """
+        parses the page from the query string params of the request,
+        either the datatables ones or the cursor ones
+        """
+        limit = to_int(
+            args.get("length", args.get("limit")), DEFAULT_PAGE_SIZE
+        )
+        if limit < 0:
+            # datatables asks for all the rows with length=-1
+            limit = MAX_PAGE_SIZE
+        cursor = to_int(args.get("start", args.get("cursor")), 0)
+        search = args.get("search[value]", args.get("search", ""))
+        order = args.get("order[0][dir]", args.get("order", "asc"))
+        return cls(
+            cursor=max(cursor, 0),
+            limit=min(max(limit, 1), MAX_PAGE_SIZE),
+            search=search.strip().lower(),
+            desc=order.lower() == "desc",
+            draw=max(to_int(args.get("draw"), 0), 0),
+        )
+
+    def key(self) -> tuple:
+        return self.cursor, self.limit, self.search, self.desc
+
+    def matches(self, row: dict) -> bool:
+        """checks if any of the values of the given row has the search"""
+        if not self.search:
+            return True
+        return any(self.search in str(value).lower() for value in row.values())
+
+
+def read_page(
+    page: Page,
+    read_chunk: Callable[[int, int], list],
+    parse: Callable[[Any], dict],
+) -> Tuple[List[dict], Optional[int]]:
+    """
+    Reads the rows of the given page from a source sorted by rank, like
+    a redis sorted set. the cursor of the page is the rank to start from
+    :param read_chunk: returns the raw rows between the given 2 ranks,
+        inclusive
+    :param parse: converts a raw row to the dict returned to the ui
+    :return: the rows of the page and the rank to continue from, or None
+        if there are no more rows
+    """
+    rows = []
+    rank = page.cursor
+    for _ in range(MAX_CHUNKS_PER_PAGE):
+        chunk = read_chunk(rank, rank + page.limit - 1)
+        for idx, raw_row in enumerate(chunk, start=1):
+            row = parse(raw_row)
+            if page.matches(row):
+                rows.append(row)
+
+            if len(rows) == page.limit:
+                # a chunk shorter than requested is the end of the source
+                is_last_row = idx == len(chunk) and len(chunk) < page.limit
+                return rows, None if is_last_row else rank + idx
+
+        if len(chunk) < page.limit:
+            return rows, None
+        rank += len(chunk)
+    return rows, rank
+
+
+def table_page(
+    page: Page, rows: List[dict], total: int, filtered: int
+) -> Dict[str, Any]:
+    """
+    returns the given rows in the format datatables expects in server
+    side mode
+    :param total: the number of rows without the search
+    :param filtered: the number of rows matching the search
+    """
+    return {
+        "draw": page.draw,
+        "recordsTotal": total,
+        "recordsFiltered": filtered,
+        "data": rows,
+    }
+
+
+class ResponseCache:
+    """
+    Keeps the pages returned by the endpoints for a few seconds.
+    Each page is stored with the version of the db data it was read from,
+    (e.g. the last modification time of its tw), so the ui polling the
+    same pages doesn't query the db again unless the data changed.
+    """
+
+    def __init__(self, ttl: float = 5, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # {key: (version, expiry time, page)}
+        self.pages: Dict[Hashable, Tuple[Hashable, float, Any]] = {}
+        # flask serves requests from multiple threads
+        self.lock = Lock()
+
+    def get(self, key: Hashable, version: Hashable) -> Optional[Any]:
+        with self.lock:
+            cached = self.pages.get(key)
+            if not cached:
+                return None
+            cached_version, expiry, page = cached
+            if cached_version != version or expiry < time.time():
+                del self.pages[key]
+                return None
+            return page
+
+    def set(self, key: Hashable, version: Hashable, page: Any):
+        with self.lock:
+            if len(self.pages) >= self.max_entries:
+                self.remove_expired()
+            if len(self.pages) >= self.max_entries:
+                # drop the oldest page
+                del self.pages[next(iter(self.pages))]
+            self.pages[key] = (version, time.time() + self.ttl, page)
+
+    def remove_expired(self):
+        now = time.time()
+        for key in [
+            key for key, (_, expiry, _) in self.pages.items() if expiry < now
+        ]:
+            del self.pages[key]
+
+    def get_or_set(
+        self, key: Hashable, version: Hashable, get_page: Callable[[], Any]
+    ) -> Any:
+        """
+        returns the cached page of the given key and version, or reads
+        it using get_page() and caches it
+        """
+        page = self.get(key, version)
+        if page is None:
+            page = get_page()
+            self.set(key, version, page)
+        return page
@@ -13,16 +13,101 @@ let childRowsProfile = null;
 let childRowsAnalysis = null;
 let profilesScrollingContainer;
 let profilesScrollTop = 0;
+// {table id: {url, nextCursor, pages, loading}} of the tables whose endpoints
+// return their rows in pages. only the first page is loaded, the next ones
+// are loaded when the table is scrolled to the bottom
+let pagedTables = {};
 
 
 function capitalizeFirstLetter(data) {
     return data.charAt(0).toUpperCase() + data.slice(1);
 }
 
+/* Requests one page of a paginated table and appends its rows. pages
+ * requested for a url the table isn't showing anymore are dropped */
+function requestPage(tableID, state, cursor, onLoad) {
+    let separator = state.url.includes("?") ? "&" : "?";
+    state.loading = true;
+    $.getJSON(state.url + separator + "cursor=" + cursor, function (json) {
+        if (pagedTables[tableID] !== state) {
+            return;
+        }
+        let table = $(tableID).DataTable();
+        if (cursor === 0) {
+            // same as what datatables does on ajax loads, so the
+            // 'xhr' listeners still work
+            $(table.table().node()).trigger("xhr.dt", [table.settings()[0], json, null]);
+            table.clear();
+        }
+        table.rows.add(json.data).draw(false);
+        state.nextCursor = json.next_cursor;
+        state.pages += 1;
+        state.loading = false;
+        if (onLoad) {
+            onLoad();
+        }
+    });
+}
+
+/* Loads the first page of a paginated endpoint into the given table, and
+ * the next ones until the given number of pages is shown, e.g. to reload
+ * the pages the user already scrolled through */
+function loadPages(tableID, url, pages = 1) {
+    let state = {url: url, nextCursor: null, pages: 0, loading: false};
+    pagedTables[tableID] = state;
+
+    function loadMore() {
+        if (state.pages < pages && state.nextCursor !== null) {
+            requestPage(tableID, state, state.nextCursor, loadMore);
+        }
+    }
+    requestPage(tableID, state, 0, loadMore);
+}
+
+/* Appends the next page of the given table if it has one */
+function loadNextPage(tableID) {
+    let state = pagedTables[tableID];
+    if (state && !state.loading && state.nextCursor !== null) {
+        requestPage(tableID, state, state.nextCursor);
+    }
+}
+
+/* Loads the profiles matching the text typed in the search box of the
+ * profiles table, instead of filtering the loaded ones only */
+function loadProfiles() {
+    let search = $('#table_profiles_filter input').val() || "";
+    let url = '/analysis/profiles_tws';
+    if (search) {
+        url += "?search=" + encodeURIComponent(search);
+    }
+    loadPages('#table_profiles', url);
+}
+
+/* Loads the next page of the profiles, and of the shown tws, once the
+ * profiles are scrolled to the bottom */
+function loadPagesOnScroll() {
+    let container = $($('#table_profiles').DataTable().table().node()).parent('div.dataTables_scrollBody');
+    container.on('scroll', function () {
+        if (this.scrollTop + this.clientHeight < this.scrollHeight - 50) {
+            return;
+        }
+        for (const tableID of Object.keys(pagedTables)) {
+            if ($(tableID).length) {
+                loadNextPage(tableID);
+            }
+        }
+    });
+}
+
+function loadAnalysisTable(link) {
+    // the timeline and flows tables request only the page they show
+    $("#table_" + active_analysisTable).DataTable().ajax.url(link).load();
+}
+
 function updateAnalysisTable() {
     if (active_profile && active_timewindow) {
         let link = "/analysis/" + active_analysisTable + "/" + active_profile + "/" + active_timewindow;
-        $("#table_" + active_analysisTable).DataTable().ajax.url(link).load();
+        loadAnalysisTable(link);
         removeListeners(last_analysisTable);
 
         switch (active_analysisTable) {
@@ -203,12 +288,13 @@ function initProfileTwListeners() {
             row.child.hide();
             tr.removeClass('shown');
             $("#" + profile_id_dash).DataTable().clear().destroy();
+            delete pagedTables["#" + profile_id_dash];
         }
         else {
             row.child(addTableTWs(profile_id_dash)).show();
             let url = '/analysis/tws/' + profile_id;
-            let table_tws = $("#" + profile_id_dash).DataTable(analysisSubTableDefs["tw"]);
-            table_tws.ajax.url(url).load();
+            $("#" + profile_id_dash).DataTable(analysisSubTableDefs["tw"]);
+            loadPages("#" + profile_id_dash, url);
             addTableTWsListener(profile_id_dash, tr)
             tr.addClass('shown');
         }
@@ -226,8 +312,8 @@ function initProfileTwListeners() {
                     let profile_id_dash = convertDotToDash(profile_id)
                     $("#" + profile_id_dash).DataTable().clear().destroy();
                     this.child(addTableTWs(profile_id_dash)).show();
-                    let table_tws = $("#" + profile_id_dash).DataTable(analysisSubTableDefs["tw"]);
-                    table_tws.ajax.url('/analysis/tws/' + profile_id).load();
+                    $("#" + profile_id_dash).DataTable(analysisSubTableDefs["tw"]);
+                    loadPages("#" + profile_id_dash, '/analysis/tws/' + profile_id);
                     addTableTWsListener(profile_id_dash, this);
                     this.nodes().to$().addClass('shown');
                 });
@@ -237,6 +323,12 @@ function initProfileTwListeners() {
         });
     });
 
+    let searchTimeout;
+    $('#table_profiles_filter input').on('input', function () {
+        clearTimeout(searchTimeout);
+        searchTimeout = setTimeout(loadProfiles, 500);
+    });
+
     $(".filter-checkbox").on("change", function(e) {
         let searchTerm = $('input[name="filter"]:checked').attr("data-filter");
         $('#table_profiles').DataTable().column(1).search(searchTerm, false, false, true).draw();
@@ -368,12 +460,15 @@ function update(){
     profilesScrollingContainer = $(profile_t.table().node()).parent('div.dataTables_scrollBody');
     profilesScrollTop = profilesScrollingContainer.scrollTop();
     $($(active_tw_id).DataTable().row(active_timewindow_index).node()).removeClass('row_selected');
-    profile_t.ajax.reload(null, false);
+    // reload only the pages that were scrolled through
+    let profiles = pagedTables['#table_profiles'];
+    loadPages('#table_profiles', profiles.url, profiles.pages);
 
-    // Update analysis table
+    // Update analysis table, the paginated ones reload the shown page only
     if (active_profile && active_timewindow) {
-        childRowsAnalysis = $("#table_" + active_analysisTable).DataTable().rows('.shown');
-        $("#table_" + active_analysisTable).DataTable().ajax.reload(null, false); 
+        let tableID = "#table_" + active_analysisTable;
+        childRowsAnalysis = $(tableID).DataTable().rows('.shown');
+        $(tableID).DataTable().ajax.reload(null, false);
     }
 
     // Update IpInfo
@@ -389,6 +484,8 @@ function automaticUpdate() {
 function initAnalysisPage() {
     initAllAnalysisTables();  // Initialize all analysis tables
     initProfileTwListeners(); // Initialize all profile and tw tables' listeners
+    loadProfiles();
+    loadPagesOnScroll();
     initAnalysisTagListeners(); //Initialize analysisTags listeners
     initHideProfileTWButtonListener();
     automaticUpdate();
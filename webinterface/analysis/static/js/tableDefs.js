@@ -48,6 +48,18 @@ let analysisTableDefs = {
         buttons: ['colvis'],
         scrollX: true,
         searching: true,
+        // only the shown page is requested, with the search and the order
+        serverSide: true,
+        processing: true,
+        // nothing to load until a tw is selected
+        deferLoading: 0,
+        searchDelay: 500,
+        // the rows can only be sorted by time
+        order: [[0, 'asc']],
+        columnDefs: [
+            { orderable: true, targets: 0 },
+            { orderable: false, targets: '_all' }
+        ],
         columns: [
             { data: 'timestamp' },
             { data: 'dport_name' },
@@ -116,6 +128,18 @@ let analysisTableDefs = {
         buttons: ['colvis'],
         scrollX: true,
         searching: true,
+        // only the shown page is requested, with the search and the order
+        serverSide: true,
+        processing: true,
+        // nothing to load until a tw is selected
+        deferLoading: 0,
+        searchDelay: 500,
+        // the rows can only be sorted by time
+        order: [[0, 'asc']],
+        columnDefs: [
+            { orderable: true, targets: 0 },
+            { orderable: false, targets: '_all' }
+        ],
         columns: [
             { data: 'ts' },
             { data: 'dur' },
@@ -179,7 +203,6 @@ let analysisTableDefs = {
         scrollCollapse: true,
         paging: false,
         info: false,
-        ajax: '/analysis/profiles_tws',
         columns: [
             {
                 data: 'profile',